@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+XOFlowers Event-Loop Lag Benchmark
+==================================
+
+Runs the CPU-bound pipeline stages under concurrent load with the shipped
+offload settings and reports event-loop lag percentiles plus per-stage latency
+for each pool type:
+
+- search-parameter extraction and product scoring run inline (offload=False),
+  as ProductRecommender calls them;
+- context JSON is decoded in the pool only above CPU_OFFLOAD_MIN_BYTES.
+
+Defaults match production sizes: 10 scored products per request (ChromaDB
+returns max_recommendations * 2) and 10 context messages
+(max_conversation_history). Raise --context-messages to see where the
+offload threshold starts to matter.
+
+Usage: python benchmark_event_loop_lag.py [--requests 200] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.intelligence.cpu_executor import CPUStageExecutor
+from src.intelligence.product_recommender import ProductRecommender
+
+
+MESSAGES = [
+    "Vreau trandafiri roșii elegante pentru soția mea, până la 800 lei, urgent azi",
+    "Caut bujori romantici pentru mama, buget 500 lei",
+    "I need modern tulips for a colleague, up to 400 mdl tomorrow",
+    "Хочу букет роз для подруги до 1000 лей",
+]
+
+
+def build_products(count: int) -> list:
+    """Synthetic ChromaDB-like search results"""
+    categories = ['trandafiri', 'bujori', 'lalele', 'orhidee', 'gerbera']
+    colors = ['roșu', 'alb', 'roz', 'galben']
+    return [
+        {
+            'id': f'product_{i}',
+            'name': f'Buchet {categories[i % 5]} elegant {i}',
+            'description': 'Buchet romantic modern cu flori proaspete ' * 5,
+            'category': categories[i % 5],
+            'colors': [colors[i % 4], colors[(i + 1) % 4]],
+            'occasions': ['romantic', 'aniversare'],
+            'price': 150 + (i * 37) % 1500,
+            'availability': i % 7 != 0,
+            'similarity_score': (i % 100) / 100
+        }
+        for i in range(count)
+    ]
+
+
+def build_context_document(messages: int) -> str:
+    """Large serialized conversation context"""
+    return json.dumps({
+        'user_id': 'bench_user',
+        'messages': [
+            {'user': MESSAGES[i % 4] * 4, 'assistant': 'Vă recomand următoarele buchete... ' * 20,
+             'timestamp': '2025-07-16T10:30:00', 'intent': 'product_search', 'confidence': 0.9}
+            for i in range(messages)
+        ],
+        'preferences': {'budget_range': [200, 800], 'preferred_colors': ['roșu']},
+        'last_updated': '2025-07-16T10:30:00',
+        'total_messages': messages
+    }, ensure_ascii=False)
+
+
+async def simulate_request(executor: CPUStageExecutor, recommender: ProductRecommender,
+                           index: int, products: list, context_document: str) -> None:
+    """One request worth of CPU-bound stages (named per pool type, the metrics registry is shared)"""
+    message = MESSAGES[index % len(MESSAGES)]
+    intent = {'intent': 'product_search', 'confidence': 0.9, 'entities': {}}
+    preferences = {'budget_range': [200, 800], 'occasions': ['romantic']}
+    prefix = f"{executor.pool_type}."
+
+    await executor.loads(context_document, f"{prefix}context_decode")
+    params = await executor.run(f"{prefix}extract_search_parameters", recommender._extract_search_parameters,
+                                message, intent, preferences, offload=False)
+    await executor.run(f"{prefix}score_products", recommender._score_and_rank_products, products, params, 5,
+                       offload=False)
+
+
+async def run_scenario(pool_type: str, requests: int, concurrency: int,
+                       products: list, context_document: str) -> dict:
+    """Run load for one pool type while sampling event-loop lag"""
+    executor = CPUStageExecutor(pool_type=pool_type)
+    recommender = ProductRecommender()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # Warm up worker pool so process start-up isn't measured
+    await simulate_request(executor, recommender, 0, products, context_document)
+
+    async def bounded(i):
+        async with semaphore:
+            await simulate_request(executor, recommender, i, products, context_document)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    stats = executor.get_stats()
+    executor.shutdown()
+    prefix = f"{pool_type}."
+    stages = {stage[len(prefix):]: summary for stage, summary in stats['stages'].items() if stage.startswith(prefix)}
+    return {'elapsed': elapsed, 'stages': stages}
+
+
+async def run_with_lag(pool_type: str, args, products: list, context_document: str) -> dict:
+    """Run scenario and sample event-loop lag concurrently"""
+    samples = []
+
+    async def sampler():
+        while True:
+            expected = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            samples.append(max(0.0, time.perf_counter() - expected))
+
+    sampler_task = asyncio.create_task(sampler())
+    result = await run_scenario(pool_type, args.requests, args.concurrency, products, context_document)
+    # Let the sampler observe an overdue wake-up if the loop was blocked the whole time
+    await asyncio.sleep(0.01)
+    sampler_task.cancel()
+
+    samples.sort()
+    result['lag'] = {
+        'samples': len(samples),
+        'p50_ms': statistics.median(samples) * 1000 if samples else 0,
+        'p99_ms': samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000 if samples else 0,
+        'max_ms': samples[-1] * 1000 if samples else 0
+    }
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag benchmark for CPU pipeline stages")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--products', type=int, default=10)
+    parser.add_argument('--context-messages', type=int, default=10)
+    args = parser.parse_args()
+
+    # Per-call performance logs would dominate the measurement
+    logging.disable(logging.INFO)
+
+    products = build_products(args.products)
+    context_document = build_context_document(args.context_messages)
+
+    print("⏱️  XOFlowers Event-Loop Lag Benchmark")
+    print("=" * 50)
+    print(f"requests={args.requests} concurrency={args.concurrency} products={args.products} "
+          f"context={len(context_document) // 1024} KB (offloaded above "
+          f"{CPUStageExecutor(pool_type='inline').offload_min_bytes // 1024} KB)")
+
+    for pool_type in ('inline', 'thread', 'process'):
+        result = await run_with_lag(pool_type, args, products, context_document)
+        lag = result['lag']
+        print(f"\n[{pool_type}] total {result['elapsed']:.2f}s | loop lag p50 {lag['p50_ms']:.2f} ms, "
+              f"p99 {lag['p99_ms']:.2f} ms, max {lag['max_ms']:.2f} ms ({lag['samples']} samples)")
+        for stage, histogram in result['stages'].items():
+            print(f"    {stage:<28} avg {histogram['avg'] * 1000:7.2f} ms  p95 <= {histogram['p95'] * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
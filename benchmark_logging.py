@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+XOFlowers Logging Overhead Benchmark
+====================================
+
+Emits one request worth of the pipeline's log lines (request start, security,
+performance and interaction records, ChromaDB details) from concurrent requests
+and reports the time each request spends in logging calls plus event-loop lag.
+Console output goes to a file in a temporary directory, like a container log pipe.
+
+Usage: python benchmark_logging.py [--requests 2000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+PRODUCTS = [
+    {'name': f'Buchet trandafiri roșii elegant {i}', 'price': 150 + i * 37, 'category': 'trandafiri'}
+    for i in range(10)
+]
+
+
+def log_request(logger: logging.Logger, index: int) -> float:
+    """Log calls of one request; returns seconds spent in them"""
+    from src.helpers.utils import log_ai_interaction, log_performance_metrics, log_security_check
+
+    request_id = f"bench_user_{index}"
+    start = time.perf_counter()
+    logger.info(f"[{request_id}] Starting enhanced AI processing for user bench_user")
+    log_performance_metrics(logger, "gemini_security_check", 0.42, True)
+    log_security_check(logger, "bench_user", "Vreau trandafiri roșii pentru soția mea", True, "low", [])
+    logger.debug("[%s] Analysis result: %s", request_id, {'intent': 'product_search', 'search_terms': 'trandafiri'})
+    log_performance_metrics(logger, "chromadb_search", 0.08, True, {"results": len(PRODUCTS)})
+    logger.info(f"[{request_id}] Found {len(PRODUCTS)} products in ChromaDB")
+    logger.debug("[%s] Product details: %s", request_id, [p['name'][:50] for p in PRODUCTS[:3]])
+    log_performance_metrics(logger, "gemini_response_generation", 1.3, True, {"request_id": request_id})
+    log_ai_interaction(logger, "bench_user", "Vreau trandafiri roșii", "Vă recomand... " * 20, 1.9,
+                       "product_search", 0.9)
+    logger.info(f"[{request_id}] Enhanced processing completed in 1.90s")
+    return time.perf_counter() - start
+
+
+async def run(requests: int, concurrency: int) -> dict:
+    from src.helpers.utils import setup_logger
+
+    logger = setup_logger("benchmark.request")
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    lag = []
+
+    async def request(index):
+        async with semaphore:
+            await asyncio.sleep(0)
+            durations.append(log_request(logger, index))
+
+    async def sampler():
+        while True:
+            expected = time.perf_counter() + 0.002
+            await asyncio.sleep(0.002)
+            lag.append(max(0.0, time.perf_counter() - expected))
+
+    sampler_task = asyncio.create_task(sampler())
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    sampler_task.cancel()
+
+    drain_start = time.perf_counter()
+    for handler in logger.handlers:
+        handler.flush()
+    try:
+        from src.helpers.log_pipeline import get_log_pipeline
+        get_log_pipeline().stop()
+    except ImportError:
+        pass
+    drain = time.perf_counter() - drain_start
+
+    durations.sort()
+    lag.sort()
+    return {
+        'elapsed': elapsed,
+        'drain': drain,
+        'mean_us': statistics.mean(durations) * 1e6,
+        'p99_us': durations[int(len(durations) * 0.99)] * 1e6,
+        'lag_p99_ms': lag[int(len(lag) * 0.99)] * 1000 if lag else 0.0,
+        'lag_max_ms': lag[-1] * 1000 if lag else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead per request")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="xoflowers-logbench-")
+    os.chdir(workdir)
+    report = sys.stdout
+    sys.stdout = open(os.path.join(workdir, "console.log"), "w", encoding="utf-8")
+
+    result = asyncio.run(run(args.requests, args.concurrency))
+
+    console, sys.stdout = sys.stdout, report
+    console.flush()
+    log_lines = sum(1 for _ in open(os.path.join(workdir, "logs", "xoflowers_ai.log"), encoding="utf-8"))
+    print("⏱️  XOFlowers Logging Overhead Benchmark")
+    print("=" * 50)
+    print(f"requests={args.requests} concurrency={args.concurrency} (log files in {workdir})")
+    print(f"logging per request: mean {result['mean_us']:.1f} µs, p99 {result['p99_us']:.1f} µs")
+    print(f"event-loop lag: p99 {result['lag_p99_ms']:.2f} ms, max {result['lag_max_ms']:.2f} ms")
+    print(f"total {result['elapsed']:.2f}s, drain after load {result['drain'] * 1000:.1f} ms, "
+          f"{log_lines} lines in the log file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+XOFlowers Webhook Parsing Benchmark
+===================================
+
+Measures per-update CPU of webhook ingestion, comparing the previous path
+(json.loads of the decoded body + full Pydantic validation) with the raw-body
+path (bytes decoded directly, non-text updates dropped before validation).
+Instagram bodies include the HMAC-SHA256 signature check in both paths.
+
+Usage: python benchmark_webhook_parsing.py [--iterations 20000] [--text-share 0.5]
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.api.telegram_integration import TelegramUpdate
+from src.api.instagram_integration import InstagramWebhook
+from src.api.webhook_parsing import (
+    HAS_ORJSON, decode_webhook_body, telegram_text_message, prune_instagram_webhook
+)
+
+APP_SECRET = b"benchmark_app_secret"
+
+
+def telegram_body(index: int, text: bool) -> bytes:
+    """Telegram update: a text message or a photo message"""
+    message = {
+        "message_id": index,
+        "from": {"id": 1000 + index, "is_bot": False, "first_name": "Ana", "language_code": "ro"},
+        "chat": {"id": 1000 + index, "type": "private", "first_name": "Ana"},
+        "date": 1752661800
+    }
+    if text:
+        message["text"] = "Vreau un buchet de trandafiri roșii până la 800 lei pentru mâine"
+    else:
+        message["photo"] = [{"file_id": f"AgAD{index}{size}", "file_unique_id": f"u{size}",
+                             "width": size, "height": size, "file_size": size * 40}
+                            for size in (90, 320, 800, 1280)]
+    return json.dumps({"update_id": index, "message": message}, ensure_ascii=False).encode('utf-8')
+
+
+def instagram_body(index: int, text: bool) -> bytes:
+    """Instagram webhook: a text message or a read receipt"""
+    event = {"sender": {"id": f"user_{index}"}, "recipient": {"id": "page_1"}, "timestamp": 1752661800000}
+    if text:
+        event["message"] = {"id": f"mid_{index}", "timestamp": "1752661800",
+                            "text": "Aveți bujori pentru o aniversare? Buget 500 lei"}
+    else:
+        event["read"] = {"mid": f"mid_{index - 1}"}
+    return json.dumps({"object": "instagram", "entry": [{"id": "page_1", "time": 1752661800,
+                                                         "messaging": [event]}]}).encode('utf-8')
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(APP_SECRET, body, hashlib.sha256).hexdigest()
+
+
+def telegram_baseline(body: bytes) -> None:
+    TelegramUpdate(**json.loads(body.decode('utf-8')))
+
+
+def telegram_fast(body: bytes) -> None:
+    data = decode_webhook_body(body)
+    if telegram_text_message(data) is not None:
+        TelegramUpdate(**data)
+
+
+def instagram_baseline(body: bytes, signature: str) -> None:
+    expected = hmac.new(APP_SECRET, body, hashlib.sha256).hexdigest()
+    hmac.compare_digest(expected, signature)
+    InstagramWebhook(**json.loads(body.decode('utf-8')))
+
+
+def instagram_fast(body: bytes, signature: str) -> None:
+    expected = hmac.new(APP_SECRET, body, hashlib.sha256).hexdigest()
+    hmac.compare_digest(expected, signature)
+    data = prune_instagram_webhook(decode_webhook_body(body))
+    if data is not None:
+        InstagramWebhook(**data)
+
+
+def measure(function, cases: list) -> float:
+    """Average CPU microseconds per call over the cases"""
+    start = time.process_time()
+    for case in cases:
+        function(*case)
+    return (time.process_time() - start) / len(cases) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook parsing CPU benchmark")
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--text-share', type=float, default=0.5, help="Share of updates carrying text")
+    args = parser.parse_args()
+
+    # Validator warnings would dominate the measurement
+    logging.disable(logging.WARNING)
+
+    every = max(1, round(1 / args.text_share)) if args.text_share > 0 else args.iterations + 1
+    telegram_cases = [(telegram_body(i, i % every == 0),) for i in range(args.iterations)]
+    instagram_cases = []
+    for i in range(args.iterations):
+        body = instagram_body(i, i % every == 0)
+        instagram_cases.append((body, sign(body)))
+
+    print("⏱️  XOFlowers Webhook Parsing Benchmark")
+    print("=" * 50)
+    print(f"iterations={args.iterations} text share={args.text_share} "
+          f"decoder={'orjson' if HAS_ORJSON else 'json'}")
+
+    for name, baseline, fast, cases in (
+        ("telegram", telegram_baseline, telegram_fast, telegram_cases),
+        ("instagram", instagram_baseline, instagram_fast, instagram_cases),
+    ):
+        # Warm up validators and caches
+        measure(baseline, cases[:200])
+        measure(fast, cases[:200])
+
+        before = measure(baseline, cases)
+        after = measure(fast, cases)
+        print(f"\n[{name}] baseline {before:7.2f} µs/update | raw-body {after:7.2f} µs/update | "
+              f"{before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
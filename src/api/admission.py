@@ -0,0 +1,192 @@
+"""
+Admission Control for XOFlowers AI Agent
+Caps in-flight AI pipelines, queues briefly with deadline awareness and sheds load
+with a fast FAQ or canned reply instead of letting every request time out
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from src.data.faq_manager import search_faq
+from src.helpers.system_definitions import get_performance_config
+from src.helpers.utils import setup_logger
+from src.helpers.monitoring import get_metrics_registry
+
+SHED_RESPONSE = ("Momentan primim foarte multe mesaje și răspundem cu o mică întârziere. "
+                 "Te rog să revii în câteva minute sau să ne suni pentru comenzi urgente. "
+                 "Mulțumim pentru răbdare! 🌸")
+
+
+class AdmissionRejected(Exception):
+    """Request was shed instead of entering the AI pipeline"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request shed: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    FIFO admission in front of process_message_ai
+    At most max_in_flight pipelines run; up to queue_size wait for a slot,
+    each no longer than the request's remaining deadline allows
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, queue_size: Optional[int] = None,
+                 max_wait: Optional[float] = None):
+        self.logger = setup_logger(__name__)
+        performance_config = get_performance_config()
+
+        self.max_in_flight = max_in_flight or performance_config.get('max_concurrent_requests', 50)
+        self.queue_size = queue_size if queue_size is not None else performance_config.get('admission_queue_size', 100)
+        self.max_wait = max_wait if max_wait is not None else performance_config.get('admission_max_wait_seconds', 2.0)
+        self.min_service_time = performance_config.get('admission_min_service_seconds', 1.0)
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self._stats = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0,
+                       'shed_queue_timeout': 0, 'shed_deadline': 0}
+        
+        metrics = get_metrics_registry()
+        metrics.gauge('xoflowers_pipelines_in_flight', "AI pipelines running").labels().set_function(
+            lambda: self._in_flight)
+        metrics.gauge('xoflowers_admission_queue_depth', "Requests waiting for a pipeline slot").labels().set_function(
+            lambda: len(self._waiters))
+        self._queue_wait = metrics.histogram('xoflowers_admission_queue_wait_seconds',
+                                             "Time requests waited for a pipeline slot")
+        self._shed_metric = metrics.counter('xoflowers_admission_shed_total', "Requests shed by reason", ('reason',))
+
+        self.logger.info(f"Admission control initialized (in-flight: {self.max_in_flight}, "
+                         f"queue: {self.queue_size}, max wait: {self.max_wait}s)")
+
+    @asynccontextmanager
+    async def admit(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold a pipeline slot for the duration of the block
+
+        Args:
+            deadline: Absolute time.time() by which the response is due (optional)
+
+        Raises:
+            AdmissionRejected: If the request is shed
+        """
+        await self._acquire(deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, deadline: Optional[float]) -> None:
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._stats['admitted'] += 1
+            self._queue_wait.labels().observe(0.0)
+            return
+
+        wait_budget = self.max_wait
+        if deadline is not None:
+            wait_budget = min(wait_budget, deadline - time.time() - self.min_service_time)
+        if wait_budget <= 0:
+            self._shed('deadline')
+        if len(self._waiters) >= self.queue_size:
+            self._shed('queue_full')
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats['queued'] += 1
+        start_time = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(waiter, timeout=wait_budget)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we gave up - pass it on
+                self._release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._queue_wait.labels().observe(time.perf_counter() - start_time)
+            self._shed('queue_timeout')
+
+        self._queue_wait.labels().observe(time.perf_counter() - start_time)
+        self._stats['admitted'] += 1
+
+    def _release(self) -> None:
+        """Hand the slot to the oldest live waiter, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self._in_flight -= 1
+
+    def _shed(self, reason: str) -> None:
+        self._stats[f'shed_{reason}'] += 1
+        self._shed_metric.labels(reason).inc()
+        self.logger.warning(f"Shedding request ({reason}) - in flight: {self._in_flight}, "
+                            f"queued: {len(self._waiters)}")
+        raise AdmissionRejected(reason)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Admission counters, current load and queue wait histogram"""
+        return {
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self._in_flight,
+            'queued_now': len(self._waiters),
+            **self._stats,
+            'shed_total': sum(value for key, value in self._stats.items() if key.startswith('shed_')),
+            'queue_wait': self._queue_wait.labels().snapshot()
+        }
+
+
+def _faq_answer(user_message: str) -> Optional[str]:
+    """FAQ answer when the message clearly asks an FAQ question (cheap, no AI)"""
+    min_score = get_performance_config().get('admission_faq_min_score', 0.5)
+    item = search_faq(user_message, min_score=min_score)
+    return item.get('answer') if item else None
+
+
+def degraded_result(user_message: str, reason: str) -> Dict[str, Any]:
+    """
+    Fast reply for a shed request in the shape returned by process_message_ai
+
+    Args:
+        user_message: User's message text
+        reason: Shed reason from AdmissionRejected
+
+    Returns:
+        Dict with FAQ answer when one matches, otherwise a canned busy reply
+    """
+    try:
+        faq_answer = _faq_answer(user_message)
+    except Exception:
+        faq_answer = None
+
+    return {
+        "response": faq_answer or SHED_RESPONSE,
+        "success": True,
+        "context_updated": False,
+        "shed": True,
+        "shed_reason": reason,
+        "intent": "faq" if faq_answer else None,
+        "service_used": "faq_fast_path" if faq_answer else "load_shedding"
+    }
+
+
+# Global admission controller instance
+_admission_controller = None
+
+def get_admission_controller() -> AdmissionController:
+    """Get global admission controller instance"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
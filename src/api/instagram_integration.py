@@ -7,7 +7,6 @@ Platform-specific message formatting and delivery with proper error handling
 import asyncio
 import hashlib
 import hmac
-import json
 import time
 from datetime import datetime
 from typing import Dict, Any, Optional, List
@@ -16,9 +15,18 @@ from fastapi import APIRouter, Request, HTTPException, BackgroundTasks, Query, H
 from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field, validator
 
-from src.helpers.system_definitions import get_service_config, get_security_config
+from src.helpers.system_definitions import get_service_config, get_security_config, get_performance_config
 from src.helpers.utils import setup_logger, log_performance_metrics, create_request_id
+from src.helpers.rate_limiter import check_user_rate_limit
 from src.intelligence.ai_engine import process_message_ai
+from src.intelligence.context_prefetch import prefetch_user_context
+from src.intelligence.deadline import request_deadline
+from src.api.webhook_ingestion import (
+    get_webhook_ingestion, is_queue_mode_enabled, DeliveryError, REPLY_CHECKPOINT_KEY
+)
+from src.api.outbound_sender import get_outbound_sender, DeliveryResult
+from src.api.webhook_parsing import decode_webhook_body, prune_instagram_webhook
+from src.api.admission import get_admission_controller, degraded_result, AdmissionRejected
 
 # Initialize logger
 logger = setup_logger(__name__)
@@ -88,9 +96,7 @@ class InstagramIntegration:
         # Instagram/Meta specific configuration
         self.verify_token = self._get_verify_token()
         self.app_secret = self._get_app_secret()
-        
-        # Rate limiting storage (in production, use Redis)
-        self.rate_limit_storage = {}
+        self._signing_key = self.app_secret.encode('utf-8') if self.app_secret else None
         
         self.logger.info("Instagram integration initialized")
     
@@ -132,7 +138,7 @@ class InstagramIntegration:
             
             # Calculate expected signature
             expected_signature = hmac.new(
-                self.app_secret.encode('utf-8'),
+                self._signing_key,
                 payload,
                 hashlib.sha256
             ).hexdigest()
@@ -197,6 +203,8 @@ class InstagramIntegration:
         Returns:
             Optional[InstagramResponse]: Response to send or None
         """
+        start_time = time.time()
+        
         try:
             # Only process text messages
             if not messaging.message or not messaging.message.text:
@@ -210,18 +218,31 @@ class InstagramIntegration:
                            f"'{message_text[:50]}...'")
             
             # Rate limiting check
-            if not self._check_rate_limit(user_id, request_id):
+            if not await self._check_rate_limit(user_id, request_id):
                 return InstagramResponse(
                     recipient_id=user_id,
                     message_text="Te rog să aștepți puțin înainte să trimiți un alt mesaj. Mulțumesc pentru înțelegere!"
                 )
             
-            # Process message through AI pipeline
-            ai_result = await process_message_ai(
-                user_message=message_text,
-                user_id=user_id,
-                context=None  # Will be retrieved from Redis by AI engine
-            )
+            # Start context/preferences/chat rehydration for the accepted message so it
+            # overlaps with admission and the security check inside the AI pipeline
+            context_future = prefetch_user_context(user_id)
+            
+            # Process message through AI pipeline within the deadline (shed with a fast reply under overload)
+            deadline = start_time + get_performance_config()['response_timeout_seconds']
+            try:
+                with request_deadline(deadline):
+                    async with get_admission_controller().admit(deadline):
+                        ai_result = await asyncio.wait_for(
+                            process_message_ai(
+                                user_message=message_text,
+                                user_id=user_id,
+                                context=context_future  # Prefetched, resolved by AI engine after security check
+                            ),
+                            timeout=max(0.1, deadline - time.time())
+                        )
+            except AdmissionRejected as e:
+                ai_result = degraded_result(message_text, e.reason)
             
             # Log AI processing result
             self.logger.info(f"[{request_id}] AI processing completed - "
@@ -232,16 +253,13 @@ class InstagramIntegration:
             # Prepare response
             response_text = ai_result.get('response', 'Îmi pare rău, nu am putut procesa mesajul tău.')
             
-            # Format response for Instagram
-            formatted_response = self._format_instagram_response(response_text)
-            
-            # Log message delivery
+            # Log message delivery (long replies are split by the outbound sender)
             self.logger.info(f"[{request_id}] Sending Instagram response to user {user_id} "
-                           f"({len(formatted_response)} chars)")
+                           f"({len(response_text)} chars)")
             
             return InstagramResponse(
                 recipient_id=user_id,
-                message_text=formatted_response
+                message_text=response_text
             )
             
         except Exception as e:
@@ -253,7 +271,65 @@ class InstagramIntegration:
                 message_text="Îmi pare rău, dar întâmpin dificultăți tehnice. Te rog să încerci din nou în câteva momente."
             )
     
-    def _check_rate_limit(self, user_id: str, request_id: str) -> bool:
+    async def handle_queued_event(self, payload: Dict[str, Any]) -> None:
+        """
+        Process Instagram messaging event taken from the work queue and reply through the send API
+        
+        Args:
+            payload: Serialized InstagramMessaging event
+            
+        Raises:
+            DeliveryError: If the reply could not be delivered (event will be retried
+                with the generated reply from the first undelivered chunk, skipping the AI pipeline)
+        """
+        payload = dict(payload)
+        checkpoint = payload.pop(REPLY_CHECKPOINT_KEY, None)
+        
+        start_chunk = 0
+        if checkpoint:
+            response = InstagramResponse(**checkpoint['reply'])
+            start_chunk = checkpoint['last_chunk'] + 1
+        else:
+            messaging = InstagramMessaging(**payload)
+            response = await self._process_messaging_event(messaging, create_request_id())
+        
+        if not response:
+            return
+        
+        result = await self.send_message(response.recipient_id, response.message_text, start_chunk=start_chunk)
+        if not result:
+            raise DeliveryError(f"Failed to deliver Instagram reply to user {response.recipient_id}",
+                                reply=response.dict(), last_chunk=result.last_chunk)
+    
+    async def enqueue_webhook(self, webhook: InstagramWebhook, request_id: str) -> Dict[str, int]:
+        """
+        Enqueue each text messaging event of the webhook (de-duplicated by message id)
+        
+        Args:
+            webhook: Instagram webhook payload
+            request_id: Request identifier
+            
+        Returns:
+            Dict with numbers of queued and duplicate events
+        """
+        counts = {'queued': 0, 'duplicates': 0}
+        ingestion = get_webhook_ingestion()
+        
+        for entry in webhook.entry:
+            for messaging_event in entry.messaging or []:
+                if not messaging_event.message or not messaging_event.message.text:
+                    continue
+                
+                enqueued = await ingestion.enqueue(
+                    "instagram", messaging_event.message.id, messaging_event.dict(exclude_none=True)
+                )
+                counts['queued' if enqueued else 'duplicates'] += 1
+        
+        self.logger.info(f"[{request_id}] Queued {counts['queued']} Instagram events "
+                         f"({counts['duplicates']} duplicates)")
+        return counts
+    
+    async def _check_rate_limit(self, user_id: str, request_id: str) -> bool:
         """
         Check if user is within rate limits
         
@@ -265,45 +341,13 @@ class InstagramIntegration:
             bool: True if within limits, False if rate limited
         """
         try:
-            current_time = time.time()
-            
-            # Initialize user rate limit data if not exists
-            if user_id not in self.rate_limit_storage:
-                self.rate_limit_storage[user_id] = {
-                    'minute_requests': [],
-                    'hour_requests': []
-                }
-            
-            user_data = self.rate_limit_storage[user_id]
+            result = await check_user_rate_limit(user_id, platform="instagram")
             
-            # Clean old requests (older than 1 hour)
-            user_data['minute_requests'] = [
-                req_time for req_time in user_data['minute_requests']
-                if current_time - req_time < 60
-            ]
-            user_data['hour_requests'] = [
-                req_time for req_time in user_data['hour_requests']
-                if current_time - req_time < 3600
-            ]
-            
-            # Check limits
-            minute_limit = self.security_config.get('rate_limit_per_minute', 20)
-            hour_limit = self.security_config.get('rate_limit_per_hour', 200)
-            
-            if len(user_data['minute_requests']) >= minute_limit:
-                self.logger.warning(f"[{request_id}] Rate limit exceeded for Instagram user {user_id} "
-                                  f"(minute limit: {minute_limit})")
-                return False
-            
-            if len(user_data['hour_requests']) >= hour_limit:
+            if not result.allowed:
                 self.logger.warning(f"[{request_id}] Rate limit exceeded for Instagram user {user_id} "
-                                  f"(hour limit: {hour_limit})")
+                                  f"({result.limit_name}, retry after {result.retry_after:.1f}s)")
                 return False
             
-            # Add current request
-            user_data['minute_requests'].append(current_time)
-            user_data['hour_requests'].append(current_time)
-            
             return True
             
         except Exception as e:
@@ -311,55 +355,23 @@ class InstagramIntegration:
             # Allow request if rate limiting fails
             return True
     
-    def _format_instagram_response(self, text: str) -> str:
-        """
-        Format response text for Instagram
-        
-        Args:
-            text: Response text
-            
-        Returns:
-            str: Formatted text for Instagram
-        """
-        # Instagram message limit is 1000 characters
-        max_length = 950  # Leave some buffer
-        
-        if len(text) <= max_length:
-            return text
-        
-        # Truncate and add continuation message
-        truncated = text[:max_length - 80]
-        
-        # Try to break at a sentence or word boundary
-        last_sentence = truncated.rfind('.')
-        last_space = truncated.rfind(' ')
-        
-        if last_sentence > max_length - 150:
-            truncated = truncated[:last_sentence + 1]
-        elif last_space > max_length - 30:
-            truncated = truncated[:last_space]
-        
-        return truncated + "\n\nPentru informații complete, te rog să mă întrebi din nou."
-    
-    async def send_message(self, recipient_id: str, message_text: str) -> bool:
+    async def send_message(self, recipient_id: str, message_text: str, start_chunk: int = 0) -> DeliveryResult:
         """
         Send message to Instagram user (for external use)
         
         Args:
             recipient_id: Instagram user ID
             message_text: Message text
+            start_chunk: First chunk to send (resumes a partially delivered message)
             
         Returns:
-            bool: True if sent successfully
+            DeliveryResult: Truthy if sent successfully, with the last delivered chunk
         """
         try:
-            # This would typically use the Instagram Graph API
-            # For now, we just log the message that would be sent
-            self.logger.info(f"Would send Instagram message to user {recipient_id}: {message_text[:100]}...")
-            return True
+            return await get_outbound_sender().send_instagram(recipient_id, message_text, start_chunk=start_chunk)
         except Exception as e:
             self.logger.error(f"Failed to send Instagram message: {e}")
-            return False
+            return DeliveryResult(False, start_chunk - 1)
     
     def get_webhook_info(self) -> Dict[str, Any]:
         """
@@ -380,7 +392,7 @@ class InstagramIntegration:
             },
             'message_limits': {
                 'max_message_length': self.security_config.get('max_message_length', 1000),
-                'instagram_response_limit': 950
+                'instagram_response_limit': get_outbound_sender().max_length('instagram')
             }
         }
 
@@ -388,6 +400,15 @@ class InstagramIntegration:
 # Global integration instance
 instagram_integration = InstagramIntegration()
 
+
+def instagram_ordering_key(payload: Dict[str, Any]) -> Any:
+    """Sender id of a queued Instagram event - one user's messages are processed in order"""
+    return payload.get('sender', {}).get('id')
+
+
+get_webhook_ingestion().register_handler("instagram", instagram_integration.handle_queued_event,
+                                         ordering_key=instagram_ordering_key)
+
 # Create FastAPI router for Instagram endpoints
 instagram_router = APIRouter(prefix="/instagram", tags=["instagram"])
 
@@ -438,9 +459,15 @@ async def instagram_webhook(
                 logger.warning(f"[{request_id}] Instagram webhook signature verification failed")
                 raise HTTPException(status_code=403, detail="Invalid signature")
         
-        # Parse webhook payload
+        # Parse the same buffer the signature was checked over; only text events get validated
         try:
-            payload_data = json.loads(body.decode('utf-8'))
+            payload_data = prune_instagram_webhook(decode_webhook_body(body))
+            if payload_data is None:
+                logger.debug(f"[{request_id}] Ignoring Instagram webhook without text messages")
+                return JSONResponse(
+                    status_code=200,
+                    content={"status": "ok", "processed": True, "responses": [], "request_id": request_id}
+                )
             webhook = InstagramWebhook(**payload_data)
         except Exception as e:
             logger.error(f"[{request_id}] Failed to parse Instagram webhook payload: {e}")
@@ -448,6 +475,28 @@ async def instagram_webhook(
         
         logger.info(f"[{request_id}] Received Instagram webhook - Object: {webhook.object}")
         
+        # Queue mode: acknowledge within milliseconds so Meta doesn't time out and retry
+        if is_queue_mode_enabled():
+            try:
+                counts = await instagram_integration.enqueue_webhook(webhook, request_id)
+                
+                background_tasks.add_task(
+                    log_performance_metrics,
+                    logger,
+                    "instagram_webhook_enqueue",
+                    time.time() - start_time,
+                    True,
+                    {"request_id": request_id, **counts}
+                )
+                
+                return JSONResponse(
+                    status_code=200,
+                    content={"status": "ok", "queued": counts['queued'],
+                             "duplicates": counts['duplicates'], "request_id": request_id}
+                )
+            except Exception as e:
+                logger.error(f"[{request_id}] Work queue unavailable, processing webhook inline: {e}")
+        
         # Process the webhook
         responses = await instagram_integration.process_webhook(webhook, request_id)
         
@@ -471,7 +520,10 @@ async def instagram_webhook(
         logger.info(f"[{request_id}] Instagram webhook processed successfully in {processing_time:.3f}s - "
                    f"Generated {len(responses)} responses")
         
-        # Return responses (in production, these would be sent via Instagram Graph API)
+        # Instagram can't take replies in the webhook response - deliver them through the Graph API
+        for response in responses:
+            background_tasks.add_task(instagram_integration.send_message, response.recipient_id, response.message_text)
+        
         return JSONResponse(
             status_code=200,
             content={
@@ -529,10 +581,10 @@ async def send_instagram_message(
         message_text: Message text
     """
     try:
-        success = await instagram_integration.send_message(recipient_id, message_text)
+        result = await instagram_integration.send_message(recipient_id, message_text)
         
         return {
-            "success": success,
+            "success": result.delivered,
             "recipient_id": recipient_id,
             "message_length": len(message_text),
             "timestamp": datetime.now().isoformat()
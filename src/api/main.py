@@ -6,20 +6,29 @@ Async message processing endpoint with Pydantic validation and comprehensive err
 import asyncio
 import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+import json
+from typing import Optional, Dict, Any, List
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel, Field, validator
 import uvicorn
 
 from src.utils.system_definitions import get_service_config, get_business_info, get_performance_config
 from src.helpers.utils import setup_logger, log_performance_metrics, create_request_id
 from src.intelligence.ai_engine import process_message_ai
+from src.intelligence.deadline import request_deadline
+from src.intelligence.batch_processor import BatchItem, get_batch_processor
 from src.api.telegram_integration import get_telegram_router
 from src.api.instagram_integration import get_instagram_router
+from src.api.webhook_ingestion import get_webhook_ingestion
+from src.api.outbound_sender import get_outbound_sender
+from src.api.admission import get_admission_controller, degraded_result, AdmissionRejected
+from src.helpers.health import get_health_registry, DOWN
+from src.helpers.monitoring import get_metrics_registry, CONTENT_TYPE, HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION
+from src.helpers.tracing import start_span, parse_traceparent, shutdown_tracing, SPAN_KIND_SERVER
 
 
 # Pydantic Models for Request/Response Validation
@@ -63,6 +72,18 @@ class MessageResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional processing metadata")
 
 
+class BatchMessageRequest(MessageRequest):
+    """One message of a batch request"""
+    id: Optional[str] = Field(None, max_length=100, description="Caller's item identifier, echoed in the result")
+
+
+class BatchRequest(BaseModel):
+    """Request model for batch message processing"""
+    messages: List[BatchMessageRequest] = Field(..., min_length=1, description="Messages to process")
+    concurrency: Optional[int] = Field(None, ge=1, le=64,
+                                       description="Users processed at once (capped at BATCH_CONCURRENCY)")
+
+
 class HealthResponse(BaseModel):
     """Health check response model"""
     status: str = Field(..., description="Service status")
@@ -70,6 +91,7 @@ class HealthResponse(BaseModel):
     version: str = Field(..., description="API version")
     uptime_seconds: float = Field(..., description="Service uptime in seconds")
     services: Dict[str, str] = Field(..., description="Status of dependent services")
+    details: Dict[str, Any] = Field(default_factory=dict, description="Per-service counters and errors")
 
 
 class ErrorResponse(BaseModel):
@@ -100,10 +122,50 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to initialize AI engine: {e}")
     
+    # Sample event-loop lag so CPU-heavy stages show up in metrics
+    from src.intelligence.cpu_executor import get_cpu_executor
+    cpu_executor = get_cpu_executor()
+    cpu_executor.start_lag_monitor()
+    
+    # Open this worker's ChromaDB connection and warm up the embedding model after fork
+    # (the weights are shared when preloaded by the parent, inference state is per worker)
+    health_registry = get_health_registry()
+    try:
+        from src.data.chromadb_client import get_chromadb_client, warm_up_embedding_model
+        chromadb_client = await asyncio.to_thread(get_chromadb_client)
+        await asyncio.to_thread(warm_up_embedding_model)
+        if chromadb_client.is_available():
+            health_registry.register_check("chromadb", chromadb_client.ping)
+    except Exception as e:
+        logger.error(f"Failed to initialize ChromaDB client: {e}")
+    
+    # Active dependency checks run in the background at a bounded rate; probes only read results
+    try:
+        from src.data.redis_client import redis_client
+        if redis_client.initialized:
+            health_registry.register_check("redis", redis_client.is_available)
+    except Exception as e:
+        logger.error(f"Failed to register Redis health check: {e}")
+    health_registry.start()
+    
+    # Share this worker's samples with the worker answering the next scrape (prefork only)
+    metrics_registry = get_metrics_registry()
+    metrics_registry.start_flusher()
+    
+    # Start webhook queue workers (no-op unless queue mode is enabled)
+    webhook_ingestion = get_webhook_ingestion()
+    await webhook_ingestion.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down XOFlowers AI Agent API")
+    health_registry.stop()
+    metrics_registry.stop_flusher()
+    shutdown_tracing()
+    await webhook_ingestion.stop()
+    await get_outbound_sender().close()
+    cpu_executor.shutdown(wait=False)
 
 
 # Create FastAPI application
@@ -115,6 +177,7 @@ app = FastAPI(
     redoc_url="/redoc",
     lifespan=lifespan
 )
+app.state.draining = False  # Set by the production server while draining on SIGTERM
 
 # Add CORS middleware
 app.add_middleware(
@@ -145,7 +208,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             error_code=f"HTTP_{exc.status_code}",
             request_id=request_id,
             timestamp=datetime.now()
-        ).dict()
+        ).model_dump(mode="json")
     )
 
 
@@ -163,7 +226,7 @@ async def general_exception_handler(request: Request, exc: Exception):
             error_code="INTERNAL_ERROR",
             request_id=request_id,
             timestamp=datetime.now()
-        ).dict()
+        ).model_dump(mode="json")
     )
 
 
@@ -174,9 +237,29 @@ async def add_request_id_middleware(request: Request, call_next):
     request_id = create_request_id()
     request.state.request_id = request_id
     
+    metrics = get_metrics_registry()
+    in_flight = metrics.gauge(HTTP_IN_FLIGHT, "HTTP requests being served").labels()
+    in_flight.inc()
+    
     start_time = time.time()
-    response = await call_next(request)
-    processing_time = time.time() - start_time
+    status_code = 500
+    # Root span of the request's trace, continuing the caller's trace when it sent a traceparent
+    with start_span(f"HTTP {request.method}", {'http.method': request.method, 'request_id': request_id},
+                    parent=parse_traceparent(request.headers.get('traceparent')), kind=SPAN_KIND_SERVER) as span:
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            processing_time = time.time() - start_time
+            in_flight.dec()
+            # Route template (e.g. /api/chat) rather than the raw path keeps label values bounded
+            route = getattr(request.scope.get('route'), 'path', 'unmatched')
+            metrics.histogram(HTTP_REQUEST_DURATION, "HTTP request latency", ('method', 'route', 'status')).labels(
+                request.method, route, status_code).observe(processing_time)
+            if span.sampled:
+                span.name = f"{request.method} {route}"
+                span.set_attribute('http.route', route)
+                span.set_attribute('http.status_code', status_code)
     
     # Add request ID to response headers
     response.headers["X-Request-ID"] = request_id
@@ -202,68 +285,58 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Comprehensive health check endpoint for container orchestration"""
+    """
+    Detailed health check from in-process state
+    
+    Dependency status comes from live call outcomes and the background checks;
+    nothing is called or constructed on this path
+    """
     uptime = time.time() - app_start_time
     
-    # Check service dependencies
-    services_status = {}
-    overall_healthy = True
+    details = get_health_registry().snapshot()
+    services_status = {name: info['status'] for name, info in details.items()}
+    overall_healthy = DOWN not in services_status.values()
     
-    # Check AI engine
+    # AI engine (created at startup)
     try:
         from src.intelligence.ai_engine import get_ai_engine
         ai_engine = get_ai_engine()
         cache_stats = ai_engine.get_cache_stats()
-        services_status["ai_engine"] = {
-            "status": "healthy",
+        ai_ready = ai_engine.gemini_available or ai_engine.openai_available
+        services_status["ai_engine"] = "healthy" if ai_ready else "unavailable"
+        details["ai_engine"] = {
             "cache_entries": cache_stats.get('active_entries', 0),
             "max_concurrent_openai": cache_stats.get('max_concurrent_openai', 0),
             "max_concurrent_gemini": cache_stats.get('max_concurrent_gemini', 0)
         }
+        overall_healthy = overall_healthy and ai_ready
     except Exception as e:
-        services_status["ai_engine"] = {"status": "unhealthy", "error": str(e)}
+        services_status["ai_engine"] = "unhealthy"
+        details["ai_engine"] = {"error": str(e)}
         overall_healthy = False
     
-    # Check Redis (optional)
-    try:
-        from src.data.redis_client import health_check_redis
-        redis_health = health_check_redis()
-        services_status["redis"] = redis_health
-        if redis_health.get('status') != 'healthy':
-            overall_healthy = False
-    except Exception as e:
-        services_status["redis"] = {"status": "unavailable", "error": str(e)}
-    
-    # Check ChromaDB (optional)
-    try:
-        from src.data.chromadb_client import health_check_chromadb
-        chromadb_health = health_check_chromadb()
-        services_status["chromadb"] = chromadb_health
-        if chromadb_health.get('status') != 'healthy':
-            overall_healthy = False
-    except Exception as e:
-        services_status["chromadb"] = {"status": "unavailable", "error": str(e)}
-    
     # Check performance monitoring
     try:
         from src.helpers.utils import get_system_health_report
         health_report = get_system_health_report()
-        services_status["performance_monitor"] = {
-            "status": "healthy",
+        services_status["performance_monitor"] = "healthy"
+        details["performance_monitor"] = {
             "active_users": health_report['system_health']['active_users'],
             "avg_response_time": health_report['system_health']['avg_response_time'],
             "error_rate": health_report['system_health']['error_rate'],
             "cache_hit_rate": health_report['system_health']['cache_hit_rate']
         }
     except Exception as e:
-        services_status["performance_monitor"] = {"status": "error", "error": str(e)}
+        services_status["performance_monitor"] = "error"
+        details["performance_monitor"] = {"error": str(e)}
     
     return HealthResponse(
         status="healthy" if overall_healthy else "degraded",
         timestamp=datetime.now(),
         version="1.0.0",
         uptime_seconds=uptime,
-        services=services_status
+        services=services_status,
+        details=details
     )
 
 
@@ -278,33 +351,45 @@ async def liveness_probe():
 
 @app.get("/health/ready", response_model=Dict[str, Any])
 async def readiness_probe():
-    """Kubernetes/Docker readiness probe - check if app is ready to serve traffic"""
+    """
+    Kubernetes/Docker readiness probe - cheap in-process checks, never calls the LLM pipeline
+    
+    Returns 503 while the worker drains after SIGTERM so load balancers stop routing to it
+    """
+    if getattr(app.state, 'draining', False):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "not_ready",
+                "timestamp": datetime.now().isoformat(),
+                "reason": "draining"
+            }
+        )
+    
     try:
-        # Quick check of critical services
         from src.intelligence.ai_engine import get_ai_engine
+        from src.data.chromadb_client import is_chromadb_available
         ai_engine = get_ai_engine()
         
-        # Test basic AI functionality
-        test_result = await process_message_ai(
-            user_message="test",
-            user_id="health_check",
-            context={}
-        )
+        ai_ready = ai_engine.gemini_available or ai_engine.openai_available
+        services = {
+            "ai_engine": "ready" if ai_ready else "no AI service configured",
+            "chromadb": "ready" if is_chromadb_available() else "fallback",
+        }
+        admission = get_admission_controller().get_stats()
         
-        if test_result.get('success', False):
-            return {
-                "status": "ready",
-                "timestamp": datetime.now().isoformat(),
-                "services": {
-                    "ai_engine": "ready"
-                }
-            }
-        else:
-            return {
-                "status": "not_ready",
-                "timestamp": datetime.now().isoformat(),
-                "reason": "AI engine test failed"
-            }
+        # Passively tracked dependency status - an LLM outage is reported, not
+        # turned into 503s on every pod at once
+        response = {
+            "status": "ready" if ai_ready else "not_ready",
+            "timestamp": datetime.now().isoformat(),
+            "services": services,
+            "dependencies": get_health_registry().statuses(),
+            "load": {"in_flight": admission['in_flight'], "queued": admission['queued_now']}
+        }
+        if not ai_ready:
+            response["reason"] = "No AI service available"
+        return response
             
     except Exception as e:
         logger.error(f"Readiness probe failed: {e}")
@@ -333,16 +418,23 @@ async def process_message(request: MessageRequest, background_tasks: BackgroundT
         # Validate request timing
         performance_config = get_performance_config()
         timeout = performance_config['response_timeout_seconds']
+        deadline = start_time + timeout
         
-        # Process message through AI pipeline with timeout
-        result = await asyncio.wait_for(
-            process_message_ai(
-                user_message=request.message,
-                user_id=request.user_id,
-                context=request.context
-            ),
-            timeout=timeout
-        )
+        # Process message through AI pipeline within the deadline; shed with a fast reply under overload.
+        # Every stage sizes its timeout from the request deadline; wait_for cancels what is left after it
+        try:
+            with request_deadline(deadline):
+                async with get_admission_controller().admit(deadline):
+                    result = await asyncio.wait_for(
+                        process_message_ai(
+                            user_message=request.message,
+                            user_id=request.user_id,
+                            context=request.context
+                        ),
+                        timeout=max(0.1, deadline - time.time())
+                    )
+        except AdmissionRejected as e:
+            result = degraded_result(request.message, e.reason)
         
         processing_time = time.time() - start_time
         
@@ -376,7 +468,8 @@ async def process_message(request: MessageRequest, background_tasks: BackgroundT
                 "platform": request.platform,
                 "security_blocked": result.get('security_blocked', False),
                 "risk_level": result.get('risk_level'),
-                "detected_issues": result.get('detected_issues', [])
+                "detected_issues": result.get('detected_issues', []),
+                "shed": result.get('shed', False)
             }
         )
         
@@ -433,17 +526,68 @@ async def process_message(request: MessageRequest, background_tasks: BackgroundT
         )
 
 
-@app.get("/metrics", response_model=Dict[str, Any])
+@app.post("/api/chat/batch")
+async def process_message_batch(request: BatchRequest, http_request: Request) -> StreamingResponse:
+    """
+    Batch message processing endpoint
+
+    Streams one NDJSON line per message as it completes. Messages of one user
+    are processed in order, so conversations can be replayed; each line carries
+    the message's batch index and id for matching.
+    """
+    request_id = http_request.state.request_id
+    batch_processor = get_batch_processor()
+
+    if len(request.messages) > batch_processor.max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large, limit is {batch_processor.max_items} messages"
+        )
+
+    logger.info(f"Processing batch [{request_id}] of {len(request.messages)} messages")
+
+    items = [
+        BatchItem(user_id=message.user_id, message=message.message,
+                  item_id=message.id, context=message.context)
+        for message in request.messages
+    ]
+
+    async def stream_results():
+        async for result in batch_processor.process(items, request.concurrency):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    try:
+        body = await asyncio.to_thread(get_metrics_registry().render)
+    except Exception as e:
+        logger.error(f"Failed to render Prometheus metrics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to render metrics")
+    return Response(content=body, media_type=CONTENT_TYPE)
+
+
+@app.get("/metrics/json", response_model=Dict[str, Any])
 async def get_metrics():
     """Get comprehensive system metrics and performance data"""
     try:
         from src.helpers.utils import get_system_health_report
+        from src.intelligence.cpu_executor import get_cpu_executor
+        from src.helpers.llm_usage import get_usage_accountant
         health_report = get_system_health_report()
         
         return {
             "success": True,
             "timestamp": datetime.now().isoformat(),
-            "metrics": health_report
+            "metrics": health_report,
+            "cpu_stages": get_cpu_executor().get_stats(),
+            "webhook_queue": await get_webhook_ingestion().get_metrics(),
+            "outbound": get_outbound_sender().get_stats(),
+            "admission": get_admission_controller().get_stats(),
+            "llm_usage": get_usage_accountant().get_stats()
         }
     except Exception as e:
         logger.error(f"Failed to get system metrics: {e}")
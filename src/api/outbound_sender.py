@@ -0,0 +1,380 @@
+"""
+Outbound Sender for XOFlowers AI Agent
+Delivers replies through the Telegram Bot API and Instagram Graph API with a pooled
+keep-alive HTTP client, per-chat ordering, token-bucket pacing, retries and message splitting
+"""
+
+import asyncio
+import html
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from src.helpers.system_definitions import get_service_config
+from src.helpers.utils import setup_logger, log_performance_metrics
+from src.helpers.monitoring import LATENCY_BUCKETS, operation_summaries, summarize_histogram
+
+# Idle per-chat state is pruned once this many chats are tracked
+MAX_CHAT_STATES = 10000
+CHAT_STATE_IDLE_SECONDS = 300
+
+# HTML tags, including one cut off at the end of a chunk
+HTML_TAG_PATTERN = re.compile(r'<[^<>]*(?:>|$)')
+
+
+def split_message(text: str, max_length: int, max_bytes: Optional[int] = None) -> List[str]:
+    """
+    Split text into chunks that fit the platform message limit
+
+    Breaks at paragraph, line, sentence or word boundaries when one exists
+    in the second half of the window, otherwise cuts hard at the window end.
+
+    Args:
+        text: Message text
+        max_length: Maximum characters per message
+        max_bytes: Maximum UTF-8 encoded bytes per message (for byte-limited APIs)
+
+    Returns:
+        List of non-empty chunks (single item if the text already fits)
+    """
+    text = text.strip()
+    chunks = []
+
+    while True:
+        limit = max_length
+        if max_bytes is not None:
+            # Longest prefix whose encoding fits, without splitting a character
+            limit = min(limit, max(1, len(text.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore'))))
+        if len(text) <= limit:
+            break
+
+        window = text[:limit]
+        cut = -1
+        for separator in ('\n\n', '\n', '. ', '! ', '? ', ' '):
+            position = window.rfind(separator)
+            if position >= limit // 2:
+                cut = position + len(separator.rstrip())
+                break
+        if cut <= 0:
+            cut = limit
+
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def strip_html(text: str) -> str:
+    """Remove HTML markup from text sent without a parse mode"""
+    return html.unescape(HTML_TAG_PATTERN.sub('', text))
+
+
+class TokenBucket:
+    """Async token bucket: rate tokens per second with a burst capacity"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class _ChatState:
+    """Per-chat ordering lock and pacing bucket"""
+    lock: asyncio.Lock
+    bucket: TokenBucket
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of sending one message: truthy only if every chunk was delivered"""
+    delivered: bool
+    last_chunk: int  # Index of the last delivered chunk (-1 if none)
+
+    def __bool__(self) -> bool:
+        return self.delivered
+
+
+class OutboundSendError(Exception):
+    """Platform API call failed"""
+
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class OutboundSender:
+    """
+    Shared sender for platform replies
+    Messages to one chat are delivered in order; different chats are sent concurrently
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            transport: Optional httpx transport (tests use a fake Bot API / Graph API)
+        """
+        self.logger = setup_logger(__name__)
+        self.config = get_service_config().get('outbound', {})
+        self._transport = transport
+
+        self.max_retries = self.config.get('max_retries', 3)
+        self.backoff_base = self.config.get('backoff_base_seconds', 0.5)
+        self.backoff_max = self.config.get('backoff_max_seconds', 10.0)
+        self.chat_burst = self.config.get('chat_burst', 3)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_buckets = {
+            platform: TokenBucket(self.config.get(f'{platform}_global_rate', 30),
+                                  self.config.get(f'{platform}_global_rate', 30))
+            for platform in ('telegram', 'instagram')
+        }
+        self._chats: Dict[Tuple[str, str], _ChatState] = {}
+
+        self._stats = {
+            platform: {'messages': 0, 'chunks': 0, 'failed': 0, 'retries': 0}
+            for platform in ('telegram', 'instagram')
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled keep-alive client, created lazily inside the running loop"""
+        if self._client is None or self._client.is_closed:
+            max_connections = self.config.get('max_connections', 50)
+            self._client = httpx.AsyncClient(
+                timeout=self.config.get('timeout_seconds', 10),
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections),
+                transport=self._transport
+            )
+        return self._client
+
+    def is_configured(self, platform: str) -> bool:
+        """Check if credentials for the platform are available"""
+        key = 'telegram_bot_token' if platform == 'telegram' else 'instagram_access_token'
+        return bool(self.config.get(key))
+
+    def max_length(self, platform: str) -> int:
+        """Platform message size limit (characters for Telegram, UTF-8 bytes for Instagram)"""
+        return self.config.get(f'{platform}_max_length', 4096 if platform == 'telegram' else 950)
+
+    def _chat_state(self, platform: str, chat_id: str) -> _ChatState:
+        key = (platform, chat_id)
+        state = self._chats.get(key)
+        if state is None:
+            if len(self._chats) >= MAX_CHAT_STATES:
+                self._prune_chat_states()
+            state = _ChatState(
+                lock=asyncio.Lock(),
+                bucket=TokenBucket(self.config.get(f'{platform}_chat_rate', 1), self.chat_burst)
+            )
+            self._chats[key] = state
+        state.last_used = time.monotonic()
+        return state
+
+    def _prune_chat_states(self) -> None:
+        cutoff = time.monotonic() - CHAT_STATE_IDLE_SECONDS
+        for key, state in list(self._chats.items()):
+            if state.last_used < cutoff and not state.lock.locked():
+                del self._chats[key]
+
+    async def send_telegram(self, chat_id: int, text: str, reply_to_message_id: Optional[int] = None,
+                            parse_mode: Optional[str] = "HTML", start_chunk: int = 0) -> DeliveryResult:
+        """
+        Send message through the Telegram Bot API (split into several messages if too long)
+
+        Args:
+            chat_id: Telegram chat ID
+            text: Message text
+            reply_to_message_id: Message to reply to (applied to the first chunk)
+            parse_mode: Telegram parse mode
+            start_chunk: First chunk to send (resumes a partially delivered message)
+
+        Returns:
+            DeliveryResult: Whether every chunk was delivered and the last delivered chunk
+        """
+        token = self.config.get('telegram_bot_token')
+        if not token:
+            self.logger.warning(f"TELEGRAM_BOT_TOKEN not set - cannot send message to chat {chat_id}")
+            return DeliveryResult(False, start_chunk - 1)
+
+        url = f"{self.config.get('telegram_api_base', 'https://api.telegram.org')}/bot{token}/sendMessage"
+        payloads = []
+        for index, chunk in enumerate(split_message(text, self.max_length('telegram'))):
+            payload: Dict[str, Any] = {'chat_id': chat_id, 'text': chunk}
+            if parse_mode:
+                payload['parse_mode'] = parse_mode
+            if reply_to_message_id and index == 0:
+                payload['reply_to_message_id'] = reply_to_message_id
+            payloads.append(payload)
+
+        return await self._deliver('telegram', str(chat_id), url, payloads, start_chunk=start_chunk)
+
+    async def send_instagram(self, recipient_id: str, text: str, start_chunk: int = 0) -> DeliveryResult:
+        """
+        Send message through the Instagram Graph API (split into several messages if too long)
+
+        Args:
+            recipient_id: Instagram-scoped user ID
+            text: Message text
+            start_chunk: First chunk to send (resumes a partially delivered message)
+
+        Returns:
+            DeliveryResult: Whether every chunk was delivered and the last delivered chunk
+        """
+        token = self.config.get('instagram_access_token')
+        if not token:
+            self.logger.warning(f"INSTAGRAM_ACCESS_TOKEN not set - cannot send message to user {recipient_id}")
+            return DeliveryResult(False, start_chunk - 1)
+
+        url = f"{self.config.get('instagram_api_base', 'https://graph.facebook.com/v19.0')}/me/messages"
+        payloads = [
+            {'recipient': {'id': recipient_id}, 'message': {'text': chunk}, 'messaging_type': 'RESPONSE'}
+            for chunk in split_message(text, self.max_length('instagram'), max_bytes=self.max_length('instagram'))
+        ]
+
+        return await self._deliver('instagram', recipient_id, url, payloads,
+                                   headers={'Authorization': f"Bearer {token}"}, start_chunk=start_chunk)
+
+    async def _deliver(self, platform: str, chat_id: str, url: str, payloads: List[Dict[str, Any]],
+                       headers: Optional[Dict[str, str]] = None, start_chunk: int = 0) -> DeliveryResult:
+        """Send chunks from start_chunk on in order while holding the chat lock"""
+        start_time = time.time()
+        state = self._chat_state(platform, chat_id)
+        stats = self._stats[platform]
+        stats['messages'] += 1
+
+        async with state.lock:
+            for index in range(start_chunk, len(payloads)):
+                payload = payloads[index]
+                try:
+                    await self._send_with_retry(platform, state, url, payload, headers)
+                    stats['chunks'] += 1
+                except Exception as e:
+                    stats['failed'] += 1
+                    self.logger.error(f"Failed to send {platform} message to {chat_id} "
+                                      f"(chunk {index + 1}/{len(payloads)}): {e}")
+                    log_performance_metrics(self.logger, f"{platform}_send_message", time.time() - start_time,
+                                            False, {"chat_id": chat_id, "error": str(e)})
+                    return DeliveryResult(False, index - 1)
+            state.last_used = time.monotonic()
+
+        duration = time.time() - start_time
+        log_performance_metrics(self.logger, f"{platform}_send_message", duration, True,
+                                {"chat_id": chat_id, "chunks": len(payloads) - start_chunk})
+        return DeliveryResult(True, len(payloads) - 1)
+
+    async def _send_with_retry(self, platform: str, state: _ChatState, url: str, payload: Dict[str, Any],
+                               headers: Optional[Dict[str, str]]) -> None:
+        """Pace, send and retry one chunk with exponential backoff"""
+        attempt = 0
+        while True:
+            # Wait for the chat's own pacing first so a throttled chat doesn't hold global tokens
+            await state.bucket.acquire()
+            await self._global_buckets[platform].acquire()
+
+            try:
+                await self._post(platform, url, payload, headers)
+                return
+            except OutboundSendError as e:
+                if platform == 'telegram' and not e.retryable and "can't parse entities" in str(e) \
+                        and 'parse_mode' in payload:
+                    # Split landed inside an HTML tag - resend this chunk as plain text
+                    payload = {k: v for k, v in payload.items() if k != 'parse_mode'}
+                    payload['text'] = strip_html(payload['text'])
+                    continue
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+                delay = e.retry_after
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise OutboundSendError(f"{type(e).__name__}: {e}", retryable=True)
+                delay = None
+
+            attempt += 1
+            self._stats[platform]['retries'] += 1
+            if delay is None:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                delay *= random.uniform(0.5, 1.0)
+            await asyncio.sleep(delay)
+
+    async def _post(self, platform: str, url: str, payload: Dict[str, Any],
+                    headers: Optional[Dict[str, str]]) -> None:
+        """POST payload and raise OutboundSendError for unsuccessful responses"""
+        response = await self.client.post(url, json=payload, headers=headers)
+        if response.status_code == 200:
+            return
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+
+        retry_after = None
+        if platform == 'telegram':
+            description = body.get('description', response.text[:200])
+            retry_after = (body.get('parameters') or {}).get('retry_after')
+        else:
+            description = (body.get('error') or {}).get('message', response.text[:200])
+        if retry_after is None and response.headers.get('Retry-After', '').isdigit():
+            retry_after = float(response.headers['Retry-After'])
+
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise OutboundSendError(f"HTTP {response.status_code}: {description}", retryable, retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Delivery counters and send latency (from the metrics registry) per platform"""
+        summaries = operation_summaries()
+        no_sends = summarize_histogram(LATENCY_BUCKETS, [0.0] * (len(LATENCY_BUCKETS) + 2))
+        stats: Dict[str, Any] = {
+            platform: {
+                **counters,
+                'configured': self.is_configured(platform),
+                'latency': summaries.get(f"{platform}_send_message", no_sends)
+            }
+            for platform, counters in self._stats.items()
+        }
+        stats['active_chats'] = len(self._chats)
+        return stats
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global outbound sender instance
+_outbound_sender = None
+
+def get_outbound_sender() -> OutboundSender:
+    """Get global outbound sender instance"""
+    global _outbound_sender
+    if _outbound_sender is None:
+        _outbound_sender = OutboundSender()
+    return _outbound_sender
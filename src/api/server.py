@@ -0,0 +1,318 @@
+"""
+Production Server for XOFlowers AI Agent
+Prefork launcher: loads the app and embedding model once, forks uvicorn workers
+sharing one listening socket and drains them gracefully on SIGTERM
+
+Usage:
+    python -m src.api.server --workers 4 --port 8000
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from src.helpers.system_definitions import get_service_config, get_performance_config
+from src.helpers.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def preload_shared_resources() -> None:
+    """
+    Import the app and load the embedding model weights in the parent process
+
+    Forked workers share the loaded model pages copy-on-write instead of each
+    loading their own copy. Connections (ChromaDB, Redis, HTTP) and the model
+    warmup happen per worker in the app lifespan, after fork.
+    """
+    import src.api.main  # noqa: F401 - imports settings, prompts and catalog code once
+    from src.data.chromadb_client import preload_embedding_model
+
+    start_time = time.time()
+    if preload_embedding_model():
+        logger.info(f"Preloaded embedding model in {time.time() - start_time:.1f}s")
+    else:
+        logger.warning("Embedding model not preloaded - workers will load it on first use")
+
+
+def prepare_metrics_dir() -> Optional[str]:
+    """
+    Point all workers at one directory for their metric samples
+
+    Must run before the app is imported so every registry is created with it.
+    Samples left by an earlier run are removed.
+
+    Returns:
+        Directory created here (to remove on exit), None when it was configured
+    """
+    from src.helpers.monitoring import get_metrics_registry
+
+    performance_config = get_performance_config()
+    created = None
+    if not performance_config.get('metrics_dir'):
+        created = tempfile.mkdtemp(prefix="xoflowers-metrics-")
+        performance_config['metrics_dir'] = created
+
+    metrics_dir = performance_config['metrics_dir']
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        os.remove(path)
+    get_metrics_registry().metrics_dir = metrics_dir
+    logger.info(f"Workers share metric samples through {metrics_dir}")
+    return created
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Create the listening socket shared by all workers
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+
+    Returns:
+        Bound, listening, inheritable socket
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    Uvicorn server that drains before shutting down
+    On the first SIGTERM the readiness probe turns 503 while requests keep being
+    served for drain_seconds, then uvicorn's graceful shutdown begins
+    """
+
+    def __init__(self, config: uvicorn.Config, drain_seconds: float = 5.0):
+        super().__init__(config)
+        self.drain_seconds = drain_seconds
+        self._drain_timer: Optional[threading.Timer] = None
+
+    def handle_exit(self, sig: int, frame) -> None:
+        app = self.config.app
+        state = getattr(app, 'state', None)
+
+        if self._drain_timer is not None or self.drain_seconds <= 0 or state is None:
+            # Second signal or no drain window - shut down now
+            if self._drain_timer is not None:
+                self._drain_timer.cancel()
+            super().handle_exit(sig, frame)
+            return
+
+        state.draining = True
+        logger.info(f"Worker {os.getpid()} draining for {self.drain_seconds}s before shutdown")
+        self._drain_timer = threading.Timer(self.drain_seconds, super().handle_exit, args=(sig, frame))
+        self._drain_timer.daemon = True
+        self._drain_timer.start()
+
+
+def _run_worker(sock: socket.socket, fastapi_config: Dict) -> None:
+    """Serve the app on the inherited socket until shut down"""
+    from src.api.main import app
+
+    config = uvicorn.Config(
+        app,
+        log_level=fastapi_config.get('log_level', 'info'),
+        timeout_graceful_shutdown=fastapi_config.get('graceful_timeout', 30),
+    )
+    server = DrainingServer(config, drain_seconds=fastapi_config.get('drain_seconds', 5))
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Parent process: forks workers, respawns crashed ones with backoff and forwards shutdown
+    A worker crashing more than max_restarts times within restart_window_seconds
+    stops the whole server instead of being respawned forever
+    """
+
+    def __init__(self, sock: socket.socket, workers: int, fastapi_config: Dict):
+        self.sock = sock
+        self.workers = workers
+        self.fastapi_config = fastapi_config
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+        self.failed = False
+
+        self.max_restarts = fastapi_config.get('max_restarts', 5)
+        self.restart_window = fastapi_config.get('restart_window_seconds', 60)
+        self.max_backoff = fastapi_config.get('restart_backoff_max_seconds', 30)
+        self._crashes: Dict[int, List[float]] = {}  # worker index -> recent exit times
+        self._respawn_at: Dict[int, float] = {}  # worker index -> monotonic respawn time
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                _run_worker(self.sock, self.fastapi_config)
+            except Exception as e:
+                logger.error(f"Worker {index} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self.children[pid] = index
+        logger.info(f"Started worker {index} (pid {pid})")
+
+    def handle_signal(self, sig: int, frame) -> None:
+        if self.stopping:
+            # Second signal - don't wait for the drain
+            self._signal_children(signal.SIGKILL)
+            return
+
+        self.stopping = True
+        self._respawn_at.clear()
+        logger.info(f"Received signal {sig}, draining {len(self.children)} workers")
+        self._signal_children(signal.SIGTERM)
+
+        deadline = self.fastapi_config.get('drain_seconds', 5) + self.fastapi_config.get('graceful_timeout', 30) + 5
+        timer = threading.Timer(deadline, self._signal_children, args=(signal.SIGKILL,))
+        timer.daemon = True
+        timer.start()
+
+    def _signal_children(self, sig: int) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def restart_delay(self, index: int) -> Optional[float]:
+        """
+        Record a worker exit and get the delay before respawning it
+
+        Args:
+            index: Worker index
+
+        Returns:
+            Seconds to wait (doubling per recent crash), None when the worker is crash-looping
+        """
+        now = time.monotonic()
+        crashes = [at for at in self._crashes.get(index, []) if now - at < self.restart_window]
+        crashes.append(now)
+        self._crashes[index] = crashes
+
+        if len(crashes) > self.max_restarts:
+            return None
+        return min(self.max_backoff, 2.0 ** (len(crashes) - 1))
+
+    def _worker_exited(self, pid: int, status: int) -> None:
+        index = self.children.pop(pid, None)
+        if index is None or self.stopping:
+            return
+
+        delay = self.restart_delay(index)
+        if delay is None:
+            logger.error(f"Worker {index} exited {len(self._crashes[index])} times within "
+                         f"{self.restart_window}s (last status {status}), shutting down")
+            self.failed = True
+            self.handle_signal(signal.SIGTERM, None)
+            return
+
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, respawning in {delay:.0f}s")
+        self._respawn_at[index] = time.monotonic() + delay
+
+    def run(self) -> int:
+        """
+        Supervise workers until all have stopped
+
+        Returns:
+            Process exit code (1 when stopped because a worker was crash-looping)
+        """
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while self.children or self._respawn_at:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = 0, 0
+            except InterruptedError:
+                continue
+
+            if pid:
+                self._worker_exited(pid, status)
+                continue
+
+            now = time.monotonic()
+            for index, respawn_at in list(self._respawn_at.items()):
+                if respawn_at <= now:
+                    del self._respawn_at[index]
+                    self.spawn(index)
+            time.sleep(0.1)
+
+        logger.info("All workers stopped")
+        return 1 if self.failed else 0
+
+
+def serve(host: str, port: int, workers: int, preload: bool = True) -> int:
+    """
+    Run the production server
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        workers: Number of worker processes
+        preload: Load the app and embedding model before forking workers
+
+    Returns:
+        Process exit code
+    """
+    fastapi_config = get_service_config()['fastapi']
+    prefork = workers > 1 and hasattr(os, 'fork')
+    created_metrics_dir = prepare_metrics_dir() if prefork else None
+
+    if preload:
+        preload_shared_resources()
+
+    sock = bind_socket(host, port)
+    logger.info(f"Listening on {host}:{port} with {workers} worker(s)")
+
+    if not prefork:
+        _run_worker(sock, fastapi_config)
+        return 0
+
+    try:
+        return Supervisor(sock, workers, fastapi_config).run()
+    finally:
+        if created_metrics_dir:
+            shutil.rmtree(created_metrics_dir, ignore_errors=True)
+
+
+def main() -> None:
+    fastapi_config = get_service_config()['fastapi']
+
+    parser = argparse.ArgumentParser(description="XOFlowers AI Agent production server")
+    parser.add_argument('--host', default=fastapi_config['host'])
+    parser.add_argument('--port', type=int, default=fastapi_config['port'])
+    parser.add_argument('--workers', type=int, default=fastapi_config.get('workers', 1))
+    parser.add_argument('--no-preload', action='store_true', help="Load the model in each worker instead")
+    args = parser.parse_args()
+
+    sys.exit(serve(args.host, args.port, max(1, args.workers),
+                   preload=fastapi_config.get('preload', True) and not args.no_preload))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,12 @@ import os
 import logging
 import sys
 import asyncio
+from typing import Any, Awaitable, Dict, Optional
 from telegram import Update, BotCommand, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ChatAction
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     MessageHandler,
     filters,
@@ -28,7 +31,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 try:
     from src.intelligence.ai_engine import process_message_ai, get_ai_engine
-    from src.utils.system_definitions import get_service_config
+    from src.utils.system_definitions import get_service_config, get_performance_config
     from src.utils.utils import setup_logger
     print("All modules imported successfully")
 except ImportError as e:
@@ -46,6 +49,64 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates of different chats concurrently and updates of one chat in arrival order
+    At most max_concurrent_updates handlers run at once; an update waiting behind an
+    earlier update of its chat does not take one of those slots
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: Optional[int] = None):
+        # The base semaphore bounds updates received but not finished, the active one bounds running handlers
+        super().__init__(max(max_concurrent_updates, max_pending_updates or 0))
+        self.max_active_updates = max_concurrent_updates
+        self._active = asyncio.Semaphore(max_concurrent_updates)
+        self._chat_locks: Dict[Any, asyncio.Lock] = {}
+        self._chat_waiters: Dict[Any, int] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = getattr(update, 'effective_chat', None)
+        if chat is None:
+            async with self._active:
+                await coroutine
+            return
+
+        # Updates reach here in arrival order and asyncio locks are FIFO, so a chat's updates run in order
+        lock = self._chat_locks.setdefault(chat.id, asyncio.Lock())
+        self._chat_waiters[chat.id] = self._chat_waiters.get(chat.id, 0) + 1
+        try:
+            async with lock:
+                async with self._active:
+                    await coroutine
+        finally:
+            self._chat_waiters[chat.id] -= 1
+            if not self._chat_waiters[chat.id]:
+                del self._chat_waiters[chat.id]
+                del self._chat_locks[chat.id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+def create_update_processor() -> Optional[ChatOrderedUpdateProcessor]:
+    """
+    Create the update processor configured for the polling bot
+
+    Returns:
+        Chat-ordered concurrent processor, or None for python-telegram-bot's sequential processing
+    """
+    polling_config = get_service_config()['telegram_polling']
+    if not polling_config['concurrent_updates']:
+        return None
+
+    # Default to the AI pipeline's in-flight capacity: more handlers would only queue on the LLM calls
+    max_concurrent = polling_config['max_concurrent_updates'] or get_performance_config()['max_concurrent_requests']
+    return ChatOrderedUpdateProcessor(max_concurrent, polling_config['max_pending_updates'])
+
+
 class XOFlowersTelegramBot:
     """Enhanced Telegram Bot with AI-powered conversations"""
 
@@ -57,16 +118,21 @@ class XOFlowersTelegramBot:
             raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
 
         print("Creating Telegram application...")
-        self.application = Application.builder().token(token).build()
+        builder = Application.builder().token(token)
+        update_processor = create_update_processor()
+        if update_processor is not None:
+            builder = builder.concurrent_updates(update_processor)
+            logger.info(f"Processing up to {update_processor.max_active_updates} chats concurrently")
+        self.application = builder.build()
+        self.typing_interval = get_service_config()['telegram_polling']['typing_interval_seconds']
         print("Modular components ready...")
 
         # Initialize AI engine for tool calling
         try:
-            from src.intelligence.ai_engine import EnhancedAIEngine
-            self.ai_engine = EnhancedAIEngine()
+            self.ai_engine = get_ai_engine()
             print("AI engine with tool calling loaded.")
         except Exception as e:
-            print(f"[ERROR] Could not initialize EnhancedAIEngine: {e}")
+            print(f"[ERROR] Could not initialize AI engine: {e}")
             self.ai_engine = None
 
         print("Setting up handlers...")
@@ -91,8 +157,11 @@ class XOFlowersTelegramBot:
         if not self.ai_engine:
             await update.message.reply_text("Sistemul AI nu este disponibil momentan. Încercați mai târziu.")
             return
+        # Show "typing..." right away and keep it up while the AI works
+        typing_task = asyncio.create_task(self._keep_typing(update.effective_chat))
         try:
             response = await self.ai_engine.process_message_with_tools(message_text, user_id)
+            typing_task.cancel()
             if any(keyword in response.lower() for keyword in ["cart", "total", "produs adăugat", "comanda", "plata"]):
                 keyboard = [
                     [
@@ -111,6 +180,18 @@ class XOFlowersTelegramBot:
         except Exception as e:
             print(f"Error handling message: {e}")
             await update.message.reply_text("Ne pare rău, a apărut o eroare. Te rugăm să încerci din nou.")
+        finally:
+            typing_task.cancel()
+
+    async def _keep_typing(self, chat) -> None:
+        """Send the typing chat action until cancelled"""
+        while True:
+            try:
+                await chat.send_action(ChatAction.TYPING)
+            except Exception as e:
+                logger.debug(f"Typing indicator failed for chat {chat.id}: {e}")
+                return
+            await asyncio.sleep(self.typing_interval)
         
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handles all text messages using enhanced AI engine with full product integration."""
@@ -145,11 +226,11 @@ class XOFlowersTelegramBot:
         user_id = str(query.from_user.id)
         try:
             if callback_data.startswith("view_cart_"):
-                response = self.ai_engine.cart_tools.view_cart(user_id)
+                response = await self.ai_engine.cart_tools.view_cart(user_id)
             elif callback_data.startswith("pay_"):
-                response = self.ai_engine.payment_tools.process_payment(user_id)
+                response = await self.ai_engine.payment_tools.process_payment(user_id)
             elif callback_data.startswith("clear_cart_"):
-                response = self.ai_engine.cart_tools.clear_cart(user_id)
+                response = await self.ai_engine.cart_tools.clear_cart(user_id)
             elif callback_data == "search_products":
                 response = "🌹 Spune-mi ce flori cauți și te voi ajuta să găsești produsul perfect!"
             else:
@@ -14,9 +14,18 @@ from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, validator
 
-from src.helpers.system_definitions import get_service_config, get_security_config
+from src.helpers.system_definitions import get_service_config, get_security_config, get_performance_config
 from src.helpers.utils import setup_logger, log_performance_metrics, create_request_id
+from src.helpers.rate_limiter import check_user_rate_limit
 from src.intelligence.ai_engine import process_message_ai
+from src.intelligence.context_prefetch import prefetch_user_context
+from src.intelligence.deadline import request_deadline
+from src.api.webhook_ingestion import (
+    get_webhook_ingestion, is_queue_mode_enabled, DeliveryError, REPLY_CHECKPOINT_KEY
+)
+from src.api.outbound_sender import get_outbound_sender, split_message, DeliveryResult
+from src.api.webhook_parsing import decode_webhook_body, telegram_text_message, WebhookPayloadError
+from src.api.admission import get_admission_controller, degraded_result, AdmissionRejected
 
 # Initialize logger
 logger = setup_logger(__name__)
@@ -86,9 +95,6 @@ class TelegramIntegration:
         self.service_config = get_service_config()
         self.security_config = get_security_config()
         
-        # Rate limiting storage (in production, use Redis)
-        self.rate_limit_storage = {}
-        
         self.logger.info("Telegram integration initialized")
     
     async def process_webhook(self, update: TelegramUpdate, request_id: str) -> Optional[TelegramResponse]:
@@ -121,7 +127,7 @@ class TelegramIntegration:
                            f"in chat {chat_id}: '{message_text[:50]}...'")
             
             # Rate limiting check
-            if not self._check_rate_limit(user_id, request_id):
+            if not await self._check_rate_limit(user_id, request_id):
                 return TelegramResponse(
                     method="sendMessage",
                     chat_id=chat_id,
@@ -129,12 +135,25 @@ class TelegramIntegration:
                     reply_to_message_id=message.message_id
                 )
             
-            # Process message through AI pipeline
-            ai_result = await process_message_ai(
-                user_message=message_text,
-                user_id=user_id,
-                context=None  # Will be retrieved from Redis by AI engine
-            )
+            # Start context/preferences/chat rehydration for the accepted message so it
+            # overlaps with admission and the security check inside the AI pipeline
+            context_future = prefetch_user_context(user_id)
+            
+            # Process message through AI pipeline within the deadline (shed with a fast reply under overload)
+            deadline = start_time + get_performance_config()['response_timeout_seconds']
+            try:
+                with request_deadline(deadline):
+                    async with get_admission_controller().admit(deadline):
+                        ai_result = await asyncio.wait_for(
+                            process_message_ai(
+                                user_message=message_text,
+                                user_id=user_id,
+                                context=context_future  # Prefetched, resolved by AI engine after security check
+                            ),
+                            timeout=max(0.1, deadline - time.time())
+                        )
+            except AdmissionRejected as e:
+                ai_result = degraded_result(message_text, e.reason)
             
             processing_time = time.time() - start_time
             
@@ -147,17 +166,14 @@ class TelegramIntegration:
             # Prepare response
             response_text = ai_result.get('response', 'Îmi pare rău, nu am putut procesa mesajul tău.')
             
-            # Format response for Telegram (handle long messages)
-            formatted_response = self._format_telegram_response(response_text)
-            
-            # Log message delivery
+            # Log message delivery (long replies are split by the outbound sender)
             self.logger.info(f"[{request_id}] Sending Telegram response to chat {chat_id} "
-                           f"({len(formatted_response)} chars)")
+                           f"({len(response_text)} chars)")
             
             return TelegramResponse(
                 method="sendMessage",
                 chat_id=chat_id,
-                text=formatted_response,
+                text=response_text,
                 parse_mode="HTML",
                 reply_to_message_id=message.message_id
             )
@@ -177,7 +193,38 @@ class TelegramIntegration:
             
             return None
     
-    def _check_rate_limit(self, user_id: str, request_id: str) -> bool:
+    async def handle_queued_update(self, payload: Dict[str, Any]) -> None:
+        """
+        Process Telegram update taken from the work queue and reply through the send API
+        
+        Args:
+            payload: Serialized TelegramUpdate
+            
+        Raises:
+            DeliveryError: If the reply could not be delivered (update will be retried
+                with the generated reply from the first undelivered chunk, skipping the AI pipeline)
+        """
+        payload = dict(payload)
+        checkpoint = payload.pop(REPLY_CHECKPOINT_KEY, None)
+        update = TelegramUpdate(**payload)
+        
+        start_chunk = 0
+        if checkpoint:
+            response = TelegramResponse(**checkpoint['reply'])
+            start_chunk = checkpoint['last_chunk'] + 1
+        else:
+            response = await self.process_webhook(update, create_request_id())
+        
+        if not response:
+            return
+        
+        result = await self.send_message(response.chat_id, response.text, response.reply_to_message_id,
+                                         start_chunk=start_chunk)
+        if not result:
+            raise DeliveryError(f"Failed to deliver Telegram reply for update {update.update_id}",
+                                reply=response.dict(), last_chunk=result.last_chunk)
+    
+    async def _check_rate_limit(self, user_id: str, request_id: str) -> bool:
         """
         Check if user is within rate limits
         
@@ -189,45 +236,13 @@ class TelegramIntegration:
             bool: True if within limits, False if rate limited
         """
         try:
-            current_time = time.time()
+            result = await check_user_rate_limit(user_id, platform="telegram")
             
-            # Initialize user rate limit data if not exists
-            if user_id not in self.rate_limit_storage:
-                self.rate_limit_storage[user_id] = {
-                    'minute_requests': [],
-                    'hour_requests': []
-                }
-            
-            user_data = self.rate_limit_storage[user_id]
-            
-            # Clean old requests (older than 1 hour)
-            user_data['minute_requests'] = [
-                req_time for req_time in user_data['minute_requests']
-                if current_time - req_time < 60
-            ]
-            user_data['hour_requests'] = [
-                req_time for req_time in user_data['hour_requests']
-                if current_time - req_time < 3600
-            ]
-            
-            # Check limits
-            minute_limit = self.security_config.get('rate_limit_per_minute', 20)
-            hour_limit = self.security_config.get('rate_limit_per_hour', 200)
-            
-            if len(user_data['minute_requests']) >= minute_limit:
-                self.logger.warning(f"[{request_id}] Rate limit exceeded for user {user_id} "
-                                  f"(minute limit: {minute_limit})")
-                return False
-            
-            if len(user_data['hour_requests']) >= hour_limit:
+            if not result.allowed:
                 self.logger.warning(f"[{request_id}] Rate limit exceeded for user {user_id} "
-                                  f"(hour limit: {hour_limit})")
+                                  f"({result.limit_name}, retry after {result.retry_after:.1f}s)")
                 return False
             
-            # Add current request
-            user_data['minute_requests'].append(current_time)
-            user_data['hour_requests'].append(current_time)
-            
             return True
             
         except Exception as e:
@@ -235,37 +250,8 @@ class TelegramIntegration:
             # Allow request if rate limiting fails
             return True
     
-    def _format_telegram_response(self, text: str) -> str:
-        """
-        Format response text for Telegram
-        
-        Args:
-            text: Response text
-            
-        Returns:
-            str: Formatted text for Telegram
-        """
-        # Telegram message limit is 4096 characters
-        max_length = 4000  # Leave some buffer
-        
-        if len(text) <= max_length:
-            return text
-        
-        # Truncate and add continuation message
-        truncated = text[:max_length - 100]
-        
-        # Try to break at a sentence or word boundary
-        last_sentence = truncated.rfind('.')
-        last_space = truncated.rfind(' ')
-        
-        if last_sentence > max_length - 200:
-            truncated = truncated[:last_sentence + 1]
-        elif last_space > max_length - 50:
-            truncated = truncated[:last_space]
-        
-        return truncated + "\n\n<i>Mesajul a fost scurtat pentru Telegram. Pentru informații complete, te rog să mă întrebi din nou.</i>"
-    
-    async def send_message(self, chat_id: int, text: str, reply_to_message_id: Optional[int] = None) -> bool:
+    async def send_message(self, chat_id: int, text: str, reply_to_message_id: Optional[int] = None,
+                           start_chunk: int = 0) -> DeliveryResult:
         """
         Send message to Telegram chat (for external use)
         
@@ -273,18 +259,17 @@ class TelegramIntegration:
             chat_id: Telegram chat ID
             text: Message text
             reply_to_message_id: Optional message ID to reply to
+            start_chunk: First chunk to send (resumes a partially delivered message)
             
         Returns:
-            bool: True if sent successfully
+            DeliveryResult: Truthy if sent successfully, with the last delivered chunk
         """
         try:
-            # This would typically use the Telegram Bot API
-            # For now, we just log the message that would be sent
-            self.logger.info(f"Would send Telegram message to chat {chat_id}: {text[:100]}...")
-            return True
+            return await get_outbound_sender().send_telegram(chat_id, text, reply_to_message_id,
+                                                             start_chunk=start_chunk)
         except Exception as e:
             self.logger.error(f"Failed to send Telegram message: {e}")
-            return False
+            return DeliveryResult(False, start_chunk - 1)
     
     def get_webhook_info(self) -> Dict[str, Any]:
         """
@@ -302,7 +287,7 @@ class TelegramIntegration:
             },
             'message_limits': {
                 'max_message_length': self.security_config.get('max_message_length', 1000),
-                'telegram_response_limit': 4000
+                'telegram_response_limit': get_outbound_sender().max_length('telegram')
             }
         }
 
@@ -310,6 +295,16 @@ class TelegramIntegration:
 # Global integration instance
 telegram_integration = TelegramIntegration()
 
+
+def telegram_ordering_key(payload: Dict[str, Any]) -> Any:
+    """Chat id of a queued Telegram update - one chat's updates are processed in order"""
+    message = payload.get('message') or payload.get('edited_message') or {}
+    return message.get('chat', {}).get('id', payload.get('update_id'))
+
+
+get_webhook_ingestion().register_handler("telegram", telegram_integration.handle_queued_update,
+                                         ordering_key=telegram_ordering_key)
+
 # Create FastAPI router for Telegram endpoints
 telegram_router = APIRouter(prefix="/telegram", tags=["telegram"])
 
@@ -317,19 +312,58 @@ telegram_router = APIRouter(prefix="/telegram", tags=["telegram"])
 @telegram_router.post("/webhook")
 async def telegram_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
-    update: TelegramUpdate
+    background_tasks: BackgroundTasks
 ) -> JSONResponse:
     """
     Telegram webhook endpoint
     
-    Receives updates from Telegram and processes them through the AI pipeline
+    Receives updates from Telegram and processes them through the AI pipeline.
+    Updates without text are acknowledged without building the update model.
     """
     request_id = create_request_id()
     start_time = time.time()
     
+    try:
+        data = decode_webhook_body(await request.body())
+    except WebhookPayloadError as e:
+        logger.error(f"[{request_id}] Failed to parse Telegram webhook payload: {e}")
+        raise HTTPException(status_code=400, detail="Invalid payload format")
+    
+    if telegram_text_message(data) is None:
+        logger.debug(f"[{request_id}] Ignoring non-text Telegram update {data.get('update_id')}")
+        return JSONResponse(status_code=200, content={"status": "ok", "message": "ignored"})
+    
+    try:
+        update = TelegramUpdate(**data)
+    except ValueError as e:
+        logger.error(f"[{request_id}] Invalid Telegram update: {e}")
+        raise HTTPException(status_code=422, detail="Invalid update format")
+    
     logger.info(f"[{request_id}] Received Telegram webhook update: {update.update_id}")
     
+    # Queue mode: acknowledge within milliseconds so Telegram doesn't time out and retry
+    if is_queue_mode_enabled():
+        try:
+            enqueued = await get_webhook_ingestion().enqueue(
+                "telegram", update.update_id, update.dict(by_alias=True, exclude_none=True)
+            )
+            
+            background_tasks.add_task(
+                log_performance_metrics,
+                logger,
+                "telegram_webhook_enqueue",
+                time.time() - start_time,
+                True,
+                {"request_id": request_id, "update_id": update.update_id, "duplicate": not enqueued}
+            )
+            
+            return JSONResponse(
+                status_code=200,
+                content={"status": "ok", "message": "queued" if enqueued else "duplicate"}
+            )
+        except Exception as e:
+            logger.error(f"[{request_id}] Work queue unavailable, processing update inline: {e}")
+    
     try:
         # Process the webhook update
         response = await telegram_integration.process_webhook(update, request_id)
@@ -353,6 +387,26 @@ async def telegram_webhook(
         
         if response:
             logger.info(f"[{request_id}] Telegram webhook processed successfully in {processing_time:.3f}s")
+            
+            # Replies over the message limit can't go in the webhook body - send them split through the Bot API
+            sender = get_outbound_sender()
+            max_length = sender.max_length('telegram')
+            if len(response.text) > max_length:
+                if sender.is_configured('telegram'):
+                    background_tasks.add_task(
+                        telegram_integration.send_message,
+                        response.chat_id,
+                        response.text,
+                        response.reply_to_message_id
+                    )
+                    return JSONResponse(
+                        status_code=200,
+                        content={"status": "ok", "message": "sending"}
+                    )
+                
+                logger.warning(f"[{request_id}] Bot token not configured - replying with first part only")
+                response.text = split_message(response.text, max_length)[0]
+            
             return JSONResponse(
                 status_code=200,
                 content=response.dict()
@@ -410,10 +464,10 @@ async def send_telegram_message(
         reply_to_message_id: Optional message ID to reply to
     """
     try:
-        success = await telegram_integration.send_message(chat_id, text, reply_to_message_id)
+        result = await telegram_integration.send_message(chat_id, text, reply_to_message_id)
         
         return {
-            "success": success,
+            "success": result.delivered,
             "chat_id": chat_id,
             "message_length": len(text),
             "timestamp": datetime.now().isoformat()
@@ -0,0 +1,282 @@
+"""
+Webhook Ingestion for XOFlowers AI Agent
+Acknowledges platform webhooks immediately and processes updates from the work queue
+in a pool of worker tasks that reply through the platform's outbound send API
+
+Ordering: updates are partitioned across workers by a per-platform ordering key
+(the chat or sender id), so one user's messages are handled one at a time and in
+queue order within a process. Ordering is not guaranteed across processes sharing
+a Redis stream, nor for an update that is re-queued after a failure.
+
+Reclaiming: a process never claims the entries it holds (in flight or buffered in
+a partition) and periodically refreshes their idle time, so slow partitions are not
+mistaken for crashed workers. Its own entries left pending by a failed ack or retry
+are reclaimed like those of crashed workers.
+"""
+
+import asyncio
+import time
+import zlib
+from typing import Dict, Any, Callable, Awaitable, List, Optional, Set
+
+from src.data.work_queue import (
+    get_work_queue, ensure_work_queue, reset_work_queue, default_consumer_name, QueuedUpdate
+)
+from src.helpers.system_definitions import get_service_config
+from src.helpers.utils import setup_logger, log_performance_metrics
+
+# Platform handler: receives the queued payload and performs processing + outbound reply
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Ordering key: updates with the same key go to the same worker
+OrderingKey = Callable[[Dict[str, Any]], Any]
+
+# Payload field holding a generated reply whose delivery failed and its last delivered chunk
+REPLY_CHECKPOINT_KEY = '_reply'
+
+# Updates buffered per worker before the fetcher waits
+PARTITION_BUFFER = 8
+
+
+class DeliveryError(RuntimeError):
+    """Reply was generated but not fully delivered - the retry resumes after the last delivered chunk"""
+
+    def __init__(self, message: str, reply: Dict[str, Any], last_chunk: int = -1):
+        super().__init__(message)
+        self.reply = reply
+        self.last_chunk = last_chunk
+
+
+class WebhookIngestion:
+    """Queue-backed webhook ingestion with a worker pool and backlog metrics"""
+
+    def __init__(self):
+        self.logger = setup_logger(__name__)
+        self.config = get_service_config().get('webhook_queue', {})
+
+        self.enabled = self.config.get('enabled', False)
+        self.worker_count = self.config.get('workers', 4)
+        self.max_attempts = self.config.get('max_attempts', 3)
+        self.block_ms = self.config.get('block_ms', 1000)
+        self.claim_idle_ms = self.config.get('claim_idle_ms', 60000)
+
+        self._handlers: Dict[str, UpdateHandler] = {}
+        self._ordering_keys: Dict[str, OrderingKey] = {}
+        self._workers: List[asyncio.Task] = []
+        self._partitions: List[asyncio.Queue] = []
+        self._held: Set[str] = set()
+        self._queue = None
+
+        self._stats = {
+            'enqueued': 0,
+            'duplicates': 0,
+            'processed': 0,
+            'failed': 0,
+            'retried': 0,
+            'dead_lettered': 0,
+            'reclaimed': 0
+        }
+        self._last_queue_latency = 0.0
+
+        self.logger.info(f"Webhook ingestion initialized (queue mode: {self.enabled}, workers: {self.worker_count})")
+
+    @property
+    def queue(self):
+        if self._queue is None:
+            self._queue = get_work_queue()
+        return self._queue
+
+    def register_handler(self, platform: str, handler: UpdateHandler,
+                         ordering_key: Optional[OrderingKey] = None) -> None:
+        """
+        Register processing handler for a platform
+
+        Args:
+            platform: Platform name (telegram, instagram)
+            handler: Coroutine processing one queued payload
+            ordering_key: Returns the key (chat/user id) whose updates must be processed in order
+        """
+        self._handlers[platform] = handler
+        if ordering_key is not None:
+            self._ordering_keys[platform] = ordering_key
+
+    async def enqueue(self, platform: str, dedup_id: Any, payload: Dict[str, Any]) -> bool:
+        """
+        Enqueue validated webhook update
+
+        Args:
+            platform: Platform name (telegram, instagram)
+            dedup_id: Platform-unique id (Telegram update_id, Instagram mid)
+            payload: JSON-serializable update payload
+
+        Returns:
+            True if enqueued, False if the update was a duplicate delivery
+        """
+        enqueued = await self.queue.enqueue(platform, str(dedup_id), payload)
+        self._stats['enqueued' if enqueued else 'duplicates'] += 1
+        if not enqueued:
+            self.logger.info(f"Ignoring duplicate {platform} update {dedup_id}")
+        return enqueued
+
+    async def start(self) -> None:
+        """Start worker tasks (no-op when queue mode is disabled or already running)"""
+        if not self.enabled or self._workers:
+            return
+
+        if self._queue is None:
+            self._queue = await ensure_work_queue()
+
+        self._partitions = [asyncio.Queue(maxsize=PARTITION_BUFFER) for _ in range(self.worker_count)]
+        for index, partition in enumerate(self._partitions):
+            self._workers.append(asyncio.create_task(self._worker_loop(partition), name=f"webhook-worker-{index}"))
+        consumer = default_consumer_name()
+        self._workers.append(asyncio.create_task(self._fetch_loop(consumer), name="webhook-fetcher"))
+        self._workers.append(asyncio.create_task(self._refresh_loop(consumer), name="webhook-refresher"))
+
+        self.logger.info(f"Started {self.worker_count} webhook workers")
+
+    async def stop(self) -> None:
+        """Stop worker tasks; unacknowledged updates stay in the queue for other workers"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._partitions = []
+        self._held.clear()
+
+        if self._queue is not None:
+            await self._queue.close()
+            self._queue = None
+        reset_work_queue()
+
+    def _partition_index(self, update: QueuedUpdate) -> int:
+        """Map update to a worker by its ordering key (entry id when the platform has none)"""
+        key_func = self._ordering_keys.get(update.platform)
+        key = update.entry_id
+        if key_func is not None:
+            try:
+                key = key_func(update.payload)
+            except Exception:
+                pass
+        return zlib.crc32(f"{update.platform}:{key}".encode()) % len(self._partitions)
+
+    async def _fetch_loop(self, consumer: str) -> None:
+        """Consume updates and dispatch them to the worker owning their ordering key"""
+        last_claim = 0.0
+
+        while True:
+            try:
+                updates: List[QueuedUpdate] = []
+
+                # Periodically take over updates abandoned by crashed workers
+                if time.time() - last_claim >= self.claim_idle_ms / 1000:
+                    last_claim = time.time()
+                    updates = await self.queue.claim_stale(consumer, self.claim_idle_ms,
+                                                           exclude_ids=self._held)
+                    for update in updates:
+                        update.attempts += 1
+                    self._stats['reclaimed'] += len(updates)
+
+                if not updates:
+                    updates = await self.queue.consume(consumer, count=self.worker_count, block_ms=self.block_ms)
+
+                for update in updates:
+                    self._held.add(update.entry_id)
+                    await self._partitions[self._partition_index(update)].put(update)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Webhook fetcher {consumer} error: {e}")
+                await asyncio.sleep(1)
+
+    async def _refresh_loop(self, consumer: str) -> None:
+        """Keep held updates from looking abandoned while they wait or run"""
+        while True:
+            await asyncio.sleep(self.claim_idle_ms / 3000)
+            if not self._held:
+                continue
+            try:
+                await self.queue.refresh(consumer, list(self._held))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Webhook refresher {consumer} error: {e}")
+
+    async def _worker_loop(self, partition: asyncio.Queue) -> None:
+        """Process updates of one partition in order until cancelled"""
+        while True:
+            update = await partition.get()
+            try:
+                await self._process(update)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Webhook worker error: {e}")
+            finally:
+                self._held.discard(update.entry_id)
+
+    async def _process(self, update: QueuedUpdate) -> None:
+        """Run platform handler for one update, then ack or retry"""
+        start_time = time.time()
+        self._last_queue_latency = start_time - update.enqueued_at
+
+        handler = self._handlers.get(update.platform)
+        if handler is None:
+            self.logger.error(f"No handler registered for platform '{update.platform}', dropping update")
+            await self.queue.ack(update)
+            return
+
+        try:
+            await handler(update.payload)
+            await self.queue.ack(update)
+            self._stats['processed'] += 1
+            log_performance_metrics(self.logger, f"{update.platform}_queued_update", time.time() - start_time, True,
+                                    {"queue_latency": round(self._last_queue_latency, 3), "attempts": update.attempts})
+
+        except Exception as e:
+            self._stats['failed'] += 1
+            if isinstance(e, DeliveryError):
+                # Keep the generated reply so the retry doesn't rerun the AI pipeline
+                update.payload = {**update.payload,
+                                  REPLY_CHECKPOINT_KEY: {'reply': e.reply, 'last_chunk': e.last_chunk}}
+            log_performance_metrics(self.logger, f"{update.platform}_queued_update", time.time() - start_time, False,
+                                    {"error": str(e), "attempts": update.attempts})
+
+            requeued = await self.queue.retry(update, self.max_attempts)
+            self._stats['retried' if requeued else 'dead_lettered'] += 1
+            self.logger.warning(f"{update.platform} update failed (attempt {update.attempts}), "
+                                f"{'re-queued' if requeued else 'moved to dead letters'}: {e}")
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Backlog and worker metrics for monitoring"""
+        metrics: Dict[str, Any] = {
+            'enabled': self.enabled,
+            'workers': len(self._partitions),
+            'last_queue_latency_seconds': round(self._last_queue_latency, 3),
+            **self._stats
+        }
+
+        if self.enabled:
+            try:
+                metrics['backlog'] = await self.queue.get_backlog()
+            except Exception as e:
+                metrics['backlog'] = {'error': str(e)}
+
+        return metrics
+
+
+# Global webhook ingestion instance
+_webhook_ingestion = None
+
+def get_webhook_ingestion() -> WebhookIngestion:
+    """Get global webhook ingestion instance"""
+    global _webhook_ingestion
+    if _webhook_ingestion is None:
+        _webhook_ingestion = WebhookIngestion()
+    return _webhook_ingestion
+
+
+def is_queue_mode_enabled() -> bool:
+    """Check if webhooks should be acknowledged immediately and processed from the queue"""
+    return get_webhook_ingestion().enabled
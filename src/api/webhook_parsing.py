@@ -0,0 +1,92 @@
+"""
+Webhook Body Parsing for XOFlowers AI Agent
+Decodes raw webhook bodies straight from the received bytes (orjson when installed)
+and drops updates the bot ignores - stickers, photos, reactions, read receipts -
+before any Pydantic model is built
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+
+class WebhookPayloadError(ValueError):
+    """Webhook body is not a JSON object"""
+
+
+def decode_webhook_body(body: bytes) -> Dict[str, Any]:
+    """
+    Decode a raw webhook body
+
+    The bytes are parsed directly, without decoding them to a str first, so
+    the buffer the signature was computed over is the only copy of the body.
+
+    Args:
+        body: Raw request body
+
+    Returns:
+        Decoded JSON object
+
+    Raises:
+        WebhookPayloadError: If the body is not valid JSON or not an object
+    """
+    try:
+        data = orjson.loads(body) if HAS_ORJSON else json.loads(body)
+    except ValueError as e:  # orjson.JSONDecodeError and UnicodeDecodeError are ValueErrors
+        raise WebhookPayloadError(f"Invalid JSON: {e}") from e
+
+    if not isinstance(data, dict):
+        raise WebhookPayloadError(f"Expected a JSON object, got {type(data).__name__}")
+    return data
+
+
+def telegram_text_message(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Get the text message of a decoded Telegram update
+
+    Args:
+        data: Decoded update
+
+    Returns:
+        The message or edited_message object if it has text, None for updates the bot ignores
+    """
+    message = data.get('message') or data.get('edited_message')
+    if isinstance(message, dict) and isinstance(message.get('text'), str) and message['text'].strip():
+        return message
+    return None
+
+
+def prune_instagram_webhook(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Keep only the text messaging events of a decoded Instagram webhook
+
+    Args:
+        data: Decoded webhook payload
+
+    Returns:
+        Payload with the same entries holding only text messaging events,
+        None if there is no text message to process
+    """
+    entries: List[Dict[str, Any]] = []
+    has_text = False
+
+    for entry in data.get('entry') or []:
+        if not isinstance(entry, dict):
+            continue
+        messaging = [
+            event for event in entry.get('messaging') or []
+            if isinstance(event, dict) and isinstance(event.get('message'), dict)
+            and isinstance(event['message'].get('text'), str) and event['message']['text'].strip()
+        ]
+        has_text = has_text or bool(messaging)
+        entries.append({**entry, 'messaging': messaging})
+
+    if not has_text:
+        return None
+    return {**data, 'entry': entries}
@@ -13,7 +13,8 @@ from pathlib import Path
 from functools import lru_cache
 
 from src.utils.system_definitions import get_service_config
-from src.utils.utils import setup_logger
+from src.utils.utils import setup_logger, log_performance_metrics
+from src.helpers.tracing import traced, current_span
 
 logger = setup_logger(__name__)
 
@@ -29,6 +30,62 @@ except ImportError:
     HAS_CHROMADB = False
     logger.warning("ChromaDB dependencies not available - using fallback mode")
 
+# Embedding model shared by every client and the security classifier (loaded before forking when preloaded)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+_embedding_function = None
+
+
+def get_embedding_function():
+    """Get shared SentenceTransformer embedding function, loading it on first use"""
+    global _embedding_function
+    if _embedding_function is None and HAS_CHROMADB:
+        # Optimized for faster loading
+        _embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=EMBEDDING_MODEL_NAME,
+            device="cpu",  # Force CPU to avoid GPU detection delays
+            normalize_embeddings=True  # Normalize for better similarity scores
+        )
+        logger.info("Embedding function initialized with optimizations")
+    return _embedding_function
+
+
+def preload_embedding_model() -> bool:
+    """
+    Load embedding model weights now (call in the parent before forking workers
+    so the model pages are shared copy-on-write)
+    
+    No inference runs here: torch creates its intra-op thread pool on the first
+    forward pass, and a pool inherited through fork can hang the workers. Each
+    worker warms up with warm_up_embedding_model() after fork.
+    
+    Returns:
+        bool: True if the model is loaded
+    """
+    try:
+        return get_embedding_function() is not None
+    except Exception as e:
+        logger.warning(f"Embedding model preload failed: {e}")
+        return False
+
+
+def warm_up_embedding_model() -> bool:
+    """
+    Run one embedding so the first user query doesn't pay for lazy initialization
+    (call in each worker process, after fork)
+    
+    Returns:
+        bool: True if the warmup succeeded
+    """
+    embedding_function = get_embedding_function()
+    if embedding_function is None:
+        return False
+    try:
+        embedding_function(["warmup"])
+        return True
+    except Exception as e:
+        logger.warning(f"Embedding model warmup failed: {e}")
+        return False
+
 class ChromaDBClient:
     """
     Optimized ChromaDB client for product search with caching and connection pooling
@@ -72,13 +129,8 @@ class ChromaDBClient:
             self.client = chromadb.PersistentClient(path=str(self.db_path))
             logger.info(f"ChromaDB client created at: {self.db_path}")
             
-            # Create embedding function for product search (optimized for faster loading)
-            embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2",
-                device="cpu",  # Force CPU to avoid GPU detection delays
-                normalize_embeddings=True  # Normalize for better similarity scores
-            )
-            logger.info("Embedding function initialized with optimizations")
+            # Shared embedding function for product search
+            embedding_function = get_embedding_function()
             
             # Get or create collection
             try:
@@ -287,7 +339,7 @@ class ChromaDBClient:
         cache_key = self._generate_cache_key(query, None, max_results)
         cached_results = self._get_cached_results(cache_key)
         if cached_results:
-            logger.debug(f"Using cached results for query: {query}")
+            logger.debug("Using cached results for query: %s", query)
             return cached_results
         
         async with self._query_semaphore:  # Connection pooling
@@ -298,11 +350,17 @@ class ChromaDBClient:
                     return self._get_fallback_products(query, max_results)
                 
                 # Perform vector search
-                results = await asyncio.to_thread(
-                    self.collection.query,
-                    query_texts=[query],
-                    n_results=max_results
-                )
+                start_time = time.time()
+                try:
+                    results = await asyncio.to_thread(
+                        self.collection.query,
+                        query_texts=[query],
+                        n_results=max_results
+                    )
+                except Exception as e:
+                    log_performance_metrics(logger, "chromadb_search", time.time() - start_time, False, {"error": str(e)})
+                    raise
+                log_performance_metrics(logger, "chromadb_search", time.time() - start_time, True)
                 
                 # Format results
                 formatted_results = self._format_search_results(results)
@@ -310,7 +368,7 @@ class ChromaDBClient:
                 # Cache results
                 self._cache_results(cache_key, formatted_results)
                 
-                logger.info(f"ChromaDB search completed: {len(formatted_results)} results for query '{query}'")
+                logger.debug("ChromaDB search completed: %d results for query '%s'", len(formatted_results), query)
                 return formatted_results
                 
             except Exception as e:
@@ -319,6 +377,7 @@ class ChromaDBClient:
                 logger.info("Falling back to mock product data")
                 return self._get_fallback_products(query, max_results)
     
+    @traced("chromadb.search")
     async def search_products_with_filters(self, query: str, filters: Dict[str, Any], max_results: int = 5) -> List[Dict[str, Any]]:
         """
         Search for products with additional filters using caching and connection pooling
@@ -334,8 +393,10 @@ class ChromaDBClient:
         # Check cache first
         cache_key = self._generate_cache_key(query, filters, max_results)
         cached_results = self._get_cached_results(cache_key)
+        span = current_span()
+        span.set_attribute('cache.hit', bool(cached_results))
         if cached_results:
-            logger.debug(f"Using cached filtered results for query: {query}")
+            logger.debug("Using cached filtered results for query: %s", query)
             return cached_results
         
         async with self._query_semaphore:  # Connection pooling
@@ -387,7 +448,8 @@ class ChromaDBClient:
                 # Cache results
                 self._cache_results(cache_key, formatted_results)
                 
-                logger.info(f"ChromaDB filtered search completed: {len(formatted_results)} results")
+                logger.debug("ChromaDB filtered search completed: %d results", len(formatted_results))
+                span.set_attribute('results', len(formatted_results))
                 return formatted_results
                 
             except Exception as e:
@@ -577,6 +639,18 @@ class ChromaDBClient:
         """
         return HAS_CHROMADB and self.initialized and self.collection is not None
     
+    def ping(self) -> bool:
+        """
+        Cheap liveness check of the collection for the background health checks
+        
+        Returns:
+            bool: True if the collection answers a count
+        """
+        if not self.is_available():
+            return False
+        self.collection.count()
+        return True
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the product collection
@@ -625,50 +699,52 @@ class ChromaDBClient:
         
         if self.is_available():
             try:
-                # Test a simple query
-                test_results = self.collection.query(
-                    query_texts=["test"],
-                    n_results=1
-                )
+                # Count is served from sqlite - no embedding or vector query
+                health_status['document_count'] = self.collection.count()
                 health_status['status'] = 'healthy'
-                health_status['test_query_success'] = True
             except Exception as e:
                 health_status['status'] = 'error'
                 health_status['error'] = str(e)
-                health_status['test_query_success'] = False
         else:
             health_status['status'] = 'unavailable'
             health_status['fallback_mode'] = True
         
         return health_status
 
-# Global instance for easy access
-chromadb_client = ChromaDBClient()
+# Global instance for easy access (created on first use, so each forked worker opens its own connection)
+_chromadb_client = None
+
+def get_chromadb_client() -> ChromaDBClient:
+    """Get global ChromaDB client instance"""
+    global _chromadb_client
+    if _chromadb_client is None:
+        _chromadb_client = ChromaDBClient()
+    return _chromadb_client
 
 # Convenience functions for direct access
 async def search_products(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
     """Search for products using natural language query"""
-    return await chromadb_client.search_products(query, max_results)
+    return await get_chromadb_client().search_products(query, max_results)
 
 async def search_products_with_filters(query: str, filters: Dict[str, Any], max_results: int = 5) -> List[Dict[str, Any]]:
     """Search for products with additional filters"""
-    return await chromadb_client.search_products_with_filters(query, filters, max_results)
+    return await get_chromadb_client().search_products_with_filters(query, filters, max_results)
 
 def is_chromadb_available() -> bool:
     """Check if ChromaDB is available"""
-    return chromadb_client.is_available()
+    return get_chromadb_client().is_available()
 
 def get_product_search_stats() -> Dict[str, Any]:
     """Get ChromaDB collection statistics"""
-    return chromadb_client.get_collection_stats()
+    return get_chromadb_client().get_collection_stats()
 
 def health_check_chromadb() -> Dict[str, Any]:
     """Perform ChromaDB health check"""
-    return chromadb_client.health_check()
+    return get_chromadb_client().health_check()
 
 async def test_chromadb_connection() -> bool:
     """Test ChromaDB connection for health checks"""
     try:
-        return chromadb_client.is_available()
+        return get_chromadb_client().is_available()
     except Exception:
         return False
\ No newline at end of file
@@ -6,6 +6,7 @@ with fallback to system_definitions when JSON files are unavailable
 
 import json
 import logging
+import re
 import time
 from typing import Dict, List, Optional, Any
 from pathlib import Path
@@ -16,6 +17,17 @@ from src.utils.utils import setup_logger
 
 logger = setup_logger(__name__)
 
+# Words too common in FAQ questions to identify one
+FAQ_STOPWORDS = {'care', 'sunt', 'este', 'pentru', 'aveți', 'aveti', 'unde', 'cum', 'pot', 'vă', 'va'}
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _significant_words(text: str) -> set:
+    """Lowercase words long enough to tell FAQ questions apart"""
+    return {word for word in _WORD_PATTERN.findall(text.lower())
+            if len(word) >= 4 and word not in FAQ_STOPWORDS}
+
+
 class FAQManager:
     """
     Manages access to FAQ data and business information with caching
@@ -231,29 +243,37 @@ class FAQManager:
                 }
             ]
     
-    def search_faq(self, query: str) -> Optional[Dict[str, str]]:
+    def search_faq(self, query: str, min_score: float = 0.0) -> Optional[Dict[str, str]]:
         """
         Search for FAQ item that matches the query
         
+        Items are scored by the share of the query's significant words that
+        appear in the FAQ question; the best item is returned.
+        
         Args:
             query: Search query string
+            min_score: Minimum share of query words (0-1) the best item must match
             
         Returns:
             Optional[Dict[str, str]]: Matching FAQ item or None if not found
         """
         try:
-            faq_items = self.get_faq_responses()
-            query_lower = query.lower()
+            query_words = _significant_words(query)
+            if not query_words:
+                return None
             
-            # Simple keyword matching for FAQ search
-            for item in faq_items:
-                question_lower = item['question'].lower()
-                if any(word in question_lower for word in query_lower.split()):
-                    logger.debug(f"Found FAQ match for query: {query}")
-                    return item
+            best_item, best_score = None, 0.0
+            for item in self.get_faq_responses():
+                score = len(query_words & _significant_words(item.get('question', ''))) / len(query_words)
+                if score > best_score:
+                    best_item, best_score = item, score
             
-            logger.debug(f"No FAQ match found for query: {query}")
-            return None
+            if best_item is None or best_score < min_score:
+                logger.debug(f"No FAQ match found for query: {query}")
+                return None
+            
+            logger.debug(f"Found FAQ match for query: {query} (score {best_score:.2f})")
+            return best_item
             
         except Exception as e:
             logger.error(f"Error searching FAQ: {e}")
@@ -357,9 +377,9 @@ def get_faq_responses() -> List[Dict[str, str]]:
     """Get all FAQ responses"""
     return faq_manager.get_faq_responses()
 
-def search_faq(query: str) -> Optional[Dict[str, str]]:
+def search_faq(query: str, min_score: float = 0.0) -> Optional[Dict[str, str]]:
     """Search FAQ for matching item"""
-    return faq_manager.search_faq(query)
+    return faq_manager.search_faq(query, min_score)
 
 def get_quick_responses() -> Dict[str, str]:
     """Get quick response templates"""
@@ -0,0 +1,334 @@
+"""
+Cart and Order Store for XOFlowers AI Agent
+Transactional embedded storage (SQLite in WAL mode) for shopping carts and placed orders
+Replaces the whole-file rewrites of data/user_carts.json and data/orders.json with
+per-item rows updated atomically and an append-only order log
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.system_definitions import get_service_config
+from src.utils.utils import setup_logger, log_performance_metrics
+
+logger = setup_logger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cart_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    url TEXT NOT NULL DEFAULT '',
+    UNIQUE (user_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user_id
+    ON orders (user_id, created_at);
+"""
+
+
+class OrderStore:
+    """
+    SQLite-backed store with one row per cart item and one row per order
+    Every cart change and checkout is a single IMMEDIATE transaction, so concurrent
+    requests (threads or worker processes) never lose each other's updates.
+    Orders are only ever inserted. All public methods are async and run the
+    blocking SQLite calls in a worker thread.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Initialize store at configured path (or explicit db_path)"""
+        self.config = get_service_config().get('order_store', {})
+        self.db_path = Path(db_path or self.config.get('path', 'data/orders.db'))
+
+        # Single shared connection, serialized with a lock (SQLite handles cross-process locking in WAL)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+        logger.info(f"Order store initialized at {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open connection, enable WAL and create schema"""
+        if str(self.db_path) != ':memory:':
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def close(self) -> None:
+        """Close the underlying connection"""
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction taking the database write lock up front, so read-then-write can't race"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # Synchronous implementation (executed in worker threads)
+
+    def _get_cart_sync(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT product_id, name, price, quantity, url FROM cart_items WHERE user_id = ? ORDER BY id",
+                (user_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _add_item_sync(self, user_id: str, name: str, price: float, url: str, product_id: Optional[str]) -> int:
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE cart_items SET quantity = quantity + 1 WHERE user_id = ? AND name = ?",
+                (user_id, name)
+            ).rowcount
+            if not updated:
+                count = conn.execute("SELECT COUNT(*) FROM cart_items WHERE user_id = ?", (user_id,)).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO cart_items (user_id, product_id, name, price, quantity, url) "
+                    "VALUES (?, ?, ?, ?, 1, ?)",
+                    (user_id, product_id or f"prod_{count + 1}", name, price, url)
+                )
+            return conn.execute(
+                "SELECT quantity FROM cart_items WHERE user_id = ? AND name = ?", (user_id, name)
+            ).fetchone()[0]
+
+    def _remove_item_sync(self, user_id: str, name: str) -> Optional[str]:
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT id, name FROM cart_items WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
+            # Case-insensitive match in Python: SQLite's lower() only folds ASCII, not Romanian diacritics
+            match = next((row for row in rows if row['name'].lower() == name.lower()), None)
+            if match is None:
+                return None
+            conn.execute("DELETE FROM cart_items WHERE id = ?", (match['id'],))
+            return match['name']
+
+    def _clear_cart_sync(self, user_id: str) -> int:
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM cart_items WHERE user_id = ?", (user_id,)).rowcount
+
+    def _checkout_sync(self, user_id: str,
+                       build_order: Callable[[List[Dict[str, Any]]], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            items = [dict(row) for row in conn.execute(
+                "SELECT product_id, name, price, quantity, url FROM cart_items WHERE user_id = ? ORDER BY id",
+                (user_id,)
+            ).fetchall()]
+            if not items:
+                return None
+
+            order = build_order(items)
+            conn.execute(
+                "INSERT INTO orders (order_id, user_id, created_at, data) VALUES (?, ?, ?, ?)",
+                (order['order_id'], user_id, order['created_at'], json.dumps(order, ensure_ascii=False))
+            )
+            conn.execute("DELETE FROM cart_items WHERE user_id = ?", (user_id,))
+            return order
+
+    def _get_order_sync(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def _get_user_orders_sync(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM orders WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    # Async access layer
+
+    async def _run(self, operation: str, func, *args):
+        """Run a blocking store operation in a worker thread with performance logging"""
+        start_time = time.time()
+        try:
+            result = await asyncio.to_thread(func, *args)
+            log_performance_metrics(logger, f"order_store_{operation}", time.time() - start_time, True)
+            return result
+        except Exception as e:
+            log_performance_metrics(logger, f"order_store_{operation}", time.time() - start_time, False,
+                                    {"error": str(e)})
+            raise
+
+    async def get_cart(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get cart items of user in the order they were added"""
+        return await self._run("get_cart", self._get_cart_sync, user_id)
+
+    async def add_item(self, user_id: str, name: str, price: float, url: str = "",
+                       product_id: Optional[str] = None) -> int:
+        """
+        Add one unit of a product to the cart
+
+        Args:
+            user_id: User identifier
+            name: Product name (items are keyed by name within a cart)
+            price: Unit price in MDL
+            url: Product URL
+            product_id: Catalog id of the product (a per-cart id is generated if omitted)
+
+        Returns:
+            Quantity of the product in the cart after the change
+        """
+        return await self._run("add_item", self._add_item_sync, user_id, name, price, url, product_id)
+
+    async def remove_item(self, user_id: str, name: str) -> Optional[str]:
+        """Remove a product (case-insensitive name) from the cart, returns the stored name or None"""
+        return await self._run("remove_item", self._remove_item_sync, user_id, name)
+
+    async def clear_cart(self, user_id: str) -> int:
+        """Remove every item from the cart, returns the number of removed items"""
+        return await self._run("clear_cart", self._clear_cart_sync, user_id)
+
+    async def checkout(self, user_id: str,
+                       build_order: Callable[[List[Dict[str, Any]]], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Turn the cart into an order atomically
+
+        The cart is read, the order appended and the cart emptied in one
+        transaction, so a cart is ordered at most once even when checkouts race.
+
+        Args:
+            user_id: User identifier
+            build_order: Builds the order dict (with order_id and created_at) from the cart items
+
+        Returns:
+            The stored order, or None if the cart was empty
+        """
+        return await self._run("checkout", self._checkout_sync, user_id, build_order)
+
+    async def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Get order by id or None if unknown"""
+        return await self._run("get_order", self._get_order_sync, order_id)
+
+    async def get_user_orders(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent orders of user, newest first"""
+        return await self._run("get_user_orders", self._get_user_orders_sync, user_id, limit)
+
+    # One-shot migration from the legacy JSON documents
+
+    def migrate_from_json(self, carts_path: str = "data/user_carts.json",
+                          orders_path: str = "data/orders.json") -> Dict[str, int]:
+        """
+        Import legacy JSON files into the store
+
+        Users that already have cart rows are skipped and orders are inserted
+        by id, so running the migration twice does not duplicate anything.
+
+        Args:
+            carts_path: Path to JSON document of {user_id: [cart items]}
+            orders_path: Path to JSON document of {order_id: order}
+
+        Returns:
+            Dict with numbers of migrated cart items and orders
+        """
+        stats = {'cart_items': 0, 'orders': 0}
+
+        carts = _load_json_document(carts_path)
+        orders = _load_json_document(orders_path)
+
+        with self._transaction() as conn:
+            for user_id, items in carts.items():
+                user_id = str(user_id)
+                if not isinstance(items, list):
+                    continue
+
+                existing = conn.execute("SELECT 1 FROM cart_items WHERE user_id = ? LIMIT 1", (user_id,)).fetchone()
+                if existing:
+                    continue
+
+                rows = _legacy_cart_rows(user_id, items)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO cart_items (user_id, product_id, name, price, quantity, url) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                stats['cart_items'] += len(rows)
+
+            for order_id, order in orders.items():
+                if not isinstance(order, dict):
+                    continue
+                stats['orders'] += conn.execute(
+                    "INSERT OR IGNORE INTO orders (order_id, user_id, created_at, data) VALUES (?, ?, ?, ?)",
+                    (str(order_id), str(order.get('user_id', '')),
+                     order.get('created_at') or datetime.now().isoformat(),
+                     json.dumps(order, ensure_ascii=False))
+                ).rowcount
+
+        logger.info(f"Migrated {stats['cart_items']} cart items and {stats['orders']} orders into {self.db_path}")
+        return stats
+
+
+def _load_json_document(path: str) -> Dict[str, Any]:
+    """Load legacy JSON document, returning empty dict if missing"""
+    file_path = Path(path)
+    if not file_path.exists():
+        logger.warning(f"Legacy file not found, skipping: {path}")
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _legacy_cart_rows(user_id: str, items: List[Any]) -> List[Tuple]:
+    """Convert legacy user_carts.json items to cart_items rows"""
+    rows = []
+    for index, item in enumerate(items, 1):
+        if not isinstance(item, dict) or not item.get('name'):
+            continue
+        rows.append((
+            user_id,
+            item.get('product_id') or f"prod_{index}",
+            item['name'],
+            float(item.get('price') or 0),
+            int(item.get('quantity') or 1),
+            item.get('url') or ''
+        ))
+    return rows
+
+
+# Global order store instance
+_order_store = None
+
+def get_order_store() -> OrderStore:
+    """Get global order store instance"""
+    global _order_store
+    if _order_store is None:
+        _order_store = OrderStore()
+    return _order_store
+
+
+if __name__ == "__main__":
+    # One-shot migration: python -m src.data.order_store [user_carts.json] [orders.json]
+    import sys
+
+    store = get_order_store()
+    args = sys.argv[1:]
+    result = store.migrate_from_json(*args)
+    print(f"Migration complete: {result['cart_items']} cart items, {result['orders']} orders")
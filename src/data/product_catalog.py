@@ -0,0 +1,236 @@
+"""
+Product Catalog for XOFlowers AI Agent
+In-memory product index loaded once from src/database/products.csv
+Resolves products by id, URL and name in O(1), with a token index for fuzzy name matches,
+so cart operations store canonical catalog ids and prices instead of model-supplied values
+"""
+
+import csv
+import math
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.utils.system_definitions import get_service_config
+from src.utils.utils import setup_logger, log_performance_metrics
+
+logger = setup_logger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_NON_ALNUM_PATTERN = re.compile(r'[^0-9a-z]+')
+
+# Fuzzy matches must beat the next best product by this much
+FUZZY_MIN_MARGIN = 0.1
+
+
+@dataclass(frozen=True)
+class Product:
+    """Catalog product"""
+    product_id: str
+    name: str
+    price: float
+    url: str = ""
+    category: str = ""
+    flower_type: str = ""
+
+
+class ProductCatalog:
+    """
+    Hash indexes over the product catalog
+    The same product is listed under several categories in the CSV; the first
+    listing is canonical and later duplicates resolve to it by name and URL.
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, fuzzy_min_score: Optional[float] = None):
+        """Initialize catalog from configured CSV (or explicit csv_path)"""
+        self.config = get_service_config().get('product_catalog', {})
+        self.csv_path = Path(csv_path or self.config.get('path', 'src/database/products.csv'))
+        self.fuzzy_min_score = fuzzy_min_score or self.config.get('fuzzy_min_score', 0.6)
+
+        self._by_id: Dict[str, Product] = {}
+        self._by_name: Dict[str, Product] = {}
+        self._by_url: Dict[str, Product] = {}
+        self._name_tokens: Dict[str, Set[str]] = {}
+        self._token_index: Dict[str, Set[str]] = defaultdict(set)
+        self._token_weights: Dict[str, float] = {}
+
+        self.index(self._load_csv())
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def _load_csv(self) -> List[Product]:
+        """Read existing products from the catalog CSV"""
+        path = self.csv_path
+        if not path.is_absolute() and not path.exists():
+            path = PROJECT_ROOT / path
+        if not path.exists():
+            logger.warning(f"Product catalog not found at {self.csv_path}, cart products will not be validated")
+            return []
+
+        products = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('chunk_type') != 'product' or row.get('product_exists', 'True').lower() != 'true':
+                    continue
+                try:
+                    price = float(row.get('price') or 0)
+                except ValueError:
+                    price = 0.0
+                products.append(Product(
+                    product_id=row['chunk_id'],
+                    # Name is the part of primary_text before the description
+                    name=row.get('primary_text', '').split(' - ')[0].strip(),
+                    price=price,
+                    url=row.get('url', ''),
+                    category=row.get('category', ''),
+                    flower_type=row.get('flower_type', '')
+                ))
+        return products
+
+    def index(self, products: Iterable[Product]) -> None:
+        """
+        Build the id, name, URL and token indexes
+
+        Args:
+            products: Catalog products in file order
+        """
+        start_time = time.time()
+        document_frequency: Dict[str, int] = defaultdict(int)
+
+        for product in products:
+            self._by_id.setdefault(product.product_id, product)
+            name_key = normalize_name(product.name)
+            if not name_key:
+                continue
+            canonical = self._by_name.setdefault(name_key, product)
+            # Duplicate listings point at the canonical product
+            self._by_id[product.product_id] = canonical
+            if product.url:
+                self._by_url.setdefault(normalize_url(product.url), canonical)
+
+            if canonical is product:
+                tokens = set(name_key.split())
+                self._name_tokens[name_key] = tokens
+                for token in tokens:
+                    self._token_index[token].add(name_key)
+                    document_frequency[token] += 1
+
+        names = max(len(self._by_name), 1)
+        self._token_weights = {token: math.log(1 + names / count) for token, count in document_frequency.items()}
+
+        log_performance_metrics(logger, "product_catalog_index", time.time() - start_time, True, {
+            "products": len(self._by_name),
+            "listings": len(self._by_id)
+        })
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Get product by catalog id (chunk_id)"""
+        return self._by_id.get(product_id)
+
+    def find_by_url(self, url: str) -> Optional[Product]:
+        """Get product by URL, ignoring scheme, trailing slashes and case"""
+        return self._by_url.get(normalize_url(url)) if url else None
+
+    def find_by_name(self, name: str) -> Optional[Product]:
+        """Get product by exact name, ignoring case, diacritics and punctuation"""
+        return self._by_name.get(normalize_name(name))
+
+    def search_name(self, name: str, limit: int = 5) -> List[Tuple[Product, float]]:
+        """
+        Fuzzy name lookup through the token index
+
+        Candidates share at least one token with the query. Tokens are weighted
+        by rarity, so distinctive words ("Coral") count more than generic ones
+        ("Bouquet"), and the score favours explaining the whole query over
+        covering the whole product name (F-score with beta 0.5).
+
+        Args:
+            name: Product name as written by the user or model
+            limit: Maximum number of matches
+
+        Returns:
+            List of (product, score) pairs, best first, scores in [0, 1]
+        """
+        query = normalize_name(name)
+        query_tokens = set(query.split())
+        if not query_tokens:
+            return []
+
+        candidates = set().union(*(self._token_index.get(token, ()) for token in query_tokens))
+        # Tokens missing from the catalog are as distinctive as the rarest known token
+        unknown_weight = max(self._token_weights.values(), default=1.0)
+        query_weight = sum(self._token_weights.get(token, unknown_weight) for token in query_tokens)
+
+        scored = []
+        for name_key in candidates:
+            tokens = self._name_tokens[name_key]
+            shared = sum(self._token_weights[token] for token in tokens & query_tokens)
+            precision = shared / query_weight
+            recall = shared / sum(self._token_weights[token] for token in tokens)
+            score = 1.25 * precision * recall / (0.25 * precision + recall)
+            scored.append((score, SequenceMatcher(None, query, name_key).ratio(), name_key))
+
+        scored.sort(reverse=True)
+        return [(self._by_name[name_key], round(score, 3)) for score, _, name_key in scored[:limit]]
+
+    def resolve(self, name: str = "", url: str = "", product_id: str = "") -> Optional[Product]:
+        """
+        Resolve a product reference to the canonical catalog product
+
+        Tries the id, then the URL, then the exact name and finally the best
+        fuzzy name match scoring at least fuzzy_min_score and clearly ahead
+        of the runner-up.
+
+        Args:
+            name: Product name
+            url: Product URL
+            product_id: Catalog id
+
+        Returns:
+            Canonical product or None if nothing matches
+        """
+        product = (product_id and self.get(product_id)) or self.find_by_url(url) or self.find_by_name(name)
+        if product is not None or not name:
+            return product
+
+        matches = self.search_name(name, limit=2)
+        if not matches or matches[0][1] < self.fuzzy_min_score:
+            return None
+        if len(matches) > 1 and matches[0][1] - matches[1][1] < FUZZY_MIN_MARGIN:
+            # Several products match about as well - don't guess which one was meant
+            return None
+        return matches[0][0]
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip diacritics and punctuation, collapse whitespace"""
+    decomposed = unicodedata.normalize('NFKD', name.lower())
+    ascii_name = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM_PATTERN.sub(' ', ascii_name).strip()
+
+
+def normalize_url(url: str) -> str:
+    """Drop scheme, query, trailing slashes and the '/n' listing suffix"""
+    url = url.strip().lower().split('?')[0].split('#')[0]
+    url = re.sub(r'^https?://(www\.)?', '', url).rstrip('/')
+    if url.endswith('/n'):
+        url = url[:-2].rstrip('/')
+    return url
+
+
+# Global product catalog instance
+_product_catalog = None
+
+def get_product_catalog() -> ProductCatalog:
+    """Get global product catalog instance"""
+    global _product_catalog
+    if _product_catalog is None:
+        _product_catalog = ProductCatalog()
+    return _product_catalog
@@ -9,6 +9,7 @@ import logging
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
 
+from src.data.redis_connection import create_redis_client, describe_redis_target, uses_hash_tags, user_key
 from src.utils.system_definitions import get_service_config
 from src.utils.utils import setup_logger
 
@@ -17,12 +18,10 @@ logger = setup_logger(__name__)
 # Try to import Redis dependencies
 try:
     import redis
-    from redis.connection import ConnectionPool
     HAS_REDIS = True
     logger.info("Redis dependencies available")
 except ImportError:
     redis = None
-    ConnectionPool = None
     HAS_REDIS = False
     logger.warning("Redis dependencies not available - using fallback mode")
 
@@ -44,6 +43,7 @@ class RedisClient:
         # Context key prefix
         self.context_prefix = "xoflowers:context:"
         self.session_prefix = "xoflowers:session:"
+        self.hash_tag_keys = uses_hash_tags(self.config)
         
         # In-memory fallback storage for when Redis is unavailable
         self._fallback_storage = {}
@@ -61,35 +61,31 @@ class RedisClient:
         Initialize Redis client with optimized connection pooling
         """
         try:
-            # Create optimized connection pool with performance settings
-            self.connection_pool = ConnectionPool(
-                host=self.config['host'],
-                port=self.config['port'],
-                db=self.config['db'],
-                decode_responses=self.config['decode_responses'],
-                socket_timeout=self.config.get('socket_timeout', 5),
-                socket_connect_timeout=self.config.get('socket_connect_timeout', 5),
-                retry_on_timeout=self.config.get('retry_on_timeout', True),
+            # Create client (standalone, Sentinel master or Cluster) with optimized pooling settings
+            self.client = create_redis_client(
+                self.config,
                 max_connections=50,  # Increased for better performance
                 socket_keepalive=True,
                 socket_keepalive_options={},
                 health_check_interval=30  # Health check every 30 seconds
             )
-            
-            # Create Redis client
-            self.client = redis.Redis(connection_pool=self.connection_pool)
+            self.connection_pool = getattr(self.client, 'connection_pool', None)
             
             # Test connection
             self.client.ping()
             
             self.initialized = True
-            logger.info(f"Redis client initialized successfully at {self.config['host']}:{self.config['port']}")
+            logger.info(f"Redis client initialized successfully at {describe_redis_target(self.config)}")
             
         except Exception as e:
             logger.warning(f"Failed to initialize Redis client: {e}")
             logger.info("Redis unavailable - system will use Gemini chat for context management")
             self.initialized = False
     
+    def _context_key(self, user_id: str) -> str:
+        """Per-user context key (hash-tagged in cluster mode)"""
+        return user_key(self.context_prefix, user_id, self.hash_tag_keys)
+    
     def store_context(self, user_id: str, context_data: Dict[str, Any], ttl_hours: int = 24) -> bool:
         """
         Store conversation context for a user with fallback to in-memory storage
@@ -103,7 +99,7 @@ class RedisClient:
             bool: True if stored successfully, False otherwise
         """
         try:
-            key = f"{self.context_prefix}{user_id}"
+            key = self._context_key(user_id)
             
             # Add timestamp to context
             context_data['last_updated'] = datetime.now().isoformat()
@@ -132,7 +128,7 @@ class RedisClient:
             logger.error(f"Error storing context for user {user_id}: {e}")
             # Still try fallback storage
             try:
-                key = f"{self.context_prefix}{user_id}"
+                key = self._context_key(user_id)
                 self._fallback_storage[key] = context_data
                 self._fallback_ttl[key] = datetime.now() + timedelta(hours=ttl_hours)
                 logger.debug(f"Context stored in fallback memory for user {user_id} after error")
@@ -151,7 +147,7 @@ class RedisClient:
             Optional[Dict[str, Any]]: Context data or None if not found
         """
         try:
-            key = f"{self.context_prefix}{user_id}"
+            key = self._context_key(user_id)
             
             # Try Redis first
             if self.is_available():
@@ -183,7 +179,7 @@ class RedisClient:
             logger.error(f"Error retrieving context for user {user_id}: {e}")
             # Try fallback storage even on error
             try:
-                key = f"{self.context_prefix}{user_id}"
+                key = self._context_key(user_id)
                 if key in self._fallback_storage and key in self._fallback_ttl:
                     if datetime.now() < self._fallback_ttl[key]:
                         return self._fallback_storage[key]
@@ -350,7 +346,7 @@ class RedisClient:
             bool: True if deleted successfully, False otherwise
         """
         try:
-            key = f"{self.context_prefix}{user_id}"
+            key = self._context_key(user_id)
             
             # Check if Redis is available, return False if not (graceful degradation)
             if not self.is_available():
@@ -421,7 +417,9 @@ class RedisClient:
             'connection_active': self.is_available(),
             'host': self.config['host'],
             'port': self.config['port'],
-            'db': self.config['db']
+            'db': self.config['db'],
+            'mode': self.config.get('mode', 'standalone'),
+            'target': describe_redis_target(self.config)
         }
         
         if not self.is_available():
@@ -0,0 +1,184 @@
+"""
+Redis Connection Factory for XOFlowers AI Agent
+Builds standalone, Sentinel or Cluster clients from SERVICE_CONFIG['redis']
+Provides hash-tagged per-user keys so one user's keys always share a cluster slot
+"""
+
+from typing import Dict, List, Optional, Any, Tuple
+
+from src.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Try to import Redis dependencies
+try:
+    import redis
+    from redis.sentinel import Sentinel
+    from redis.cluster import RedisCluster, ClusterNode
+    from redis.asyncio import Redis as AsyncRedis
+    from redis.asyncio.sentinel import Sentinel as AsyncSentinel
+    from redis.asyncio.cluster import RedisCluster as AsyncRedisCluster, ClusterNode as AsyncClusterNode
+    HAS_REDIS = True
+except ImportError:
+    redis = None
+    Sentinel = None
+    RedisCluster = None
+    ClusterNode = None
+    AsyncRedis = None
+    AsyncSentinel = None
+    AsyncRedisCluster = None
+    AsyncClusterNode = None
+    HAS_REDIS = False
+
+REDIS_MODES = ('standalone', 'sentinel', 'cluster')
+
+
+def parse_nodes(nodes: Any) -> List[Tuple[str, int]]:
+    """
+    Parse node list from "host:port,host:port" string or list of pairs
+
+    Args:
+        nodes: Comma separated string, list of "host:port" strings or (host, port) tuples
+
+    Returns:
+        List of (host, port) tuples
+    """
+    if not nodes:
+        return []
+
+    if isinstance(nodes, str):
+        nodes = [node.strip() for node in nodes.split(',') if node.strip()]
+
+    parsed = []
+    for node in nodes:
+        if isinstance(node, str):
+            host, _, port = node.rpartition(':')
+            parsed.append((host or 'localhost', int(port)))
+        else:
+            host, port = node
+            parsed.append((host, int(port)))
+    return parsed
+
+
+def uses_hash_tags(redis_config: Dict[str, Any]) -> bool:
+    """Check if per-user keys should carry a cluster hash tag"""
+    return bool(redis_config.get('hash_tag_keys', redis_config.get('mode') == 'cluster'))
+
+
+def user_key(prefix: str, user_id: str, hash_tag: bool = False) -> str:
+    """
+    Build per-user Redis key
+
+    With hash_tag enabled the user id is wrapped in braces, so context, session
+    and rate-limit keys of one user map to the same cluster slot and can be
+    written in a single pipeline.
+
+    Args:
+        prefix: Key namespace ending with a colon (e.g. "xoflowers:context:")
+        user_id: User identifier
+        hash_tag: Wrap user id in a cluster hash tag
+
+    Returns:
+        Redis key
+    """
+    return f"{prefix}{{{user_id}}}" if hash_tag else f"{prefix}{user_id}"
+
+
+def user_id_from_key(key: str) -> str:
+    """Extract user id from a key built with user_key (tagged or not)"""
+    return key.split(':', 2)[-1].strip('{}')
+
+
+def create_redis_client(redis_config: Dict[str, Any], asynchronous: bool = False, **connection_kwargs) -> Any:
+    """
+    Create Redis client for the configured deployment mode
+
+    Args:
+        redis_config: SERVICE_CONFIG['redis'] dictionary
+        asynchronous: Return a redis.asyncio client (for blocking reads such as streams)
+        **connection_kwargs: Extra connection options (pool size, keepalive, ...)
+
+    Returns:
+        Redis for standalone/Sentinel master, RedisCluster for cluster mode
+
+    Raises:
+        RuntimeError: If Redis dependencies are missing
+        ValueError: If mode is unknown or required nodes are missing
+    """
+    if not HAS_REDIS:
+        raise RuntimeError("Redis dependencies not available")
+
+    mode = redis_config.get('mode', 'standalone')
+    if mode not in REDIS_MODES:
+        raise ValueError(f"Unknown Redis mode '{mode}', expected one of {REDIS_MODES}")
+
+    options = {
+        'decode_responses': redis_config.get('decode_responses', True),
+        'socket_timeout': redis_config.get('socket_timeout', 5),
+        'socket_connect_timeout': redis_config.get('socket_connect_timeout', 5),
+        'retry_on_timeout': redis_config.get('retry_on_timeout', True),
+    }
+    if redis_config.get('password'):
+        options['password'] = redis_config['password']
+    options.update(connection_kwargs)
+
+    if asynchronous:
+        redis_class, sentinel_class, cluster_class, node_class = (
+            AsyncRedis, AsyncSentinel, AsyncRedisCluster, AsyncClusterNode
+        )
+    else:
+        redis_class, sentinel_class, cluster_class, node_class = (
+            redis.Redis, Sentinel, RedisCluster, ClusterNode
+        )
+
+    if mode == 'sentinel':
+        sentinels = parse_nodes(redis_config.get('sentinels'))
+        if not sentinels:
+            raise ValueError("Redis Sentinel mode requires at least one sentinel node")
+
+        sentinel = sentinel_class(
+            sentinels,
+            socket_timeout=options['socket_timeout'],
+            sentinel_kwargs=_sentinel_kwargs(redis_config)
+        )
+        master_name = redis_config.get('sentinel_master', 'mymaster')
+        logger.info(f"Using Redis Sentinel master '{master_name}' via {len(sentinels)} sentinel(s)")
+        return sentinel.master_for(master_name, db=redis_config.get('db', 0), **options)
+
+    if mode == 'cluster':
+        nodes = parse_nodes(redis_config.get('cluster_nodes'))
+        if not nodes:
+            nodes = [(redis_config.get('host', 'localhost'), redis_config.get('port', 6379))]
+
+        # Cluster has no logical databases and manages its own per-node pools
+        options.pop('connection_pool', None)
+        logger.info(f"Using Redis Cluster with {len(nodes)} startup node(s)")
+        return cluster_class(
+            startup_nodes=[node_class(host, port) for host, port in nodes],
+            **options
+        )
+
+    return redis_class(
+        host=redis_config.get('host', 'localhost'),
+        port=redis_config.get('port', 6379),
+        db=redis_config.get('db', 0),
+        **options
+    )
+
+
+def _sentinel_kwargs(redis_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Connection options for the sentinels themselves"""
+    if redis_config.get('sentinel_password'):
+        return {'password': redis_config['sentinel_password']}
+    return None
+
+
+def describe_redis_target(redis_config: Dict[str, Any]) -> str:
+    """Human-readable description of the configured Redis deployment for logs and stats"""
+    mode = redis_config.get('mode', 'standalone')
+    if mode == 'sentinel':
+        return f"sentinel:{redis_config.get('sentinel_master', 'mymaster')}"
+    if mode == 'cluster':
+        nodes = parse_nodes(redis_config.get('cluster_nodes'))
+        return f"cluster:{len(nodes) or 1} node(s)"
+    return f"{redis_config.get('host', 'localhost')}:{redis_config.get('port', 6379)}"
@@ -0,0 +1,347 @@
+"""
+User Store for XOFlowers AI Agent
+Indexed embedded storage (SQLite in WAL mode) for user profiles and conversation history
+Replaces the whole-document rewrites of data/contexts.json and data/profiles.json with per-user rows
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from src.utils.system_definitions import get_service_config, get_performance_config
+from src.utils.utils import setup_logger, log_performance_metrics
+
+logger = setup_logger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    conversation_count INTEGER NOT NULL DEFAULT 0,
+    first_interaction TEXT,
+    last_interaction TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_user_profiles_last_interaction
+    ON user_profiles (last_interaction);
+
+CREATE TABLE IF NOT EXISTS conversation_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversation_messages_user_id
+    ON conversation_messages (user_id, id);
+"""
+
+
+class UserStore:
+    """
+    SQLite-backed store with one row per user profile and one row per conversation message
+    All public methods are async and run the blocking SQLite calls in a worker thread
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_messages: Optional[int] = None):
+        """Initialize store at configured path (or explicit db_path)"""
+        self.config = get_service_config().get('user_store', {})
+        self.db_path = Path(db_path or self.config.get('path', 'data/xoflowers.db'))
+        # History kept per user, trimmed on every append
+        self.max_messages = max_messages or get_performance_config().get('max_conversation_history', 10)
+
+        # Single shared connection, serialized with a lock (SQLite handles cross-process locking in WAL)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+        logger.info(f"User store initialized at {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open connection, enable WAL and create schema"""
+        if str(self.db_path) != ':memory:':
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        return conn
+
+    def close(self) -> None:
+        """Close the underlying connection"""
+        with self._lock:
+            self._conn.close()
+
+    # Synchronous implementation (executed in worker threads)
+
+    def _get_profile_sync(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, conversation_count, first_interaction, last_interaction "
+                "FROM user_profiles WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        profile = json.loads(row['data'])
+        profile.update({
+            'user_id': user_id,
+            'conversation_count': row['conversation_count'],
+            'first_interaction': row['first_interaction'],
+            'last_interaction': row['last_interaction']
+        })
+        return profile
+
+    def _upsert_profile_row(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """Write full profile row (caller holds the lock and commits)"""
+        data = {k: v for k, v in profile.items()
+                if k not in ('user_id', 'conversation_count', 'first_interaction', 'last_interaction')}
+        self._conn.execute(
+            "INSERT INTO user_profiles (user_id, data, conversation_count, first_interaction, last_interaction) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, "
+            "conversation_count = excluded.conversation_count, "
+            "first_interaction = excluded.first_interaction, "
+            "last_interaction = excluded.last_interaction",
+            (
+                user_id,
+                json.dumps(data, ensure_ascii=False),
+                int(profile.get('conversation_count') or 0),
+                profile.get('first_interaction'),
+                profile.get('last_interaction')
+            )
+        )
+
+    def _save_profile_sync(self, user_id: str, profile: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._upsert_profile_row(user_id, profile)
+
+    def _update_preferences_sync(self, user_id: str, preferences: Dict[str, Any]) -> None:
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM user_profiles WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            data = json.loads(row['data']) if row else {}
+            data.setdefault('preferences', {}).update(preferences)
+            self._conn.execute(
+                "INSERT INTO user_profiles (user_id, data, first_interaction, last_interaction) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, "
+                "last_interaction = excluded.last_interaction",
+                (user_id, json.dumps(data, ensure_ascii=False), now, now)
+            )
+
+    def _append_message_sync(self, user_id: str, message: Dict[str, Any]) -> None:
+        timestamp = message.get('timestamp') or datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO conversation_messages (user_id, timestamp, data) VALUES (?, ?, ?)",
+                (user_id, timestamp, json.dumps(message, ensure_ascii=False))
+            )
+            # Keep only the newest max_messages rows (served by the (user_id, id) index)
+            self._conn.execute(
+                "DELETE FROM conversation_messages WHERE user_id = ? AND id <= ("
+                "SELECT id FROM conversation_messages WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (user_id, user_id, self.max_messages)
+            )
+            self._conn.execute(
+                "INSERT INTO user_profiles (user_id, data, conversation_count, first_interaction, last_interaction) "
+                "VALUES (?, '{}', 1, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET "
+                "conversation_count = conversation_count + 1, "
+                "last_interaction = excluded.last_interaction",
+                (user_id, timestamp, timestamp)
+            )
+
+    def _get_recent_messages_sync(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM conversation_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+        return [json.loads(row['data']) for row in reversed(rows)]
+
+    def _delete_user_sync(self, user_id: str) -> bool:
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM conversation_messages WHERE user_id = ?", (user_id,)
+            ).rowcount
+            deleted += self._conn.execute(
+                "DELETE FROM user_profiles WHERE user_id = ?", (user_id,)
+            ).rowcount
+        return deleted > 0
+
+    def _cleanup_inactive_sync(self, cutoff: str) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM conversation_messages WHERE user_id IN ("
+                "SELECT user_id FROM user_profiles WHERE last_interaction < ?)", (cutoff,)
+            )
+            return self._conn.execute(
+                "DELETE FROM user_profiles WHERE last_interaction < ?", (cutoff,)
+            ).rowcount
+
+    def _count_users_sync(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone()[0]
+
+    # Async access layer
+
+    async def _run(self, operation: str, func, *args):
+        """Run a blocking store operation in a worker thread with performance logging"""
+        start_time = time.time()
+        try:
+            result = await asyncio.to_thread(func, *args)
+            log_performance_metrics(logger, f"user_store_{operation}", time.time() - start_time, True)
+            return result
+        except Exception as e:
+            log_performance_metrics(logger, f"user_store_{operation}", time.time() - start_time, False,
+                                    {"error": str(e)})
+            raise
+
+    async def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user profile or None if user is unknown"""
+        return await self._run("get_profile", self._get_profile_sync, user_id)
+
+    async def save_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """Insert or replace a single user profile row"""
+        await self._run("save_profile", self._save_profile_sync, user_id, profile)
+
+    async def update_preferences(self, user_id: str, preferences: Dict[str, Any]) -> None:
+        """Merge preferences into user profile"""
+        await self._run("update_preferences", self._update_preferences_sync, user_id, preferences)
+
+    async def append_message(self, user_id: str, message: Dict[str, Any]) -> None:
+        """Append one conversation message and bump the user's counters"""
+        await self._run("append_message", self._append_message_sync, user_id, message)
+
+    async def get_recent_messages(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the most recent messages for user in chronological order"""
+        return await self._run("get_recent_messages", self._get_recent_messages_sync, user_id, limit)
+
+    async def delete_user(self, user_id: str) -> bool:
+        """Delete profile and history for user"""
+        return await self._run("delete_user", self._delete_user_sync, user_id)
+
+    async def cleanup_inactive(self, cutoff: datetime) -> int:
+        """Delete users whose last interaction is older than cutoff"""
+        return await self._run("cleanup_inactive", self._cleanup_inactive_sync, cutoff.isoformat())
+
+    async def count_users(self) -> int:
+        """Number of stored user profiles"""
+        return await self._run("count_users", self._count_users_sync)
+
+    # One-shot migration from the legacy JSON documents
+
+    def migrate_from_json(self, contexts_path: str = "data/contexts.json",
+                          profiles_path: str = "data/profiles.json") -> Dict[str, int]:
+        """
+        Import legacy JSON files into the store
+
+        Users that already have stored messages are skipped for history import,
+        so running the migration twice does not duplicate conversations.
+
+        Args:
+            contexts_path: Path to JSON document of {user_id: [messages]}
+            profiles_path: Path to JSON document of {user_id: profile}
+
+        Returns:
+            Dict with numbers of migrated profiles and messages
+        """
+        stats = {'profiles': 0, 'messages': 0}
+
+        profiles = _load_json_document(profiles_path)
+        contexts = _load_json_document(contexts_path)
+
+        with self._lock, self._conn:
+            for user_id, profile in profiles.items():
+                self._upsert_profile_row(str(user_id), profile or {})
+                stats['profiles'] += 1
+
+            for user_id, messages in contexts.items():
+                user_id = str(user_id)
+                if not isinstance(messages, list):
+                    continue
+
+                existing = self._conn.execute(
+                    "SELECT 1 FROM conversation_messages WHERE user_id = ? LIMIT 1", (user_id,)
+                ).fetchone()
+                if existing:
+                    continue
+
+                rows = [
+                    (user_id, msg.get('timestamp') or datetime.now().isoformat(),
+                     json.dumps(_normalize_legacy_message(msg), ensure_ascii=False))
+                    for msg in messages if isinstance(msg, dict)
+                ]
+                self._conn.executemany(
+                    "INSERT INTO conversation_messages (user_id, timestamp, data) VALUES (?, ?, ?)", rows
+                )
+                stats['messages'] += len(rows)
+
+                # Users with history but without profile still get a row for indexing
+                if rows:
+                    self._conn.execute(
+                        "INSERT INTO user_profiles (user_id, data, conversation_count, first_interaction, last_interaction) "
+                        "VALUES (?, '{}', ?, ?, ?) ON CONFLICT(user_id) DO NOTHING",
+                        (user_id, len(rows), rows[0][1], rows[-1][1])
+                    )
+
+        logger.info(f"Migrated {stats['profiles']} profiles and {stats['messages']} messages into {self.db_path}")
+        return stats
+
+
+def _load_json_document(path: str) -> Dict[str, Any]:
+    """Load legacy JSON document, returning empty dict if missing"""
+    file_path = Path(path)
+    if not file_path.exists():
+        logger.warning(f"Legacy file not found, skipping: {path}")
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _normalize_legacy_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert legacy contexts.json entries to ConversationMessage fields"""
+    return {
+        'user': message.get('user', message.get('user_message', '')),
+        'assistant': message.get('assistant', message.get('bot_response', '')),
+        'timestamp': message.get('timestamp') or datetime.now().isoformat(),
+        'intent': message.get('intent'),
+        'confidence': message.get('confidence')
+    }
+
+
+# Global user store instance
+_user_store = None
+
+def get_user_store() -> UserStore:
+    """Get global user store instance"""
+    global _user_store
+    if _user_store is None:
+        _user_store = UserStore()
+    return _user_store
+
+
+def is_user_store_enabled() -> bool:
+    """Check if the embedded user store is enabled in configuration"""
+    return bool(get_service_config().get('user_store', {}).get('enabled', False))
+
+
+if __name__ == "__main__":
+    # One-shot migration: python -m src.data.user_store [contexts.json] [profiles.json]
+    import sys
+
+    store = get_user_store()
+    args = sys.argv[1:]
+    result = store.migrate_from_json(*args)
+    print(f"Migration complete: {result['profiles']} profiles, {result['messages']} messages")
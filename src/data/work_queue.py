@@ -0,0 +1,377 @@
+"""
+Work Queue for XOFlowers AI Agent
+Durable queue for incoming webhook updates: Redis Streams with consumer groups,
+plus an in-memory queue for development and Redis-less deployments
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Any
+
+from src.data.redis_connection import create_redis_client, HAS_REDIS
+from src.utils.system_definitions import get_service_config
+from src.utils.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class QueuedUpdate:
+    """Single update taken from the work queue"""
+    entry_id: str
+    platform: str
+    payload: Dict[str, Any]
+    enqueued_at: float
+    attempts: int = 1
+
+
+def default_consumer_name(index: int = 0) -> str:
+    """Unique consumer name per worker task across hosts and processes"""
+    return f"{socket.gethostname()}-{os.getpid()}-{index}"
+
+
+class InMemoryWorkQueue:
+    """
+    In-process queue with the same interface as the Redis Streams queue
+    Updates are lost on restart - use for development only
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self.dedup_ttl = self.config.get('dedup_ttl_seconds', 86400)
+        self.max_dedup_entries = self.config.get('max_dedup_entries', 100000)
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._dedup: "OrderedDict[str, float]" = OrderedDict()
+        self._in_flight: Dict[str, QueuedUpdate] = {}
+        self._dead_letters = 0
+        self._sequence = 0
+
+    def _is_duplicate(self, dedup_key: str) -> bool:
+        """Check and record dedup key (expired keys are pruned oldest first)"""
+        now = time.time()
+        while self._dedup:
+            expires_at = next(iter(self._dedup.values()))
+            if expires_at > now and len(self._dedup) < self.max_dedup_entries:
+                break
+            self._dedup.popitem(last=False)
+
+        if dedup_key in self._dedup:
+            return True
+        self._dedup[dedup_key] = now + self.dedup_ttl
+        return False
+
+    async def enqueue(self, platform: str, dedup_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Add update to the queue unless it was already seen
+
+        Returns:
+            True if enqueued, False if duplicate
+        """
+        if self._is_duplicate(f"{platform}:{dedup_id}"):
+            return False
+
+        self._sequence += 1
+        await self._queue.put(QueuedUpdate(
+            entry_id=str(self._sequence),
+            platform=platform,
+            payload=payload,
+            enqueued_at=time.time()
+        ))
+        return True
+
+    async def consume(self, consumer: str, count: int = 1, block_ms: int = 1000) -> List[QueuedUpdate]:
+        """Take up to count updates, waiting up to block_ms for the first one"""
+        try:
+            update = await asyncio.wait_for(self._queue.get(), timeout=block_ms / 1000)
+        except asyncio.TimeoutError:
+            return []
+
+        updates = [update]
+        while len(updates) < count and not self._queue.empty():
+            updates.append(self._queue.get_nowait())
+
+        for item in updates:
+            self._in_flight[item.entry_id] = item
+        return updates
+
+    async def ack(self, update: QueuedUpdate) -> None:
+        """Mark update as processed"""
+        self._in_flight.pop(update.entry_id, None)
+
+    async def retry(self, update: QueuedUpdate, max_attempts: int) -> bool:
+        """
+        Re-queue failed update or drop it after max_attempts
+
+        Returns:
+            True if re-queued, False if moved to dead letters
+        """
+        self._in_flight.pop(update.entry_id, None)
+        if update.attempts >= max_attempts:
+            self._dead_letters += 1
+            return False
+
+        self._sequence += 1
+        await self._queue.put(QueuedUpdate(
+            entry_id=str(self._sequence),
+            platform=update.platform,
+            payload=update.payload,
+            enqueued_at=update.enqueued_at,
+            attempts=update.attempts + 1
+        ))
+        return True
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int = 10,
+                          exclude_ids: Iterable[str] = ()) -> List[QueuedUpdate]:
+        """Nothing to reclaim - in-memory updates die with the process"""
+        return []
+
+    async def refresh(self, consumer: str, entry_ids: Iterable[str]) -> None:
+        """Nothing to refresh - in-memory updates are never reclaimed"""
+
+    async def get_backlog(self) -> Dict[str, Any]:
+        """Queue depth metrics"""
+        return {
+            'backend': 'memory',
+            'length': self._queue.qsize(),
+            'pending': len(self._in_flight),
+            'lag': self._queue.qsize(),
+            'dead_letters': self._dead_letters
+        }
+
+    async def ping(self) -> bool:
+        """In-process queue is always reachable"""
+        return True
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisStreamWorkQueue:
+    """
+    Redis Streams queue with a consumer group shared by all workers
+    Unacknowledged entries of crashed workers are reclaimed with XPENDING + XCLAIM
+    """
+
+    def __init__(self, config: Dict[str, Any], redis_config: Dict[str, Any]):
+        self.config = config
+        self.stream = config.get('stream', 'xoflowers:webhook_updates')
+        self.dead_letter_stream = f"{self.stream}:dead"
+        self.group = config.get('group', 'xoflowers-webhook-workers')
+        self.dedup_prefix = config.get('dedup_prefix', 'xoflowers:webhook_dedup:')
+        self.dedup_ttl = config.get('dedup_ttl_seconds', 86400)
+        self.max_length = config.get('max_stream_length', 100000)
+
+        self.client = create_redis_client(redis_config, asynchronous=True)
+        self._group_ready = False
+
+    async def _ensure_group(self) -> None:
+        """Create consumer group (and stream) once"""
+        if self._group_ready:
+            return
+        try:
+            await self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    async def enqueue(self, platform: str, dedup_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Add update to the stream unless it was already seen
+
+        Returns:
+            True if enqueued, False if duplicate
+        """
+        await self._ensure_group()
+
+        first_seen = await self.client.set(f"{self.dedup_prefix}{platform}:{dedup_id}", 1,
+                                           nx=True, ex=self.dedup_ttl)
+        if not first_seen:
+            return False
+
+        await self._add(platform, payload, time.time(), 1)
+        return True
+
+    async def _add(self, platform: str, payload: Dict[str, Any], enqueued_at: float, attempts: int,
+                   stream: Optional[str] = None) -> None:
+        await self.client.xadd(
+            stream or self.stream,
+            {
+                'platform': platform,
+                'payload': json.dumps(payload, ensure_ascii=False),
+                'enqueued_at': str(enqueued_at),
+                'attempts': str(attempts)
+            },
+            maxlen=self.max_length,
+            approximate=True
+        )
+
+    @staticmethod
+    def _to_update(entry_id: str, fields: Dict[str, str]) -> QueuedUpdate:
+        return QueuedUpdate(
+            entry_id=entry_id,
+            platform=fields.get('platform', ''),
+            payload=json.loads(fields.get('payload', '{}')),
+            enqueued_at=float(fields.get('enqueued_at', time.time())),
+            attempts=int(fields.get('attempts', 1))
+        )
+
+    async def consume(self, consumer: str, count: int = 1, block_ms: int = 1000) -> List[QueuedUpdate]:
+        """Read new entries for this consumer from the group"""
+        await self._ensure_group()
+
+        response = await self.client.xreadgroup(self.group, consumer, {self.stream: '>'},
+                                                count=count, block=block_ms)
+        updates = []
+        for _stream, entries in response or []:
+            for entry_id, fields in entries:
+                updates.append(self._to_update(entry_id, fields))
+        return updates
+
+    async def ack(self, update: QueuedUpdate) -> None:
+        """Acknowledge and delete processed entry"""
+        await self.client.xack(self.stream, self.group, update.entry_id)
+        await self.client.xdel(self.stream, update.entry_id)
+
+    async def retry(self, update: QueuedUpdate, max_attempts: int) -> bool:
+        """
+        Re-queue failed update or move it to the dead-letter stream
+
+        Returns:
+            True if re-queued, False if dead-lettered
+        """
+        requeue = update.attempts < max_attempts
+        await self._add(update.platform, update.payload, update.enqueued_at, update.attempts + 1,
+                        stream=None if requeue else self.dead_letter_stream)
+        await self.ack(update)
+        return requeue
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int = 10,
+                          exclude_ids: Iterable[str] = ()) -> List[QueuedUpdate]:
+        """
+        Take over entries left unacknowledged by crashed or stuck consumers
+
+        Entries of this consumer are claimed too (an ack or retry that failed leaves them
+        pending, and consume only reads new entries); entries still in flight or buffered
+        locally are passed in exclude_ids. Consumers of exited workers with nothing
+        pending are removed from the group.
+
+        Args:
+            consumer: Consumer taking over the entries
+            min_idle_ms: Idle time after which an entry or consumer counts as abandoned
+            count: Maximum number of entries to claim
+            exclude_ids: Entry ids held locally that must not be claimed
+        """
+        await self._ensure_group()
+
+        excluded = set(exclude_ids)
+        claimed: List[QueuedUpdate] = []
+        for info in await self.client.xinfo_consumers(self.stream, self.group):
+            owner = info.get('name')
+            if not info.get('pending'):
+                # Live consumers poll every block_ms, so only exited ones stay idle this long
+                if owner != consumer and info.get('idle', 0) >= min_idle_ms:
+                    await self.client.xgroup_delconsumer(self.stream, self.group, owner)
+                continue
+            if len(claimed) >= count:
+                continue
+
+            pending = await self.client.xpending_range(self.stream, self.group, min='-', max='+',
+                                                       count=count - len(claimed), consumername=owner,
+                                                       idle=min_idle_ms)
+            entry_ids = [entry['message_id'] for entry in pending if entry['message_id'] not in excluded]
+            if entry_ids:
+                # XCLAIM re-checks the idle time, so entries refreshed meanwhile stay with their owner
+                entries = await self.client.xclaim(self.stream, self.group, consumer, min_idle_ms, entry_ids)
+                claimed.extend(self._to_update(entry_id, fields) for entry_id, fields in entries if fields)
+        return claimed
+
+    async def refresh(self, consumer: str, entry_ids: Iterable[str]) -> None:
+        """Reset the idle time of entries this consumer still holds so they are not reclaimed"""
+        entry_ids = list(entry_ids)
+        if entry_ids:
+            await self.client.xclaim(self.stream, self.group, consumer, 0, entry_ids, justid=True)
+
+    async def get_backlog(self) -> Dict[str, Any]:
+        """Stream length, pending entries and consumer group lag"""
+        await self._ensure_group()
+
+        length = await self.client.xlen(self.stream)
+        dead_letters = await self.client.xlen(self.dead_letter_stream)
+
+        pending, lag = 0, None
+        for group in await self.client.xinfo_groups(self.stream):
+            if group.get('name') == self.group:
+                pending = group.get('pending', 0)
+                lag = group.get('lag')
+                break
+
+        return {
+            'backend': 'redis',
+            'stream': self.stream,
+            'length': length,
+            'pending': pending,
+            'lag': lag if lag is not None else max(0, length - pending),
+            'dead_letters': dead_letters
+        }
+
+    async def ping(self) -> bool:
+        """Check that the Redis server is reachable"""
+        return bool(await self.client.ping())
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+# Global work queue instance
+_work_queue = None
+
+def get_work_queue():
+    """Get global work queue instance (Redis Streams or in-memory fallback)"""
+    global _work_queue
+    if _work_queue is None:
+        service_config = get_service_config()
+        queue_config = service_config.get('webhook_queue', {})
+
+        if queue_config.get('backend', 'redis') == 'redis' and HAS_REDIS:
+            _work_queue = RedisStreamWorkQueue(queue_config, service_config['redis'])
+            logger.info(f"Work queue using Redis stream '{_work_queue.stream}'")
+        else:
+            _work_queue = InMemoryWorkQueue(queue_config)
+            logger.warning("Work queue using in-memory backend - queued updates are lost on restart")
+    return _work_queue
+
+
+async def ensure_work_queue():
+    """
+    Get global work queue, checking Redis once and falling back to the in-memory queue
+
+    Returns:
+        Reachable work queue instance
+    """
+    global _work_queue
+    queue = get_work_queue()
+    if isinstance(queue, RedisStreamWorkQueue):
+        try:
+            await queue.ping()
+        except Exception as e:
+            logger.error(f"Redis work queue unreachable ({e}), falling back to in-memory backend")
+            try:
+                await queue.close()
+            except Exception:
+                pass
+            queue = InMemoryWorkQueue(queue.config)
+            _work_queue = queue
+    return queue
+
+
+def reset_work_queue() -> None:
+    """Forget the global work queue so the next start creates a fresh one"""
+    global _work_queue
+    _work_queue = None
@@ -0,0 +1,233 @@
+"""
+Dependency Health for XOFlowers AI Agent
+Tracks dependency status passively from live call outcomes, with active checks
+run in the background at a bounded rate, so health probes only read memory
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.helpers.system_definitions import get_performance_config
+from src.helpers.utils import setup_logger
+
+# Operation name prefixes (as passed to log_performance_metrics) mapped to dependencies
+DEPENDENCY_OPERATIONS = {
+    'openai_': 'openai',
+    'gemini_': 'gemini',
+    'redis_': 'redis',
+    'chromadb_': 'chromadb',
+    'telegram_send_': 'telegram',
+    'instagram_send_': 'instagram'
+}
+
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'
+DOWN = 'down'
+UNKNOWN = 'unknown'
+
+
+class DependencyHealth:
+    """
+    Outcome counters and breaker state for one dependency
+    Marked down after failure_threshold consecutive failures and kept down for
+    open_seconds unless a call or check succeeds in the meantime
+    """
+
+    def __init__(self, name: str, failure_threshold: int, open_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_latency: Optional[float] = None
+        self.last_check: Optional[float] = None
+        self.open_until = 0.0
+
+    def record(self, success: bool, duration: Optional[float], error: Optional[str], now: float) -> None:
+        if duration is not None:
+            self.last_latency = duration
+        if success:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.last_success = now
+            self.open_until = 0.0
+            return
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = now
+        self.last_error = error
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = now + self.open_seconds
+
+    def status(self, now: float) -> str:
+        if self.open_until > now:
+            return DOWN
+        if self.last_success is None and self.last_failure is None:
+            return UNKNOWN
+        if self.consecutive_failures:
+            return DEGRADED
+        return HEALTHY
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            'status': self.status(now),
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_success_age': round(now - self.last_success, 1) if self.last_success else None,
+            'last_failure_age': round(now - self.last_failure, 1) if self.last_failure else None,
+            'last_check_age': round(now - self.last_check, 1) if self.last_check else None,
+            'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None,
+            'last_error': self.last_error
+        }
+
+
+class HealthRegistry:
+    """
+    Health of all external dependencies
+    Recording and reading are O(1) under a lock; active checks never run on the probe path
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.logger = setup_logger(__name__)
+        performance_config = get_performance_config()
+
+        self.check_interval = performance_config.get('health_check_interval_seconds', 30.0)
+        self.check_timeout = performance_config.get('health_check_timeout_seconds', 2.0)
+        self.failure_threshold = performance_config.get('health_failure_threshold', 5)
+        self.open_seconds = performance_config.get('health_open_seconds', 30.0)
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dependencies: Dict[str, DependencyHealth] = {}
+        self._checks: Dict[str, Callable[[], bool]] = {}
+        self._check_task: Optional[asyncio.Task] = None
+
+    def _get(self, name: str) -> DependencyHealth:
+        dependency = self._dependencies.get(name)
+        if dependency is None:
+            dependency = DependencyHealth(name, self.failure_threshold, self.open_seconds)
+            self._dependencies[name] = dependency
+        return dependency
+
+    def record(self, name: str, success: bool, duration: Optional[float] = None,
+               error: Optional[str] = None) -> None:
+        """
+        Record the outcome of a call to a dependency
+
+        Args:
+            name: Dependency name (e.g. 'openai', 'redis')
+            success: Whether the call succeeded
+            duration: Call duration in seconds (optional)
+            error: Error message for failed calls (optional)
+        """
+        with self._lock:
+            self._get(name).record(success, duration, error, self._clock())
+
+    def record_operation(self, operation: str, success: bool, duration: Optional[float] = None,
+                         details: Optional[Dict[str, Any]] = None) -> None:
+        """Record a log_performance_metrics operation against its dependency, if it has one"""
+        dependency = next((name for prefix, name in DEPENDENCY_OPERATIONS.items()
+                           if operation.startswith(prefix)), None)
+        if dependency is None:
+            return
+        error = str(details.get('error')) if details and not success and details.get('error') else None
+        self.record(dependency, success, duration, error)
+
+    def register_check(self, name: str, check: Callable[[], bool]) -> None:
+        """
+        Register an active check, run in a thread every check interval
+
+        Args:
+            name: Dependency name
+            check: Blocking callable returning True when the dependency responds
+        """
+        with self._lock:
+            self._checks[name] = check
+            self._get(name)
+
+    def status(self, name: str) -> str:
+        """Current status of a dependency (unknown if never seen)"""
+        with self._lock:
+            dependency = self._dependencies.get(name)
+            return dependency.status(self._clock()) if dependency else UNKNOWN
+
+    def is_down(self, name: str) -> bool:
+        """Whether the dependency's breaker is open"""
+        return self.status(name) == DOWN
+
+    def statuses(self) -> Dict[str, str]:
+        """Status of every known dependency"""
+        with self._lock:
+            now = self._clock()
+            return {name: dependency.status(now) for name, dependency in self._dependencies.items()}
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Counters and status of every known dependency"""
+        with self._lock:
+            now = self._clock()
+            return {name: dependency.snapshot(now) for name, dependency in self._dependencies.items()}
+
+    async def run_checks(self) -> None:
+        """Run all registered active checks once, concurrently, each bounded by the check timeout"""
+        with self._lock:
+            checks = list(self._checks.items())
+        await asyncio.gather(*(self._run_check(name, check) for name, check in checks))
+
+    async def _run_check(self, name: str, check: Callable[[], bool]) -> None:
+        start_time = time.time()
+        try:
+            success = bool(await asyncio.wait_for(asyncio.to_thread(check), timeout=self.check_timeout))
+            error = None if success else "check failed"
+        except asyncio.TimeoutError:
+            success, error = False, f"check timed out after {self.check_timeout}s"
+        except Exception as e:
+            success, error = False, str(e)
+
+        with self._lock:
+            dependency = self._get(name)
+            dependency.record(success, time.time() - start_time, error, self._clock())
+            dependency.last_check = self._clock()
+
+    async def _check_loop(self) -> None:
+        while True:
+            try:
+                await self.run_checks()
+            except Exception as e:
+                self.logger.error(f"Health checks failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        """Start running active checks in the background (call from the running loop)"""
+        if self._check_task is None or self._check_task.done():
+            self._check_task = asyncio.get_running_loop().create_task(self._check_loop())
+
+    def stop(self) -> None:
+        """Stop the background checks"""
+        if self._check_task is not None:
+            self._check_task.cancel()
+            self._check_task = None
+
+
+# Global health registry instance
+_health_registry = None
+
+def get_health_registry() -> HealthRegistry:
+    """Get global health registry instance"""
+    global _health_registry
+    if _health_registry is None:
+        _health_registry = HealthRegistry()
+    return _health_registry
+
+def record_operation_outcome(operation: str, success: bool, duration: Optional[float] = None,
+                             details: Optional[Dict[str, Any]] = None) -> None:
+    """Record a performance metric's outcome against its dependency"""
+    get_health_registry().record_operation(operation, success, duration, details)
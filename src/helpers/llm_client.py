@@ -9,6 +9,8 @@ import logging
 import time
 from typing import Dict, Any, Optional
 
+from src.helpers.llm_usage import record_llm_usage
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -167,11 +169,13 @@ class LLMClient:
             max_tokens=max_tokens,
             temperature=0.7
         )
+        record_llm_usage("llm_client", "openai", "gpt-3.5-turbo", response)
         return response.choices[0].message.content.strip()
     
     def _call_gemini(self, prompt: str) -> str:
         """Call Gemini API directly"""
         response = self.gemini_model.generate_content(prompt)
+        record_llm_usage("llm_client", "gemini", "gemini-1.5-flash", response)
         return response.text.strip()
     
     def get_health_status(self) -> Dict[str, Any]:
@@ -0,0 +1,461 @@
+"""
+LLM Usage Accounting for XOFlowers AI Agent
+Records prompt/completion tokens and estimated cost of every LLM call per stage,
+request, user and provider
+
+Totals are aggregated in memory and exported as Prometheus counters; daily per-user
+totals are also kept in Redis (when configured) so all workers enforce the same
+per-user daily budgets.
+"""
+
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from src.data.redis_connection import create_redis_client, user_key, uses_hash_tags, HAS_REDIS
+from src.helpers.monitoring import get_metrics_registry
+from src.helpers.rate_limiter import RateLimitResult
+from src.helpers.system_definitions import get_service_config
+from src.helpers.tracing import current_span
+from src.helpers.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Metric names
+LLM_CALLS = 'xoflowers_llm_calls_total'
+LLM_TOKENS = 'xoflowers_llm_tokens_total'
+LLM_COST = 'xoflowers_llm_cost_usd_total'
+LLM_PROMPT_TOKENS = 'xoflowers_llm_prompt_tokens'
+LLM_REQUEST_TOKENS = 'xoflowers_llm_request_tokens'
+
+# Token counts per call/request: short intent prompts up to long chat histories
+TOKEN_BUCKETS = (100.0, 250.0, 500.0, 1000.0, 2000.0, 4000.0, 8000.0, 16000.0, 32000.0, 64000.0, 128000.0)
+
+# Daily Redis totals outlive the day they count by one day
+DAILY_KEY_TTL = 2 * 86400
+
+
+@dataclass
+class TokenUsage:
+    """Token counts reported by a provider for one call"""
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int = 0  # Part of prompt_tokens served from the provider's prompt cache
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class RequestUsage:
+    """Usage of all LLM calls made while handling one request"""
+    user_id: Optional[str] = None
+    request_id: Optional[str] = None
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+    stages: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, stage: str, usage: TokenUsage, cost: float) -> None:
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.cost_usd += cost
+        self.stages[stage] = self.stages.get(stage, 0) + usage.total_tokens
+
+
+_request_usage: ContextVar[Optional[RequestUsage]] = ContextVar('llm_request_usage', default=None)
+
+
+def _count(obj: Any, name: str) -> Optional[int]:
+    """Integer attribute of a provider usage object (None when missing)"""
+    value = getattr(obj, name, None)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def extract_usage(response: Any) -> Optional[TokenUsage]:
+    """
+    Read token usage from an OpenAI or Gemini response
+
+    Args:
+        response: OpenAI chat completion or Gemini GenerateContentResponse
+
+    Returns:
+        TokenUsage, or None when the response carries no usage
+    """
+    # OpenAI: usage.prompt_tokens includes prompt_tokens_details.cached_tokens
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = _count(usage, 'prompt_tokens')
+    if prompt_tokens is not None:
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return TokenUsage(prompt_tokens, _count(usage, 'completion_tokens') or 0,
+                          _count(details, 'cached_tokens') or 0)
+
+    # Gemini: thinking tokens are billed as output
+    metadata = getattr(response, 'usage_metadata', None)
+    prompt_tokens = _count(metadata, 'prompt_token_count')
+    if prompt_tokens is not None:
+        completion_tokens = (_count(metadata, 'candidates_token_count') or 0) + \
+                            (_count(metadata, 'thoughts_token_count') or 0)
+        return TokenUsage(prompt_tokens, completion_tokens, _count(metadata, 'cached_content_token_count') or 0)
+
+    return None
+
+
+def _utc_day() -> str:
+    return time.strftime('%Y%m%d', time.gmtime())
+
+
+def _seconds_until_utc_midnight() -> float:
+    return 86400 - time.time() % 86400
+
+
+class UsageAccountant:
+    """
+    Aggregates LLM token usage and estimated cost
+    Totals per (stage, provider, model) and per user for the current UTC day; after a
+    Redis error the shared daily totals are skipped for redis_cooldown_seconds
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, redis_config: Optional[Dict[str, Any]] = None,
+                 client=None):
+        """
+        Args:
+            config: Usage configuration (SERVICE_CONFIG['llm_usage'])
+            redis_config: Redis connection settings (SERVICE_CONFIG['redis']); per-process totals if omitted
+            client: redis.asyncio client to use instead of creating one
+        """
+        self.config = config or {}
+        self.prices = self.config.get('prices', {})
+        self.token_budget = self.config.get('user_daily_token_budget', 0)
+        self.cost_budget = self.config.get('user_daily_cost_budget', 0.0)
+        self.max_users = self.config.get('max_users', 100000)
+        self.redis_cooldown = self.config.get('redis_cooldown_seconds', 30)
+        self.key_prefix = 'xoflowers:llm_usage:'
+        self.hash_tag_keys = uses_hash_tags(redis_config or {})
+
+        self._lock = threading.Lock()
+        self.totals: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        self._day = _utc_day()
+        self._daily: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._unpriced: Set[str] = set()
+        self._pending: Set[asyncio.Task] = set()
+        self._redis_retry_at = 0.0
+
+        self.client = client
+        if self.client is None and redis_config and self.config.get('backend', 'redis') == 'redis':
+            self.client = self._create_client(redis_config)
+
+    def _create_client(self, redis_config: Dict[str, Any]):
+        """Shared daily totals on Redis when available"""
+        if not HAS_REDIS:
+            return None
+        try:
+            return create_redis_client(redis_config, asynchronous=True)
+        except Exception as e:
+            logger.warning(f"Redis unavailable for LLM usage accounting, daily budgets are per process: {e}")
+            return None
+
+    def _price(self, model: str) -> Optional[Dict[str, float]]:
+        """Price entry with the longest name prefixing the model (e.g. gpt-4o-mini-2024-07-18)"""
+        name = model.split('/')[-1]
+        matches = [key for key in self.prices if name.startswith(key)]
+        if not matches:
+            return None
+        return self.prices[max(matches, key=len)]
+
+    def estimate_cost(self, model: str, usage: TokenUsage) -> float:
+        """
+        Estimate the cost of one call
+
+        Args:
+            model: Model name
+            usage: Token counts of the call
+
+        Returns:
+            Cost in USD (0.0 for models without a price)
+        """
+        price = self._price(model)
+        if price is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"No price configured for model {model}, its cost is not counted")
+            return 0.0
+        cached = min(usage.cached_tokens, usage.prompt_tokens)
+        return ((usage.prompt_tokens - cached) * price.get('input', 0.0)
+                + cached * price.get('cached', price.get('input', 0.0))
+                + usage.completion_tokens * price.get('output', 0.0)) / 1_000_000
+
+    def _daily_key(self, user_id: str, day: str) -> str:
+        return f"{user_key(self.key_prefix, user_id, self.hash_tag_keys)}:{day}"
+
+    def record(self, stage: str, provider: str, model: str, response: Any) -> Optional[TokenUsage]:
+        """
+        Record the usage of one LLM call
+
+        The call is attributed to the request and user of the current usage_scope().
+
+        Args:
+            stage: Pipeline stage (security, intent, analysis, generation, ...)
+            provider: openai or gemini
+            model: Model name
+            response: Provider response, or TokenUsage
+
+        Returns:
+            Recorded TokenUsage, or None when the response carries no usage
+        """
+        usage = response if isinstance(response, TokenUsage) else extract_usage(response)
+        if usage is None:
+            return None
+        cost = self.estimate_cost(model, usage)
+        request = _request_usage.get()
+        user_id = request.user_id if request is not None else None
+
+        with self._lock:
+            totals = self.totals.setdefault((stage, provider, model), {
+                'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0, 'cost_usd': 0.0
+            })
+            totals['calls'] += 1
+            totals['prompt_tokens'] += usage.prompt_tokens
+            totals['completion_tokens'] += usage.completion_tokens
+            totals['cached_tokens'] += usage.cached_tokens
+            totals['cost_usd'] += cost
+            if request is not None:
+                request.add(stage, usage, cost)
+            if user_id:
+                day = self._add_daily(user_id, usage, cost)
+
+        self._export(stage, provider, model, usage, cost)
+        if user_id:
+            self._schedule_shared(user_id, day, usage, cost)
+        return usage
+
+    def _add_daily(self, user_id: str, usage: TokenUsage, cost: float) -> str:
+        """Add to the user's totals of the current day (caller holds the lock)"""
+        day = _utc_day()
+        if day != self._day:
+            self._day = day
+            self._daily.clear()
+        daily = self._daily.pop(user_id, None) or {'calls': 0, 'tokens': 0, 'cost_usd': 0.0}
+        daily['calls'] += 1
+        daily['tokens'] += usage.total_tokens
+        daily['cost_usd'] += cost
+        self._daily[user_id] = daily
+        while len(self._daily) > self.max_users:
+            self._daily.popitem(last=False)
+        return day
+
+    def _export(self, stage: str, provider: str, model: str, usage: TokenUsage, cost: float) -> None:
+        registry = get_metrics_registry()
+        labels = (stage, provider, model)
+        registry.counter(LLM_CALLS, "LLM calls with reported usage",
+                         ('stage', 'provider', 'model')).labels(*labels).inc()
+        tokens = registry.counter(LLM_TOKENS, "LLM tokens by type (cached is part of prompt)",
+                                  ('stage', 'provider', 'model', 'type'))
+        tokens.labels(*labels, 'prompt').inc(usage.prompt_tokens)
+        tokens.labels(*labels, 'completion').inc(usage.completion_tokens)
+        tokens.labels(*labels, 'cached').inc(usage.cached_tokens)
+        registry.counter(LLM_COST, "Estimated LLM cost in USD",
+                         ('stage', 'provider', 'model')).labels(*labels).inc(cost)
+        registry.histogram(LLM_PROMPT_TOKENS, "Prompt tokens per LLM call (grows with chat history)",
+                           ('stage',), buckets=TOKEN_BUCKETS).labels(stage).observe(usage.prompt_tokens)
+
+        span = current_span()
+        span.set_attribute('llm.provider', provider)
+        span.set_attribute('llm.model', model)
+        span.set_attribute('llm.prompt_tokens', usage.prompt_tokens)
+        span.set_attribute('llm.completion_tokens', usage.completion_tokens)
+        span.set_attribute('llm.cost_usd', round(cost, 6))
+
+    def _schedule_shared(self, user_id: str, day: str, usage: TokenUsage, cost: float) -> None:
+        """Add to the shared daily totals in the background (skipped outside an event loop)"""
+        if self.client is None or time.monotonic() < self._redis_retry_at:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._add_shared(self._daily_key(user_id, day), usage, cost))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _add_shared(self, key: str, usage: TokenUsage, cost: float) -> None:
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hincrby(key, 'calls', 1)
+            pipe.hincrby(key, 'tokens', usage.total_tokens)
+            pipe.hincrbyfloat(key, 'cost_usd', cost)
+            pipe.expire(key, DAILY_KEY_TTL)
+            await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._redis_retry_at = time.monotonic() + self.redis_cooldown
+        logger.error(f"Redis LLM usage update failed, using per-process totals for {self.redis_cooldown}s: {error}")
+
+    def user_usage_local(self, user_id: str) -> Dict[str, float]:
+        """Today's totals of a user in this process"""
+        with self._lock:
+            if self._day != _utc_day():
+                return {'calls': 0, 'tokens': 0, 'cost_usd': 0.0}
+            return dict(self._daily.get(user_id) or {'calls': 0, 'tokens': 0, 'cost_usd': 0.0})
+
+    async def user_usage(self, user_id: str) -> Dict[str, float]:
+        """
+        Today's totals of a user across workers
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Dict with calls, tokens and cost_usd (per process when Redis is unavailable)
+        """
+        usage = self.user_usage_local(user_id)
+        if self.client is None or time.monotonic() < self._redis_retry_at:
+            return usage
+        try:
+            shared = await self.client.hgetall(self._daily_key(user_id, _utc_day()))
+        except Exception as e:
+            self._redis_failed(e)
+            return usage
+        # Local totals may include increments not yet written to Redis
+        return {
+            'calls': max(usage['calls'], int(shared.get('calls', 0))),
+            'tokens': max(usage['tokens'], int(shared.get('tokens', 0))),
+            'cost_usd': max(usage['cost_usd'], float(shared.get('cost_usd', 0.0)))
+        }
+
+    async def check_user_budget(self, user_id: str) -> RateLimitResult:
+        """
+        Check a user's daily token and cost budgets
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            RateLimitResult denied until UTC midnight once a budget is spent
+        """
+        if not self.token_budget and not self.cost_budget:
+            return RateLimitResult(True)
+
+        usage = await self.user_usage(user_id)
+        if self.token_budget and usage['tokens'] >= self.token_budget:
+            return RateLimitResult(False, _seconds_until_utc_midnight(), 'daily-token-budget')
+        if self.cost_budget and usage['cost_usd'] >= self.cost_budget:
+            return RateLimitResult(False, _seconds_until_utc_midnight(), 'daily-cost-budget')
+        remaining = int(self.token_budget - usage['tokens']) if self.token_budget else 0
+        return RateLimitResult(True, remaining=remaining)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals per stage/provider/model since start and today's per-user count"""
+        with self._lock:
+            return {
+                'by_stage': [
+                    {'stage': stage, 'provider': provider, 'model': model, **totals}
+                    for (stage, provider, model), totals in sorted(self.totals.items())
+                ],
+                'cost_usd': sum(totals['cost_usd'] for totals in self.totals.values()),
+                'users_today': len(self._daily)
+            }
+
+
+def current_request_usage() -> Optional[RequestUsage]:
+    """Usage of the request being handled (None outside usage_scope())"""
+    return _request_usage.get()
+
+
+def _finish_request(usage: RequestUsage) -> None:
+    """Export the totals of a finished request"""
+    if not usage.calls:
+        return
+    get_metrics_registry().histogram(LLM_REQUEST_TOKENS, "LLM tokens per handled request",
+                                     buckets=TOKEN_BUCKETS).labels().observe(usage.total_tokens)
+    span = current_span()
+    span.set_attribute('llm.calls', usage.calls)
+    span.set_attribute('llm.total_tokens', usage.total_tokens)
+    span.set_attribute('llm.cost_usd', round(usage.cost_usd, 6))
+    logger.info(f"[{usage.request_id or usage.user_id}] LLM usage: {usage.calls} calls, "
+                f"{usage.prompt_tokens} prompt + {usage.completion_tokens} completion tokens, "
+                f"~${usage.cost_usd:.5f}")
+
+
+@contextmanager
+def usage_scope(user_id: Optional[str] = None, request_id: Optional[str] = None) -> Iterator[RequestUsage]:
+    """
+    Attribute LLM calls made inside the block (and tasks started in it) to one request
+
+    Args:
+        user_id: User the calls are counted against
+        request_id: Request identifier for logs
+
+    Yields:
+        RequestUsage filled in as calls are recorded
+    """
+    usage = RequestUsage(user_id, request_id)
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+        _finish_request(usage)
+
+
+def metered(func: Callable) -> Callable:
+    """Decorator running every call of a coroutine function in a usage_scope() for its user_id argument"""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        user_id = signature.bind_partial(*args, **kwargs).arguments.get('user_id')
+        with usage_scope(user_id):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+# Global usage accountant instance
+_usage_accountant = None
+
+def get_usage_accountant() -> UsageAccountant:
+    """Get global usage accountant instance"""
+    global _usage_accountant
+    if _usage_accountant is None:
+        service_config = get_service_config()
+        _usage_accountant = UsageAccountant(service_config.get('llm_usage', {}), service_config.get('redis'))
+    return _usage_accountant
+
+
+# Convenience functions
+def record_llm_usage(stage: str, provider: str, model: str, response: Any) -> Optional[TokenUsage]:
+    """Record the usage of one LLM call (never raises)"""
+    try:
+        return get_usage_accountant().record(stage, provider, model, response)
+    except Exception as e:
+        logger.error(f"LLM usage accounting failed: {e}")
+        return None
+
+
+async def check_user_llm_budget(user_id: str) -> RateLimitResult:
+    """Check a user's daily LLM token and cost budgets"""
+    try:
+        return await get_usage_accountant().check_user_budget(user_id)
+    except Exception as e:
+        logger.error(f"LLM budget check failed, allowing request: {e}")
+        return RateLimitResult(True)
@@ -0,0 +1,225 @@
+"""
+Logging Pipeline for XOFlowers AI Agent
+Console and file handlers shared by all module loggers, fed through a queue so
+request handlers never wait on formatting or disk I/O
+
+Records are written by one background thread that starts with the first record in
+each process, so the thread of the prefork parent never has to survive a fork.
+The log file gets one JSON object per line (with the trace of sampled requests) and
+high-volume DEBUG lines can be sampled per logger.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.helpers.system_definitions import get_service_config
+
+FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed with extra= and is written as a JSON field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'function': record.funcName,
+            'line': record.lineno,
+            'pid': record.process
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TraceContextFilter(logging.Filter):
+    """Add the trace and span id of sampled requests (runs in the calling thread, where the span is known)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Not imported here: tracing logs through this module
+        current_span = getattr(sys.modules.get('src.helpers.tracing'), 'current_span', None)
+        if current_span is not None:
+            span = current_span()
+            if span.sampled:
+                record.trace_id = span.trace_id
+                record.span_id = span.span_id
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keep only a share of a logger's DEBUG records"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class PipelineQueueHandler(QueueHandler):
+    """Queue records for the pipeline's writer thread; drops them when the queue is full"""
+
+    def __init__(self, pipeline: "LogPipeline"):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message now (its arguments may change later); the queue stays in process,
+        # so the record isn't copied or pickled and tracebacks are formatted by the writer
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.pipeline.start()
+        if self.queue.qsize() >= self.pipeline.queue_size:
+            self.pipeline.stats['dropped'] += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class LogPipeline:
+    """
+    Console and file handlers shared by all module loggers
+    With async enabled, loggers get a queue handler and a QueueListener thread writes
+    the records; otherwise loggers write through the handlers directly.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, handlers: Optional[List[logging.Handler]] = None):
+        """
+        Args:
+            config: Logging configuration (SERVICE_CONFIG['logging'])
+            handlers: Output handlers to use instead of the configured console and file handlers
+        """
+        self.config = config or {}
+        self.async_enabled = self.config.get('async', True)
+        self.debug_sample_rate = self.config.get('debug_sample_rate', 1.0)
+        self.debug_sample_rates = self.config.get('debug_sample_rates', {})
+        self.queue_size = self.config.get('queue_size', 10000)
+        self.handlers = handlers if handlers is not None else self._create_handlers()
+        self.trace_filter = TraceContextFilter()
+
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = PipelineQueueHandler(self)
+        self._listener: Optional[QueueListener] = None
+        self._listener_lock = threading.Lock()
+        self.stats = {'dropped': 0}
+
+        if self.async_enabled:
+            self.queue_handler.addFilter(self.trace_filter)
+        else:
+            for handler in self.handlers:
+                handler.addFilter(self.trace_filter)
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self.stop, after_in_child=self._reset_after_fork)
+
+    def _create_handlers(self) -> List[logging.Handler]:
+        """Console handler and file handler with the configured formats"""
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(self._formatter(self.config.get('console_format', 'text'),
+                                                     CONSOLE_FORMAT, '%H:%M:%S'))
+
+        log_file = Path(self.config.get('file_path', 'logs/xoflowers_ai.log'))
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(self._formatter(self.config.get('file_format', 'json'),
+                                                  FILE_FORMAT, '%Y-%m-%d %H:%M:%S'))
+        return [console_handler, file_handler]
+
+    @staticmethod
+    def _formatter(kind: str, text_format: str, datefmt: str) -> logging.Formatter:
+        if kind == 'json':
+            return JsonFormatter()
+        return logging.Formatter(text_format, datefmt=datefmt)
+
+    def _reset_after_fork(self) -> None:
+        """Records queued in the parent are written by the parent; the child starts its own writer"""
+        self.queue = queue.SimpleQueue()
+        self.queue_handler.queue = self.queue
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    @property
+    def logger_handlers(self) -> List[logging.Handler]:
+        """Handlers to attach to a module logger"""
+        return [self.queue_handler] if self.async_enabled else list(self.handlers)
+
+    def debug_sampler(self, name: str) -> Optional[DebugSampler]:
+        """
+        DEBUG sampling filter for a logger
+
+        Args:
+            name: Logger name; the longest configured prefix decides the rate
+
+        Returns:
+            DebugSampler, or None when all DEBUG records are kept
+        """
+        matches = [prefix for prefix in self.debug_sample_rates if name == prefix or name.startswith(prefix + '.')]
+        rate = self.debug_sample_rates[max(matches, key=len)] if matches else self.debug_sample_rate
+        return DebugSampler(rate) if rate < 1.0 else None
+
+    def start(self) -> None:
+        """Start the writer thread of this process (called with the first record)"""
+        if self._listener is None:
+            with self._listener_lock:
+                if self._listener is None:
+                    listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+                    listener.start()
+                    self._listener = listener
+
+    def stop(self) -> None:
+        """Write all queued records and stop the writer thread (restarted by the next record)"""
+        with self._listener_lock:
+            listener, self._listener = self._listener, None
+            if listener is not None:
+                listener.stop()
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                pass  # Stream already closed (interpreter shutdown)
+
+
+# Global logging pipeline instance
+_log_pipeline = None
+
+def get_log_pipeline() -> LogPipeline:
+    """Get global logging pipeline instance"""
+    global _log_pipeline
+    if _log_pipeline is None:
+        _log_pipeline = LogPipeline(get_service_config().get('logging', {}))
+    return _log_pipeline
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    # Registered after logging's own exit hook, so it runs before the handlers are closed
+    if _log_pipeline is not None:
+        _log_pipeline.stop()
@@ -0,0 +1,546 @@
+"""
+Prometheus Metrics for XOFlowers AI Agent
+Counters, gauges and bucketed latency histograms rendered in the Prometheus text
+exposition format on /metrics
+
+Updates never take a lock: every thread writes its own cells and scrapes add them
+up. With several prefork workers each worker writes its samples to metrics_dir
+and the worker answering the scrape merges all of them.
+"""
+
+import asyncio
+import bisect
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.helpers.system_definitions import get_performance_config
+from src.helpers.utils import setup_logger
+
+# Latency bucket upper bounds in seconds: 1ms to 60s, at most 1.67x apart so interpolated quantiles stay close
+LATENCY_BUCKETS = tuple(
+    round(base * 10 ** exponent, 6)
+    for exponent in range(-3, 2)
+    for base in (1.0, 1.5, 2.0, 3.0, 5.0, 7.5)
+    if base * 10 ** exponent < 60
+) + (60.0,)
+
+# Operation name prefixes (as passed to log_performance_metrics) mapped to providers
+OPERATION_PROVIDERS = {
+    'openai_': 'openai',
+    'gemini_': 'gemini',
+    'redis_': 'redis',
+    'chromadb_': 'chromadb',
+    'telegram_': 'telegram',
+    'instagram_': 'instagram'
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Metric names shared by the instrumented modules
+OPERATION_DURATION = 'xoflowers_operation_duration_seconds'
+OPERATION_ERRORS = 'xoflowers_operation_errors_total'
+CACHE_LOOKUPS = 'xoflowers_cache_lookups_total'
+CACHE_ENTRIES = 'xoflowers_cache_entries'
+HTTP_REQUEST_DURATION = 'xoflowers_http_request_duration_seconds'
+HTTP_IN_FLIGHT = 'xoflowers_http_requests_in_flight'
+
+LabelValues = Tuple[str, ...]
+
+
+class _Cells:
+    """
+    Per-thread value cells
+    A thread only ever writes its own cell list, so updates need no lock; readers
+    add the cells up and may see an update a moment late.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._all: List[List[float]] = []
+
+    def local(self) -> List[float]:
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = [0.0] * self._size
+            self._local.cells = cells
+            self._all.append(cells)  # list.append is atomic
+            return cells
+
+    def total(self) -> List[float]:
+        totals = [0.0] * self._size
+        for cells in list(self._all):
+            for index, value in enumerate(cells):
+                totals[index] += value
+        return totals
+
+
+class Counter:
+    """Monotonic counter of one label set"""
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.local()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.total()[0]
+
+
+class Gauge:
+    """Gauge of one label set, changed with inc/dec or read from a function at scrape time"""
+
+    def __init__(self):
+        self._cells = _Cells(1)
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.local()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._cells.local()[0] -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Report function() instead of the inc/dec total"""
+        self._function = function
+
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._cells.total()[0]
+
+
+class Histogram:
+    """Bucketed histogram of one label set (cells: a count per bucket, the +Inf count, then the sum)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self._cells = _Cells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cells = self._cells.local()
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def value(self) -> List[float]:
+        return self._cells.total()
+
+    def quantile(self, q: float) -> float:
+        return histogram_quantile(q, self.buckets, self.value()[:-1])
+
+    def snapshot(self) -> Dict[str, Any]:
+        return summarize_histogram(self.buckets, self.value())
+
+
+def histogram_quantile(q: float, buckets: Tuple[float, ...], counts: List[float]) -> float:
+    """
+    Estimate a quantile like PromQL histogram_quantile
+
+    Args:
+        q: Quantile between 0 and 1
+        buckets: Bucket upper bounds
+        counts: Observations per bucket (not cumulative), the last one above all bounds
+
+    Returns:
+        Value interpolated linearly inside the bucket holding the quantile
+    """
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+
+    rank = q * total
+    cumulative = 0.0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if index == len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+def summarize_histogram(buckets: Tuple[float, ...], value: List[float]) -> Dict[str, Any]:
+    """
+    Count, sum, average and quantiles of a histogram for JSON reports
+
+    Args:
+        buckets: Bucket upper bounds
+        value: Histogram cells (a count per bucket, the +Inf count, then the sum)
+
+    Returns:
+        Dict with count, sum, avg, p50, p95 and p99
+    """
+    counts, total = value[:-1], value[-1]
+    count = sum(counts)
+    return {
+        'count': int(count),
+        'sum': total,
+        'avg': total / count if count else 0.0,
+        'p50': histogram_quantile(0.5, buckets, counts),
+        'p95': histogram_quantile(0.95, buckets, counts),
+        'p99': histogram_quantile(0.99, buckets, counts)
+    }
+
+
+class MetricFamily:
+    """Named metric with one child per label value combination"""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if kind == 'histogram' else ()
+        if any(upper <= lower for lower, upper in zip(self.buckets, self.buckets[1:])):
+            raise ValueError(f"{name} buckets must be strictly increasing: {self.buckets}")
+        self._children: Dict[LabelValues, Any] = {}
+
+    def labels(self, *values: Any, **labels: Any):
+        """
+        Get the child for a label value combination
+
+        Args:
+            *values: Label values in labelnames order
+            **labels: Label values by name
+
+        Returns:
+            Counter, Gauge or Histogram
+        """
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def reset(self) -> None:
+        """Drop all children"""
+        self._children = {}
+
+    def _new_child(self):
+        if self.kind == 'counter':
+            return Counter()
+        if self.kind == 'gauge':
+            return Gauge()
+        return Histogram(self.buckets)
+
+    def collect(self) -> Dict[str, Any]:
+        return {
+            'type': self.kind,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'buckets': list(self.buckets),
+            'samples': [[list(key), child.value()] for key, child in list(self._children.items())]
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metric families
+    Families are created on first use, so instrumented modules just ask for them by name
+    """
+
+    def __init__(self, metrics_dir: str = "", flush_interval: float = 5.0):
+        """
+        Args:
+            metrics_dir: Directory shared by prefork workers for their samples (single process if empty)
+            flush_interval: Seconds between sample writes of a worker
+        """
+        self.logger = setup_logger(__name__)
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()  # Only taken to create families
+        self._flush_task: Optional[asyncio.Task] = None
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """Forked workers start from zero, otherwise merging would count the parent's samples once per worker"""
+        self._lock = threading.Lock()
+        self._flush_task = None
+        for family in self._families.values():
+            if family.kind != 'gauge':
+                family.reset()
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> MetricFamily:
+        return self._family(name, documentation, 'counter', labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> MetricFamily:
+        return self._family(name, documentation, 'gauge', labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._family(name, documentation, 'histogram', labelnames, buckets)
+
+    def _family(self, name: str, documentation: str, kind: str, labelnames: Iterable[str],
+                buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            with self._lock:
+                family = self._families.get(name)
+                if family is None:
+                    family = MetricFamily(name, documentation, kind, labelnames, buckets)
+                    self._families[name] = family
+        if family.kind != kind:
+            raise ValueError(f"Metric {name} is a {family.kind}, not a {kind}")
+        return family
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Current samples of all families"""
+        return {name: family.collect() for name, family in list(self._families.items())}
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+
+        Returns:
+            Exposition text, merged over all workers when metrics_dir is set
+        """
+        families = self.collect()
+        if self.metrics_dir:
+            self.write_snapshot(families)
+            families = merge_snapshots(self._read_snapshots())
+        return render_families(families)
+
+    def write_snapshot(self, families: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Write this worker's samples to metrics_dir (atomically replaced)"""
+        if not self.metrics_dir:
+            return
+        path = os.path.join(self.metrics_dir, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pid': os.getpid(), 'families': families or self.collect()}, f)
+            os.replace(temp_path, path)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Could not write metrics snapshot {path}: {e}")
+
+    def _read_snapshots(self) -> List[Tuple[Dict[str, Dict[str, Any]], bool]]:
+        """Samples of every worker with whether the worker is still alive"""
+        snapshots = []
+        for filename in sorted(os.listdir(self.metrics_dir)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.metrics_dir, filename), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append((data.get('families', {}), _pid_alive(data.get('pid'))))
+        return snapshots
+
+    def start_flusher(self) -> None:
+        """Write samples every flush_interval so scrapes answered by other workers see them"""
+        if self.metrics_dir and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.write_snapshot)
+
+    def stop_flusher(self) -> None:
+        """Stop the flush task and write the final samples"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.write_snapshot()
+
+
+def _pid_alive(pid: Any) -> bool:
+    if not isinstance(pid, int):
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: List[Tuple[Dict[str, Dict[str, Any]], bool]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Add up the samples of several workers
+
+    Counters and histograms of exited workers are kept so totals never go backwards;
+    gauges only count live workers.
+
+    Args:
+        snapshots: (families, worker alive) per worker
+
+    Returns:
+        Merged families
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for families, alive in snapshots:
+        for name, family in families.items():
+            if family['type'] == 'gauge' and not alive:
+                continue
+            target = merged.setdefault(name, {**family, 'samples': {}})
+            for labels, value in family['samples']:
+                key = tuple(labels)
+                current = target['samples'].get(key)
+                if current is None:
+                    target['samples'][key] = value
+                elif isinstance(value, list):
+                    target['samples'][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target['samples'][key] = current + value
+
+    for family in merged.values():
+        family['samples'] = [[list(key), value] for key, value in family['samples'].items()]
+    return merged
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render_families(families: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Render collected families in the text exposition format (version 0.0.4)
+
+    Args:
+        families: Families as returned by MetricsRegistry.collect or merge_snapshots
+
+    Returns:
+        Exposition text
+    """
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        labelnames = family['labelnames']
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+
+        for labels, value in sorted(family['samples'], key=lambda sample: sample[0]):
+            if family['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                continue
+
+            cumulative = 0.0
+            bounds = [repr(float(bound)) for bound in family['buckets']] + ['+Inf']
+            for bound, count in zip(bounds, value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labelnames + ['le'], labels + [bound])} "
+                             f"{_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {_format_value(cumulative)}")
+    return '\n'.join(lines) + '\n'
+
+
+def operation_provider(operation: str) -> str:
+    """Provider of an operation by its name prefix ('internal' for our own stages)"""
+    for prefix, provider in OPERATION_PROVIDERS.items():
+        if operation.startswith(prefix):
+            return provider
+    return 'internal'
+
+
+def _operation_families(registry: MetricsRegistry) -> Tuple[MetricFamily, MetricFamily]:
+    return (registry.histogram(OPERATION_DURATION, "Duration of pipeline stages and provider calls",
+                               ('operation', 'provider')),
+            registry.counter(OPERATION_ERRORS, "Failed pipeline stages and provider calls",
+                             ('operation', 'provider')))
+
+
+def _cache_lookups(registry: MetricsRegistry) -> MetricFamily:
+    return registry.counter(CACHE_LOOKUPS, "Cache lookups by result", ('cache', 'result'))
+
+
+def observe_operation(operation: str, duration: float, success: bool,
+                      registry: Optional[MetricsRegistry] = None) -> None:
+    """Record a performance metric's duration and outcome"""
+    durations, errors = _operation_families(registry or get_metrics_registry())
+    provider = operation_provider(operation)
+    durations.labels(operation, provider).observe(duration)
+    if not success:
+        errors.labels(operation, provider).inc()
+
+
+def observe_cache_lookup(cache: str, hit: bool, registry: Optional[MetricsRegistry] = None) -> None:
+    """Record a cache hit or miss"""
+    _cache_lookups(registry or get_metrics_registry()).labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def operation_summaries(registry: Optional[MetricsRegistry] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-operation latency summary and error count of this process
+
+    Args:
+        registry: Registry to read (the global one if omitted)
+
+    Returns:
+        Operation name -> summarize_histogram() fields plus 'errors'
+    """
+    durations, errors = _operation_families(registry or get_metrics_registry())
+    error_counts = {labels[0]: value for labels, value in errors.collect()['samples']}
+    return {
+        labels[0]: {**summarize_histogram(durations.buckets, value), 'errors': int(error_counts.get(labels[0], 0))}
+        for labels, value in durations.collect()['samples']
+    }
+
+
+def cache_lookup_totals(registry: Optional[MetricsRegistry] = None) -> Dict[str, int]:
+    """Cache hits and misses of this process over all caches"""
+    totals = {'hits': 0, 'misses': 0}
+    for (cache, result), value in _cache_lookups(registry or get_metrics_registry()).collect()['samples']:
+        totals['hits' if result == 'hit' else 'misses'] += int(value)
+    return totals
+
+
+def register_cache_size(cache: str, size: Callable[[], float]) -> None:
+    """Report a cache's entry count at scrape time"""
+    get_metrics_registry().gauge(CACHE_ENTRIES, "Entries held by in-process caches",
+                                 ('cache',)).labels(cache).set_function(size)
+
+
+# Global metrics registry instance
+_metrics_registry = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get global metrics registry instance"""
+    global _metrics_registry
+    if _metrics_registry is None:
+        performance_config = get_performance_config()
+        _metrics_registry = MetricsRegistry(
+            metrics_dir=performance_config.get('metrics_dir', ''),
+            flush_interval=performance_config.get('metrics_flush_seconds', 5.0)
+        )
+    return _metrics_registry
@@ -0,0 +1,285 @@
+"""
+Rate Limiter for XOFlowers AI Agent
+Single GCRA rate limiter for per-user, per-platform and global LLM-budget limits
+O(1) in-memory backend for one process, async Redis Lua backend for limits shared across workers
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.data.redis_connection import create_redis_client, user_key, uses_hash_tags, HAS_REDIS
+from src.helpers.system_definitions import get_security_config, get_service_config
+from src.helpers.utils import setup_logger
+
+# GCRA over several keys: all limits must allow the request, otherwise nothing is consumed
+# KEYS: rate-limit keys; ARGV: emission interval and period (seconds) for each key
+GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local new_tats = {}
+local remaining = -1
+
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2 - 1])
+    local period = tonumber(ARGV[i * 2])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    if new_tat - now > period then
+        return {0, i, tostring(new_tat - period - now), 0}
+    end
+    new_tats[i] = new_tat
+    local left = math.floor((period - (new_tat - now)) / interval)
+    if remaining < 0 or left < remaining then
+        remaining = left
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000) + 1)
+end
+return {1, 0, '0', remaining}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Allow `limit` requests per `period` seconds (bursts up to `limit`)"""
+    name: str
+    limit: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        """Emission interval between evenly spaced requests"""
+        return self.period / self.limit
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    retry_after: float = 0.0
+    limit_name: Optional[str] = None
+    remaining: int = 0
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self.allowed:
+            return None
+        return f"Exceeded {self.limit_name} limit, retry after {self.retry_after:.1f}s"
+
+
+class InMemoryRateLimitBackend:
+    """GCRA state in a bounded LRU map - one float per key"""
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.time):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, limits: List[Tuple[str, RateLimit]]) -> RateLimitResult:
+        """Consume one request from every key if all limits allow it"""
+        with self._lock:
+            now = self.clock()
+            new_tats = []
+            remaining = None
+
+            for key, limit in limits:
+                new_tat = max(self._tats.get(key, now), now) + limit.interval
+                if new_tat - now > limit.period:
+                    return RateLimitResult(False, new_tat - limit.period - now, limit.name)
+                new_tats.append(new_tat)
+                left = math.floor((limit.period - (new_tat - now)) / limit.interval)
+                remaining = left if remaining is None else min(remaining, left)
+
+            for (key, _limit), new_tat in zip(limits, new_tats):
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+
+            # Least recently used keys are the ones most likely fully replenished
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+
+            return RateLimitResult(True, remaining=remaining or 0)
+
+    def reset(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._tats.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._tats)
+
+
+class RedisRateLimitBackend:
+    """GCRA state in Redis, evaluated atomically by a Lua script (keys expire when replenished)"""
+
+    def __init__(self, client):
+        """
+        Args:
+            client: redis.asyncio client
+        """
+        self.client = client
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    async def acquire(self, limits: List[Tuple[str, RateLimit]]) -> RateLimitResult:
+        """Consume one request from every key if all limits allow it"""
+        args = []
+        for _key, limit in limits:
+            args.extend([limit.interval, limit.period])
+
+        allowed, index, retry_after, remaining = await self._script(keys=[key for key, _ in limits], args=args)
+        if int(allowed):
+            return RateLimitResult(True, remaining=int(remaining))
+        return RateLimitResult(False, float(retry_after), limits[int(index) - 1][1].name)
+
+    async def reset(self, keys: List[str]) -> None:
+        for key in keys:
+            await self.client.delete(key)
+
+
+class RateLimiter:
+    """
+    Rate limiting for user messages and LLM calls
+    Limits come from SECURITY_CONFIG; after a Redis error the in-memory backend is used
+    for a cooldown period before Redis is tried again (fail open)
+    """
+
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: Shared async backend (default: Redis when configured)
+        """
+        self.logger = setup_logger(__name__)
+        self.security_config = get_security_config()
+        redis_config = get_service_config().get('redis', {})
+
+        self.key_prefix = 'xoflowers:ratelimit:'
+        self.hash_tag_keys = uses_hash_tags(redis_config)
+
+        self.user_limits = [
+            RateLimit('per-minute', self.security_config.get('rate_limit_per_minute', 20), 60),
+            RateLimit('per-hour', self.security_config.get('rate_limit_per_hour', 200), 3600)
+        ]
+        self.platform_limit = RateLimit('platform', self.security_config.get('rate_limit_platform_per_minute', 600), 60)
+        self.llm_limit = RateLimit('llm-budget', self.security_config.get('llm_requests_per_minute', 120), 60)
+
+        self.memory_backend = InMemoryRateLimitBackend(self.security_config.get('rate_limit_max_keys', 100000))
+        self.shared_backend = backend if backend is not None else self._create_backend(redis_config)
+        self.redis_cooldown = self.security_config.get('rate_limit_redis_cooldown_seconds', 30)
+        self._shared_retry_at = 0.0
+
+        backend_name = type(self.shared_backend or self.memory_backend).__name__
+        self.logger.info(f"Rate limiter initialized (backend: {backend_name})")
+
+    def _create_backend(self, redis_config: Dict) -> Optional[RedisRateLimitBackend]:
+        """Use Redis when configured, otherwise only the in-memory backend"""
+        if self.security_config.get('rate_limit_backend', 'redis') != 'redis' or not HAS_REDIS:
+            return None
+        try:
+            return RedisRateLimitBackend(create_redis_client(redis_config, asynchronous=True))
+        except Exception as e:
+            self.logger.warning(f"Redis unavailable for rate limiting, limits are per process: {e}")
+            return None
+
+    async def _acquire(self, limits: List[Tuple[str, RateLimit]]) -> RateLimitResult:
+        if self.shared_backend is not None and time.monotonic() >= self._shared_retry_at:
+            try:
+                return await self.shared_backend.acquire(limits)
+            except Exception as e:
+                self._shared_retry_at = time.monotonic() + self.redis_cooldown
+                self.logger.error(f"Redis rate limit check failed, using in-memory limits "
+                                  f"for {self.redis_cooldown}s: {e}")
+        return self._acquire_local(limits)
+
+    def _acquire_local(self, limits: List[Tuple[str, RateLimit]]) -> RateLimitResult:
+        try:
+            return self.memory_backend.acquire(limits)
+        except Exception as e:
+            self.logger.error(f"Rate limit check failed, allowing request: {e}")
+            return RateLimitResult(True)
+
+    def _user_keys(self, user_id: str) -> List[str]:
+        base = user_key(f"{self.key_prefix}user:", user_id, self.hash_tag_keys)
+        return [f"{base}:{limit.name}" for limit in self.user_limits]
+
+    def _user_limits(self, user_id: str, platform: Optional[str]) -> List[List[Tuple[str, RateLimit]]]:
+        """
+        Group a user's limits into atomic checks
+
+        All keys are checked in one script, so a request denied by any limit
+        consumes none. With cluster hash tags the platform key lives in another
+        slot than the user's keys and is checked in a second step.
+        """
+        limits = list(zip(self._user_keys(user_id), self.user_limits))
+        if not platform:
+            return [limits]
+
+        platform_limit = (f"{self.key_prefix}platform:{platform}", self.platform_limit)
+        if self.hash_tag_keys:
+            return [limits, [platform_limit]]
+        return [limits + [platform_limit]]
+
+    async def check_user(self, user_id: str, platform: Optional[str] = None) -> RateLimitResult:
+        """
+        Check and count one message from a user
+
+        Args:
+            user_id: User identifier
+            platform: Platform name for the platform-wide limit (optional)
+
+        Returns:
+            RateLimitResult with retry-after hint when limited
+        """
+        result = RateLimitResult(True)
+        for limits in self._user_limits(user_id, platform):
+            result = await self._acquire(limits)
+            if not result.allowed:
+                break
+        return result
+
+    def check_user_local(self, user_id: str, platform: Optional[str] = None) -> RateLimitResult:
+        """Check and count one message against per-process limits (for synchronous callers)"""
+        limits = [item for group in self._user_limits(user_id, platform) for item in group]
+        return self._acquire_local(limits)
+
+    async def check_llm_budget(self) -> RateLimitResult:
+        """Check and count one request against the global LLM budget"""
+        return await self._acquire([(f"{self.key_prefix}llm", self.llm_limit)])
+
+    async def reset_user(self, user_id: str) -> None:
+        """Clear a user's limits (admin/testing)"""
+        keys = self._user_keys(user_id)
+        self.memory_backend.reset(keys)
+        if self.shared_backend is not None:
+            await self.shared_backend.reset(keys)
+
+
+# Global rate limiter instance
+_rate_limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get global rate limiter instance"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+# Convenience functions
+async def check_user_rate_limit(user_id: str, platform: Optional[str] = None) -> RateLimitResult:
+    """Check and count one message from a user"""
+    return await get_rate_limiter().check_user(user_id, platform)
+
+
+async def check_llm_budget() -> RateLimitResult:
+    """Check and count one request against the global LLM budget"""
+    return await get_rate_limiter().check_llm_budget()
@@ -0,0 +1,396 @@
+"""
+Request Tracing for XOFlowers AI Agent
+Request-scoped spans carried through the pipeline in a context variable, so every
+stage of a slow request shows up with its own timing under the request's trace
+
+Spans are exported in the OpenTelemetry OTLP/JSON format: to a JSON lines file for
+offline analysis, or to an OTLP/HTTP collector (Jaeger, Tempo, otel-collector).
+Only a sampled share of traces is recorded; unsampled requests pay one context lookup per stage.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from src.helpers.system_definitions import get_service_config
+from src.helpers.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class Span:
+    """Timed pipeline stage with attributes and a parent in the same trace"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, sampled: bool = True,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header continuing this trace in a downstream service"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (or to now while running)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span in the OTLP/JSON encoding"""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or time.time_ns()),
+            'attributes': otlp_attributes(self.attributes),
+            'status': {'code': self.status, **({'message': self.status_message} if self.status_message else {})}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Encode attributes as OTLP key/value pairs"""
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        encoded.append({'key': key, 'value': typed})
+    return encoded
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Span]:
+    """
+    Parse a W3C traceparent header
+
+    Args:
+        header: Header value (e.g. from an upstream proxy)
+
+    Returns:
+        Remote parent span carrying the trace id, span id and sampled flag, or None if invalid
+    """
+    match = _TRACEPARENT_PATTERN.match((header or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    parent = Span('remote', match.group(1), sampled=bool(int(match.group(3), 16) & 1))
+    parent.span_id = match.group(2)
+    return parent
+
+
+class FileSpanExporter:
+    """Append OTLP/JSON export requests to a JSON lines file, rotating it at max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """POST OTLP/JSON export requests to a collector's /v1/traces endpoint"""
+
+    def __init__(self, endpoint: str, headers: Optional[Dict[str, str]] = None, timeout: float = 5.0):
+        self.url = endpoint.rstrip('/') + ('' if endpoint.rstrip('/').endswith('/v1/traces') else '/v1/traces')
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.timeout = timeout
+        self._client = None
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.Client(timeout=self.timeout)
+        response = self._client.post(self.url, content=json.dumps(payload), headers=self.headers)
+        response.raise_for_status()
+
+
+class BatchSpanProcessor:
+    """
+    Queue finished spans and export them in batches from a background thread
+    The thread starts with the first span, so importing the module in the prefork
+    parent never starts it; when the queue is full the oldest spans are dropped.
+    """
+
+    def __init__(self, exporter, service_name: str = "xoflowers-ai", max_queue: int = 2048,
+                 batch_size: int = 256, flush_interval: float = 5.0):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: Deque[Span] = deque(maxlen=max_queue)
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.stats = {'exported': 0, 'dropped': 0, 'failed_batches': 0}
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        """The exporter thread doesn't survive fork; the child starts its own on its first span"""
+        self._queue.clear()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def on_end(self, span: Span) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.stats['dropped'] += 1
+        self._queue.append(span)
+        if self._thread is None:
+            self._start()
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export all queued spans"""
+        with self._flush_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+                try:
+                    self.exporter.export(self.export_request(batch))
+                    self.stats['exported'] += len(batch)
+                except Exception as e:
+                    self.stats['failed_batches'] += 1
+                    logger.warning(f"Could not export {len(batch)} spans: {e}")
+                    return
+
+    def export_request(self, spans: List[Span]) -> Dict[str, Any]:
+        """OTLP ExportTraceServiceRequest for a batch of spans"""
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': otlp_attributes({'service.name': self.service_name,
+                                                            'process.pid': os.getpid()})},
+                'scopeSpans': [{
+                    'scope': {'name': 'xoflowers.tracing'},
+                    'spans': [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+
+# Span of the stage currently running (None outside any span)
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+# Placeholder returned outside sampled traces; nothing recorded on it is kept
+_UNSAMPLED = Span('unsampled', '0' * 32, sampled=False)
+
+
+class Tracer:
+    """Creates spans, decides sampling per trace and hands finished spans to the processor"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, processor: Optional[BatchSpanProcessor] = None):
+        """
+        Args:
+            config: Tracing configuration (SERVICE_CONFIG['tracing'])
+            processor: Span processor to use instead of the configured exporter
+        """
+        self.config = config or {}
+        self.enabled = self.config.get('enabled', True)
+        self.sample_rate = float(self.config.get('sample_rate', 0.01))
+        self.processor = processor if processor is not None else self._create_processor()
+        if self.processor is None:
+            self.enabled = False
+
+    def _create_processor(self) -> Optional[BatchSpanProcessor]:
+        exporter_name = self.config.get('exporter', 'file')
+        if not self.enabled or exporter_name == 'none':
+            return None
+        if exporter_name == 'otlp':
+            if not self.config.get('otlp_endpoint'):
+                logger.warning("OTLP trace exporter selected without an endpoint, tracing disabled")
+                return None
+            exporter = OTLPHttpSpanExporter(self.config['otlp_endpoint'],
+                                            parse_headers(self.config.get('otlp_headers', '')))
+        else:
+            exporter = FileSpanExporter(self.config.get('file_path', 'data/traces.jsonl'),
+                                        self.config.get('file_max_bytes', 50 * 1024 * 1024))
+        return BatchSpanProcessor(
+            exporter,
+            service_name=self.config.get('service_name', 'xoflowers-ai'),
+            max_queue=self.config.get('max_queue', 2048),
+            batch_size=self.config.get('batch_size', 256),
+            flush_interval=self.config.get('flush_seconds', 5.0)
+        )
+
+    def new_span(self, name: str, parent: Optional[Span] = None, kind: int = SPAN_KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """Child of parent (or of the current span), or the root of a new trace"""
+        if not self.enabled:
+            return _UNSAMPLED
+        if parent is None:
+            parent = _current_span.get()
+        if parent is not None:
+            if not parent.sampled:
+                return _UNSAMPLED
+            return Span(name, parent.trace_id, parent.span_id, kind=kind, attributes=attributes)
+
+        if random.random() >= self.sample_rate:
+            return _UNSAMPLED
+        return Span(name, f"{random.getrandbits(128):032x}", kind=kind, attributes=attributes)
+
+    def end_span(self, span: Span) -> None:
+        if span.sampled and span.end_ns is None:
+            span.end_ns = time.time_ns()
+            self.processor.on_end(span)
+
+
+def parse_headers(value: str) -> Dict[str, str]:
+    """Parse "key=value,key=value" exporter headers (OTEL_EXPORTER_OTLP_HEADERS format)"""
+    headers = {}
+    for pair in (value or '').split(','):
+        key, _, header_value = pair.partition('=')
+        if key.strip() and header_value:
+            headers[key.strip()] = header_value.strip()
+    return headers
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Span] = None,
+               kind: int = SPAN_KIND_INTERNAL) -> Iterator[Span]:
+    """
+    Run the block as a span of the current trace
+
+    Tasks and threads started inside the block inherit the span as their parent.
+    Exceptions mark the span as failed and propagate.
+
+    Args:
+        name: Stage name (e.g. "security", "chromadb.search")
+        attributes: Initial span attributes
+        parent: Explicit parent, e.g. from parse_traceparent (default: the current span)
+        kind: SPAN_KIND_INTERNAL or SPAN_KIND_SERVER
+
+    Yields:
+        The span (a no-op placeholder when the trace isn't sampled)
+    """
+    if parent is None and _current_span.get() is _UNSAMPLED:
+        yield _UNSAMPLED
+        return
+
+    tracer = get_tracer()
+    span = tracer.new_span(name, parent, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if span.sampled:
+            span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.end_span(span)
+
+
+def current_span() -> Span:
+    """Span of the running stage (a no-op placeholder outside sampled traces)"""
+    return _current_span.get() or _UNSAMPLED
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator running every call of a function or coroutine function in a span
+
+    Args:
+        name: Span name
+    """
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# Global tracer instance
+_tracer = None
+
+def get_tracer() -> Tracer:
+    """Get global tracer instance"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(get_service_config().get('tracing', {}))
+    return _tracer
+
+
+def shutdown_tracing() -> None:
+    """Export spans still queued (call on shutdown)"""
+    if _tracer is not None and _tracer.processor is not None:
+        _tracer.processor.flush()
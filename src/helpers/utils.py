@@ -5,21 +5,21 @@ Centralized logging configuration, monitoring, and shared utility functions
 
 import logging
 import os
-import sys
 import time
 import json
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, Any, List
-from pathlib import Path
-from collections import defaultdict, deque
 from dataclasses import dataclass, asdict
 
+from src.helpers.log_pipeline import get_log_pipeline
+
 
 def setup_logger(name: str, log_level: str = "INFO") -> logging.Logger:
     """
     Configure consistent logging across all modules
-    Logs to both console and file with structured format
+    Logs to both console and file through the shared logging pipeline: records are
+    queued and written by a background thread, the file gets one JSON object per line
     
     Args:
         name: Logger name (typically __name__ from calling module)
@@ -38,36 +38,15 @@ def setup_logger(name: str, log_level: str = "INFO") -> logging.Logger:
     level = getattr(logging, log_level.upper(), logging.INFO)
     logger.setLevel(level)
     
-    # Create logs directory if it doesn't exist
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-    
-    # Console handler with colored output
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    
-    # File handler for persistent logging
-    log_file = logs_dir / "xoflowers_ai.log"
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)  # Always log DEBUG to file
-    
-    # Detailed formatter for file logs
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Simpler formatter for console
-    console_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%H:%M:%S'
-    )
+    # Console and file handlers are shared by all loggers (one open log file per process)
+    pipeline = get_log_pipeline()
+    for handler in pipeline.logger_handlers:
+        logger.addHandler(handler)
     
-    console_handler.setFormatter(console_formatter)
-    file_handler.setFormatter(file_formatter)
-    
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # Sample high-volume DEBUG lines of configured loggers
+    sampler = pipeline.debug_sampler(name)
+    if sampler is not None:
+        logger.addFilter(sampler)
     
     return logger
 
@@ -101,7 +80,7 @@ def log_ai_interaction(logger: logging.Logger,
         'timestamp': datetime.now().isoformat()
     }
     
-    logger.info(f"AI_INTERACTION: {log_data}")
+    logger.info("AI_INTERACTION: %s", log_data, extra={'data': log_data})
 
 
 def log_security_check(logger: logging.Logger,
@@ -135,9 +114,9 @@ def log_security_check(logger: logging.Logger,
     }
     
     if is_safe:
-        logger.info(f"SECURITY_PASS: {log_data}")
+        logger.info("SECURITY_PASS: %s", log_data, extra={'data': log_data})
     else:
-        logger.warning(f"SECURITY_BLOCK: {log_data}")
+        logger.warning("SECURITY_BLOCK: %s", log_data, extra={'data': log_data})
 
 
 def log_performance_metrics(logger: logging.Logger,
@@ -166,9 +145,16 @@ def log_performance_metrics(logger: logging.Logger,
         log_data.update(details)
     
     if success:
-        logger.info(f"PERFORMANCE: {log_data}")
+        logger.info("PERFORMANCE: %s", log_data, extra={'data': log_data})
     else:
-        logger.error(f"PERFORMANCE_ERROR: {log_data}")
+        logger.error("PERFORMANCE_ERROR: %s", log_data, extra={'data': log_data})
+    
+    # Feed dependency health from live traffic (openai_*, redis_*, ...)
+    from src.helpers.health import record_operation_outcome
+    record_operation_outcome(operation, success, duration, details)
+    
+    # Per-stage and per-provider latency histograms for /metrics (the performance monitor reads them back)
+    get_performance_monitor().record_metric(operation, duration, success)
 
 
 def log_fallback_activation(logger: logging.Logger,
@@ -194,7 +180,7 @@ def log_fallback_activation(logger: logging.Logger,
         'timestamp': datetime.now().isoformat()
     }
     
-    logger.warning(f"FALLBACK_ACTIVATED: {log_data}")
+    logger.warning("FALLBACK_ACTIVATED: %s", log_data, extra={'data': log_data})
 
 
 def sanitize_for_logging(text: str, max_length: int = 100) -> str:
@@ -244,15 +230,6 @@ def create_request_id() -> str:
 
 # Performance Monitoring Classes and Functions
 
-@dataclass
-class PerformanceMetric:
-    """Performance metric data structure"""
-    operation: str
-    duration: float
-    success: bool
-    timestamp: datetime
-    details: Dict[str, Any]
-
 @dataclass
 class SystemHealth:
     """System health status"""
@@ -268,144 +245,131 @@ class SystemHealth:
 
 class PerformanceMonitor:
     """
-    Comprehensive performance monitoring and metrics collection
-    Thread-safe implementation for concurrent access
+    Performance monitoring backed by the metrics registry
+    Operation latencies, errors and cache lookups are recorded only as /metrics
+    histograms and counters; the summaries here are read back from them.
     """
     
-    def __init__(self, max_metrics: int = 1000):
-        self.max_metrics = max_metrics
-        self._metrics = deque(maxlen=max_metrics)
-        self._operation_stats = defaultdict(list)
-        self._error_counts = defaultdict(int)
-        self._user_activity = defaultdict(int)
-        self._cache_stats = {'hits': 0, 'misses': 0}
-        self._lock = threading.Lock()
+    def __init__(self, registry=None):
+        """
+        Args:
+            registry: MetricsRegistry to record into (the global one if omitted)
+        """
+        self._registry = registry
+        self._user_activity = {}
+        self._lock = threading.Lock()  # Only guards user activity
         self.logger = setup_logger(__name__)
         
         # Start background cleanup task
         self._start_cleanup_task()
     
+    @property
+    def registry(self):
+        if self._registry is None:
+            from src.helpers.monitoring import get_metrics_registry
+            self._registry = get_metrics_registry()
+        return self._registry
+    
     def record_metric(self, operation: str, duration: float, success: bool, 
                      details: Optional[Dict[str, Any]] = None) -> None:
-        """Record a performance metric"""
-        with self._lock:
-            metric = PerformanceMetric(
-                operation=operation,
-                duration=duration,
-                success=success,
-                timestamp=datetime.now(),
-                details=details or {}
-            )
-            
-            self._metrics.append(metric)
-            self._operation_stats[operation].append(duration)
-            
-            if not success:
-                self._error_counts[operation] += 1
-            
-            # Keep operation stats manageable
-            if len(self._operation_stats[operation]) > 100:
-                self._operation_stats[operation] = self._operation_stats[operation][-50:]
+        """Record a performance metric (details are only logged by the callers)"""
+        from src.helpers.monitoring import observe_operation
+        observe_operation(operation, duration, success, self.registry)
     
     def record_user_activity(self, user_id: str) -> None:
         """Record user activity for monitoring active users"""
         with self._lock:
             self._user_activity[user_id] = int(time.time())
     
-    def record_cache_hit(self, hit: bool) -> None:
+    def record_cache_hit(self, hit: bool, cache: str = 'response') -> None:
         """Record cache hit/miss statistics"""
-        with self._lock:
-            if hit:
-                self._cache_stats['hits'] += 1
-            else:
-                self._cache_stats['misses'] += 1
+        from src.helpers.monitoring import observe_cache_lookup
+        observe_cache_lookup(cache, hit, self.registry)
+    
+    def _operation_summaries(self) -> Dict[str, Dict[str, Any]]:
+        from src.helpers.monitoring import operation_summaries
+        return operation_summaries(self.registry)
+    
+    @staticmethod
+    def _operation_stats(operation: str, summary: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not summary or not summary['count']:
+            return {'operation': operation, 'count': 0}
+        
+        return {
+            'operation': operation,
+            'count': summary['count'],
+            'avg_duration': summary['avg'],
+            'p50_duration': summary['p50'],
+            'p95_duration': summary['p95'],
+            'p99_duration': summary['p99'],
+            'error_count': summary['errors'],
+            'success_rate': 1 - summary['errors'] / summary['count']
+        }
     
     def get_operation_stats(self, operation: str) -> Dict[str, Any]:
         """Get statistics for a specific operation"""
-        with self._lock:
-            durations = self._operation_stats.get(operation, [])
-            if not durations:
-                return {'operation': operation, 'count': 0}
-            
-            return {
-                'operation': operation,
-                'count': len(durations),
-                'avg_duration': sum(durations) / len(durations),
-                'min_duration': min(durations),
-                'max_duration': max(durations),
-                'error_count': self._error_counts.get(operation, 0),
-                'success_rate': 1 - (self._error_counts.get(operation, 0) / len(durations))
-            }
-    
-    def get_system_health(self) -> SystemHealth:
+        return self._operation_stats(operation, self._operation_summaries().get(operation))
+    
+    def get_system_health(self, summaries: Optional[Dict[str, Dict[str, Any]]] = None) -> SystemHealth:
         """Get comprehensive system health status"""
+        if summaries is None:
+            summaries = self._operation_summaries()
+        
+        # Average response time and error rate over all recorded operations
+        total_operations = sum(summary['count'] for summary in summaries.values())
+        total_duration = sum(summary['sum'] for summary in summaries.values())
+        total_errors = sum(summary['errors'] for summary in summaries.values())
+        avg_response_time = total_duration / total_operations if total_operations > 0 else 0
+        error_rate = total_errors / total_operations if total_operations > 0 else 0
+        
+        # Calculate active users (last 5 minutes)
+        current_time = int(time.time())
         with self._lock:
-            # Calculate average response time
-            all_durations = []
-            for durations in self._operation_stats.values():
-                all_durations.extend(durations)
-            
-            avg_response_time = sum(all_durations) / len(all_durations) if all_durations else 0
-            
-            # Calculate error rate
-            total_operations = len(self._metrics)
-            total_errors = sum(self._error_counts.values())
-            error_rate = total_errors / total_operations if total_operations > 0 else 0
-            
-            # Calculate active users (last 5 minutes)
-            current_time = int(time.time())
             active_users = sum(
                 1 for last_activity in self._user_activity.values()
                 if current_time - last_activity < 300  # 5 minutes
             )
-            
-            # Calculate cache hit rate
-            total_cache_requests = self._cache_stats['hits'] + self._cache_stats['misses']
-            cache_hit_rate = self._cache_stats['hits'] / total_cache_requests if total_cache_requests > 0 else 0
-            
-            return SystemHealth(
-                redis_available=self._check_service_health('redis'),
-                chromadb_available=self._check_service_health('chromadb'),
-                openai_available=self._check_service_health('openai'),
-                gemini_available=self._check_service_health('gemini'),
-                avg_response_time=avg_response_time,
-                error_rate=error_rate,
-                active_users=active_users,
-                cache_hit_rate=cache_hit_rate,
-                timestamp=datetime.now()
-            )
-    
-    def _check_service_health(self, service: str) -> bool:
-        """Check if a service is healthy based on recent metrics"""
-        recent_metrics = [
-            m for m in self._metrics 
-            if m.operation.startswith(service) and 
-            datetime.now() - m.timestamp < timedelta(minutes=5)
-        ]
         
-        if not recent_metrics:
-            return True  # No recent activity, assume healthy
+        # Calculate cache hit rate
+        cache_stats = self._cache_stats()
+        total_cache_requests = cache_stats['hits'] + cache_stats['misses']
+        cache_hit_rate = cache_stats['hits'] / total_cache_requests if total_cache_requests > 0 else 0
         
-        success_rate = sum(1 for m in recent_metrics if m.success) / len(recent_metrics)
-        return success_rate > 0.8  # 80% success rate threshold
+        return SystemHealth(
+            redis_available=self._check_service_health('redis'),
+            chromadb_available=self._check_service_health('chromadb'),
+            openai_available=self._check_service_health('openai'),
+            gemini_available=self._check_service_health('gemini'),
+            avg_response_time=avg_response_time,
+            error_rate=error_rate,
+            active_users=active_users,
+            cache_hit_rate=cache_hit_rate,
+            timestamp=datetime.now()
+        )
+    
+    def _cache_stats(self) -> Dict[str, int]:
+        from src.helpers.monitoring import cache_lookup_totals
+        return cache_lookup_totals(self.registry)
+    
+    def _check_service_health(self, service: str) -> bool:
+        """Check if a service is healthy based on live call outcomes (down only while its breaker is open)"""
+        from src.helpers.health import get_health_registry
+        return not get_health_registry().is_down(service)
     
     def get_performance_summary(self) -> Dict[str, Any]:
         """Get comprehensive performance summary"""
-        with self._lock:
-            operations_summary = {}
-            for operation in self._operation_stats.keys():
-                operations_summary[operation] = self.get_operation_stats(operation)
-            
-            health = self.get_system_health()
-            
-            return {
-                'system_health': asdict(health),
-                'operations': operations_summary,
-                'total_metrics': len(self._metrics),
-                'cache_stats': self._cache_stats.copy(),
-                'active_operations': list(self._operation_stats.keys()),
-                'generated_at': datetime.now().isoformat()
-            }
+        summaries = self._operation_summaries()
+        health = self.get_system_health(summaries)
+        
+        return {
+            'system_health': asdict(health),
+            'operations': {operation: self._operation_stats(operation, summary)
+                           for operation, summary in summaries.items()},
+            'total_metrics': sum(summary['count'] for summary in summaries.values()),
+            'cache_stats': self._cache_stats(),
+            'active_operations': list(summaries.keys()),
+            'generated_at': datetime.now().isoformat()
+        }
     
     def _start_cleanup_task(self) -> None:
         """Start background task to clean up old data"""
@@ -521,7 +485,7 @@ def log_cache_operation(logger: logging.Logger,
     """
     # Record cache statistics
     monitor = get_performance_monitor()
-    monitor.record_cache_hit(hit)
+    monitor.record_cache_hit(hit, cache=operation[:-len('_get')] if operation.endswith('_get') else 'response')
     
     if duration > 0:
         monitor.record_metric(
@@ -562,16 +526,7 @@ class PerformanceTimer:
         self.duration = time.time() - self.start_time
         success = exc_type is None
         
-        # Record performance metric
-        monitor = get_performance_monitor()
-        monitor.record_metric(
-            operation=self.operation,
-            duration=self.duration,
-            success=success,
-            details=self.details
-        )
-        
-        # Log performance
+        # Log and record performance (once, in the metrics registry)
         if success:
             log_performance_metrics(self.logger, self.operation, self.duration, True, self.details)
         else:
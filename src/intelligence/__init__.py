@@ -6,6 +6,11 @@ Contains AI processing, security, and context management components
 from .ai_engine import process_message_ai, get_ai_engine, AIEngine, AIResponse
 from .security_ai import check_message_security, is_message_safe, generate_security_response, SecurityResult
 from .context_manager import get_user_context, add_conversation_message, get_context_for_ai, update_user_preferences
+from .context_prefetch import prefetch_user_context, refresh_user_context, invalidate_user_context, get_context_prefetcher
+from .cpu_executor import run_cpu_stage, get_cpu_executor
+from .deadline import request_deadline, remaining_time, run_within_deadline, DeadlineExceeded
+from .batch_processor import BatchItem, process_messages_batch, process_messages_batch_all, get_batch_processor
+from .tool_calling import ToolCallingEngine, ToolExecutor, TOOL_DEFINITIONS
 
 __all__ = [
     'process_message_ai',
@@ -19,5 +24,22 @@ __all__ = [
     'get_user_context',
     'add_conversation_message',
     'get_context_for_ai',
-    'update_user_preferences'
+    'update_user_preferences',
+    'prefetch_user_context',
+    'refresh_user_context',
+    'invalidate_user_context',
+    'get_context_prefetcher',
+    'run_cpu_stage',
+    'get_cpu_executor',
+    'request_deadline',
+    'remaining_time',
+    'run_within_deadline',
+    'DeadlineExceeded',
+    'BatchItem',
+    'process_messages_batch',
+    'process_messages_batch_all',
+    'get_batch_processor',
+    'ToolCallingEngine',
+    'ToolExecutor',
+    'TOOL_DEFINITIONS'
 ]
\ No newline at end of file
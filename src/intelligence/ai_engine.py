@@ -4,7 +4,9 @@ Main AI processing coordinator with fallback chain and comprehensive logging usi
 """
 
 import asyncio
+import inspect
 import json
+import logging
 import time
 from typing import Dict, Any, Optional, Tuple, List
 from dataclasses import dataclass
@@ -16,7 +18,7 @@ from openai import OpenAI
 from google import genai
 from google.genai import types
 
-from src.utils.system_definitions import get_service_config, get_ai_prompts
+from src.utils.system_definitions import get_service_config, get_ai_prompts, get_performance_config
 from src.utils.utils import (
     setup_logger, log_ai_interaction, log_fallback_activation, log_performance_metrics,
     log_ai_interaction_with_monitoring, log_error_with_monitoring, log_cache_operation,
@@ -30,6 +32,18 @@ from .gemini_chat_manager import (
     send_message_with_enhanced_context,
     get_gemini_chat_manager
 )
+from .context_prefetch import refresh_user_context
+from .tool_calling import ToolCallingEngine, OpenAIToolModel
+from src.helpers.rate_limiter import check_llm_budget
+from src.helpers.monitoring import register_cache_size
+from src.helpers.tracing import traced, current_span
+from src.helpers.llm_usage import metered, record_llm_usage, check_user_llm_budget, current_request_usage
+from .deadline import run_within_deadline, stage_timeout, http_timeout_ms, DeadlineExceeded
+
+# Default timeouts for stages without their own service timeout
+CONTEXT_STAGE_TIMEOUT = 5.0
+PRODUCT_SEARCH_TIMEOUT = 5.0
+CONTEXT_SAVE_TIMEOUT = 5.0
 
 
 @dataclass
@@ -62,9 +76,13 @@ class AIEngine:
         self.service_config = get_service_config()
         self.ai_prompts = get_ai_prompts()
         
+        # Time kept free for the final generation when earlier stages size their timeouts
+        self.min_generation_time = get_performance_config().get('min_generation_seconds', 1.0)
+        
         # Performance optimization: Response caching
         self._response_cache = {}
         self._cache_ttl = 300  # 5 minutes cache TTL
+        register_cache_size('response', lambda: len(self._response_cache))
         
         # Performance optimization: Connection pooling for AI services
         self._openai_semaphore = asyncio.Semaphore(10)  # Limit concurrent OpenAI calls
@@ -76,6 +94,10 @@ class AIEngine:
         self.chat_cleanup_interval = 300  # Clean up every 5 minutes
         self.last_cleanup = time.time()
         
+        # Cart and payment tools for function calling (created on first use)
+        self._cart_tools = None
+        self._payment_tools = None
+        
         # Initialize AI services
         self._setup_openai()
         self._setup_gemini()
@@ -183,17 +205,19 @@ OBIECTIVUL TĂU:
 
 IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, preferințele, bugetul."""
             
+            chat_config = {
+                'system_instruction': system_instruction,
+                'temperature': 0.7
+            }
             chat = self.gemini_client.chats.create(
                 model=self.gemini_model,
-                config={
-                    'system_instruction': system_instruction,
-                    'temperature': 0.7
-                }
+                config=chat_config
             )
             
-            # Store chat info
+            # Store chat info (config is resent with each message's per-call timeout)
             self.user_chats[user_id] = {
                 'chat': chat,
+                'config': chat_config,
                 'created_at': current_time,
                 'last_used': current_time,
                 'message_count': 0
@@ -202,82 +226,38 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
             self.logger.info(f"Created new Gemini chat session for user {user_id}")
             return chat
             
-        # Cart & Payment Tools
-        from src.tools.cart_tools import CartTools
-        from src.tools.payment_tools import PaymentTools
-        import json
-        self.cart_tools = CartTools()
-        self.payment_tools = PaymentTools(self.cart_tools)
-
-        # Tool definitions for OpenAI function calling
-        self.available_tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_to_cart",
-                    "description": "Adaugă un produs în cartul utilizatorului",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "ID-ul utilizatorului"},
-                            "product_name": {"type": "string", "description": "Numele produsului"},
-                            "price": {"type": "number", "description": "Prețul produsului în MDL"},
-                            "product_url": {"type": "string", "description": "URL-ul produsului"}
-                        },
-                        "required": ["user_id", "product_name", "price"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "view_cart",
-                    "description": "Afișează conținutul cartului utilizatorului",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "ID-ul utilizatorului"}
-                        },
-                        "required": ["user_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "clear_cart",
-                    "description": "Golește cartul utilizatorului",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "ID-ul utilizatorului"}
-                        },
-                        "required": ["user_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "process_payment",
-                    "description": "Procesează plata pentru produsele din cart",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "ID-ul utilizatorului"},
-                            "customer_name": {"type": "string", "description": "Numele clientului"},
-                            "customer_phone": {"type": "string", "description": "Telefonul clientului"}
-                        },
-                        "required": ["user_id"]
-                    }
-                }
-            }
-        ]
-
         except Exception as e:
             self.logger.error(f"Failed to create chat for user {user_id}: {e}")
             return None
     
+    def rehydrate_chat(self, user_id: str) -> bool:
+        """
+        Make sure a chat session for user is ready before the message reaches generation
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            True if a chat session is available for the user
+        """
+        return self._get_or_create_chat(user_id) is not None
+    
+    @property
+    def cart_tools(self):
+        """Cart tools backed by the order store"""
+        if self._cart_tools is None:
+            from src.tools.cart_tools import CartTools
+            self._cart_tools = CartTools()
+        return self._cart_tools
+    
+    @property
+    def payment_tools(self):
+        """Payment tools sharing the cart tools' store"""
+        if self._payment_tools is None:
+            from src.tools.payment_tools import PaymentTools
+            self._payment_tools = PaymentTools(self.cart_tools)
+        return self._payment_tools
+    
     def _cleanup_old_chats(self):
         """Remove old chat sessions to prevent memory leaks"""
         current_time = time.time()
@@ -294,6 +274,8 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
         if expired_users:
             self.logger.info(f"Cleaned up {len(expired_users)} expired chat sessions")
     
+    @traced("ai.process_message")
+    @metered
     async def process_message_ai(self, user_message: str, user_id: str, context: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Main AI processing pipeline entry point with enhanced Gemini chat integration
@@ -301,26 +283,94 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
         Args:
             user_message: User's message text
             user_id: Unique user identifier
-            context: Conversation context (optional, will use enhanced context if not provided)
+            context: Conversation context (optional, will use enhanced context if not provided).
+                     May also be an awaitable from prefetch_user_context(), resolved after the security check
         
         Returns:
             Dict with response, success status, and metadata
         """
         start_time = time.time()
         request_id = f"{user_id}_{int(start_time)}"
+        span = current_span()
+        span.set_attribute('request_id', request_id)
+        span.set_attribute('message.length', len(user_message))
+        current_request_usage().request_id = request_id
         
         self.logger.info(f"[{request_id}] Starting enhanced AI processing for user {user_id}")
         
         try:
-            # Step 0: Get enhanced conversation context (Gemini chat + Redis fallback)
-            if context is None:
-                context = await get_enhanced_context_for_ai(user_id)
-                context_type = context.get('conversation_type', 'none')
-                self.logger.debug(f"[{request_id}] Retrieved {context_type} context: {len(context.get('recent_messages', []))} recent messages")
+            # Daily per-user and global LLM budgets: answer with a busy message instead of overspending
+            budget = await check_user_llm_budget(user_id)
+            if budget.allowed:
+                budget = await check_llm_budget()
+            if not budget.allowed:
+                self.logger.warning(f"[{request_id}] {budget.limit_name} exhausted, retry after {budget.retry_after:.1f}s")
+                return {
+                    "response": self._get_busy_response(),
+                    "success": True,
+                    "context_updated": False,
+                    "rate_limited": True,
+                    "retry_after": budget.retry_after,
+                    "processing_time": time.time() - start_time,
+                    "service_used": "rate_limiter",
+                    "request_id": request_id
+                }
             
+            # Step 0: Start enhanced conversation context retrieval (Gemini chat + Redis fallback)
+            # so that it overlaps with the security check instead of preceding it
+            context_future = None
+            owns_context_future = False
+            if context is None:
+                context_future = asyncio.ensure_future(get_enhanced_context_for_ai(user_id))
+                owns_context_future = True
+            elif inspect.isawaitable(context):
+                # Context prefetched by the integration layer (may be shared, never cancel it)
+                context_future = asyncio.ensure_future(context)
+
             # Step 1: Security check using AI-powered security system
-            security_result = await check_message_security(user_message, user_id)
-            
+            try:
+                security_result = await run_within_deadline(
+                    check_message_security(user_message, user_id),
+                    "security",
+                    self.service_config['openai']['timeout'],
+                    reserve=self.min_generation_time
+                )
+            except Exception:
+                if owns_context_future:
+                    context_future.cancel()
+                raise
+
+            span.set_attribute('security.service', security_result.service_used)
+            span.set_attribute('security.is_safe', security_result.is_safe)
+
+            if context_future is not None:
+                if not security_result.is_safe:
+                    if owns_context_future:
+                        context_future.cancel()
+                else:
+                    try:
+                        # Shared prefetch futures must survive our timeout
+                        context = await run_within_deadline(
+                            context_future if owns_context_future else asyncio.shield(context_future),
+                            "context",
+                            CONTEXT_STAGE_TIMEOUT,
+                            reserve=self.min_generation_time
+                        )
+                        if context is None:
+                            # Prefetch failed - fetch directly instead of answering without history
+                            context = await run_within_deadline(
+                                get_enhanced_context_for_ai(user_id),
+                                "context",
+                                CONTEXT_STAGE_TIMEOUT,
+                                reserve=self.min_generation_time
+                            )
+                    except DeadlineExceeded:
+                        self.logger.warning(f"[{request_id}] Context not loaded before deadline, continuing without it")
+                        context = {}
+                    context_type = context.get('conversation_type', 'none')
+                    self.logger.debug("[%s] Retrieved %s context: %d recent messages",
+                                      request_id, context_type, len(context.get('recent_messages', [])))
+
             if not security_result.is_safe:
                 # Message failed security check, return safe response
                 processing_time = time.time() - start_time
@@ -340,7 +390,7 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
                 }
             
             # Step 2: Use ENHANCED Gemini Chat with intelligent ChromaDB integration
-            self.logger.info(f"[{request_id}] Using enhanced Gemini Chat + ChromaDB integration")
+            self.logger.debug("[%s] Using enhanced Gemini Chat + ChromaDB integration", request_id)
             
             # Enhanced processing that combines Gemini intelligence with product search
             response_result = await self._enhanced_gemini_with_products(
@@ -352,16 +402,26 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
             # Save conversation to context if response was successful
             context_updated = False
             if response_result.success:
-                context_updated = await add_conversation_message(
+                # Save keeps running in the background if the deadline leaves no time to wait for it
+                save_task = asyncio.ensure_future(add_conversation_message(
                     user_id, 
                     user_message, 
                     response_result.response_text,
                     response_result.intent,
                     response_result.confidence
-                )
+                ))
+                # Re-warm context once the save finishes - also when it outlives this request or
+                # fails - so the next message never gets the warm copy from before this exchange
+                save_task.add_done_callback(lambda _task: refresh_user_context(user_id))
+                try:
+                    context_updated = await run_within_deadline(
+                        asyncio.shield(save_task), "context_save", CONTEXT_SAVE_TIMEOUT
+                    )
+                except DeadlineExceeded:
+                    self.logger.warning(f"[{request_id}] Context save continues after response (deadline)")
                 
                 if context_updated:
-                    self.logger.debug(f"[{request_id}] Context updated successfully")
+                    self.logger.debug("[%s] Context updated successfully", request_id)
                 else:
                     self.logger.warning(f"[{request_id}] Failed to update context")
             
@@ -390,6 +450,10 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
                 "request_id": request_id
             }
             
+        except DeadlineExceeded as e:
+            self.logger.warning(f"[{request_id}] AI processing stopped: {e}")
+            raise
+            
         except Exception as e:
             processing_time = time.time() - start_time
             self.logger.error(f"[{request_id}] AI processing failed: {e}")
@@ -397,6 +461,74 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
             # NO FALLBACK - System must work with proper AI services
             raise Exception(f"AI processing failed - system requires functional AI services: {e}")
     
+    @metered
+    async def process_message_with_tools(self, user_message: str, user_id: str) -> str:
+        """
+        Process a message with the cart and payment tools available to the model
+        
+        Runs the security check, then lets OpenAI call the tools until it answers.
+        Without OpenAI the message goes through the regular pipeline without tools.
+        
+        Args:
+            user_message: User's message text
+            user_id: Unique user identifier (the tools act on this user's cart)
+        
+        Returns:
+            Response text for the user
+        """
+        start_time = time.time()
+        request_id = f"{user_id}_{int(start_time)}"
+        
+        if not self.openai_available:
+            self.logger.warning(f"[{request_id}] OpenAI unavailable, answering without tools")
+            result = await self.process_message_ai(user_message, user_id)
+            return result.get('response', self._get_safe_fallback_response())
+        
+        current_request_usage().request_id = request_id
+        budget = await check_user_llm_budget(user_id)
+        if budget.allowed:
+            budget = await check_llm_budget()
+        if not budget.allowed:
+            self.logger.warning(f"[{request_id}] {budget.limit_name} exhausted, retry after {budget.retry_after:.1f}s")
+            return self._get_busy_response()
+        
+        context_task = asyncio.ensure_future(get_enhanced_context_for_ai(user_id))
+        security_result = await check_message_security(user_message, user_id)
+        if not security_result.is_safe:
+            context_task.cancel()
+            return generate_security_response(security_result.detected_issues, security_result.risk_level)
+        
+        try:
+            context = await asyncio.wait_for(context_task, CONTEXT_STAGE_TIMEOUT) or {}
+        except Exception as e:
+            self.logger.warning(f"[{request_id}] Context unavailable for tool calling: {e}")
+            context = {}
+        
+        messages = [{"role": "system", "content": f"{self.ai_prompts['main_system_prompt']}\n\n"
+                                                  f"{self.ai_prompts['tool_calling_prompt']}"}]
+        messages.extend(_history_messages(context.get('recent_messages', [])))
+        messages.append({"role": "user", "content": user_message})
+        
+        engine = ToolCallingEngine(
+            OpenAIToolModel(self.openai_client, self.service_config['openai'], self._openai_semaphore),
+            self.cart_tools,
+            self.payment_tools
+        )
+        result = await engine.run(user_id, messages)
+        response_text = result.response.strip() or self._get_safe_fallback_response()
+        
+        self.logger.info(f"[{request_id}] Tool calling finished in {result.iterations} iterations "
+                         f"({len(result.tool_calls)} tool calls) in {time.time() - start_time:.3f}s")
+        
+        save_task = asyncio.ensure_future(add_conversation_message(user_id, user_message, response_text, "tool_calling", 1.0))
+        save_task.add_done_callback(lambda _task: refresh_user_context(user_id))
+        try:
+            if not await run_within_deadline(asyncio.shield(save_task), "context_save", CONTEXT_SAVE_TIMEOUT):
+                self.logger.warning(f"[{request_id}] Failed to update context")
+        except DeadlineExceeded:
+            self.logger.warning(f"[{request_id}] Context save continues after response (deadline)")
+        return response_text
+    
     async def _analyze_intent(self, message: str, context: Dict) -> Dict[str, Any]:
         """
         Analyze user intent using AI
@@ -445,11 +577,12 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
                     messages=[{"role": "user", "content": prompt}],
                     temperature=self.service_config['openai']['temperature'],
                     max_tokens=500,
-                    timeout=self.service_config['openai']['timeout']
+                    timeout=stage_timeout(self.service_config['openai']['timeout'], stage="openai")
                 )
                 
                 duration = time.time() - start_time
                 log_performance_metrics(self.logger, "openai_intent_analysis", duration, True)
+                record_llm_usage("intent", "openai", self.service_config['openai']['model'], response)
                 
                 content = response.choices[0].message.content.strip()
                 try:
@@ -492,12 +625,16 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
                     config=types.GenerateContentConfig(
                         response_mime_type="application/json",
                         temperature=self.service_config['gemini']['temperature'],
-                        thinking_config=types.ThinkingConfig(thinking_budget=0)  # Disable thinking for speed
+                        thinking_config=types.ThinkingConfig(thinking_budget=0),  # Disable thinking for speed
+                        http_options=types.HttpOptions(timeout=http_timeout_ms(
+                            self.service_config['gemini'].get('timeout', 30), stage="gemini"
+                        ))
                     )
                 )
                 
                 duration = time.time() - start_time
                 log_performance_metrics(self.logger, "gemini_intent_analysis", duration, True)
+                record_llm_usage("intent", "gemini", self.gemini_model, response)
                 
                 # NEW API returns structured JSON - parse it directly
                 if hasattr(response, 'text') and response.text:
@@ -549,6 +686,7 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
             "reasoning": "Basic keyword detection fallback"
         }
     
+    @traced("ai.enhanced_gemini")
     async def _enhanced_gemini_with_products(self, user_message: str, context: Dict, 
                                            user_id: str, request_id: str) -> AIResponse:
         """
@@ -571,7 +709,7 @@ IMPORTANT: Ține minte tot ce discutați în conversație - numele, ocasiile, pr
         """
         try:
             start_time = time.time()
-            self.logger.info(f"[{request_id}] Enhanced Gemini+ChromaDB processing started")
+            self.logger.debug("[%s] Enhanced Gemini+ChromaDB processing started", request_id)
             
             # Import here to avoid circular imports
             from google import genai
@@ -606,16 +744,35 @@ Exemple:
 - "Care e programul?" → needs_product_search: false, intent: "business_info"
 """
             
-            self.logger.debug(f"[{request_id}] Analyzing message with Gemini for product search needs")
+            self.logger.debug("[%s] Analyzing message with Gemini for product search needs", request_id)
             
-            analysis_response = client.models.generate_content(
-                model=self.service_config['gemini']['model'],
-                contents=analysis_prompt,
-                config={'temperature': 0.3}  # Lower temperature for more consistent analysis
-            )
+            gemini_timeout = self.service_config['gemini'].get('timeout', 30)
+            try:
+                analysis_response = await run_within_deadline(
+                    asyncio.to_thread(
+                        client.models.generate_content,
+                        model=self.service_config['gemini']['model'],
+                        contents=analysis_prompt,
+                        config=types.GenerateContentConfig(
+                            temperature=0.3,  # Lower temperature for more consistent analysis
+                            http_options=types.HttpOptions(timeout=http_timeout_ms(
+                                gemini_timeout, reserve=self.min_generation_time, stage="analysis"
+                            ))
+                        )
+                    ),
+                    "analysis",
+                    gemini_timeout,
+                    reserve=self.min_generation_time
+                )
+            except DeadlineExceeded:
+                self.logger.warning(f"[{request_id}] No time left for AI analysis, using keyword analysis")
+                analysis_response = None
             
             # Parse the analysis
             try:
+                if analysis_response is None:
+                    raise ValueError("analysis skipped to meet deadline")
+                record_llm_usage("analysis", "gemini", self.service_config['gemini']['model'], analysis_response)
                 analysis_text = analysis_response.text
                 if "```json" in analysis_text:
                     json_start = analysis_text.find("```json") + 7
@@ -623,7 +780,7 @@ Exemple:
                     analysis_text = analysis_text[json_start:json_end].strip()
                 
                 analysis = json.loads(analysis_text)
-                self.logger.debug(f"[{request_id}] Analysis result: {analysis}")
+                self.logger.debug("[%s] Analysis result: %s", request_id, analysis)
                 
             except Exception as parse_error:
                 self.logger.warning(f"[{request_id}] Failed to parse analysis JSON: {parse_error}")
@@ -664,21 +821,25 @@ Exemple:
                     # if category:
                     #     filters['category'] = category
                     
-                    self.logger.debug(f"[{request_id}] ChromaDB search - query: '{search_terms}', filters: {filters}")
-                    self.logger.info(f"[{request_id}] About to call ChromaDB with query='{search_terms}', filters={filters}, max_results=10")
+                    self.logger.debug("[%s] ChromaDB search - query: '%s', filters: %s", request_id, search_terms, filters)
                     
                     # Call ChromaDB with proper parameters
-                    products = await search_products_with_filters(
-                        query=search_terms,
-                        filters=filters,
-                        max_results=10  # Increased from 6 to 10 for better variety
+                    products = await run_within_deadline(
+                        search_products_with_filters(
+                            query=search_terms,
+                            filters=filters,
+                            max_results=10  # Increased from 6 to 10 for better variety
+                        ),
+                        "product_search",
+                        PRODUCT_SEARCH_TIMEOUT,
+                        reserve=self.min_generation_time
                     )
                     
-                    self.logger.info(f"[{request_id}] ChromaDB returned {len(products)} products")
-                    
-                    # Safe debug logging - filter out None values
-                    valid_products = [p for p in products[:3] if p is not None and isinstance(p, dict)]
-                    self.logger.debug(f"[{request_id}] Product details: {[p.get('name', 'N/A')[:50] for p in valid_products]}")
+                    # Product details are only collected when DEBUG is on - filter out None values
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        valid_products = [p for p in products[:3] if p is not None and isinstance(p, dict)]
+                        self.logger.debug("[%s] Product details: %s", request_id,
+                                          [p.get('name', 'N/A')[:50] for p in valid_products])
                     
                     self.logger.info(f"[{request_id}] Found {len(products)} products in ChromaDB")
                     
@@ -697,7 +858,7 @@ Exemple:
                                     # Skip products with invalid price data
                                     continue
                         products = safe_products
-                        self.logger.debug(f"[{request_id}] After additional price filtering (≤{max_price}): {len(products)} products")
+                        self.logger.debug("[%s] After additional price filtering (≤%s): %d products", request_id, max_price, len(products))
                     
                 except Exception as search_error:
                     self.logger.error(f"[{request_id}] Product search failed: {search_error}")
@@ -726,13 +887,25 @@ Exemple:
             else:
                 enhanced_message = user_message
             
-            self.logger.debug(f"[{request_id}] Sending message to Gemini chat with conversation history")
+            self.logger.debug("[%s] Sending message to Gemini chat with conversation history", request_id)
             
             # Send message to chat (this maintains conversation history automatically)
-            final_response = await asyncio.to_thread(
-                chat.send_message,
-                enhanced_message
-            )
+            try:
+                generation_config = {
+                    **self.user_chats.get(user_id, {}).get('config', {}),
+                    'http_options': {'timeout': http_timeout_ms(gemini_timeout, stage="generation")}
+                }
+                final_response = await run_within_deadline(
+                    asyncio.to_thread(chat.send_message, enhanced_message, config=generation_config),
+                    "generation",
+                    gemini_timeout
+                )
+            except DeadlineExceeded:
+                self.logger.warning(f"[{request_id}] Generation would overrun the deadline, returning degraded answer")
+                return self._deadline_degraded_response(analysis, products)
+            
+            # Prompt tokens include the whole chat history sent with the message
+            record_llm_usage("generation", "gemini", self.gemini_model, final_response)
             
             # Update chat message count
             if user_id in self.user_chats:
@@ -746,6 +919,10 @@ Exemple:
             # Filter out None/invalid products before returning
             valid_products = [p for p in products[:5] if p is not None and isinstance(p, dict)]
             
+            span = current_span()
+            span.set_attribute('intent', analysis.get("intent", "general"))
+            span.set_attribute('products.found', len(valid_products))
+            
             return AIResponse(
                 response_text=response_text,
                 success=True,
@@ -926,7 +1103,7 @@ Generează un răspuns natural, conversațional și util pentru client.
         cache_key = self._generate_cache_key(prompt, "openai")
         cached_response = self._get_cached_response(cache_key)
         if cached_response:
-            self.logger.debug(f"[{request_id}] Using cached OpenAI response")
+            self.logger.debug("[%s] Using cached OpenAI response", request_id)
             return cached_response
         
         async with self._openai_semaphore:  # Connection pooling
@@ -942,12 +1119,13 @@ Generează un răspuns natural, conversațional și util pentru client.
                     ],
                     temperature=self.service_config['openai']['temperature'],
                     max_tokens=self.service_config['openai']['max_tokens'],
-                    timeout=self.service_config['openai']['timeout']
+                    timeout=stage_timeout(self.service_config['openai']['timeout'], stage="openai")
                 )
                 
                 duration = time.time() - start_time
                 log_performance_metrics(self.logger, "openai_response_generation", duration, True, 
                                       {"request_id": request_id})
+                record_llm_usage("response", "openai", self.service_config['openai']['model'], response)
                 
                 result = response.choices[0].message.content.strip()
                 
@@ -969,7 +1147,7 @@ Generează un răspuns natural, conversațional și util pentru client.
         cache_key = self._generate_cache_key(prompt, "gemini")
         cached_response = self._get_cached_response(cache_key)
         if cached_response:
-            self.logger.debug(f"[{request_id}] Using cached Gemini response")
+            self.logger.debug("[%s] Using cached Gemini response", request_id)
             return cached_response
         
         async with self._gemini_semaphore:  # Connection pooling
@@ -984,13 +1162,17 @@ Generează un răspuns natural, conversațional și util pentru client.
                     config=types.GenerateContentConfig(
                         system_instruction=self.ai_prompts['main_system_prompt'],
                         temperature=self.service_config['gemini']['temperature'],
-                        thinking_config=types.ThinkingConfig(thinking_budget=0)  # Disable thinking for speed
+                        thinking_config=types.ThinkingConfig(thinking_budget=0),  # Disable thinking for speed
+                        http_options=types.HttpOptions(timeout=http_timeout_ms(
+                            self.service_config['gemini'].get('timeout', 30), stage="gemini"
+                        ))
                     )
                 )
                 
                 duration = time.time() - start_time
                 log_performance_metrics(self.logger, "gemini_response_generation", duration, True,
                                       {"request_id": request_id})
+                record_llm_usage("response", "gemini", self.gemini_model, response)
                 
                 # Extract text from NEW API response
                 if hasattr(response, 'text') and response.text:
@@ -1071,6 +1253,35 @@ Generează un răspuns natural, conversațional și util pentru client.
             'max_concurrent_gemini': self._gemini_semaphore._value
         }
     
+    def _deadline_degraded_response(self, analysis: Dict, products: List) -> AIResponse:
+        """Partial answer from the products found so far when generation can't finish in time"""
+        valid_products = [p for p in products[:5] if p is not None and isinstance(p, dict)]
+        
+        if valid_products:
+            lines = [f"{i}. {p.get('name', 'Produs')} - {p.get('price', 'N/A')} MDL"
+                     for i, p in enumerate(valid_products, 1)]
+            response_text = ("Iată câteva opțiuni potrivite din catalogul nostru:\n" + "\n".join(lines) +
+                             "\n\nScrie-mi dacă vrei detalii despre oricare dintre ele! 🌸")
+        else:
+            response_text = ("Îmi pare rău, răspunsul meu durează mai mult decât de obicei. "
+                             "Te rog să îmi scrii din nou în câteva momente. 🌸")
+        
+        return AIResponse(
+            response_text=response_text,
+            success=True,
+            service_used="deadline_degraded",
+            intent=analysis.get("intent", "general"),
+            confidence=analysis.get("confidence", 0.5),
+            products_found=len(valid_products),
+            needs_product_search=analysis.get("needs_product_search", False),
+            products=valid_products
+        )
+    
+    def _get_busy_response(self) -> str:
+        """Get response when the global LLM budget is exhausted"""
+        return ("Momentan primim foarte multe mesaje. Te rog să revii în câteva momente, "
+                "iar noi îți vom răspunde cu plăcere. Mulțumesc pentru răbdare!")
+    
     def _get_safe_fallback_response(self) -> str:
         """Get safe fallback response when all AI services fail"""
         return ("Îmi pare rău, dar în acest moment întâmpin dificultăți tehnice. "
@@ -1078,6 +1289,22 @@ Generează un răspuns natural, conversațional și util pentru client.
                 "direct la telefon pentru asistență imediată. Mulțumesc pentru înțelegere!")
 
 
+def _history_messages(recent_messages: List[Dict[str, Any]], limit: int = 4) -> List[Dict[str, str]]:
+    """Convert context history (Gemini chat or Redis summary entries) to chat completion messages"""
+    messages = []
+    for entry in recent_messages[-limit:]:
+        if 'role' in entry:
+            role = "assistant" if entry['role'] in ("model", "assistant") else "user"
+            if entry.get('content'):
+                messages.append({"role": role, "content": entry['content']})
+            continue
+        if entry.get('user'):
+            messages.append({"role": "user", "content": entry['user']})
+        if entry.get('assistant'):
+            messages.append({"role": "assistant", "content": entry['assistant']})
+    return messages
+
+
 # Global AI engine instance
 _ai_engine = None
 
@@ -0,0 +1,174 @@
+"""
+Batch Message Processing for XOFlowers AI Agent
+Runs many (user_id, message) pairs through the AI pipeline for replays, evaluations and backfills
+Messages of one user run in submission order, different users run concurrently up to a bound
+shared by all batches of the process
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.system_definitions import get_performance_config
+from src.utils.utils import setup_logger, log_performance_metrics
+from .deadline import request_deadline
+
+
+@dataclass
+class BatchItem:
+    """One message of a batch"""
+    user_id: str
+    message: str
+    item_id: Optional[str] = None  # Caller's identifier, echoed back in the result
+    context: Optional[Dict[str, Any]] = None
+
+
+class BatchProcessor:
+    """
+    Processes batches through process_message_ai with bounded concurrency
+    Each user's messages form one sequential group, so conversation context
+    builds up exactly as it would have for the live messages. batch_concurrency
+    bounds the groups running at once across all batches, so parallel batch
+    requests cannot multiply the load on the AI pipeline
+    """
+
+    def __init__(self):
+        self.logger = setup_logger(__name__)
+        self.performance_config = get_performance_config()
+
+        self.concurrency = self.performance_config.get('batch_concurrency', 8)
+        self.item_timeout = self.performance_config.get('batch_item_timeout_seconds', 30)
+        self.max_items = self.performance_config.get('batch_max_items', 1000)
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+        self.logger.info(f"Batch processor initialized (concurrency: {self.concurrency}, "
+                         f"item timeout: {self.item_timeout}s)")
+
+    async def process(self, items: Iterable[BatchItem],
+                      concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a batch, yielding each result as soon as it is ready
+
+        Results of one user come out in submission order; results of different
+        users interleave. Closing the iterator early cancels the remaining work.
+
+        Args:
+            items: Messages to process
+            concurrency: Users of this batch processed at once (capped at batch_concurrency)
+
+        Yields:
+            Result dict per item with its index in the batch, see _process_item
+
+        Raises:
+            ValueError: If the batch has more than batch_max_items items
+        """
+        items = list(items)
+        if len(items) > self.max_items:
+            raise ValueError(f"Batch has {len(items)} items, limit is {self.max_items}")
+
+        groups: "OrderedDict[str, List[Tuple[int, BatchItem]]]" = OrderedDict()
+        for index, item in enumerate(items):
+            groups.setdefault(item.user_id, []).append((index, item))
+
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(max(1, min(concurrency or self.concurrency, self.concurrency)))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def run_group(entries: List[Tuple[int, BatchItem]]) -> None:
+            async with semaphore, self._slots:
+                for index, item in entries:
+                    await results.put(await self._process_item(index, item))
+
+        tasks = [asyncio.create_task(run_group(entries)) for entries in groups.values()]
+        succeeded = 0
+        try:
+            for _ in range(len(items)):
+                result = await results.get()
+                succeeded += result['success']
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            log_performance_metrics(self.logger, "batch_processing", time.time() - start_time,
+                                    succeeded == len(items), {
+                                        "items": len(items),
+                                        "users": len(groups),
+                                        "succeeded": succeeded
+                                    })
+
+    async def process_all(self, items: Iterable[BatchItem],
+                          concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Process a batch and collect the results
+
+        Args:
+            items: Messages to process
+            concurrency: Users of this batch processed at once (capped at batch_concurrency)
+
+        Returns:
+            Result dicts in submission order
+        """
+        results = [result async for result in self.process(items, concurrency)]
+        return sorted(results, key=lambda result: result['index'])
+
+    async def _process_item(self, index: int, item: BatchItem) -> Dict[str, Any]:
+        """Run one message through the AI pipeline, never raises"""
+        # Import here to avoid circular imports
+        from .ai_engine import process_message_ai
+
+        start_time = time.time()
+        error = None
+        try:
+            with request_deadline(start_time + self.item_timeout):
+                result = await asyncio.wait_for(
+                    process_message_ai(item.message, item.user_id, item.context),
+                    timeout=self.item_timeout
+                )
+        except asyncio.TimeoutError:
+            result, error = {}, f"timeout after {self.item_timeout}s"
+        except Exception as e:
+            self.logger.error(f"Batch item {index} for user {item.user_id} failed: {e}")
+            result, error = {}, str(e)
+
+        response = {
+            'index': index,
+            'id': item.item_id,
+            'user_id': item.user_id,
+            'response': result.get('response', ''),
+            'success': result.get('success', False),
+            'intent': result.get('intent'),
+            'confidence': result.get('confidence'),
+            'service_used': result.get('service_used'),
+            'processing_time': time.time() - start_time
+        }
+        if error is not None:
+            response['error'] = error
+        return response
+
+
+# Global batch processor instance
+_batch_processor = None
+
+def get_batch_processor() -> BatchProcessor:
+    """Get global batch processor instance"""
+    global _batch_processor
+    if _batch_processor is None:
+        _batch_processor = BatchProcessor()
+    return _batch_processor
+
+
+# Convenience functions
+def process_messages_batch(items: Iterable[BatchItem],
+                           concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Process a batch, yielding results as they complete"""
+    return get_batch_processor().process(items, concurrency)
+
+
+async def process_messages_batch_all(items: Iterable[BatchItem],
+                                     concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Process a batch and return the results in submission order"""
+    return await get_batch_processor().process_all(items, concurrency)
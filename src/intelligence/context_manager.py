@@ -1,6 +1,7 @@
 """
 Redis-based Context Management for XOFlowers AI Agent
 Conversation history storage, retrieval, and context compression
+Falls back to the embedded SQLite user store when Redis is unavailable
 """
 
 import json
@@ -10,7 +11,6 @@ from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, asdict
 
 try:
-    import redis
     from redis.exceptions import ConnectionError, TimeoutError, RedisError
     REDIS_AVAILABLE = True
 except ImportError:
@@ -21,8 +21,86 @@ except ImportError:
     class TimeoutError(Exception): pass
     class RedisError(Exception): pass
 
+from src.data.redis_connection import create_redis_client, describe_redis_target, uses_hash_tags, user_key, user_id_from_key
 from src.utils.system_definitions import get_service_config, get_performance_config
-from src.utils.utils import setup_logger, log_performance_metrics, log_fallback_activation
+from .cpu_executor import decode_json
+from src.utils.utils import setup_logger, log_performance_metrics, log_fallback_activation, log_cache_operation
+from src.helpers.tracing import traced
+
+# Exchanges included in the AI-ready summary
+SUMMARY_RECENT_MESSAGES = 3
+
+# Append one message to the stored history and fold it into the materialized summary in a
+# single round trip. The summary is updated from the new message only; it is derived from
+# the history just once, for contexts saved before summaries existed.
+# Preferences are stored as a JSON string so they pass through unchanged: cjson can't tell an
+# empty array from an empty object and would write [] back as {}.
+# KEYS: context key, summary key (same hash slot)
+# ARGV: message JSON, user_id, max history, TTL seconds, summary size
+APPEND_MESSAGE_SCRIPT = """
+local message = cjson.decode(ARGV[1])
+local max_messages = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local recent_count = tonumber(ARGV[5])
+
+local raw = redis.call('GET', KEYS[1])
+local context
+if raw then
+    context = cjson.decode(raw)
+else
+    context = {user_id = ARGV[2], messages = {}, preferences = '{}', total_messages = 0}
+end
+
+local messages = context['messages']
+table.insert(messages, message)
+while #messages > max_messages do
+    table.remove(messages, 1)
+end
+context['total_messages'] = (tonumber(context['total_messages']) or 0) + 1
+context['last_updated'] = message['timestamp']
+
+local function summary_entry(msg)
+    return {user = msg['user'], assistant = msg['assistant'], intent = msg['intent'], timestamp = msg['timestamp']}
+end
+
+local summary_raw = redis.call('GET', KEYS[2])
+local summary
+if summary_raw then
+    summary = cjson.decode(summary_raw)
+end
+if summary and summary['recent_messages'] then
+    table.insert(summary['recent_messages'], summary_entry(message))
+    while #summary['recent_messages'] > recent_count do
+        table.remove(summary['recent_messages'], 1)
+    end
+else
+    local recent = {}
+    for i = math.max(1, #messages - recent_count + 1), #messages do
+        table.insert(recent, summary_entry(messages[i]))
+    end
+    summary = {recent_messages = recent, preferences = context['preferences']}
+end
+summary['total_messages'] = context['total_messages']
+summary['conversation_started'] = messages[1]['timestamp']
+
+redis.call('SET', KEYS[1], cjson.encode(context), 'EX', ttl)
+redis.call('SET', KEYS[2], cjson.encode(summary), 'EX', ttl)
+return context['total_messages']
+"""
+
+
+def _encode_stored(data: Dict[str, Any]) -> str:
+    """Serialize a context or summary for Redis with preferences as a JSON string"""
+    if 'preferences' in data:
+        data = dict(data, preferences=json.dumps(data['preferences'], ensure_ascii=False))
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _decode_preferences(preferences: Any) -> Dict[str, Any]:
+    """Preferences as stored in Redis (JSON string, or an object in entries written before)"""
+    if isinstance(preferences, str):
+        return json.loads(preferences)
+    return preferences or {}
 
 
 @dataclass
@@ -61,7 +139,7 @@ class ConversationContext:
         return cls(
             user_id=data['user_id'],
             messages=messages,
-            preferences=data.get('preferences', {}),
+            preferences=_decode_preferences(data.get('preferences')),
             last_updated=data['last_updated'],
             total_messages=data.get('total_messages', len(messages))
         )
@@ -77,13 +155,21 @@ class ContextManager:
         
         # Initialize Redis connection
         self.redis_client = None
+        self.redis_mode = self.service_config['redis'].get('mode', 'standalone')
+        self.hash_tag_keys = False
         self.redis_available = self._setup_redis()
         
         # Context settings
         self.max_messages = self.performance_config['max_conversation_history']
         self.cleanup_interval = self.performance_config['context_cleanup_interval_hours']
+        self.context_ttl_hours = self.performance_config.get('context_ttl_hours', 24)
+        self._append_script = None
+        
+        # Durable embedded store used when Redis is unavailable
+        self.user_store_enabled = self.service_config.get('user_store', {}).get('enabled', False)
         
-        self.logger.info(f"Context Manager initialized (Redis available: {self.redis_available})")
+        self.logger.info(f"Context Manager initialized (Redis available: {self.redis_available}, "
+                         f"user store: {self.user_store_enabled})")
     
     def _setup_redis(self) -> bool:
         """Initialize Redis connection with error handling"""
@@ -93,19 +179,12 @@ class ContextManager:
             
         try:
             redis_config = self.service_config['redis']
-            self.redis_client = redis.Redis(
-                host=redis_config['host'],
-                port=redis_config['port'],
-                db=redis_config['db'],
-                decode_responses=redis_config['decode_responses'],
-                socket_timeout=redis_config['socket_timeout'],
-                socket_connect_timeout=redis_config['socket_connect_timeout'],
-                retry_on_timeout=redis_config['retry_on_timeout']
-            )
+            self.hash_tag_keys = uses_hash_tags(redis_config)
+            self.redis_client = create_redis_client(redis_config)
             
             # Test connection
             self.redis_client.ping()
-            self.logger.info("Redis connection established successfully")
+            self.logger.info(f"Redis connection established successfully ({describe_redis_target(redis_config)})")
             return True
             
         except Exception as e:
@@ -113,10 +192,51 @@ class ContextManager:
             self.redis_client = None
             return False
     
+    def _list_keys(self, pattern: str) -> List[str]:
+        """List keys matching pattern (cluster KEYS only reaches one node, so scan all primaries)"""
+        if self.redis_mode == 'cluster':
+            return list(self.redis_client.scan_iter(match=pattern))
+        return self.redis_client.keys(pattern)
+    
     def _get_context_key(self, user_id: str) -> str:
         """Generate Redis key for user context"""
-        return f"xoflowers:context:{user_id}"
+        return user_key("xoflowers:context:", user_id, self.hash_tag_keys)
     
+    def _get_summary_key(self, user_id: str) -> str:
+        """Generate Redis key for materialized AI-ready context summary"""
+        return user_key("xoflowers:context_summary:", user_id, self.hash_tag_keys)
+    
+    def _use_user_store(self) -> bool:
+        """Check if context operations should go to the embedded user store"""
+        return not self.redis_available and self.user_store_enabled
+    
+    def _get_user_store(self):
+        """Get embedded user store (imported lazily to keep SQLite off the Redis path)"""
+        from src.data.user_store import get_user_store
+        return get_user_store()
+    
+    async def _get_context_from_store(self, user_id: str) -> Optional[ConversationContext]:
+        """Build conversation context from the embedded user store"""
+        try:
+            store = self._get_user_store()
+            profile = await store.get_profile(user_id)
+            if profile is None:
+                return None
+            
+            messages = await store.get_recent_messages(user_id, self.max_messages)
+            return ConversationContext(
+                user_id=user_id,
+                messages=[ConversationMessage(**msg) for msg in messages],
+                preferences=profile.get('preferences', {}),
+                last_updated=profile.get('last_interaction') or datetime.now().isoformat(),
+                total_messages=profile.get('conversation_count', len(messages))
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Failed to retrieve context from user store for user {user_id}: {e}")
+            return None
+    
+    @traced("context.get")
     async def get_context(self, user_id: str) -> Optional[ConversationContext]:
         """
         Retrieve conversation context for user
@@ -127,6 +247,9 @@ class ContextManager:
         Returns:
             ConversationContext or None if not found/Redis unavailable
         """
+        if self._use_user_store():
+            return await self._get_context_from_store(user_id)
+        
         if not self.redis_available:
             self.logger.debug(f"Redis unavailable, returning empty context for user {user_id}")
             return None
@@ -140,7 +263,7 @@ class ContextManager:
             duration = time.time() - start_time
             
             if context_data:
-                context_dict = json.loads(context_data)
+                context_dict = await decode_json(context_data, "context_decode")
                 context = ConversationContext.from_dict(context_dict)
                 
                 log_performance_metrics(self.logger, "redis_context_get", duration, True, 
@@ -169,13 +292,14 @@ class ContextManager:
             self.logger.error(f"Failed to retrieve context for user {user_id}: {e}")
             return None
     
-    async def save_context(self, context: ConversationContext, ttl_hours: int = 24) -> bool:
+    @traced("context.save")
+    async def save_context(self, context: ConversationContext, ttl_hours: Optional[int] = None) -> bool:
         """
         Save conversation context to Redis
         
         Args:
             context: ConversationContext to save
-            ttl_hours: Time to live in hours
+            ttl_hours: Time to live in hours (defaults to the configured context TTL)
         
         Returns:
             True if saved successfully, False otherwise
@@ -188,11 +312,16 @@ class ContextManager:
         
         try:
             key = self._get_context_key(context.user_id)
-            context_json = json.dumps(context.to_dict(), ensure_ascii=False)
+            context_json = _encode_stored(context.to_dict())
             
-            # Set with TTL
-            ttl_seconds = ttl_hours * 3600
-            self.redis_client.setex(key, ttl_seconds, context_json)
+            # Set with TTL; context and summary share the user's hash slot, so one pipeline works in cluster mode
+            ttl_seconds = (ttl_hours or self.context_ttl_hours) * 3600
+            pipe = self.redis_client.pipeline()
+            pipe.setex(key, ttl_seconds, context_json)
+            
+            # Materialize AI-ready summary next to the full history so reads skip parsing it
+            self._save_summary(context.user_id, self.get_context_summary(context), ttl_seconds, pipe)
+            pipe.execute()
             
             duration = time.time() - start_time
             log_performance_metrics(self.logger, "redis_context_save", duration, True,
@@ -215,6 +344,51 @@ class ContextManager:
             self.logger.error(f"Failed to save context for user {context.user_id}: {e}")
             return False
     
+    def _save_summary(self, user_id: str, summary: Dict[str, Any], ttl_seconds: int, client=None) -> None:
+        """Store materialized context summary with the same TTL as the full context"""
+        (client or self.redis_client).set(self._get_summary_key(user_id), _encode_stored(summary), ex=ttl_seconds)
+    
+    @traced("context.get_ai_context")
+    async def get_ai_context(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get AI-ready context summary for user
+        
+        Reads the small materialized summary key; only contexts written before
+        summaries existed (or served from the user store) are rebuilt from history.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            Context summary for AI processing (empty dict if no context)
+        """
+        if self.redis_available:
+            start_time = time.time()
+            try:
+                summary_data = self.redis_client.get(self._get_summary_key(user_id))
+                log_cache_operation(self.logger, "context_summary_get", user_id,
+                                    summary_data is not None, time.time() - start_time)
+                if summary_data:
+                    summary = json.loads(summary_data)
+                    if 'preferences' in summary:
+                        summary['preferences'] = _decode_preferences(summary['preferences'])
+                    return summary
+            except Exception as e:
+                self.logger.warning(f"Failed to read context summary for user {user_id}: {e}")
+        
+        context = await self.get_context(user_id)
+        summary = self.get_context_summary(context) if context else {}
+        
+        # Backfill summary for contexts saved before it was materialized
+        if summary and self.redis_available:
+            try:
+                self._save_summary(user_id, summary, self.context_ttl_hours * 3600)
+            except Exception as e:
+                self.logger.debug(f"Context summary backfill skipped for user {user_id}: {e}")
+        
+        return summary
+    
+    @traced("context.add_message")
     async def add_message(self, user_id: str, user_message: str, assistant_response: str,
                          intent: Optional[str] = None, confidence: Optional[float] = None) -> bool:
         """
@@ -230,19 +404,26 @@ class ContextManager:
         Returns:
             True if added successfully, False otherwise
         """
-        # Get existing context or create new one
-        context = await self.get_context(user_id)
-        
-        if context is None:
-            context = ConversationContext(
-                user_id=user_id,
-                messages=[],
-                preferences={},
-                last_updated=datetime.now().isoformat(),
-                total_messages=0
+        if self._use_user_store():
+            # Single row insert instead of rewriting the whole history
+            message = ConversationMessage(
+                user=user_message,
+                assistant=assistant_response,
+                timestamp=datetime.now().isoformat(),
+                intent=intent,
+                confidence=confidence
             )
+            try:
+                await self._get_user_store().append_message(user_id, asdict(message))
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to store message for user {user_id}: {e}")
+                return False
+        
+        if not self.redis_available:
+            self.logger.debug(f"Redis unavailable, cannot save message for user {user_id}")
+            return False
         
-        # Create new message
         new_message = ConversationMessage(
             user=user_message,
             assistant=assistant_response,
@@ -251,16 +432,36 @@ class ContextManager:
             confidence=confidence
         )
         
-        # Add message and update context
-        context.messages.append(new_message)
-        context.total_messages += 1
-        context.last_updated = datetime.now().isoformat()
-        
-        # Apply context compression if needed
-        context = self._compress_context(context)
+        start_time = time.time()
         
-        # Save updated context
-        return await self.save_context(context)
+        try:
+            # Append, compress and update the summary server-side without reading the history here
+            if self._append_script is None:
+                self._append_script = self.redis_client.register_script(APPEND_MESSAGE_SCRIPT)
+            total_messages = self._append_script(
+                keys=[self._get_context_key(user_id), self._get_summary_key(user_id)],
+                args=[json.dumps(asdict(new_message), ensure_ascii=False), user_id,
+                      self.max_messages, self.context_ttl_hours * 3600, SUMMARY_RECENT_MESSAGES]
+            )
+            
+            duration = time.time() - start_time
+            log_performance_metrics(self.logger, "redis_context_save", duration, True,
+                                  {"user_id": user_id, "total_messages": total_messages})
+            return True
+            
+        except (ConnectionError, TimeoutError) as e:
+            duration = time.time() - start_time
+            log_performance_metrics(self.logger, "redis_context_save", duration, False,
+                                  {"error": str(e), "user_id": user_id})
+            log_fallback_activation(self.logger, "Redis", "no_save", f"Message save failed: {e}", user_id)
+            return False
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            log_performance_metrics(self.logger, "redis_context_save", duration, False,
+                                  {"error": str(e), "user_id": user_id})
+            self.logger.error(f"Failed to save message for user {user_id}: {e}")
+            return False
     
     def _compress_context(self, context: ConversationContext) -> ConversationContext:
         """
@@ -292,6 +493,14 @@ class ContextManager:
         Returns:
             True if updated successfully, False otherwise
         """
+        if self._use_user_store():
+            try:
+                await self._get_user_store().update_preferences(user_id, preferences)
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to update preferences for user {user_id}: {e}")
+                return False
+        
         context = await self.get_context(user_id)
         
         if context is None:
@@ -337,12 +546,19 @@ class ContextManager:
         Returns:
             True if cleared successfully, False otherwise
         """
+        if self._use_user_store():
+            try:
+                return await self._get_user_store().delete_user(user_id)
+            except Exception as e:
+                self.logger.error(f"Failed to clear context for user {user_id}: {e}")
+                return False
+        
         if not self.redis_available:
             return False
         
         try:
             key = self._get_context_key(user_id)
-            result = self.redis_client.delete(key)
+            result = self.redis_client.delete(key, self._get_summary_key(user_id))
             
             self.logger.info(f"Cleared context for user {user_id}")
             return result > 0
@@ -358,13 +574,21 @@ class ContextManager:
         Returns:
             Number of contexts cleaned up
         """
+        if self._use_user_store():
+            try:
+                cutoff_time = datetime.now() - timedelta(hours=self.cleanup_interval)
+                return await self._get_user_store().cleanup_inactive(cutoff_time)
+            except Exception as e:
+                self.logger.error(f"User store cleanup failed: {e}")
+                return 0
+        
         if not self.redis_available:
             return 0
         
         try:
             # Get all context keys
             pattern = "xoflowers:context:*"
-            keys = self.redis_client.keys(pattern)
+            keys = self._list_keys(pattern)
             
             cleaned_count = 0
             cutoff_time = datetime.now() - timedelta(hours=self.cleanup_interval)
@@ -377,7 +601,8 @@ class ContextManager:
                         last_updated = datetime.fromisoformat(context_dict['last_updated'])
                         
                         if last_updated < cutoff_time:
-                            self.redis_client.delete(key)
+                            user_id = user_id_from_key(key)
+                            self.redis_client.delete(key, self._get_summary_key(user_id))
                             cleaned_count += 1
                             
                 except Exception as e:
@@ -406,7 +631,7 @@ class ContextManager:
         if not context or not context.messages:
             return {}
         
-        recent_messages = context.messages[-3:]  # Last 3 exchanges
+        recent_messages = context.messages[-SUMMARY_RECENT_MESSAGES:]
         
         return {
             "recent_messages": [
@@ -452,8 +677,7 @@ async def add_conversation_message(user_id: str, user_message: str, assistant_re
 async def get_context_for_ai(user_id: str) -> Dict[str, Any]:
     """Get context summary for AI processing"""
     manager = get_context_manager()
-    context = await manager.get_context(user_id)
-    return manager.get_context_summary(context) if context else {}
+    return await manager.get_ai_context(user_id)
 
 
 async def update_user_preferences(user_id: str, preferences: Dict[str, Any]) -> bool:
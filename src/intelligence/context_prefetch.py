@@ -0,0 +1,180 @@
+"""
+Context Prefetching for XOFlowers AI Agent
+Starts user context retrieval as soon as a webhook is parsed and keeps a small warm cache of recently active users
+A warm entry serves one accepted message only; it is re-warmed after that message's context save
+Prefetches and re-warms never share a fetch, so context read before a save never reaches the warm cache
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from src.helpers.system_definitions import get_performance_config
+from src.helpers.utils import setup_logger, log_cache_operation
+from src.helpers.monitoring import register_cache_size
+
+
+class ContextPrefetcher:
+    """
+    Launches context, preferences and chat-session rehydration off the critical path
+    Results are handed to the AI engine through the existing `context` parameter
+    """
+
+    def __init__(self):
+        self.logger = setup_logger(__name__)
+        self.performance_config = get_performance_config()
+
+        # Warm cache of recently active users (LRU ordered, oldest first)
+        self._warm_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = self.performance_config.get('context_warm_cache_size', 1000)
+        self._cache_ttl = self.performance_config.get('context_warm_cache_ttl_seconds', 60)
+        register_cache_size('context_warm', lambda: len(self._warm_cache))
+
+        # In-flight fetches by (user, warm) so concurrent webhooks for one user share a single lookup;
+        # a prefetch joining a re-warm would hand out (and a re-warm joining a prefetch would cache)
+        # context read before the save that triggered the re-warm
+        self._inflight: Dict[Tuple[str, bool], asyncio.Task] = {}
+
+        self.logger.info(f"Context prefetcher initialized (warm cache size: {self._cache_size}, "
+                         f"TTL: {self._cache_ttl}s)")
+
+    def prefetch(self, user_id: str) -> asyncio.Future:
+        """
+        Start fetching context for an accepted message without waiting for it
+
+        The warm entry is consumed, so a second message arriving before this
+        one's context is saved fetches from the store instead of reusing it.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            Awaitable resolving to the context dict, or None if retrieval failed (never raises)
+        """
+        cached = self._get_cached(user_id)
+        if cached is not None:
+            self.invalidate(user_id)
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(cached)
+            return future
+
+        return self._start_fetch(user_id, warm=False)
+
+    def _start_fetch(self, user_id: str, warm: bool) -> asyncio.Task:
+        """Start a fetch for user, sharing one of the same kind already in flight"""
+        key = (user_id, warm)
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch(user_id, warm))
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, user_id: str, warm: bool) -> Optional[Dict[str, Any]]:
+        """Fetch context and rehydrate the chat session for user"""
+        try:
+            return await self._fetch_and_warm(user_id, warm)
+        finally:
+            self._inflight.pop((user_id, warm), None)
+
+    async def _fetch_and_warm(self, user_id: str, warm: bool) -> Optional[Dict[str, Any]]:
+        """Load enhanced context, rehydrate the chat session and optionally store the warm entry"""
+        start_time = time.time()
+
+        try:
+            # Import here to avoid circular imports
+            from .gemini_chat_manager import get_enhanced_context_for_ai
+            context = await get_enhanced_context_for_ai(user_id)
+        except Exception as e:
+            self.logger.warning(f"Context prefetch failed for user {user_id}: {e}")
+            return None
+
+        # Rehydrate the engine's chat session so generation doesn't pay for it later
+        try:
+            from .ai_engine import get_ai_engine
+            get_ai_engine().rehydrate_chat(user_id)
+        except Exception as e:
+            self.logger.debug(f"Chat session rehydration skipped for user {user_id}: {e}")
+
+        if warm:
+            # Only contexts read after a save are complete enough to serve the next message
+            self._store(user_id, context)
+        self.logger.debug(f"Prefetched context for user {user_id} in {time.time() - start_time:.3f}s")
+        return context
+
+    def _get_cached(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get warm context if present and not expired"""
+        entry = self._warm_cache.get(user_id)
+
+        if entry is None:
+            log_cache_operation(self.logger, "context_warm_get", user_id, False)
+            return None
+
+        if time.time() - entry['timestamp'] >= self._cache_ttl:
+            del self._warm_cache[user_id]
+            log_cache_operation(self.logger, "context_warm_get", user_id, False)
+            return None
+
+        self._warm_cache.move_to_end(user_id)
+        log_cache_operation(self.logger, "context_warm_get", user_id, True)
+        return entry['context']
+
+    def _store(self, user_id: str, context: Dict[str, Any]) -> None:
+        """Store context in the warm cache, evicting least recently used users"""
+        self._warm_cache[user_id] = {
+            'context': context,
+            'timestamp': time.time()
+        }
+        self._warm_cache.move_to_end(user_id)
+
+        while len(self._warm_cache) > self._cache_size:
+            self._warm_cache.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop warm context for user (call when the conversation may have changed)"""
+        self._warm_cache.pop(user_id, None)
+
+    def refresh(self, user_id: str) -> None:
+        """Invalidate and re-warm context for an active user in the background"""
+        self.invalidate(user_id)
+        try:
+            self._start_fetch(user_id, warm=True)
+        except RuntimeError:
+            # No running event loop - the next request will fetch on demand
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get warm cache statistics for monitoring"""
+        return {
+            'warm_entries': len(self._warm_cache),
+            'max_entries': self._cache_size,
+            'ttl_seconds': self._cache_ttl,
+            'inflight_fetches': len(self._inflight)
+        }
+
+
+# Global context prefetcher instance
+_context_prefetcher = None
+
+def get_context_prefetcher() -> ContextPrefetcher:
+    """Get global context prefetcher instance"""
+    global _context_prefetcher
+    if _context_prefetcher is None:
+        _context_prefetcher = ContextPrefetcher()
+    return _context_prefetcher
+
+
+# Convenience functions
+def prefetch_user_context(user_id: str) -> asyncio.Future:
+    """Start fetching context for user, returns an awaitable for the `context` parameter (None on failure)"""
+    return get_context_prefetcher().prefetch(user_id)
+
+
+def refresh_user_context(user_id: str) -> None:
+    """Re-warm context after the conversation for user was updated"""
+    get_context_prefetcher().refresh(user_id)
+
+
+def invalidate_user_context(user_id: str) -> None:
+    """Drop warm context for user without re-warming it"""
+    get_context_prefetcher().invalidate(user_id)
@@ -0,0 +1,199 @@
+"""
+CPU Stage Executor for XOFlowers AI Agent
+Runs CPU-bound pure Python stages (keyword scans, scoring, large JSON documents) off the event loop
+Stage latency and event-loop lag are recorded in the metrics registry for monitoring
+"""
+
+import asyncio
+import inspect
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import types
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.system_definitions import get_performance_config
+from src.utils.utils import setup_logger, log_performance_metrics
+from src.helpers.monitoring import get_metrics_registry, operation_summaries
+
+POOL_TYPES = ('process', 'thread', 'inline')
+
+# Performance metric operation name of a stage
+STAGE_OPERATION_PREFIX = 'cpu_stage_'
+
+
+def _is_module_function(func: Callable) -> bool:
+    """Module-level functions are pickled by reference; methods and closures ship their whole state"""
+    if isinstance(func, types.BuiltinFunctionType):
+        owner = getattr(func, '__self__', None)
+        return owner is None or isinstance(owner, types.ModuleType)
+    qualname = getattr(func, '__qualname__', '')
+    return inspect.isfunction(func) and '.' not in qualname and '<' not in qualname
+
+
+class CPUStageExecutor:
+    """
+    Executor abstraction for CPU-bound stages of the message pipeline
+    Pool type and size come from PERFORMANCE_CONFIG (process, thread or inline)
+    """
+
+    def __init__(self, pool_type: Optional[str] = None, max_workers: Optional[int] = None):
+        self.logger = setup_logger(__name__)
+        self.performance_config = get_performance_config()
+
+        self.pool_type = pool_type or self.performance_config.get('cpu_pool_type', 'thread')
+        if self.pool_type not in POOL_TYPES:
+            self.logger.warning(f"Unknown CPU pool type '{self.pool_type}', using inline execution")
+            self.pool_type = 'inline'
+
+        self.max_workers = max_workers or self.performance_config.get('cpu_pool_workers') or min(4, os.cpu_count() or 1)
+        self.offload_min_bytes = self.performance_config.get('cpu_offload_min_bytes', 32768)
+
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+
+        self._loop_lag_metric = get_metrics_registry().histogram(
+            'xoflowers_event_loop_lag_seconds', "Delay of event-loop wakeups past their schedule")
+        self._lag_task: Optional[asyncio.Task] = None
+
+        self.logger.info(f"CPU stage executor initialized (pool: {self.pool_type}, workers: {self.max_workers})")
+
+    def _get_executor(self) -> Optional[Executor]:
+        """Create worker pool lazily so importing the module never forks"""
+        if self.pool_type == 'inline':
+            return None
+
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.pool_type == 'process':
+                        # The app already runs threads (loop, monitors), so never fork it directly
+                        methods = multiprocessing.get_all_start_methods()
+                        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix="cpu-stage")
+        return self._executor
+
+    async def run(self, stage: str, func: Callable, *args, offload: bool = True, **kwargs) -> Any:
+        """
+        Run CPU-bound stage in the worker pool
+
+        Args:
+            stage: Stage name used for histograms and performance logs
+            func: Callable; only module-level functions with small arguments are sent to a process
+                  pool, anything else runs in a thread
+            *args: Positional arguments for func
+            offload: Set False to run inline (e.g. payload too small to be worth the round trip)
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        start_time = time.perf_counter()
+        call = partial(func, *args, **kwargs)
+        success = True
+
+        try:
+            executor = self._get_executor() if offload else None
+            if executor is None:
+                return call()
+
+            if self.pool_type == 'process' and not _is_module_function(func):
+                return await asyncio.to_thread(call)
+
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, call)
+            except (pickle.PicklingError, BrokenProcessPool) as e:
+                # Stage can't cross the process boundary - keep serving requests from a thread
+                self.logger.warning(f"CPU stage '{stage}' could not be offloaded ({e}), running in a thread")
+                if isinstance(e, BrokenProcessPool):
+                    self._reset_executor()
+                return await asyncio.to_thread(call)
+
+        except Exception:
+            success = False
+            raise
+
+        finally:
+            duration = time.perf_counter() - start_time
+            log_performance_metrics(self.logger, f"{STAGE_OPERATION_PREFIX}{stage}", duration, success)
+
+    def _reset_executor(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def loads(self, data: str, stage: str = "json_decode") -> Any:
+        """Decode JSON, offloading only documents large enough to stall the loop"""
+        return await self.run(stage, json.loads, data, offload=len(data) >= self.offload_min_bytes)
+
+    # Event-loop lag monitoring
+
+    def start_lag_monitor(self, interval: float = 0.1) -> None:
+        """Start background task sampling event-loop lag (call from the running loop)"""
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.get_running_loop().create_task(self._monitor_lag(interval))
+
+    async def _monitor_lag(self, interval: float) -> None:
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._loop_lag_metric.labels().observe(lag)
+
+    def stop_lag_monitor(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool configuration, per-stage latency and event-loop lag from the metrics registry"""
+        return {
+            'pool_type': self.pool_type,
+            'max_workers': self.max_workers,
+            'stages': {
+                operation[len(STAGE_OPERATION_PREFIX):]: summary
+                for operation, summary in operation_summaries().items()
+                if operation.startswith(STAGE_OPERATION_PREFIX)
+            },
+            'event_loop_lag': self._loop_lag_metric.labels().snapshot()
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop lag monitor and worker pool"""
+        self.stop_lag_monitor()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+# Global CPU stage executor instance
+_cpu_executor = None
+
+def get_cpu_executor() -> CPUStageExecutor:
+    """Get global CPU stage executor instance"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = CPUStageExecutor()
+    return _cpu_executor
+
+
+# Convenience functions
+async def run_cpu_stage(stage: str, func: Callable, *args, **kwargs) -> Any:
+    """Run CPU-bound stage in the global worker pool"""
+    return await get_cpu_executor().run(stage, func, *args, **kwargs)
+
+
+async def decode_json(data: str, stage: str = "json_decode") -> Any:
+    """Decode JSON document, offloading large documents to the worker pool"""
+    return await get_cpu_executor().loads(data, stage)
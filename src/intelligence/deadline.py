@@ -0,0 +1,135 @@
+"""
+Request Deadlines for XOFlowers AI Agent
+Request-scoped deadline carried through the pipeline in a context variable
+Each stage sizes its own timeout from the time left and stops when the deadline passes
+"""
+
+import asyncio
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional
+
+from src.helpers.tracing import start_span
+
+# Absolute time.time() by which the response is due (None = no deadline)
+_request_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Stage could not finish before the request deadline"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded in stage '{stage}'")
+        self.stage = stage
+
+
+@contextmanager
+def request_deadline(deadline: Optional[float]) -> Iterator[None]:
+    """
+    Set the deadline for all pipeline stages run inside the block
+
+    Tasks and threads started inside the block inherit it. A deadline set
+    by an outer caller is only ever tightened, never extended.
+
+    Args:
+        deadline: Absolute time.time() by which the response is due
+    """
+    current = _request_deadline.get()
+    if deadline is not None and current is not None:
+        deadline = min(deadline, current)
+    token = _request_deadline.set(deadline if deadline is not None else current)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    """Get deadline of the current request"""
+    return _request_deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the deadline (None when the request has no deadline)"""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def stage_timeout(default: float, reserve: float = 0.0, stage: str = "stage") -> float:
+    """
+    Timeout for a stage: its own default, capped by the time left
+
+    Args:
+        default: Stage timeout without a deadline
+        reserve: Seconds to keep for later stages (e.g. final generation)
+        stage: Stage name for the error
+
+    Returns:
+        Timeout in seconds
+
+    Raises:
+        DeadlineExceeded: If no time is left for the stage
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return default
+    timeout = min(default, remaining - reserve)
+    if timeout <= 0:
+        raise DeadlineExceeded(stage)
+    return timeout
+
+
+def http_timeout_ms(default: float, reserve: float = 0.0, stage: str = "stage") -> int:
+    """
+    Stage timeout in milliseconds for SDK calls that take a per-request HTTP timeout
+
+    Blocking SDK calls run in worker threads that a cancelled wait_for can't stop;
+    passing this timeout ends the HTTP request itself when the stage's time is up.
+
+    Args:
+        default: Stage timeout without a deadline (seconds)
+        reserve: Seconds to keep for later stages
+        stage: Stage name for the error
+
+    Returns:
+        Timeout in milliseconds
+
+    Raises:
+        DeadlineExceeded: If no time is left for the stage
+    """
+    return max(1, int(stage_timeout(default, reserve, stage) * 1000))
+
+
+async def run_within_deadline(awaitable: Awaitable, stage: str, default_timeout: float,
+                              reserve: float = 0.0) -> Any:
+    """
+    Await stage in its own trace span, cancelling it when its share of the deadline runs out
+
+    Args:
+        awaitable: Coroutine or future of the stage (wrap in asyncio.shield to keep it running)
+        stage: Stage name for errors and logs
+        default_timeout: Stage timeout without a deadline
+        reserve: Seconds to keep for later stages
+
+    Returns:
+        Stage result
+
+    Raises:
+        DeadlineExceeded: If the stage could not finish in time
+    """
+    try:
+        timeout = stage_timeout(default_timeout, reserve, stage)
+    except DeadlineExceeded:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+
+    with start_span(stage, {'deadline.timeout_seconds': round(timeout, 3)}):
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage)
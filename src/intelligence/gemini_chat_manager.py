@@ -14,6 +14,7 @@ import google.generativeai as genai
 
 from src.utils.system_definitions import get_service_config, get_ai_prompts
 from src.utils.utils import setup_logger, log_performance_metrics
+from src.helpers.llm_usage import record_llm_usage
 from .context_manager import ContextManager, get_context_manager
 
 
@@ -145,6 +146,7 @@ class GeminiChatManager:
                 chat_session.send_message,
                 message
             )
+            record_llm_usage("chat", "gemini", self.service_config['gemini']['model'], response)
             
             # Update session info
             if user_id in self.active_chats:
@@ -173,12 +175,13 @@ class GeminiChatManager:
             self.logger.error(f"Gemini chat message failed for user {user_id}: {e}")
             return None
     
-    async def get_conversation_history(self, user_id: str) -> List[Dict[str, Any]]:
+    async def get_conversation_history(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get conversation history from Gemini chat
         
         Args:
             user_id: User identifier
+            limit: Only convert the most recent messages (optional)
             
         Returns:
             List of conversation messages
@@ -201,8 +204,11 @@ class GeminiChatManager:
             chat = self.active_chats[user_id].chat
             history = []
             
-            # Get chat history
-            for message in chat.get_history():
+            # Get chat history (in memory; only the requested tail is converted)
+            messages = chat.get_history()
+            if limit:
+                messages = messages[-limit:]
+            for message in messages:
                 history.append({
                     "role": message.role,
                     "content": message.parts[0].text if message.parts else "",
@@ -338,13 +344,13 @@ async def get_enhanced_context_for_ai(user_id: str) -> Dict[str, Any]:
     # Try to get context from Gemini chat first
     if gemini_manager.gemini_available and user_id in gemini_manager.active_chats:
         try:
-            history = await gemini_manager.get_conversation_history(user_id)
+            history = await gemini_manager.get_conversation_history(user_id, limit=6)  # Last 3 exchanges
             
             if history:
                 return {
-                    "recent_messages": history[-6:],  # Last 6 messages (3 exchanges)
+                    "recent_messages": history,
                     "conversation_type": "gemini_chat",
-                    "total_messages": len(history),
+                    "total_messages": gemini_manager.active_chats[user_id].message_count,
                     "session_active": True
                 }
         except Exception as e:
@@ -9,6 +9,7 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 
 from src.utils.utils import setup_logger
+from src.intelligence.cpu_executor import run_cpu_stage
 from src.data.chromadb_client import search_products, search_products_with_filters, is_chromadb_available
 
 logger = setup_logger(__name__)
@@ -49,14 +50,16 @@ class ProductRecommender:
             List of ProductRecommendation objects
         """
         try:
-            # Extract search parameters
-            search_params = self._extract_search_parameters(user_message, intent_data, user_preferences)
+            # Extract search parameters (microsecond keyword scans - timed, but not worth a pool round trip)
+            search_params = await run_cpu_stage("extract_search_parameters", self._extract_search_parameters,
+                                                user_message, intent_data, user_preferences, offload=False)
             
             # Get products from ChromaDB
             products = await self._search_products_intelligently(search_params, max_recommendations * 2)
             
             # Score and rank products
-            recommendations = self._score_and_rank_products(products, search_params, max_recommendations)
+            recommendations = await run_cpu_stage("score_products", self._score_and_rank_products,
+                                                  products, search_params, max_recommendations, offload=False)
             
             # Add alternative suggestions if needed
             if len(recommendations) < max_recommendations:
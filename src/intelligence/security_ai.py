@@ -7,7 +7,7 @@ import asyncio
 import json
 import time
 from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from pydantic import BaseModel, Field
 
 from openai import OpenAI
@@ -15,11 +15,16 @@ from openai import OpenAI
 from google import genai
 from google.genai import types
 
-from src.utils.system_definitions import get_service_config, get_ai_prompts, get_security_config
+from src.utils.system_definitions import get_service_config, get_ai_prompts, get_security_config, get_performance_config
 from src.utils.utils import (
     setup_logger, log_security_check, log_fallback_activation, log_performance_metrics,
     log_error_with_monitoring, PerformanceTimer, get_performance_monitor
 )
+from src.helpers.llm_usage import record_llm_usage
+from src.security.pattern_matcher import build_security_matcher
+from .deadline import stage_timeout, http_timeout_ms, DeadlineExceeded
+from .security_classifier import SecurityClassifier
+from .security_cache import SecurityVerdictCache
 
 
 @dataclass
@@ -53,6 +58,17 @@ class SecurityAI:
         self.ai_prompts = get_ai_prompts()
         self.security_config = get_security_config()
         
+        # Time the security stage leaves for the final generation
+        self.min_generation_time = get_performance_config().get('min_generation_seconds', 1.0)
+        
+        # All pre-filter pattern lists compiled into one matcher
+        self.pattern_matcher = build_security_matcher(self.security_config)
+        # Local classifier clears confidently benign messages before the LLM check
+        self.classifier = SecurityClassifier(self.security_config.get('classifier', {}))
+        # Verdicts of repeated messages, shared across workers through Redis
+        self.verdict_cache = SecurityVerdictCache(self.security_config.get('verdict_cache', {}),
+                                                  self.service_config.get('redis'))
+        
         # Initialize AI services (reuse from ai_engine pattern)
         self._setup_openai()
         self._setup_gemini()
@@ -163,7 +179,41 @@ class SecurityAI:
                 log_security_check(self.logger, user_id, message, False, "high", basic_check['issues'])
                 return result
             
-            # Step 2: AI-powered security analysis - REQUIRED
+            # Step 2: Verdict cache - repeated messages reuse their earlier verdict
+            cached = await self.verdict_cache.get(message)
+            if cached is not None:
+                result = SecurityResult(
+                    is_safe=cached['is_safe'],
+                    risk_level=cached['risk_level'],
+                    detected_issues=cached.get('detected_issues', []),
+                    should_proceed=cached.get('should_proceed', cached['is_safe']),
+                    reason=cached.get('reason', ''),
+                    confidence=cached.get('confidence', 0.8),
+                    processing_time=time.time() - start_time,
+                    service_used="verdict_cache"
+                )
+                log_security_check(self.logger, user_id, message, result.is_safe,
+                                 result.risk_level, result.detected_issues)
+                return result
+            
+            # Step 3: Local classifier - confidently benign messages skip the LLM
+            unsafe_probability = await self.classifier.unsafe_probability(message)
+            if self.classifier.is_confidently_benign(unsafe_probability):
+                result = SecurityResult(
+                    is_safe=True,
+                    risk_level="low",
+                    detected_issues=[],
+                    should_proceed=True,
+                    reason="Local classifier: confidently benign",
+                    confidence=1.0 - unsafe_probability,
+                    processing_time=time.time() - start_time,
+                    service_used="local_classifier"
+                )
+                log_security_check(self.logger, user_id, message, True, "low", [])
+                await self.verdict_cache.set(message, asdict(result))
+                return result
+            
+            # Step 4: AI-powered security analysis for uncertain messages - REQUIRED
             ai_result = await self._ai_security_analysis(message)
             
             processing_time = time.time() - start_time
@@ -185,9 +235,13 @@ class SecurityAI:
             
             log_security_check(self.logger, user_id, message, result.is_safe, 
                              result.risk_level, result.detected_issues)
+            await self.classifier.record_verdict(message, result.is_safe, result.risk_level, result.service_used)
+            await self.verdict_cache.set(message, asdict(result))
             
             return result
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             processing_time = time.time() - start_time
             self.logger.error(f"Security check failed for user {user_id}: {e}")
@@ -206,28 +260,17 @@ class SecurityAI:
             Dict with is_safe status and detected issues
         """
         issues = []
-        message_lower = message.lower()
         
         # Check message length
         if len(message) > self.security_config['max_message_length']:
             issues.append("Message too long")
         
-        # Check for known jailbreak patterns
-        for pattern in self.security_config['jailbreak_patterns']:
-            if pattern in message_lower:
-                issues.append(f"Jailbreak pattern detected: {pattern}")
-        
-        # Check for obvious inappropriate content
-        inappropriate_patterns = [
-            'hack', 'exploit', 'bypass', 'override',
-            'system prompt', 'ignore instructions',
-            'pretend you are', 'act as if you are',
-            'forget everything', 'new instructions'
-        ]
-        
-        for pattern in inappropriate_patterns:
-            if pattern in message_lower:
-                issues.append(f"Inappropriate pattern: {pattern}")
+        # Known jailbreak and inappropriate patterns, found in one pass
+        for hit in self.pattern_matcher.find(message, groups=('jailbreak', 'inappropriate')):
+            if hit.group == 'jailbreak':
+                issues.append(f"Jailbreak pattern detected: {hit.pattern}")
+            else:
+                issues.append(f"Inappropriate pattern: {hit.pattern}")
         
         return {
             'is_safe': len(issues) == 0,
@@ -274,11 +317,13 @@ class SecurityAI:
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,  # Low temperature for consistent security decisions
                 max_tokens=300,
-                timeout=self.service_config['openai']['timeout']
+                timeout=stage_timeout(self.service_config['openai']['timeout'],
+                                      reserve=self.min_generation_time, stage="security")
             )
             
             duration = time.time() - start_time
             log_performance_metrics(self.logger, "openai_security_check", duration, True)
+            record_llm_usage("security", "openai", self.service_config['openai']['model'], response)
             
             content = response.choices[0].message.content.strip()
             return json.loads(content)
@@ -286,6 +331,8 @@ class SecurityAI:
         except json.JSONDecodeError as e:
             self.logger.error(f"OpenAI security response not valid JSON: {e}")
             return None
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             duration = time.time() - start_time if 'start_time' in locals() else 0
             log_performance_metrics(self.logger, "openai_security_check", duration, False, {"error": str(e)})
@@ -306,12 +353,17 @@ class SecurityAI:
                     response_mime_type="application/json",
                     response_schema=SecurityAnalysis,
                     temperature=0.1,  # Low temperature for consistent security decisions
-                    thinking_config=types.ThinkingConfig(thinking_budget=0)  # Disable thinking for speed
+                    thinking_config=types.ThinkingConfig(thinking_budget=0),  # Disable thinking for speed
+                    http_options=types.HttpOptions(timeout=http_timeout_ms(
+                        self.service_config['gemini'].get('timeout', 30),
+                        reserve=self.min_generation_time, stage="security"
+                    ))
                 )
             )
             
             duration = time.time() - start_time
             log_performance_metrics(self.logger, "gemini_security_check", duration, True)
+            record_llm_usage("security", "gemini", self.gemini_model, response)
             
             # Use the parsed structured output directly
             security_analysis = response.parsed
@@ -330,6 +382,8 @@ class SecurityAI:
             else:
                 raise Exception("No parsed result from Gemini structured output")
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             duration = time.time() - start_time if 'start_time' in locals() else 0
             log_performance_metrics(self.logger, "gemini_security_check", duration, False, {"error": str(e)})
@@ -0,0 +1,209 @@
+"""
+Security Verdict Cache for XOFlowers AI Agent
+Reuses security verdicts for repeated messages ("buna", "salut", "vreau trandafiri")
+Messages are keyed by a hash of their normalized text; safe verdicts are kept long,
+risky ones only briefly. Entries live in a per-process LRU and, when Redis is
+configured, in Redis so all workers share them.
+"""
+
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.data.redis_connection import create_redis_client, HAS_REDIS
+from src.utils.utils import setup_logger
+# The /health endpoint reports the helpers monitor, so hits are counted there
+from src.helpers.utils import get_performance_monitor
+from src.helpers.monitoring import register_cache_size
+
+logger = setup_logger(__name__)
+
+# Bump when the security prompt or verdict format changes so old verdicts are ignored
+CACHE_VERSION = 1
+
+# Variation selectors, zero-width joiner and skin tone modifiers that glue emoji sequences together
+_EMOJI_JOINERS = {'\u200d', '\ufe0e', '\ufe0f', '\u20e3'}
+
+# Verdict fields stored in the cache (processing time and service are per check)
+VERDICT_FIELDS = ('is_safe', 'risk_level', 'detected_issues', 'should_proceed', 'reason', 'confidence')
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalize a message for verdict lookup
+
+    Lowercases, strips diacritics and emoji and collapses whitespace. Punctuation,
+    digits and other scripts are kept, so only trivially different messages share a verdict.
+
+    Args:
+        message: User message
+
+    Returns:
+        Normalized text
+    """
+    text = message.lower()
+    if not text.isascii():
+        characters = []
+        for char in unicodedata.normalize('NFKD', text):
+            category = unicodedata.category(char)
+            # Mn: combining diacritics, So/Sk: emoji and modifiers, Cs/Co: stray surrogates and private use
+            if category in ('Mn', 'So', 'Sk', 'Cs', 'Co') or char in _EMOJI_JOINERS:
+                continue
+            characters.append(char)
+        text = ''.join(characters)
+    return ' '.join(text.split())
+
+
+def cache_key(message: str) -> str:
+    """Stable hash of the normalized message (message text is never stored)"""
+    return hashlib.sha256(normalize_message(message).encode('utf-8')).hexdigest()
+
+
+class SecurityVerdictCache:
+    """
+    Two-level cache of security verdicts
+    Local LRU with per-entry expiry in front of a shared Redis cache; after a Redis
+    error only the local level is used for redis_cooldown_seconds
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, redis_config: Optional[Dict[str, Any]] = None,
+                 client=None):
+        """
+        Args:
+            config: Verdict cache configuration (SECURITY_CONFIG['verdict_cache'])
+            redis_config: Redis connection settings (SERVICE_CONFIG['redis']); no shared level if omitted
+            client: redis.asyncio client to use instead of creating one
+        """
+        self.config = config or {}
+        self.enabled = self.config.get('enabled', True)
+        self.max_entries = self.config.get('max_entries', 10000)
+        self.safe_ttl = self.config.get('safe_ttl_seconds', 86400)
+        self.risky_ttl = self.config.get('risky_ttl_seconds', 300)
+        self.redis_cooldown = self.config.get('redis_cooldown_seconds', 30)
+        self.key_prefix = f"xoflowers:security_verdict:v{CACHE_VERSION}:"
+
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis_retry_at = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'shared_hits': 0}
+        register_cache_size('security_verdict', lambda: len(self._entries))
+
+        self.client = client
+        if self.client is None and self.enabled and redis_config and self.config.get('backend', 'redis') == 'redis':
+            self.client = self._create_client(redis_config)
+
+    def _create_client(self, redis_config: Dict[str, Any]):
+        """Shared level on Redis when available"""
+        if not HAS_REDIS:
+            return None
+        try:
+            return create_redis_client(redis_config, asynchronous=True)
+        except Exception as e:
+            logger.warning(f"Redis unavailable for the security verdict cache, verdicts are per process: {e}")
+            return None
+
+    def ttl_for(self, verdict: Dict[str, Any]) -> int:
+        """Long TTL for safe low-risk verdicts, short TTL for everything else"""
+        if verdict.get('is_safe') and verdict.get('risk_level') == 'low':
+            return self.safe_ttl
+        return self.risky_ttl
+
+    async def get(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the verdict for a message
+
+        Args:
+            message: User message
+
+        Returns:
+            Cached verdict fields, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = cache_key(message)
+        verdict = self._get_local(key)
+        if verdict is None:
+            verdict = await self._get_shared(key)
+
+        hit = verdict is not None
+        self.stats['hits' if hit else 'misses'] += 1
+        get_performance_monitor().record_cache_hit(hit, cache='security_verdict')
+        return verdict
+
+    async def set(self, message: str, verdict: Dict[str, Any]) -> None:
+        """
+        Store the verdict for a message
+
+        Args:
+            message: User message
+            verdict: Security verdict with at least is_safe and risk_level
+        """
+        if not self.enabled:
+            return
+
+        key = cache_key(message)
+        entry = {field: verdict[field] for field in VERDICT_FIELDS if field in verdict}
+        ttl = self.ttl_for(entry)
+        self._set_local(key, entry, ttl)
+
+        if self._shared_available():
+            try:
+                await self.client.set(self.key_prefix + key, json.dumps(entry), ex=ttl)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def clear(self) -> None:
+        """Drop all local entries (shared entries expire on their own)"""
+        self._entries.clear()
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, verdict = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return verdict
+
+    def _set_local(self, key: str, verdict: Dict[str, Any], ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_shared(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read from Redis and keep the verdict locally for its remaining lifetime"""
+        if not self._shared_available():
+            return None
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self.key_prefix + key)
+            pipe.ttl(self.key_prefix + key)
+            raw, ttl = await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+        if raw is None:
+            return None
+        try:
+            verdict = json.loads(raw)
+        except ValueError:
+            return None
+        if ttl and ttl > 0:
+            self._set_local(key, verdict, ttl)
+        self.stats['shared_hits'] += 1
+        return verdict
+
+    def _shared_available(self) -> bool:
+        return self.client is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._redis_retry_at = time.monotonic() + self.redis_cooldown
+        logger.error(f"Redis security verdict cache failed, using the local cache "
+                     f"for {self.redis_cooldown}s: {error}")
@@ -0,0 +1,347 @@
+"""
+Local Security Classifier for XOFlowers AI Agent
+Logistic regression on MiniLM sentence embeddings that clears confidently benign
+messages without an LLM security call; uncertain messages still escalate to the LLM
+
+Train (writes the model and a calibration report next to it):
+    python -m src.intelligence.security_classifier [--verdicts data/security_verdicts.jsonl]
+"""
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.system_definitions import get_security_config
+from src.utils.utils import setup_logger, log_performance_metrics
+from .cpu_executor import run_cpu_stage
+
+logger = setup_logger(__name__)
+
+# Sentence embeddings are optional - without them every message escalates to the LLM
+try:
+    from sentence_transformers import SentenceTransformer
+    HAS_SENTENCE_TRANSFORMERS = True
+except ImportError:
+    SentenceTransformer = None
+    HAS_SENTENCE_TRANSFORMERS = False
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SEED_DATASET_PATH = PROJECT_ROOT / "src" / "database" / "security_seed.jsonl"
+
+# Thresholds evaluated in the calibration report
+REPORT_THRESHOLDS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3)
+
+
+class LogisticRegressionModel:
+    """Binary logistic regression (label 1 = unsafe) trained with full-batch gradient descent"""
+
+    def __init__(self, weights: Optional[np.ndarray] = None, bias: float = 0.0):
+        self.weights = weights
+        self.bias = bias
+
+    def fit(self, features: np.ndarray, labels: np.ndarray, l2: float = 1e-3,
+            epochs: int = 500, learning_rate: float = 0.5) -> "LogisticRegressionModel":
+        """
+        Fit on embedding features with class-balanced sample weights
+
+        Args:
+            features: Matrix of shape (samples, dimensions)
+            labels: 1 for unsafe, 0 for safe
+            l2: L2 regularization strength
+            epochs: Gradient descent iterations
+            learning_rate: Step size
+
+        Returns:
+            The fitted model
+        """
+        samples, dimensions = features.shape
+        positives = max(labels.sum(), 1)
+        negatives = max(samples - labels.sum(), 1)
+        sample_weights = np.where(labels == 1, samples / (2 * positives), samples / (2 * negatives))
+
+        self.weights = np.zeros(dimensions)
+        self.bias = 0.0
+        for _ in range(epochs):
+            errors = (self.predict_proba(features) - labels) * sample_weights
+            self.weights -= learning_rate * (features.T @ errors / samples + l2 * self.weights)
+            self.bias -= learning_rate * float(errors.mean())
+        return self
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Probability that each row is unsafe"""
+        return 1.0 / (1.0 + np.exp(-(features @ self.weights + self.bias)))
+
+    def save(self, path: Path, metadata: Dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, weights=self.weights, bias=np.array(self.bias), metadata=np.array(json.dumps(metadata)))
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["LogisticRegressionModel", Dict[str, Any]]:
+        with np.load(path) as data:
+            return cls(data['weights'], float(data['bias'])), json.loads(str(data['metadata']))
+
+
+class SecurityClassifier:
+    """
+    Local first tier of the security check
+    Returns an unsafe probability for messages that passed the pattern filter, or
+    None when no trained model or embedding backend is available.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 embed: Optional[Callable[[List[str]], np.ndarray]] = None):
+        """
+        Initialize classifier from configuration
+
+        Args:
+            config: Classifier configuration (SECURITY_CONFIG['classifier'])
+            embed: Embedding function for a list of texts (the product search MiniLM model if omitted)
+        """
+        self.config = config if config is not None else get_security_config().get('classifier', {})
+        self.enabled = self.config.get('enabled', True)
+        self.benign_threshold = self.config.get('benign_threshold', 0.05)
+        self.model_path = _project_path(self.config.get('model_path', 'data/security_classifier.npz'))
+        self.embedding_model = self.config.get('embedding_model', 'all-MiniLM-L6-v2')
+        self.verdict_log_path = self.config.get('verdict_log_path', '')
+
+        self._embed = embed
+        self._embed_lock = threading.Lock()
+        self._verdict_lock = threading.Lock()
+        self.model: Optional[LogisticRegressionModel] = None
+
+        if self.enabled and self.model_path.exists():
+            try:
+                self.model, metadata = LogisticRegressionModel.load(self.model_path)
+                logger.info(f"Security classifier loaded from {self.model_path} "
+                            f"(trained {metadata.get('trained_at')}, {metadata.get('samples')} samples)")
+            except Exception as e:
+                logger.error(f"Failed to load security classifier from {self.model_path}: {e}")
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None and (self._embed is not None or HAS_SENTENCE_TRANSFORMERS)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, loading the sentence-transformers model on first use"""
+        if self._embed is None:
+            with self._embed_lock:
+                if self._embed is None:
+                    self._embed = self._load_embedding()
+        return np.asarray(self._embed(texts), dtype=float)
+
+    def _load_embedding(self) -> Callable[[List[str]], np.ndarray]:
+        """Reuse the product search embedding model (preloaded before fork) when it is the same model"""
+        from src.data.chromadb_client import EMBEDDING_MODEL_NAME, get_embedding_function
+
+        if self.embedding_model == EMBEDDING_MODEL_NAME:
+            shared = get_embedding_function()
+            if shared is not None:
+                return shared
+        if not HAS_SENTENCE_TRANSFORMERS:
+            raise RuntimeError("sentence-transformers is not installed")
+        model = SentenceTransformer(self.embedding_model)
+        return lambda batch: model.encode(batch, normalize_embeddings=True)
+
+    def _predict(self, message: str) -> float:
+        return float(self.model.predict_proba(self.embed([message]))[0])
+
+    async def unsafe_probability(self, message: str) -> Optional[float]:
+        """
+        Estimate the probability that a message is unsafe
+
+        Args:
+            message: Message that passed the pattern pre-filter
+
+        Returns:
+            Probability in [0, 1], or None if the classifier is unavailable or failed
+        """
+        if not self.available:
+            return None
+        try:
+            return await run_cpu_stage("security_classifier", self._predict, message)
+        except Exception as e:
+            logger.warning(f"Security classifier failed, escalating to LLM: {e}")
+            return None
+
+    def is_confidently_benign(self, unsafe_probability: Optional[float]) -> bool:
+        """Whether the LLM security call can be skipped for this probability"""
+        return unsafe_probability is not None and unsafe_probability <= self.benign_threshold
+
+    async def record_verdict(self, message: str, is_safe: bool, risk_level: str, service_used: str) -> None:
+        """Append an LLM verdict to the verdict log used as training data (if configured)"""
+        if not self.verdict_log_path:
+            return
+        entry = json.dumps({
+            'text': message, 'is_safe': is_safe, 'risk_level': risk_level,
+            'service_used': service_used, 'timestamp': datetime.now().isoformat()
+        }, ensure_ascii=False)
+        try:
+            await asyncio.to_thread(self._append_verdict, entry)
+        except OSError as e:
+            logger.warning(f"Could not record security verdict: {e}")
+
+    def _append_verdict(self, entry: str) -> None:
+        path = _project_path(self.verdict_log_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._verdict_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(entry + "\n")
+
+
+def load_training_data(paths: Sequence[Path]) -> Tuple[List[str], np.ndarray]:
+    """
+    Load labelled messages from JSONL files of {"text": ..., "is_safe": ...}
+
+    Later files win for duplicate texts, so logged verdicts override the seed set.
+
+    Returns:
+        Texts and labels (1 = unsafe)
+    """
+    labelled: Dict[str, int] = {}
+    for path in paths:
+        if not path.exists():
+            logger.warning(f"Training data not found, skipping: {path}")
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                text = str(entry.get('text', '')).strip()
+                if text:
+                    labelled[text] = 0 if entry.get('is_safe') else 1
+    return list(labelled), np.array(list(labelled.values()), dtype=float)
+
+
+def calibration_report(probabilities: np.ndarray, labels: np.ndarray,
+                       thresholds: Sequence[float] = REPORT_THRESHOLDS, bins: int = 10) -> Dict[str, Any]:
+    """
+    Describe how well unsafe probabilities are calibrated and what each threshold would skip
+
+    Args:
+        probabilities: Predicted unsafe probabilities
+        labels: True labels (1 = unsafe)
+        thresholds: Candidate benign thresholds
+        bins: Number of equal-width reliability bins
+
+    Returns:
+        Dict with Brier score, expected calibration error, reliability bins and per-threshold
+        share of LLM calls skipped and unsafe messages that would have been cleared
+    """
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    bin_index = np.clip(np.digitize(probabilities, edges[1:-1]), 0, bins - 1)
+    reliability = []
+    calibration_error = 0.0
+    for index in range(bins):
+        in_bin = bin_index == index
+        if not in_bin.any():
+            continue
+        predicted = float(probabilities[in_bin].mean())
+        observed = float(labels[in_bin].mean())
+        calibration_error += in_bin.mean() * abs(predicted - observed)
+        reliability.append({'bin': f"{edges[index]:.1f}-{edges[index + 1]:.1f}", 'count': int(in_bin.sum()),
+                            'mean_predicted': round(predicted, 4), 'observed_unsafe': round(observed, 4)})
+
+    benign = labels == 0
+    threshold_rows = []
+    for threshold in thresholds:
+        skipped = probabilities <= threshold
+        threshold_rows.append({
+            'threshold': threshold,
+            'llm_calls_skipped': round(float(skipped.mean()), 4),
+            'benign_skipped': round(float(skipped[benign].mean()) if benign.any() else 0.0, 4),
+            'unsafe_cleared': int((skipped & ~benign).sum())
+        })
+
+    safe_thresholds = [row['threshold'] for row in threshold_rows if row['unsafe_cleared'] == 0]
+    return {
+        'samples': int(len(labels)),
+        'unsafe_samples': int(labels.sum()),
+        'brier_score': round(float(np.mean((probabilities - labels) ** 2)), 4),
+        'expected_calibration_error': round(float(calibration_error), 4),
+        'reliability': reliability,
+        'thresholds': threshold_rows,
+        'max_threshold_without_unsafe_cleared': max(safe_thresholds) if safe_thresholds else None
+    }
+
+
+def train_classifier(texts: List[str], labels: np.ndarray, embed: Callable[[List[str]], np.ndarray],
+                     holdout: float = 0.25, seed: int = 13) -> Tuple[LogisticRegressionModel, Dict[str, Any]]:
+    """
+    Train on a stratified split and report calibration on the held-out part
+
+    The returned model is refit on all samples after evaluation.
+
+    Args:
+        texts: Messages
+        labels: 1 for unsafe, 0 for safe
+        embed: Embedding function
+        holdout: Share of each class held out for the calibration report
+        seed: Random seed for the split
+
+    Returns:
+        Trained model and calibration report
+    """
+    start_time = time.time()
+    features = np.asarray(embed(texts), dtype=float)
+    rng = np.random.default_rng(seed)
+
+    test_mask = np.zeros(len(labels), dtype=bool)
+    for label in (0, 1):
+        indices = np.flatnonzero(labels == label)
+        rng.shuffle(indices)
+        test_mask[indices[:int(round(len(indices) * holdout))]] = True
+
+    evaluation = LogisticRegressionModel().fit(features[~test_mask], labels[~test_mask])
+    report = calibration_report(evaluation.predict_proba(features[test_mask]), labels[test_mask])
+
+    model = LogisticRegressionModel().fit(features, labels)
+    log_performance_metrics(logger, "security_classifier_training", time.time() - start_time, True, {
+        "samples": len(labels), "unsafe": int(labels.sum())
+    })
+    return model, report
+
+
+def _project_path(path: str) -> Path:
+    """Resolve relative paths against the project root"""
+    resolved = Path(path)
+    return resolved if resolved.is_absolute() else PROJECT_ROOT / resolved
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the local security classifier")
+    parser.add_argument('--verdicts', action='append', default=[],
+                        help="JSONL verdict log(s) to train on besides the seed set")
+    parser.add_argument('--output', help="Model path (defaults to the configured model_path)")
+    args = parser.parse_args()
+
+    classifier = SecurityClassifier()
+    output = _project_path(args.output) if args.output else classifier.model_path
+    configured_log = [classifier.verdict_log_path] if classifier.verdict_log_path else []
+    sources = [SEED_DATASET_PATH] + [_project_path(path) for path in configured_log + args.verdicts]
+
+    texts, labels = load_training_data(sources)
+    model, report = train_classifier(texts, labels, classifier.embed)
+    model.save(output, {
+        'trained_at': datetime.now().isoformat(),
+        'samples': len(texts),
+        'embedding_model': classifier.embedding_model,
+        'sources': [str(path) for path in sources]
+    })
+    report_path = output.with_suffix('.report.json')
+    report_path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    print(f"Trained on {len(texts)} messages ({int(labels.sum())} unsafe), model saved to {output}")
+    print(f"Held-out Brier score {report['brier_score']}, ECE {report['expected_calibration_error']}")
+    for row in report['thresholds']:
+        print(f"  threshold {row['threshold']:<5} skips {row['llm_calls_skipped']:.0%} of LLM calls, "
+              f"clears {row['unsafe_cleared']} unsafe")
+    print(f"Calibration report: {report_path} (configured benign_threshold: {classifier.benign_threshold})")
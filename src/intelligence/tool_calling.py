@@ -0,0 +1,342 @@
+"""
+Tool Calling for XOFlowers AI Agent
+Function-calling loop that lets the model work with the cart and payment tools
+Consecutive read-only tool calls from one model turn run concurrently while mutating
+calls run one at a time in model order, read-only results are cached for the rest of
+the user's turn and results are compacted before they go back to the model
+"""
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol
+
+from src.utils.system_definitions import get_performance_config
+from src.utils.utils import setup_logger, log_performance_metrics
+from src.helpers.llm_usage import record_llm_usage
+from .deadline import stage_timeout
+
+
+# Tools are bound to the user of the conversation - the model never chooses whose cart it touches
+TOOL_DEFINITIONS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "add_to_cart",
+            "description": "Adaugă un produs în cartul utilizatorului",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "product_name": {"type": "string", "description": "Numele produsului"},
+                    "price": {"type": "number", "description": "Prețul produsului în MDL (se verifică în catalog)"},
+                    "product_url": {"type": "string", "description": "URL-ul produsului"}
+                },
+                "required": ["product_name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "remove_from_cart",
+            "description": "Elimină un produs din cartul utilizatorului",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "product_name": {"type": "string", "description": "Numele produsului"}
+                },
+                "required": ["product_name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "view_cart",
+            "description": "Afișează conținutul cartului utilizatorului",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "clear_cart",
+            "description": "Golește cartul utilizatorului",
+            "parameters": {"type": "object", "properties": {}}
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "process_payment",
+            "description": "Procesează plata pentru produsele din cart",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "customer_name": {"type": "string", "description": "Numele clientului"},
+                    "customer_phone": {"type": "string", "description": "Telefonul clientului"}
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_order_status",
+            "description": "Afișează statusul unei comenzi",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "order_id": {"type": "string", "description": "ID-ul comenzii, de forma XOF_..."}
+                },
+                "required": ["order_id"]
+            }
+        }
+    }
+]
+
+# Results of these tools only change when a mutating tool runs
+READ_ONLY_TOOLS = frozenset({'view_cart', 'get_order_status'})
+
+_MARKDOWN_PATTERN = re.compile(r'\*\*|__|`')
+_BLANK_LINES_PATTERN = re.compile(r'[ \t]*\n\s*')
+
+
+@dataclass
+class ToolCall:
+    """Tool call requested by the model"""
+    id: str
+    name: str
+    arguments: Dict[str, Any]
+
+
+@dataclass
+class ModelTurn:
+    """One model reply: final text, or tool calls to run first"""
+    content: Optional[str]
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
+
+@dataclass
+class ToolRunResult:
+    """Outcome of a tool-calling loop"""
+    response: str
+    iterations: int
+    tool_calls: List[str] = field(default_factory=list)
+    hit_iteration_limit: bool = False
+
+
+class ToolModel(Protocol):
+    """Chat model able to request tool calls"""
+
+    async def complete(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]],
+                       allow_tools: bool = True) -> ModelTurn:
+        ...
+
+
+class OpenAIToolModel:
+    """Chat completions function calling through the OpenAI client"""
+
+    def __init__(self, client: Any, openai_config: Dict[str, Any], semaphore: Optional[asyncio.Semaphore] = None):
+        self.client = client
+        self.config = openai_config
+        self.semaphore = semaphore or asyncio.Semaphore(10)
+
+    async def complete(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]],
+                       allow_tools: bool = True) -> ModelTurn:
+        async with self.semaphore:
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
+                model=self.config['model'],
+                messages=messages,
+                tools=tools,
+                tool_choice="auto" if allow_tools else "none",
+                temperature=self.config['temperature'],
+                max_tokens=self.config['max_tokens'],
+                timeout=stage_timeout(self.config['timeout'], stage="openai")
+            )
+        record_llm_usage("tool_calling", "openai", self.config['model'], response)
+
+        message = response.choices[0].message
+        return ModelTurn(
+            content=message.content,
+            tool_calls=[
+                ToolCall(call.id, call.function.name, _parse_arguments(call.function.arguments))
+                for call in message.tool_calls or []
+            ]
+        )
+
+
+class ToolExecutor:
+    """
+    Runs tool calls for one user's turn
+    Identical read-only calls share one execution until a mutating tool runs
+    """
+
+    def __init__(self, cart_tools: Any, payment_tools: Any, user_id: str, max_result_chars: int = 600):
+        self.max_result_chars = max_result_chars
+        self._reads: Dict[str, asyncio.Future] = {}
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[str]]] = {
+            'add_to_cart': lambda args: cart_tools.add_to_cart(
+                user_id, args['product_name'], float(args.get('price') or 0), args.get('product_url', '')),
+            'remove_from_cart': lambda args: cart_tools.remove_from_cart(user_id, args['product_name']),
+            'view_cart': lambda args: cart_tools.view_cart(user_id),
+            'clear_cart': lambda args: cart_tools.clear_cart(user_id),
+            'process_payment': lambda args: payment_tools.process_payment(
+                user_id, args.get('customer_name', ''), args.get('customer_phone', '')),
+            'get_order_status': lambda args: payment_tools.get_order_status(args['order_id'])
+        }
+
+    async def execute(self, calls: List[ToolCall]) -> List[str]:
+        """
+        Run the tool calls of one model turn
+
+        Mutating calls run one at a time in the order the model sent them, so e.g.
+        add_to_cart finishes before a following process_payment starts; runs of
+        consecutive read-only calls between them run concurrently.
+
+        Args:
+            calls: Tool calls requested by the model
+
+        Returns:
+            Compacted result per call, in call order (errors are reported as results)
+        """
+        results: List[str] = []
+        reads: List[ToolCall] = []
+        for call in calls:
+            if call.name in READ_ONLY_TOOLS or call.name not in self._handlers:
+                reads.append(call)
+                continue
+            results.extend(await asyncio.gather(*[self._execute_one(read) for read in reads]))
+            reads = []
+            results.append(await self._execute_one(call))
+        results.extend(await asyncio.gather(*[self._execute_one(read) for read in reads]))
+        return results
+
+    async def _execute_one(self, call: ToolCall) -> str:
+        handler = self._handlers.get(call.name)
+        if handler is None:
+            return f"Error: unknown tool '{call.name}'"
+
+        try:
+            if call.name in READ_ONLY_TOOLS:
+                key = f"{call.name}:{json.dumps(call.arguments, sort_keys=True)}"
+                if key not in self._reads:
+                    self._reads[key] = asyncio.ensure_future(handler(call.arguments))
+                    self._reads[key].add_done_callback(lambda future, key=key: self._forget_failed_read(key, future))
+                result = await asyncio.shield(self._reads[key])
+            else:
+                # Reads cached before the write are stale; a failed write may have changed state too
+                self._reads.clear()
+                try:
+                    result = await handler(call.arguments)
+                finally:
+                    self._reads.clear()
+        except Exception as e:
+            return f"Error: {type(e).__name__}: {e}"
+
+        return compact_tool_result(str(result), self.max_result_chars)
+
+    def _forget_failed_read(self, key: str, future: asyncio.Future) -> None:
+        """Drop a failed read from the cache so the next call retries it"""
+        if (future.cancelled() or future.exception() is not None) and self._reads.get(key) is future:
+            del self._reads[key]
+
+
+class ToolCallingEngine:
+    """Model <-> tool loop bounded by a maximum number of iterations"""
+
+    def __init__(self, model: ToolModel, cart_tools: Any, payment_tools: Any,
+                 max_iterations: Optional[int] = None, max_result_chars: Optional[int] = None):
+        self.logger = setup_logger(__name__)
+        performance_config = get_performance_config()
+
+        self.model = model
+        self.cart_tools = cart_tools
+        self.payment_tools = payment_tools
+        self.max_iterations = max_iterations or performance_config.get('tool_max_iterations', 4)
+        self.max_result_chars = max_result_chars or performance_config.get('tool_result_max_chars', 600)
+
+    async def run(self, user_id: str, messages: List[Dict[str, Any]]) -> ToolRunResult:
+        """
+        Let the model call tools until it answers
+
+        After max_iterations rounds of tool calls the model is asked once more
+        with tools disabled, so the loop always ends with a reply.
+
+        Args:
+            user_id: User whose cart and orders the tools act on
+            messages: Chat messages (system, history, user message); tool rounds are appended
+
+        Returns:
+            ToolRunResult with the final reply and the tools that ran
+        """
+        start_time = time.time()
+        executor = ToolExecutor(self.cart_tools, self.payment_tools, user_id, self.max_result_chars)
+        tool_names: List[str] = []
+        success = False
+
+        try:
+            for iteration in range(1, self.max_iterations + 1):
+                turn = await self.model.complete(messages, TOOL_DEFINITIONS)
+                if not turn.tool_calls:
+                    success = True
+                    return ToolRunResult(turn.content or "", iteration, tool_names)
+
+                messages.append({
+                    "role": "assistant",
+                    "content": turn.content,
+                    "tool_calls": [
+                        {"id": call.id, "type": "function",
+                         "function": {"name": call.name, "arguments": json.dumps(call.arguments, ensure_ascii=False)}}
+                        for call in turn.tool_calls
+                    ]
+                })
+                results = await executor.execute(turn.tool_calls)
+                messages.extend(
+                    {"role": "tool", "tool_call_id": call.id, "content": result}
+                    for call, result in zip(turn.tool_calls, results)
+                )
+                tool_names.extend(call.name for call in turn.tool_calls)
+
+            self.logger.warning(f"Tool loop for user {user_id} reached {self.max_iterations} iterations")
+            final = await self.model.complete(messages, TOOL_DEFINITIONS, allow_tools=False)
+            success = True
+            return ToolRunResult(final.content or "", self.max_iterations + 1, tool_names, hit_iteration_limit=True)
+        finally:
+            log_performance_metrics(self.logger, "tool_calling", time.time() - start_time, success, {
+                "user_id": user_id,
+                "tool_calls": len(tool_names),
+                "tools": sorted(set(tool_names))
+            })
+
+
+def compact_tool_result(text: str, max_chars: int = 600) -> str:
+    """
+    Shrink a tool reply before it goes back to the model
+
+    Drops markdown emphasis and blank lines and caps the length; the model
+    rewrites the reply for the user anyway.
+
+    Args:
+        text: Tool reply
+        max_chars: Maximum length
+
+    Returns:
+        Compacted text
+    """
+    text = _BLANK_LINES_PATTERN.sub('\n', _MARKDOWN_PATTERN.sub('', text)).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars - 1].rstrip() + "…"
+    return text
+
+
+def _parse_arguments(arguments: Optional[str]) -> Dict[str, Any]:
+    """Decode tool call arguments, tolerating empty or malformed JSON"""
+    try:
+        parsed = json.loads(arguments or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
@@ -3,6 +3,6 @@ XOFlowers Security Module
 Contains security filters and protection mechanisms
 """
 
-from .filters import SecurityFilter
+from .pattern_matcher import PatternMatcher, PatternHit, build_security_matcher, get_security_matcher
 
-__all__ = ['SecurityFilter']
+__all__ = ['PatternMatcher', 'PatternHit', 'build_security_matcher', 'get_security_matcher']
@@ -7,8 +7,6 @@ Each function has one responsibility and is testable
 import time
 import logging
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
-from collections import defaultdict
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -31,8 +29,17 @@ try:
 except ImportError:
     HAS_DEBUG = False
 
-# Rate limiting storage (in production, use Redis)
-_rate_limit_storage = defaultdict(list)
+try:
+    from src.helpers.rate_limiter import get_rate_limiter
+    HAS_RATE_LIMITER = True
+except ImportError:
+    HAS_RATE_LIMITER = False
+
+try:
+    from src.security.pattern_matcher import get_security_matcher
+    HAS_PATTERN_MATCHER = True
+except ImportError:
+    HAS_PATTERN_MATCHER = False
 
 
 def validate_message_security(message_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -168,44 +175,17 @@ def is_rate_limited(user_id: str) -> Dict[str, Any]:
     Returns:
         Dict with rate limit check result
     """
-    if not HAS_DEFINITIONS:
-        return {"is_limited": False, "reason": "No rate limit rules configured"}
-    
-    current_time = datetime.now()
-    user_requests = _rate_limit_storage[user_id]
-    
-    # Clean old requests (older than 1 hour)
-    hour_ago = current_time - timedelta(hours=1)
-    user_requests[:] = [req_time for req_time in user_requests if req_time > hour_ago]
-    
-    # Check per-minute limit
-    minute_ago = current_time - timedelta(minutes=1)
-    requests_last_minute = sum(1 for req_time in user_requests if req_time > minute_ago)
-    
-    if requests_last_minute >= SECURITY_RULES.get('rate_limit_per_minute', 10):
-        return {
-            "is_limited": True,
-            "reason": f"Exceeded {SECURITY_RULES.get('rate_limit_per_minute', 10)} requests per minute",
-            "requests_last_minute": requests_last_minute
-        }
-    
-    # Check per-hour limit
-    requests_last_hour = len(user_requests)
-    if requests_last_hour >= SECURITY_RULES.get('rate_limit_per_hour', 100):
-        return {
-            "is_limited": True,
-            "reason": f"Exceeded {SECURITY_RULES.get('rate_limit_per_hour', 100)} requests per hour",
-            "requests_last_hour": requests_last_hour
-        }
+    if not HAS_RATE_LIMITER:
+        return {"is_limited": False, "reason": "Rate limiter not available"}
     
-    # Add current request to storage
-    user_requests.append(current_time)
+    # Synchronous path: per-process limits of the shared limiter
+    result = get_rate_limiter().check_user_local(user_id)
     
     return {
-        "is_limited": False,
-        "reason": None,
-        "requests_last_minute": requests_last_minute,
-        "requests_last_hour": requests_last_hour + 1
+        "is_limited": not result.allowed,
+        "reason": result.reason,
+        "retry_after": result.retry_after,
+        "remaining": result.remaining
     }
 
 
@@ -257,16 +237,10 @@ def contains_offensive_content(message_text: str) -> Dict[str, Any]:
     Returns:
         Dict with offensive content check result
     """
-    if not HAS_DEFINITIONS:
+    if not HAS_PATTERN_MATCHER:
         return {"contains_offensive": False, "reason": "No offensive keywords configured"}
     
-    message_lower = message_text.lower()
-    offensive_keywords = SECURITY_RULES.get('offensive_keywords', [])
-    
-    found_keywords = []
-    for keyword in offensive_keywords:
-        if keyword.lower() in message_lower:
-            found_keywords.append(keyword)
+    found_keywords = [hit.pattern for hit in get_security_matcher().find(message_text, groups=('offensive',))]
     
     if found_keywords:
         return {
@@ -292,16 +266,10 @@ def is_jailbreak_attempt(message_text: str) -> Dict[str, Any]:
     Returns:
         Dict with jailbreak detection result
     """
-    if not HAS_DEFINITIONS:
+    if not HAS_PATTERN_MATCHER:
         return {"is_jailbreak": False, "reason": "No jailbreak patterns configured"}
     
-    message_lower = message_text.lower()
-    jailbreak_patterns = SECURITY_RULES.get('jailbreak_patterns', [])
-    
-    found_patterns = []
-    for pattern in jailbreak_patterns:
-        if pattern.lower() in message_lower:
-            found_patterns.append(pattern)
+    found_patterns = [hit.pattern for hit in get_security_matcher().find(message_text, groups=('jailbreak',))]
     
     if found_patterns:
         return {
@@ -0,0 +1,226 @@
+"""
+Security Pattern Matcher for XOFlowers AI Agent
+Finds every configured security pattern in a message in a single pass
+Patterns are compiled once into one trie-shaped regular expression, so the cost of a
+check depends on the message length rather than on the number of patterns
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.utils.system_definitions import get_security_config
+from src.utils.utils import setup_logger, log_performance_metrics
+
+logger = setup_logger(__name__)
+
+# Common character substitutions used to dodge keyword filters ("h4ck", "0verride", "$ystem")
+_LEET_TABLE = str.maketrans({'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's'})
+_SEPARATOR_PATTERN = re.compile(r'[^0-9a-z]+')
+
+# Manipulation attempts checked besides the configured jailbreak patterns
+INAPPROPRIATE_PATTERNS = [
+    'hack', 'exploit', 'bypass', 'override',
+    'system prompt', 'ignore instructions',
+    'pretend you are', 'act as if you are',
+    'forget everything', 'new instructions'
+]
+
+
+class PatternHit(NamedTuple):
+    """Pattern found in a message"""
+    group: str
+    pattern: str
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip diacritics, undo leetspeak and collapse punctuation and whitespace"""
+    text = text.lower()
+    if not text.isascii():
+        # Diacritics decompose into base letter + combining mark; the marks (and other non-ASCII) are dropped
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return _SEPARATOR_PATTERN.sub(' ', text.translate(_LEET_TABLE)).strip()
+
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """Regex source matching the longest of the patterns at a position"""
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        optional = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if optional:
+            # Greedy: prefer continuing to a longer pattern, fall back to the shorter one
+            return f"(?:{body})?" if len(branches) > 1 or len(branches[0]) > 1 else f"{body}?"
+        return body
+
+    return build(trie)
+
+
+class PatternMatcher:
+    """
+    Multi-pattern substring matcher over normalized text
+    Groups name the pattern lists (e.g. jailbreak, inappropriate); a pattern may
+    belong to several groups. The compiled state is swapped atomically on reload,
+    so checks running concurrently always see a complete pattern set.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], pattern_file: str = "", reload_interval: float = 30.0):
+        """
+        Compile the pattern groups
+
+        Args:
+            groups: Pattern lists by group name
+            pattern_file: Optional JSON file of {group: [patterns]} merged into the groups and
+                reloaded when it changes
+            reload_interval: Seconds between checks of the pattern file
+        """
+        self.base_groups = {group: list(patterns) for group, patterns in groups.items()}
+        self.pattern_file = pattern_file
+        self.reload_interval = reload_interval
+
+        self._reload_lock = threading.Lock()
+        self._file_mtime: Optional[float] = None
+        self._next_file_check = 0.0
+        self._compiled: Tuple[Optional[re.Pattern], Dict[str, List[PatternHit]]] = (None, {})
+        self.pattern_count = 0
+
+        self.reload()
+
+    def reload(self, groups: Optional[Dict[str, Iterable[str]]] = None) -> None:
+        """
+        Rebuild the matcher
+
+        Args:
+            groups: New base pattern lists (keeps the current ones if omitted);
+                patterns from the pattern file are merged in either way
+        """
+        start_time = time.time()
+        with self._reload_lock:
+            if groups is not None:
+                self.base_groups = {group: list(patterns) for group, patterns in groups.items()}
+
+            merged = {group: list(patterns) for group, patterns in self.base_groups.items()}
+            for group, patterns in self._read_pattern_file().items():
+                merged.setdefault(group, []).extend(patterns)
+
+            owners: Dict[str, List[PatternHit]] = {}
+            for group, patterns in merged.items():
+                for pattern in patterns:
+                    key = normalize_text(pattern)
+                    hit = PatternHit(group, pattern)
+                    if key and hit not in owners.setdefault(key, []):
+                        owners[key].append(hit)
+
+            # A match is the longest pattern at its position; shorter patterns at the same position are its prefixes
+            hits_by_match = {
+                key: [hit for end in range(1, len(key) + 1) if key[:end] in owners for hit in owners[key[:end]]]
+                for key in owners
+            }
+            regex = re.compile(f"(?=({_trie_regex(owners)}))") if owners else None
+
+            self._compiled = (regex, hits_by_match)
+            self.pattern_count = len(owners)
+
+        log_performance_metrics(logger, "security_patterns_compiled", time.time() - start_time, True, {
+            "patterns": self.pattern_count,
+            "groups": sorted(merged)
+        })
+
+    def find(self, text: str, groups: Optional[Iterable[str]] = None) -> List[PatternHit]:
+        """
+        Find all patterns contained in the text
+
+        Matching ignores case, diacritics, leetspeak digits and punctuation.
+
+        Args:
+            text: Message to scan
+            groups: Only report hits of these groups (all groups if omitted)
+
+        Returns:
+            Distinct hits in order of first appearance
+        """
+        self._maybe_reload()
+        regex, hits_by_match = self._compiled
+        if regex is None:
+            return []
+
+        wanted = set(groups) if groups is not None else None
+        found: Dict[PatternHit, None] = {}
+        for match in regex.finditer(normalize_text(text)):
+            for hit in hits_by_match[match.group(1)]:
+                if wanted is None or hit.group in wanted:
+                    found[hit] = None
+        return list(found)
+
+    def _maybe_reload(self) -> None:
+        """Reload when the pattern file changed, checking at most once per reload_interval"""
+        if not self.pattern_file or time.monotonic() < self._next_file_check:
+            return
+        self._next_file_check = time.monotonic() + self.reload_interval
+        try:
+            mtime = os.path.getmtime(self.pattern_file)
+        except OSError:
+            mtime = None
+        if mtime != self._file_mtime:
+            logger.info(f"Security pattern file {self.pattern_file} changed, reloading patterns")
+            self.reload()
+
+    def _read_pattern_file(self) -> Dict[str, List[str]]:
+        """Read extra patterns from the pattern file, keeping the built-in lists on errors"""
+        if not self.pattern_file:
+            return {}
+        try:
+            self._file_mtime = os.path.getmtime(self.pattern_file)
+            with open(self.pattern_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load security pattern file {self.pattern_file}: {e}")
+            self._file_mtime = None
+            return {}
+        return {str(group): [str(pattern) for pattern in patterns]
+                for group, patterns in data.items() if isinstance(patterns, list)}
+
+
+def build_security_matcher(security_config: Dict) -> PatternMatcher:
+    """
+    Create the matcher for the security pattern lists of a configuration
+
+    Args:
+        security_config: Security configuration (SECURITY_CONFIG)
+
+    Returns:
+        PatternMatcher with jailbreak, inappropriate and offensive groups
+    """
+    return PatternMatcher(
+        {
+            'jailbreak': security_config.get('jailbreak_patterns', []),
+            'inappropriate': security_config.get('inappropriate_patterns', INAPPROPRIATE_PATTERNS),
+            'offensive': security_config.get('offensive_keywords', [])
+        },
+        pattern_file=security_config.get('pattern_file', ''),
+        reload_interval=security_config.get('pattern_reload_seconds', 30)
+    )
+
+
+# Global security matcher instance
+_security_matcher = None
+
+def get_security_matcher() -> PatternMatcher:
+    """Get global security pattern matcher"""
+    global _security_matcher
+    if _security_matcher is None:
+        _security_matcher = build_security_matcher(get_security_config())
+    return _security_matcher
@@ -1,7 +1,8 @@
 from dataclasses import dataclass
-from typing import List, Optional
-import json
-import os
+from typing import Optional
+
+from src.data.order_store import OrderStore, get_order_store
+from src.data.product_catalog import ProductCatalog, get_product_catalog
 
 @dataclass
 class CartItem:
@@ -12,44 +13,30 @@ class CartItem:
     url: str = ""
 
 class CartTools:
-    def __init__(self):
-        self.carts_file = "data/user_carts.json"
-        self.carts = self._load_carts()
-    
-    def _load_carts(self) -> dict:
-        if os.path.exists(self.carts_file):
-            with open(self.carts_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
-    
-    def _save_carts(self):
-        os.makedirs(os.path.dirname(self.carts_file), exist_ok=True)
-        with open(self.carts_file, 'w', encoding='utf-8') as f:
-            json.dump(self.carts, f, ensure_ascii=False, indent=2)
+    def __init__(self, store: Optional[OrderStore] = None, catalog: Optional[ProductCatalog] = None):
+        # Carts live in the transactional order store, one row per item
+        self.store = store or get_order_store()
+        # Products are resolved against the catalog; name and price from the caller are only hints
+        self.catalog = catalog or get_product_catalog()
 
-    def add_to_cart(self, user_id: str, product_name: str, price: float, product_url: str = "") -> str:
-        if user_id not in self.carts:
-            self.carts[user_id] = []
-        for item in self.carts[user_id]:
-            if item['name'] == product_name:
-                item['quantity'] += 1
-                self._save_carts()
-                return f"🌸 {product_name} (cantitatea actualizată la {item['quantity']}) - {price} MDL"
-        new_item = {
-            'product_id': f"prod_{len(self.carts[user_id]) + 1}",
-            'name': product_name,
-            'price': price,
-            'quantity': 1,
-            'url': product_url
-        }
-        self.carts[user_id].append(new_item)
-        self._save_carts()
+    async def add_to_cart(self, user_id: str, product_name: str, price: float, product_url: str = "") -> str:
+        product = self.catalog.resolve(name=product_name, url=product_url)
+        if product is not None:
+            product_name, price = product.name, product.price
+            quantity = await self.store.add_item(user_id, product.name, product.price, product.url, product.product_id)
+        elif len(self.catalog):
+            return f"❌ Produsul '{product_name}' nu a fost găsit în catalog"
+        else:
+            # Catalog unavailable - keep carts working with the given details
+            quantity = await self.store.add_item(user_id, product_name, price, product_url)
+        if quantity > 1:
+            return f"🌸 {product_name} (cantitatea actualizată la {quantity}) - {price} MDL"
         return f"✅ {product_name} adăugat în cart - {price} MDL"
 
-    def view_cart(self, user_id: str) -> str:
-        if user_id not in self.carts or not self.carts[user_id]:
+    async def view_cart(self, user_id: str) -> str:
+        cart_items = await self.store.get_cart(user_id)
+        if not cart_items:
             return "🛒 Cartul tău este gol.\n🌹 Caută produse cu: 'Arată-mi buchete' sau 'Vreau flori pentru...'"
-        cart_items = self.carts[user_id]
         total = sum(item['price'] * item['quantity'] for item in cart_items)
         cart_text = "🛒 **Cartul tău:**\n\n"
         for item in cart_items:
@@ -58,19 +45,18 @@ class CartTools:
         cart_text += "📝 Pentru finalizare: 'Vreau să plătesc'"
         return cart_text
 
-    def clear_cart(self, user_id: str) -> str:
-        if user_id in self.carts:
-            self.carts[user_id] = []
-            self._save_carts()
+    async def clear_cart(self, user_id: str) -> str:
+        await self.store.clear_cart(user_id)
         return "🗑️ Cartul a fost golit cu succes!"
 
-    def remove_from_cart(self, user_id: str, product_name: str) -> str:
-        if user_id not in self.carts:
+    async def remove_from_cart(self, user_id: str, product_name: str) -> str:
+        product = self.catalog.resolve(name=product_name)
+        removed_name = await self.store.remove_item(user_id, product.name if product else product_name)
+        if not removed_name and product is not None:
+            # Items added before catalog validation are stored under the given name
+            removed_name = await self.store.remove_item(user_id, product_name)
+        if removed_name:
+            return f"❌ {removed_name} eliminat din cart"
+        if not await self.store.get_cart(user_id):
             return "🛒 Cartul tău este gol."
-        cart_items = self.carts[user_id]
-        for i, item in enumerate(cart_items):
-            if item['name'].lower() == product_name.lower():
-                removed_item = cart_items.pop(i)
-                self._save_carts()
-                return f"❌ {removed_item['name']} eliminat din cart"
         return f"❌ Produsul '{product_name}' nu a fost găsit în cart"
@@ -17,7 +17,16 @@ SERVICE_CONFIG = {
         'decode_responses': True,
         'socket_timeout': 5,
         'socket_connect_timeout': 5,
-        'retry_on_timeout': True
+        'retry_on_timeout': True,
+        'password': os.getenv('REDIS_PASSWORD'),
+        # Deployment mode: standalone, sentinel or cluster
+        'mode': os.getenv('REDIS_MODE', 'standalone').lower(),
+        'sentinels': os.getenv('REDIS_SENTINELS', ''),  # host:port,host:port
+        'sentinel_master': os.getenv('REDIS_SENTINEL_MASTER', 'mymaster'),
+        'sentinel_password': os.getenv('REDIS_SENTINEL_PASSWORD'),
+        'cluster_nodes': os.getenv('REDIS_CLUSTER_NODES', ''),  # host:port,host:port
+        # Wrap user ids in {hash tags} so a user's keys share one cluster slot (default: cluster mode only)
+        'hash_tag_keys': os.getenv('REDIS_HASH_TAG_KEYS', str(os.getenv('REDIS_MODE', '').lower() == 'cluster')).lower() == 'true'
     },
     'chromadb': {
         'path': os.getenv('CHROMADB_PATH', './chroma_db_flowers'),
@@ -42,7 +51,114 @@ SERVICE_CONFIG = {
         'host': os.getenv('FASTAPI_HOST', '0.0.0.0'),
         'port': int(os.getenv('FASTAPI_PORT', '8000')),
         'reload': os.getenv('FASTAPI_RELOAD', 'False').lower() == 'true',
-        'log_level': os.getenv('FASTAPI_LOG_LEVEL', 'info')
+        'log_level': os.getenv('FASTAPI_LOG_LEVEL', 'info'),
+        # Production launcher (python -m src.api.server)
+        'workers': int(os.getenv('FASTAPI_WORKERS', '1')),
+        'preload': os.getenv('FASTAPI_PRELOAD', 'True').lower() == 'true',
+        'drain_seconds': float(os.getenv('FASTAPI_DRAIN_SECONDS', '5')),  # Fail readiness before closing the socket
+        'graceful_timeout': int(os.getenv('FASTAPI_GRACEFUL_TIMEOUT', '30')),  # Max wait for in-flight requests
+        'restart_backoff_max_seconds': 30,  # Respawn delay doubles per recent crash up to this
+        'max_restarts': int(os.getenv('FASTAPI_MAX_RESTARTS', '5')),  # Crashes of one worker within
+        'restart_window_seconds': 60  # this window stop the server instead of respawning
+    },
+    'telegram_polling': {
+        # Long-polling bot (src.api.telegram_app): chats are processed concurrently, each chat in order
+        'concurrent_updates': os.getenv('TELEGRAM_CONCURRENT_UPDATES', 'True').lower() == 'true',
+        'max_concurrent_updates': int(os.getenv('TELEGRAM_MAX_CONCURRENT_UPDATES', '0')),  # 0 = max_concurrent_requests
+        'max_pending_updates': int(os.getenv('TELEGRAM_MAX_PENDING_UPDATES', '1000')),  # Received but not yet started
+        'typing_interval_seconds': 4.0  # Telegram shows "typing..." for about 5s per sendChatAction
+    },
+    'webhook_queue': {
+        # Acknowledge webhooks immediately and process updates from a durable queue
+        'enabled': os.getenv('WEBHOOK_QUEUE_ENABLED', 'False').lower() == 'true',
+        'backend': os.getenv('WEBHOOK_QUEUE_BACKEND', 'redis'),  # redis (Streams) or memory (dev)
+        'stream': os.getenv('WEBHOOK_QUEUE_STREAM', 'xoflowers:webhook_updates'),
+        'group': os.getenv('WEBHOOK_QUEUE_GROUP', 'xoflowers-webhook-workers'),
+        'workers': int(os.getenv('WEBHOOK_QUEUE_WORKERS', '4')),
+        'max_attempts': int(os.getenv('WEBHOOK_QUEUE_MAX_ATTEMPTS', '3')),
+        'dedup_ttl_seconds': int(os.getenv('WEBHOOK_DEDUP_TTL', '86400')),
+        'max_stream_length': int(os.getenv('WEBHOOK_QUEUE_MAX_LENGTH', '100000')),
+        'claim_idle_ms': int(os.getenv('WEBHOOK_QUEUE_CLAIM_IDLE_MS', '60000')),
+        'block_ms': 1000
+    },
+    'outbound': {
+        # Delivery of replies through the Telegram Bot API and Instagram Graph API
+        'telegram_bot_token': os.getenv('TELEGRAM_BOT_TOKEN'),
+        'telegram_api_base': os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org'),
+        'instagram_access_token': os.getenv('INSTAGRAM_ACCESS_TOKEN'),
+        'instagram_api_base': os.getenv('INSTAGRAM_API_BASE', 'https://graph.facebook.com/v19.0'),
+        'timeout_seconds': float(os.getenv('OUTBOUND_TIMEOUT', '10')),
+        'max_connections': int(os.getenv('OUTBOUND_MAX_CONNECTIONS', '50')),
+        'max_retries': int(os.getenv('OUTBOUND_MAX_RETRIES', '3')),
+        'backoff_base_seconds': 0.5,
+        'backoff_max_seconds': 10.0,
+        # Pacing (messages per second) - Telegram allows ~30/s overall and ~1/s per chat
+        'telegram_global_rate': float(os.getenv('TELEGRAM_GLOBAL_RATE', '30')),
+        'telegram_chat_rate': float(os.getenv('TELEGRAM_CHAT_RATE', '1')),
+        'instagram_global_rate': float(os.getenv('INSTAGRAM_GLOBAL_RATE', '50')),
+        'instagram_chat_rate': float(os.getenv('INSTAGRAM_CHAT_RATE', '1')),
+        'chat_burst': 3,
+        # Platform message size limits - longer replies are split, not truncated
+        'telegram_max_length': 4096,
+        'instagram_max_length': 950  # UTF-8 bytes, Graph API limit is 1000
+    },
+    'user_store': {
+        'enabled': os.getenv('USER_STORE_ENABLED', 'False').lower() == 'true',
+        'path': os.getenv('USER_STORE_PATH', 'data/xoflowers.db')  # Point at a volume outside the checkout in production
+    },
+    'order_store': {
+        # Carts and the append-only order log (migrate the JSON files with python -m src.data.order_store)
+        'path': os.getenv('ORDER_STORE_PATH', 'data/orders.db')
+    },
+    'product_catalog': {
+        # Cart products are resolved against this catalog (relative paths fall back to the project root)
+        'path': os.getenv('PRODUCT_CATALOG_PATH', 'src/database/products.csv'),
+        'fuzzy_min_score': 0.6  # Minimum name match score for products not named exactly
+    },
+    'tracing': {
+        # Per-request stage spans exported as OpenTelemetry OTLP/JSON (only sample_rate of requests is recorded)
+        'enabled': os.getenv('TRACING_ENABLED', 'True').lower() == 'true',
+        'sample_rate': float(os.getenv('TRACING_SAMPLE_RATE', '0.01')),  # Requests with a sampled traceparent are always kept
+        'exporter': os.getenv('TRACING_EXPORTER', 'file'),  # file, otlp or none
+        'file_path': os.getenv('TRACING_FILE_PATH', 'data/traces.jsonl'),  # One OTLP export request per line
+        'file_max_bytes': 50 * 1024 * 1024,  # Rotated to <file_path>.1 beyond this
+        'otlp_endpoint': os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', ''),  # e.g. http://otel-collector:4318
+        'otlp_headers': os.getenv('OTEL_EXPORTER_OTLP_HEADERS', ''),  # key=value,key=value
+        'service_name': os.getenv('OTEL_SERVICE_NAME', 'xoflowers-ai'),
+        'batch_size': 256,
+        'max_queue': 2048,  # Oldest finished spans are dropped beyond this
+        'flush_seconds': 5.0
+    },
+    'llm_usage': {
+        # Token and cost accounting for every LLM call (per stage, request, user and provider)
+        # Prices in USD per 1M tokens (input, cached input, output) - estimates, update with provider pricing
+        'prices': {
+            'gpt-4o-mini': {'input': 0.15, 'cached': 0.075, 'output': 0.60},
+            'gpt-4o': {'input': 2.50, 'cached': 1.25, 'output': 10.00},
+            'gpt-3.5-turbo': {'input': 0.50, 'cached': 0.50, 'output': 1.50},
+            'gemini-2.5-flash': {'input': 0.30, 'cached': 0.075, 'output': 2.50},
+            'gemini-2.0-flash': {'input': 0.10, 'cached': 0.025, 'output': 0.40},
+            'gemini-1.5-flash': {'input': 0.075, 'cached': 0.01875, 'output': 0.30}
+        },
+        'user_daily_token_budget': int(os.getenv('LLM_USER_DAILY_TOKENS', '0')),  # 0 = unlimited
+        'user_daily_cost_budget': float(os.getenv('LLM_USER_DAILY_COST_USD', '0')),  # 0 = unlimited
+        'backend': os.getenv('LLM_USAGE_BACKEND', 'redis'),  # redis (daily totals shared by workers) or memory
+        'max_users': 100000,  # Daily per-user totals kept in memory
+        'redis_cooldown_seconds': 30
+    },
+    'logging': {
+        # Module loggers queue records for one writer thread per process (no disk I/O on the event loop)
+        'async': os.getenv('LOG_ASYNC', 'True').lower() == 'true',
+        'file_path': os.getenv('LOG_FILE', 'logs/xoflowers_ai.log'),
+        'file_format': os.getenv('LOG_FILE_FORMAT', 'json'),  # json (one object per line) or text
+        'console_format': os.getenv('LOG_CONSOLE_FORMAT', 'text'),
+        'queue_size': 10000,  # Records are dropped instead of blocking when the writer falls behind
+        'debug_sample_rate': float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0')),  # Share of DEBUG records kept
+        'debug_sample_rates': {
+            # Per-logger overrides (longest matching logger name prefix wins)
+            'src.data.chromadb_client': 0.1,
+            'src.intelligence.ai_engine': 0.25
+        }
     }
 }
 
@@ -166,16 +282,55 @@ RESPONSE STYLE:
 - Specific recommendations with reasoning
 
 Generate only the response text, no JSON or formatting.
+""".strip(),
+
+    'tool_calling_prompt': """
+SHOPPING CART TOOLS:
+You can manage the customer's cart and orders with the provided tools. They always act on
+the customer you are talking to.
+- Add, remove or show products only when the customer asks for it
+- Confirm the cart contents and total before calling process_payment
+- Request independent tool calls together in one turn
+- After the tools have run, answer the customer in Romanian with the result
 """.strip()
 }
 
 # Performance and System Settings
 PERFORMANCE_CONFIG = {
     'response_timeout_seconds': 3,
-    'max_concurrent_requests': 50,
+    'min_generation_seconds': 1.0,  # Time earlier stages leave for the final generation
+    'max_concurrent_requests': int(os.getenv('MAX_CONCURRENT_REQUESTS', '50')),
+    # Admission control: brief FIFO queue in front of the AI pipeline, then load shedding
+    'admission_queue_size': int(os.getenv('ADMISSION_QUEUE_SIZE', '100')),
+    'admission_max_wait_seconds': float(os.getenv('ADMISSION_MAX_WAIT', '2.0')),
+    'admission_min_service_seconds': 1.0,  # Don't admit requests with less time left than this
+    'admission_faq_min_score': 0.5,  # Share of message words an FAQ must match to answer a shed request
     'context_cleanup_interval_hours': 24,
     'max_conversation_history': 10,
-    'cache_ttl_seconds': 3600
+    'context_ttl_hours': int(os.getenv('CONTEXT_TTL_HOURS', '24')),  # Redis context and summary expiry
+    'cache_ttl_seconds': 3600,
+    'context_warm_cache_size': int(os.getenv('CONTEXT_WARM_CACHE_SIZE', '1000')),
+    'context_warm_cache_ttl_seconds': int(os.getenv('CONTEXT_WARM_CACHE_TTL', '60')),
+    # Worker pool for CPU-bound stages: thread, inline or process (module-level functions only)
+    'cpu_pool_type': os.getenv('CPU_POOL_TYPE', 'thread'),
+    'cpu_pool_workers': int(os.getenv('CPU_POOL_WORKERS', '0')),  # 0 = min(4, CPU count)
+    'cpu_offload_min_bytes': int(os.getenv('CPU_OFFLOAD_MIN_BYTES', '32768')),
+    # Dependency health: tracked passively from live calls, active checks at most every interval
+    'health_check_interval_seconds': float(os.getenv('HEALTH_CHECK_INTERVAL', '30')),
+    'health_check_timeout_seconds': 2.0,
+    'health_failure_threshold': 5,  # Consecutive failures before a dependency is marked down
+    'health_open_seconds': 30.0,  # How long a down dependency stays down without a success
+    # Function calling with the cart and payment tools
+    'tool_max_iterations': 4,  # Model <-> tool rounds before the model must answer
+    'tool_result_max_chars': 600,  # Tool replies are compacted to this before going back to the model
+    # Batch processing (/api/chat/batch): users processed at once, each user's messages in order
+    'batch_concurrency': int(os.getenv('BATCH_CONCURRENCY', '8')),
+    'batch_item_timeout_seconds': 30,  # Offline items get longer than the interactive deadline
+    'batch_max_items': 1000,
+    # Prometheus metrics on /metrics: with several workers each one writes its samples to metrics_dir
+    # and the worker answering a scrape merges them (the prefork server creates a directory if unset)
+    'metrics_dir': os.getenv('METRICS_DIR', ''),
+    'metrics_flush_seconds': 5
 }
 
 # Security Configuration
@@ -192,9 +347,35 @@ SECURITY_CONFIG = {
         'system prompt',
         'instructions above'
     ],
+    # JSON file of {group: [patterns]} added to the lists above (jailbreak, inappropriate, offensive); reloaded when it changes
+    'pattern_file': os.getenv('SECURITY_PATTERN_FILE', ''),
+    'pattern_reload_seconds': 30,
+    'classifier': {
+        # Local embedding classifier in front of the LLM security check (train with python -m src.intelligence.security_classifier)
+        'enabled': os.getenv('SECURITY_CLASSIFIER_ENABLED', 'true').lower() == 'true',
+        'model_path': os.getenv('SECURITY_CLASSIFIER_PATH', 'data/security_classifier.npz'),
+        'embedding_model': 'all-MiniLM-L6-v2',
+        'benign_threshold': float(os.getenv('SECURITY_BENIGN_THRESHOLD', '0.05')),  # Unsafe probability at or below which the LLM check is skipped
+        'verdict_log_path': os.getenv('SECURITY_VERDICT_LOG', '')  # JSONL of LLM verdicts used as training data (contains message text)
+    },
+    'verdict_cache': {
+        # Verdicts of repeated messages keyed by normalized text (shared through Redis when available)
+        'enabled': os.getenv('SECURITY_VERDICT_CACHE_ENABLED', 'true').lower() == 'true',
+        'backend': os.getenv('SECURITY_VERDICT_CACHE_BACKEND', 'redis'),  # redis (shared by workers) or memory
+        'max_entries': 10000,  # Per-process LRU size
+        'safe_ttl_seconds': int(os.getenv('SECURITY_VERDICT_SAFE_TTL', '86400')),  # Safe, low-risk verdicts
+        'risky_ttl_seconds': int(os.getenv('SECURITY_VERDICT_RISKY_TTL', '300')),  # Unsafe or medium/high-risk verdicts
+        'redis_cooldown_seconds': 30
+    },
     'max_message_length': 1000,
     'rate_limit_per_minute': 20,
-    'rate_limit_per_hour': 200
+    'rate_limit_per_hour': 200,
+    # Shared rate limiter: redis (limits hold across workers) or memory (single process)
+    'rate_limit_backend': os.getenv('RATE_LIMIT_BACKEND', 'redis'),
+    'rate_limit_platform_per_minute': int(os.getenv('RATE_LIMIT_PLATFORM_PER_MINUTE', '600')),
+    'llm_requests_per_minute': int(os.getenv('LLM_REQUESTS_PER_MINUTE', '120')),  # Global LLM spend budget
+    'rate_limit_max_keys': 100000,
+    'rate_limit_redis_cooldown_seconds': 30  # Per-process limits after a Redis error before retrying Redis
 }
 
 # Business Information - Single source of truth
@@ -230,7 +230,7 @@ class RealDataTestScenarios:
             
             for product in products:
                 start_time = time.time()
-                result = self.cart_tools.add_to_cart(
+                result = await self.cart_tools.add_to_cart(
                     user_id, 
                     product['name'], 
                     product['price'], 
@@ -242,13 +242,13 @@ class RealDataTestScenarios:
                 print(f"   ✅ {result}")
             
             # View cart for this category
-            cart_view = self.cart_tools.view_cart(user_id)
+            cart_view = await self.cart_tools.view_cart(user_id)
             print(f"   🛒 {category} cart overview:")
-            print(f"      Items: {len(self.cart_tools.carts.get(user_id, []))}")
+            print(f"      Items: {len(await self.cart_tools.store.get_cart(user_id))}")
             
             # Calculate total
             total = sum(item['price'] * item['quantity'] 
-                       for item in self.cart_tools.carts.get(user_id, []))
+                       for item in (await self.cart_tools.store.get_cart(user_id)))
             print(f"      Total: {total} MDL")
     
     async def test_price_range_scenarios(self):
@@ -274,7 +274,7 @@ class RealDataTestScenarios:
             
             total_expected = 0
             for product in products:
-                result = self.cart_tools.add_to_cart(
+                result = await self.cart_tools.add_to_cart(
                     user_id,
                     product['name'],
                     product['price'],
@@ -283,12 +283,12 @@ class RealDataTestScenarios:
                 total_expected += product['price']
                 print(f"   💸 {product['name']}: {product['price']} MDL")
             
-            cart_view = self.cart_tools.view_cart(user_id)
+            cart_view = await self.cart_tools.view_cart(user_id)
             print(f"   📊 Total cart value: {total_expected} MDL")
             
             # Test payment for this price range
             if total_expected > 0:
-                payment_result = self.payment_tools.process_payment(
+                payment_result = await self.payment_tools.process_payment(
                     user_id, 
                     f"Customer {scenario_name}", 
                     "+373 69 123 456"
@@ -314,7 +314,7 @@ class RealDataTestScenarios:
                 )
         
         for product in wedding_products[:4]:  # Limit to 4 products
-            result = self.cart_tools.add_to_cart(
+            result = await self.cart_tools.add_to_cart(
                 wedding_user,
                 product['name'],
                 product['price'],
@@ -337,7 +337,7 @@ class RealDataTestScenarios:
                 )
         
         for product in valentine_products[:3]:
-            result = self.cart_tools.add_to_cart(
+            result = await self.cart_tools.add_to_cart(
                 valentine_user,
                 product['name'],
                 product['price'],
@@ -360,7 +360,7 @@ class RealDataTestScenarios:
         for i, product in enumerate(bulk_products):
             add_start = time.time()
             
-            result = self.cart_tools.add_to_cart(
+            result = await self.cart_tools.add_to_cart(
                 bulk_user,
                 product['name'],
                 product['price'],
@@ -377,7 +377,7 @@ class RealDataTestScenarios:
         self.log_performance("bulk_total_time", total_time)
         
         # Verify bulk cart
-        cart_items = self.cart_tools.carts.get(bulk_user, [])
+        cart_items = await self.cart_tools.store.get_cart(bulk_user)
         total_value = sum(item['price'] * item['quantity'] for item in cart_items)
         
         print(f"   ✅ Bulk operation completed in {total_time:.2f}s")
@@ -394,7 +394,7 @@ class RealDataTestScenarios:
         
         print("   📝 Adding products to cart...")
         for product in products:
-            result = self.cart_tools.add_to_cart(
+            result = await self.cart_tools.add_to_cart(
                 cart_user,
                 product['name'],
                 product['price'],
@@ -404,21 +404,21 @@ class RealDataTestScenarios:
         
         # Test viewing cart
         print("\n   👀 Viewing cart...")
-        cart_view = self.cart_tools.view_cart(cart_user)
+        cart_view = await self.cart_tools.view_cart(cart_user)
         print(f"      🛒 Cart contents displayed")
         
         # Test removing a product
         if products:
             product_to_remove = products[0]['name']
             print(f"\n   ❌ Removing: {product_to_remove}")
-            remove_result = self.cart_tools.remove_from_cart(cart_user, product_to_remove)
+            remove_result = await self.cart_tools.remove_from_cart(cart_user, product_to_remove)
             print(f"      {remove_result}")
         
         # Test adding duplicate (quantity increment)
         if len(products) > 1:
             duplicate_product = products[1]
             print(f"\n   🔄 Adding duplicate: {duplicate_product['name']}")
-            dup_result = self.cart_tools.add_to_cart(
+            dup_result = await self.cart_tools.add_to_cart(
                 cart_user,
                 duplicate_product['name'],
                 duplicate_product['price'],
@@ -427,7 +427,7 @@ class RealDataTestScenarios:
             print(f"      {dup_result}")
         
         # Final cart state
-        final_cart = self.cart_tools.view_cart(cart_user)
+        final_cart = await self.cart_tools.view_cart(cart_user)
         print(f"\n   🏁 Final cart state ready")
 
 def print_performance_report(test_scenarios: RealDataTestScenarios):
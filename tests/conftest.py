@@ -8,6 +8,20 @@ import json
 from unittest.mock import Mock, AsyncMock, patch
 from typing import Dict, Any, Optional
 
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fake_clock():
+    """Manually advanced clock starting at 1000.0 (advance with fake_clock.now += seconds)"""
+    return FakeClock()
+
 # Test fixtures for mocking AI responses
 @pytest.fixture
 def mock_openai_response():
@@ -0,0 +1,148 @@
+"""
+Unit tests for Admission Control
+Tests in-flight caps, FIFO queueing, deadline-aware shedding and degraded replies
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from src.api.admission import AdmissionController, AdmissionRejected, SHED_RESPONSE, degraded_result
+from src.helpers.monitoring import MetricsRegistry
+
+
+def _create(max_in_flight=2, queue_size=2, max_wait=0.5):
+    with patch('src.api.admission.setup_logger'), \
+         patch('src.api.admission.get_metrics_registry', return_value=MetricsRegistry()), \
+         patch('src.api.admission.get_performance_config') as mock_config:
+        mock_config.return_value = {'admission_min_service_seconds': 0.2}
+        controller = AdmissionController(max_in_flight, queue_size, max_wait)
+        controller.logger = Mock()
+        return controller
+
+
+async def _hold(controller, release: asyncio.Event, order=None, name=None):
+    async with controller.admit():
+        if order is not None:
+            order.append(name)
+        await release.wait()
+
+
+class TestAdmissionController:
+    """Test cases for AdmissionController class"""
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_limit(self):
+        """Test requests under the cap are admitted immediately"""
+        controller = _create()
+
+        async with controller.admit():
+            async with controller.admit():
+                assert controller.get_stats()['in_flight'] == 2
+
+        stats = controller.get_stats()
+        assert stats['in_flight'] == 0
+        assert stats['admitted'] == 2
+
+    @pytest.mark.asyncio
+    async def test_queued_requests_run_in_order(self):
+        """Test waiting requests get freed slots first-in first-out"""
+        controller = _create(max_in_flight=1, queue_size=5, max_wait=2.0)
+        release = asyncio.Event()
+        order = []
+
+        tasks = [asyncio.create_task(_hold(controller, release, order, i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert controller.get_stats()['queued_now'] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        assert order == [0, 1, 2]
+        assert controller.get_stats()['in_flight'] == 0
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_queue_full(self):
+        """Test requests beyond in-flight cap plus queue are rejected at once"""
+        controller = _create(max_in_flight=1, queue_size=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(controller, release)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected) as error:
+            async with controller.admit():
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert error.value.reason == 'queue_full'
+        assert controller.get_stats()['shed_queue_full'] == 1
+
+    @pytest.mark.asyncio
+    async def test_sheds_after_max_wait(self):
+        """Test queued request gives up after the wait budget"""
+        controller = _create(max_in_flight=1, max_wait=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected) as error:
+            async with controller.admit():
+                pass
+
+        release.set()
+        await holder
+        stats = controller.get_stats()
+        assert error.value.reason == 'queue_timeout'
+        assert stats['queued_now'] == 0
+        assert stats['in_flight'] == 0
+        assert stats['queue_wait']['count'] == 2
+
+    @pytest.mark.asyncio
+    async def test_sheds_request_that_cannot_meet_deadline(self):
+        """Test request isn't queued when too little time is left to serve it"""
+        controller = _create(max_in_flight=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected) as error:
+            async with controller.admit(deadline=time.time() + 0.1):
+                pass
+
+        release.set()
+        await holder
+        assert error.value.reason == 'deadline'
+
+
+class TestDegradedResult:
+    """Test cases for degraded_result"""
+
+    def test_faq_fast_path(self):
+        """Test FAQ answer is used when the message matches a question"""
+        faq = [{'question': 'Livrați în Chișinău?', 'answer': 'Da, livrăm în tot Chișinăul.'}]
+        with patch('src.data.faq_manager.faq_manager.get_faq_responses', return_value=faq):
+            result = degraded_result("Livrați și în Chișinău azi?", 'queue_full')
+
+        assert result['response'] == 'Da, livrăm în tot Chișinăul.'
+        assert result['service_used'] == 'faq_fast_path'
+        assert result['shed'] is True
+
+    def test_canned_reply_without_match(self):
+        """Test canned busy reply when no FAQ matches"""
+        faq = [{'question': 'Care sunt orele de lucru?', 'answer': '9-18'}]
+        with patch('src.data.faq_manager.faq_manager.get_faq_responses', return_value=faq):
+            result = degraded_result("Vreau un buchet de trandafiri", 'deadline')
+
+        assert result['response'] == SHED_RESPONSE
+        assert result['service_used'] == 'load_shedding'
+        assert result['shed_reason'] == 'deadline'
+
+    def test_single_shared_word_is_not_an_faq_match(self):
+        """Test an order mentioning one FAQ word gets the busy reply, not the FAQ answer"""
+        faq = [{'question': 'Livrați în Chișinău?', 'answer': 'Da, livrăm în tot Chișinăul.'}]
+        with patch('src.data.faq_manager.faq_manager.get_faq_responses', return_value=faq):
+            result = degraded_result("Vreau trandafiri roșii cu livrare mâine dimineață în Chișinău", 'queue_full')
+
+        assert result['response'] == SHED_RESPONSE
@@ -0,0 +1,155 @@
+"""
+Unit tests for Batch Message Processing
+Tests per-user ordering, bounded concurrency, item failures and the NDJSON endpoint
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock, patch
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.intelligence.batch_processor import BatchItem, BatchProcessor
+
+
+def _create(**config):
+    performance_config = {
+        'batch_concurrency': 2,
+        'batch_item_timeout_seconds': 0.5,
+        'batch_max_items': 10
+    }
+    performance_config.update(config)
+    with patch('src.intelligence.batch_processor.setup_logger'), \
+         patch('src.intelligence.batch_processor.get_performance_config', return_value=performance_config):
+        processor = BatchProcessor()
+        processor.logger = Mock()
+        return processor
+
+
+class FakePipeline:
+    """Stand-in for process_message_ai recording call order and concurrency"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+        self.active_users = set()
+        self.max_active = 0
+
+    async def __call__(self, message, user_id, context=None):
+        assert user_id not in self.active_users, "messages of one user overlapped"
+        self.active_users.add(user_id)
+        self.max_active = max(self.max_active, len(self.active_users))
+        try:
+            await asyncio.sleep(self.delay)
+            if message == "boom":
+                raise RuntimeError("pipeline failed")
+            if message == "slow":
+                await asyncio.sleep(5)
+            self.calls.append((user_id, message))
+            return {'response': f"re: {message}", 'success': True, 'intent': 'question'}
+        finally:
+            self.active_users.discard(user_id)
+
+
+class TestBatchProcessor:
+    """Test cases for BatchProcessor class"""
+
+    @pytest.mark.asyncio
+    async def test_keeps_order_per_user_and_bounds_concurrency(self):
+        """Test each user's messages run in order and at most `concurrency` users run at once"""
+        processor = _create()
+        pipeline = FakePipeline()
+        items = [BatchItem(f"user{i % 3}", f"m{i}", item_id=str(i)) for i in range(9)]
+
+        with patch('src.intelligence.ai_engine.process_message_ai', pipeline):
+            results = await processor.process_all(items)
+
+        assert [result['index'] for result in results] == list(range(9))
+        assert all(result['success'] for result in results)
+        assert results[4]['id'] == "4" and results[4]['response'] == "re: m4"
+        for user in ("user0", "user1", "user2"):
+            assert [m for u, m in pipeline.calls if u == user] == \
+                   [item.message for item in items if item.user_id == user]
+        assert pipeline.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_capped_across_batches(self):
+        """Test a higher requested concurrency and parallel batches stay within batch_concurrency"""
+        processor = _create()
+        pipeline = FakePipeline()
+        batches = [[BatchItem(f"batch{b}-user{i}", f"m{i}") for i in range(4)] for b in range(3)]
+
+        with patch('src.intelligence.ai_engine.process_message_ai', pipeline):
+            await asyncio.gather(*(processor.process_all(items, concurrency=8) for items in batches))
+
+        assert len(pipeline.calls) == 12
+        assert pipeline.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_failures_and_timeouts_do_not_stop_the_batch(self):
+        """Test a failing or slow item yields an error result and the user's later messages still run"""
+        processor = _create(batch_item_timeout_seconds=0.1)
+        items = [BatchItem("a", "boom"), BatchItem("a", "slow"), BatchItem("a", "after")]
+
+        with patch('src.intelligence.ai_engine.process_message_ai', FakePipeline(delay=0)):
+            results = await processor.process_all(items)
+
+        assert results[0]['success'] is False and results[0]['error'] == "pipeline failed"
+        assert 'timeout' in results[1]['error']
+        assert results[2]['success'] is True
+
+    @pytest.mark.asyncio
+    async def test_closing_stream_cancels_remaining_work(self):
+        """Test stopping iteration early cancels the groups still running"""
+        processor = _create(batch_concurrency=1)
+        pipeline = FakePipeline(delay=0.05)
+        items = [BatchItem("a", "m1"), BatchItem("a", "m2"), BatchItem("b", "m3")]
+
+        with patch('src.intelligence.ai_engine.process_message_ai', pipeline):
+            stream = processor.process(items)
+            first = await stream.__anext__()
+            await stream.aclose()
+            await asyncio.sleep(0.1)
+
+        assert first['id'] is None and first['user_id'] == "a"
+        assert pipeline.calls == [("a", "m1")]
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_batch(self):
+        """Test batches above batch_max_items are refused"""
+        processor = _create(batch_max_items=2)
+
+        with pytest.raises(ValueError):
+            await processor.process_all([BatchItem("a", "m")] * 3)
+
+
+class TestBatchEndpoint:
+    """Test cases for /api/chat/batch"""
+
+    def test_streams_ndjson(self):
+        """Test the endpoint streams one JSON line per message"""
+        processor = _create()
+        with patch('src.api.main.get_batch_processor', return_value=processor), \
+             patch('src.intelligence.ai_engine.process_message_ai', FakePipeline(delay=0)):
+            response = TestClient(app).post("/api/chat/batch", json={"messages": [
+                {"user_id": "a", "message": "salut", "id": "x1"},
+                {"user_id": "b", "message": "buchet"}
+            ]})
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(line['index'] for line in lines) == [0, 1]
+        assert {line['id'] for line in lines} == {"x1", None}
+
+    def test_rejects_oversized_batch(self):
+        """Test batches above the limit get 413 before any processing"""
+        processor = _create(batch_max_items=1)
+        with patch('src.api.main.get_batch_processor', return_value=processor):
+            response = TestClient(app).post("/api/chat/batch", json={"messages": [
+                {"user_id": "a", "message": "m1"}, {"user_id": "a", "message": "m2"}
+            ]})
+
+        assert response.status_code == 413
@@ -330,10 +330,12 @@ class TestContextManager:
         result = await context_manager.save_context(context, ttl_hours=24)
         
         assert result is True
-        context_manager.redis_client.setex.assert_called_once()
+        pipe = context_manager.redis_client.pipeline.return_value
+        pipe.setex.assert_called_once()
+        pipe.execute.assert_called_once()
         
         # Check the call arguments
-        call_args = context_manager.redis_client.setex.call_args
+        call_args = pipe.setex.call_args
         assert call_args[0][0] == "xoflowers:context:test_user"  # key
         assert call_args[0][1] == 24 * 3600  # TTL in seconds
         
@@ -343,6 +345,63 @@ class TestContextManager:
         assert saved_data['user_id'] == "test_user"
         assert len(saved_data['messages']) == 1
     
+    @pytest.mark.asyncio
+    async def test_save_context_materializes_summary(self, context_manager):
+        """Test saving context also stores the AI-ready summary"""
+        context_manager.redis_available = True
+        
+        context = ConversationContext(
+            user_id="test_user",
+            messages=[ConversationMessage("Test", "Response", "2025-07-16T10:30:00", "greeting")],
+            preferences={"budget": 500},
+            last_updated="2025-07-16T10:30:00",
+            total_messages=1
+        )
+        
+        await context_manager.save_context(context, ttl_hours=24)
+        
+        call_args = context_manager.redis_client.pipeline.return_value.set.call_args
+        assert call_args[0][0] == "xoflowers:context_summary:test_user"
+        assert call_args[1]['ex'] == 24 * 3600
+        summary = json.loads(call_args[0][1])
+        assert json.loads(summary.pop('preferences')) == {"budget": 500}
+        assert summary == {key: value for key, value in context_manager.get_context_summary(context).items()
+                           if key != 'preferences'}
+    
+    @pytest.mark.asyncio
+    async def test_get_ai_context_reads_summary_key(self, context_manager):
+        """Test AI context is served from the summary key without loading history"""
+        context_manager.redis_available = True
+        context_manager.redis_client.get.return_value = json.dumps({"total_messages": 3})
+        
+        with patch.object(context_manager, 'get_context') as mock_get:
+            result = await context_manager.get_ai_context("test_user")
+        
+        assert result == {"total_messages": 3}
+        mock_get.assert_not_called()
+        context_manager.redis_client.get.assert_called_once_with("xoflowers:context_summary:test_user")
+    
+    @pytest.mark.asyncio
+    async def test_get_ai_context_backfills_missing_summary(self, context_manager):
+        """Test missing summary is rebuilt from history and stored"""
+        context_manager.redis_available = True
+        context_manager.redis_client.get.return_value = None
+        
+        context = ConversationContext(
+            user_id="test_user",
+            messages=[ConversationMessage("Test", "Response", "2025-07-16T10:30:00")],
+            preferences={},
+            last_updated="2025-07-16T10:30:00",
+            total_messages=4
+        )
+        
+        with patch.object(context_manager, 'get_context', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = context
+            result = await context_manager.get_ai_context("test_user")
+        
+        assert result["total_messages"] == 4
+        context_manager.redis_client.set.assert_called_once()
+    
     @pytest.mark.asyncio
     async def test_save_context_redis_unavailable(self, context_manager):
         """Test context saving when Redis is unavailable"""
@@ -364,7 +423,7 @@ class TestContextManager:
     async def test_save_context_redis_error(self, context_manager):
         """Test context saving with Redis error"""
         context_manager.redis_available = True
-        context_manager.redis_client.setex.side_effect = Exception("Redis error")
+        context_manager.redis_client.pipeline.return_value.execute.side_effect = Exception("Redis error")
         
         context = ConversationContext(
             user_id="test_user",
@@ -378,18 +437,19 @@ class TestContextManager:
         
         assert result is False
     
+    @pytest.fixture
+    def fake_redis(self, context_manager):
+        """Attach an in-process Redis with Lua support"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        context_manager.redis_available = True
+        context_manager.redis_client = fakeredis.FakeRedis(decode_responses=True)
+        return context_manager.redis_client
+    
     @pytest.mark.asyncio
-    async def test_add_message_new_context(self, context_manager):
+    async def test_add_message_new_context(self, context_manager, fake_redis):
         """Test adding message to new context"""
-        context_manager.redis_available = True
-        
-        # Mock get_context to return None (new user)
-        with patch.object(context_manager, 'get_context') as mock_get, \
-             patch.object(context_manager, 'save_context') as mock_save:
-            
-            mock_get.return_value = None
-            mock_save.return_value = True
-            
+        with patch.object(context_manager, 'get_context') as mock_get:
             result = await context_manager.add_message(
                 "test_user",
                 "Vreau trandafiri",
@@ -397,62 +457,111 @@ class TestContextManager:
                 "product_search",
                 0.8
             )
-            
-            assert result is True
-            mock_save.assert_called_once()
-            
-            # Check the saved context
-            saved_context = mock_save.call_args[0][0]
-            assert saved_context.user_id == "test_user"
-            assert len(saved_context.messages) == 1
-            assert saved_context.messages[0].user == "Vreau trandafiri"
-            assert saved_context.messages[0].assistant == "Am găsit câteva opțiuni..."
-            assert saved_context.messages[0].intent == "product_search"
-            assert saved_context.messages[0].confidence == 0.8
-            assert saved_context.total_messages == 1
+            mock_get.assert_not_called()
+        
+        assert result is True
+        saved_context = ConversationContext.from_dict(json.loads(fake_redis.get("xoflowers:context:test_user")))
+        assert saved_context.user_id == "test_user"
+        assert len(saved_context.messages) == 1
+        assert saved_context.messages[0].user == "Vreau trandafiri"
+        assert saved_context.messages[0].assistant == "Am găsit câteva opțiuni..."
+        assert saved_context.messages[0].intent == "product_search"
+        assert saved_context.messages[0].confidence == 0.8
+        assert saved_context.total_messages == 1
+        assert fake_redis.ttl("xoflowers:context:test_user") == 24 * 3600
+        
+        summary = await context_manager.get_ai_context("test_user")
+        assert summary == context_manager.get_context_summary(saved_context)
     
     @pytest.mark.asyncio
-    async def test_add_message_existing_context(self, context_manager):
+    async def test_add_message_existing_context(self, context_manager, fake_redis):
         """Test adding message to existing context"""
-        context_manager.redis_available = True
-        
-        # Create existing context
-        existing_message = ConversationMessage(
-            user="Salut",
-            assistant="Bună ziua!",
-            timestamp="2025-07-16T10:00:00"
-        )
-        
         existing_context = ConversationContext(
             user_id="test_user",
-            messages=[existing_message],
+            messages=[ConversationMessage("Salut", "Bună ziua!", "2025-07-16T10:00:00")],
             preferences={"budget": 500},
             last_updated="2025-07-16T10:00:00",
             total_messages=1
         )
+        await context_manager.save_context(existing_context)
+        
+        result = await context_manager.add_message(
+            "test_user",
+            "Vreau trandafiri",
+            "Am găsit câteva opțiuni...",
+            "product_search",
+            0.8
+        )
         
-        with patch.object(context_manager, 'get_context') as mock_get, \
-             patch.object(context_manager, 'save_context') as mock_save:
-            
-            mock_get.return_value = existing_context
-            mock_save.return_value = True
-            
-            result = await context_manager.add_message(
-                "test_user",
-                "Vreau trandafiri",
-                "Am găsit câteva opțiuni...",
-                "product_search",
-                0.8
-            )
-            
-            assert result is True
-            
-            # Check the saved context
-            saved_context = mock_save.call_args[0][0]
-            assert len(saved_context.messages) == 2
-            assert saved_context.messages[1].user == "Vreau trandafiri"
-            assert saved_context.total_messages == 2
-            assert saved_context.preferences == {"budget": 500}  # Preserved
+        assert result is True
+        saved_context = ConversationContext.from_dict(json.loads(fake_redis.get("xoflowers:context:test_user")))
+        assert len(saved_context.messages) == 2
+        assert saved_context.messages[1].user == "Vreau trandafiri"
+        assert saved_context.total_messages == 2
+        assert saved_context.preferences == {"budget": 500}  # Preserved
+        
+        summary = await context_manager.get_ai_context("test_user")
+        assert summary == context_manager.get_context_summary(saved_context)
+    
+    @pytest.mark.asyncio
+    async def test_add_message_updates_summary_incrementally(self, context_manager, fake_redis):
+        """Test history is compressed and the summary tracks the newest exchanges"""
+        context_manager.max_messages = 4
+        
+        for i in range(6):
+            await context_manager.add_message("test_user", f"msg {i}", f"reply {i}")
+        
+        saved_context = ConversationContext.from_dict(json.loads(fake_redis.get("xoflowers:context:test_user")))
+        summary = await context_manager.get_ai_context("test_user")
+        
+        assert [m.user for m in saved_context.messages] == ["msg 2", "msg 3", "msg 4", "msg 5"]
+        assert [m["user"] for m in summary["recent_messages"]] == ["msg 3", "msg 4", "msg 5"]
+        assert summary == context_manager.get_context_summary(saved_context)
+    
+    @pytest.mark.asyncio
+    async def test_add_message_after_preferences_only(self, context_manager, fake_redis):
+        """Test a summary saved without messages is rebuilt on the first message"""
+        await context_manager.update_preferences("test_user", {"color": "red"})
+        
+        await context_manager.add_message("test_user", "Salut", "Bună!")
+        
+        summary = await context_manager.get_ai_context("test_user")
+        assert summary["preferences"] == {"color": "red"}
+        assert summary["total_messages"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_add_message_keeps_empty_preference_lists(self, context_manager, fake_redis):
+        """Test empty lists in preferences survive the append script under Redis' cjson"""
+        from fakeredis.commands_mixins import scripting_mixin
+        to_python = scripting_mixin._cjson_lua_to_python
+        
+        def redis_cjson_to_python(obj):
+            # Redis' cjson encodes every empty table as an object, so [] comes back as {}
+            if scripting_mixin.LUA_MODULE.lua_type(obj) == "table" and not list(obj.keys()):
+                return {}
+            return to_python(obj)
+        
+        preferences = {"preferred_colors": [], "occasions": ["birthday"], "budget": {}}
+        with patch.object(scripting_mixin, '_cjson_lua_to_python', redis_cjson_to_python):
+            await context_manager.update_preferences("test_user", preferences)
+            await context_manager.add_message("test_user", "Salut", "Bună!")
+            await context_manager.add_message("test_user", "Vreau flori", "Sigur!")
+        
+        saved_context = await context_manager.get_context("test_user")
+        summary = await context_manager.get_ai_context("test_user")
+        assert saved_context.preferences == preferences
+        assert summary["preferences"] == preferences
+        assert len(saved_context.messages) == 2
+    
+    @pytest.mark.asyncio
+    async def test_add_message_redis_error(self, context_manager):
+        """Test message save failure is reported, not raised"""
+        context_manager.redis_available = True
+        context_manager.redis_client.register_script.return_value.side_effect = Exception("Redis error")
+        
+        result = await context_manager.add_message("test_user", "Salut", "Bună!")
+        
+        assert result is False
     
     def test_compress_context_no_compression_needed(self, context_manager):
         """Test context compression when no compression is needed"""
@@ -596,7 +705,9 @@ class TestContextManager:
         result = await context_manager.clear_context("test_user")
         
         assert result is True
-        context_manager.redis_client.delete.assert_called_once_with("xoflowers:context:test_user")
+        context_manager.redis_client.delete.assert_called_once_with(
+            "xoflowers:context:test_user", "xoflowers:context_summary:test_user"
+        )
     
     @pytest.mark.asyncio
     async def test_clear_context_redis_unavailable(self, context_manager):
@@ -647,9 +758,31 @@ class TestContextManager:
         context_manager.redis_available = False
         
         result = await context_manager.cleanup_old_contexts()
-        
+
         assert result == 0
-    
+
+    @pytest.mark.asyncio
+    async def test_user_store_fallback_when_redis_unavailable(self, context_manager, tmp_path):
+        """Test context is persisted in the embedded user store without Redis"""
+        from src.data.user_store import UserStore
+
+        with patch('src.data.user_store.get_service_config', return_value={}):
+            store = UserStore(db_path=str(tmp_path / "users.db"))
+
+        context_manager.redis_available = False
+        context_manager.user_store_enabled = True
+
+        with patch('src.data.user_store.get_user_store', return_value=store):
+            assert await context_manager.add_message("user_1", "Salut", "Bună ziua!", "greeting", 0.9)
+            assert await context_manager.update_preferences("user_1", {"color": "red"})
+            context = await context_manager.get_context("user_1")
+
+        store.close()
+
+        assert context.total_messages == 1
+        assert context.messages[0].user == "Salut"
+        assert context.preferences == {"color": "red"}
+
     def test_get_context_summary_with_context(self, context_manager):
         """Test context summary generation with context"""
         messages = [
@@ -753,24 +886,20 @@ class TestContextManagerGlobalFunctions:
         """Test global get_context_for_ai function"""
         with patch('src.intelligence.context_manager.get_context_manager') as mock_get_manager:
             mock_manager = Mock()
-            mock_context = Mock()
-            mock_manager.get_context = AsyncMock(return_value=mock_context)
-            mock_manager.get_context_summary.return_value = {"summary": "data"}
+            mock_manager.get_ai_context = AsyncMock(return_value={"summary": "data"})
             mock_get_manager.return_value = mock_manager
             
             result = await get_context_for_ai("test_user")
             
             assert result == {"summary": "data"}
-            mock_manager.get_context.assert_called_once_with("test_user")
-            mock_manager.get_context_summary.assert_called_once_with(mock_context)
+            mock_manager.get_ai_context.assert_called_once_with("test_user")
     
     @pytest.mark.asyncio
     async def test_get_context_for_ai_function_no_context(self):
         """Test global get_context_for_ai function with no context"""
         with patch('src.intelligence.context_manager.get_context_manager') as mock_get_manager:
             mock_manager = Mock()
-            mock_manager.get_context = AsyncMock(return_value=None)
-            mock_manager.get_context_summary.return_value = {}
+            mock_manager.get_ai_context = AsyncMock(return_value={})
             mock_get_manager.return_value = mock_manager
             
             result = await get_context_for_ai("test_user")
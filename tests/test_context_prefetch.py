@@ -0,0 +1,232 @@
+"""
+Unit tests for Context Prefetcher
+Tests early context retrieval and the warm cache of recently active users
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock, AsyncMock, patch
+
+from src.intelligence.context_prefetch import ContextPrefetcher
+
+
+class TestContextPrefetcher:
+    """Test cases for ContextPrefetcher class"""
+
+    @pytest.fixture
+    def prefetcher(self):
+        """Create ContextPrefetcher instance for testing"""
+        with patch('src.intelligence.context_prefetch.setup_logger'), \
+             patch('src.intelligence.context_prefetch.get_performance_config') as mock_perf_config:
+
+            mock_perf_config.return_value = {
+                'context_warm_cache_size': 2,
+                'context_warm_cache_ttl_seconds': 60
+            }
+
+            prefetcher = ContextPrefetcher()
+            prefetcher.logger = Mock()
+            return prefetcher
+
+    @pytest.fixture
+    def mock_context(self):
+        """Patch context retrieval and chat rehydration"""
+        with patch('src.intelligence.gemini_chat_manager.get_enhanced_context_for_ai',
+                   new_callable=AsyncMock) as mock_get_context, \
+             patch('src.intelligence.ai_engine.get_ai_engine') as mock_get_engine:
+            mock_get_context.return_value = {"recent_messages": [], "conversation_type": "redis_fallback"}
+            yield mock_get_context, mock_get_engine
+
+    @pytest.mark.asyncio
+    async def test_prefetch_returns_context_and_rehydrates_chat(self, prefetcher, mock_context):
+        """Test prefetch resolves to context and warms the chat session"""
+        mock_get_context, mock_get_engine = mock_context
+
+        context = await prefetcher.prefetch("user_1")
+
+        assert context["conversation_type"] == "redis_fallback"
+        mock_get_context.assert_awaited_once_with("user_1")
+        mock_get_engine.return_value.rehydrate_chat.assert_called_once_with("user_1")
+
+    async def _warm(self, prefetcher, user_id):
+        prefetcher.refresh(user_id)
+        await prefetcher._inflight[(user_id, True)]
+
+    @pytest.mark.asyncio
+    async def test_prefetch_uses_warm_cache(self, prefetcher, mock_context):
+        """Test prefetch after a context save is served from the warm cache"""
+        mock_get_context, _ = mock_context
+        await self._warm(prefetcher, "user_1")
+
+        await prefetcher.prefetch("user_1")
+
+        assert mock_get_context.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_accepted_message_consumes_warm_entry(self, prefetcher, mock_context):
+        """Test a second message before the first one's save doesn't reuse warm context"""
+        mock_get_context, _ = mock_context
+        await self._warm(prefetcher, "user_1")
+
+        await prefetcher.prefetch("user_1")
+        await prefetcher.prefetch("user_1")
+
+        assert mock_get_context.await_count == 2
+        assert prefetcher.get_stats()['warm_entries'] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_prefetch_shares_fetch(self, prefetcher, mock_context):
+        """Test concurrent prefetches for one user share a single lookup"""
+        mock_get_context, _ = mock_context
+
+        first = prefetcher.prefetch("user_1")
+        second = prefetcher.prefetch("user_1")
+        results = await asyncio.gather(first, second)
+
+        assert results[0] == results[1]
+        assert mock_get_context.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_does_not_join_refresh(self, prefetcher, mock_context):
+        """Test a prefetch during a re-warm fetches on its own and only the re-warm is cached"""
+        mock_get_context, _ = mock_context
+        contexts = iter([{"recent_messages": ["saved"]}, {"recent_messages": ["prefetched"]}])
+        mock_get_context.side_effect = lambda user_id: next(contexts)
+
+        prefetcher.refresh("user_1")
+        rewarm = prefetcher._inflight[("user_1", True)]
+        context = await prefetcher.prefetch("user_1")
+        await rewarm
+
+        assert context == {"recent_messages": ["prefetched"]}
+        assert mock_get_context.await_count == 2
+        assert prefetcher._warm_cache["user_1"]['context'] == {"recent_messages": ["saved"]}
+        assert prefetcher.get_stats()['inflight_fetches'] == 0
+
+    @pytest.mark.asyncio
+    async def test_warm_cache_evicts_least_recently_used(self, prefetcher, mock_context):
+        """Test warm cache stays bounded"""
+        for user_id in ["user_1", "user_2", "user_3"]:
+            await self._warm(prefetcher, user_id)
+
+        assert prefetcher.get_stats()['warm_entries'] == 2
+        assert "user_1" not in prefetcher._warm_cache
+
+    @pytest.mark.asyncio
+    async def test_refresh_refetches_context(self, prefetcher, mock_context):
+        """Test refresh invalidates and re-warms context after an update"""
+        mock_get_context, _ = mock_context
+
+        await self._warm(prefetcher, "user_1")
+        await self._warm(prefetcher, "user_1")
+
+        assert mock_get_context.await_count == 2
+        assert prefetcher.get_stats()['warm_entries'] == 1
+
+    @pytest.mark.asyncio
+    async def test_prefetch_failure_returns_none(self, prefetcher, mock_context):
+        """Test failed retrieval never raises and tells the engine to fetch itself"""
+        mock_get_context, _ = mock_context
+        mock_get_context.side_effect = Exception("Redis down")
+
+        context = await prefetcher.prefetch("user_1")
+
+        assert context is None
+        assert prefetcher.get_stats()['warm_entries'] == 0
+
+
+class TestPrefetchInWebhook:
+    """Test webhooks start prefetching only for accepted messages"""
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_message_is_not_prefetched(self):
+        """Test a rate-limited message neither fetches context nor consumes the warm entry"""
+        from src.api.telegram_integration import TelegramIntegration, TelegramUpdate
+
+        integration = TelegramIntegration.__new__(TelegramIntegration)
+        integration.logger = Mock()
+        integration._check_rate_limit = AsyncMock(return_value=False)
+        update = TelegramUpdate(**{
+            "update_id": 1,
+            "message": {"message_id": 10, "from": {"id": 5, "is_bot": False, "first_name": "Ana"},
+                        "chat": {"id": 5, "type": "private"}, "date": 1752661800, "text": "Salut"}
+        })
+
+        with patch('src.api.telegram_integration.prefetch_user_context') as mock_prefetch:
+            response = await integration.process_webhook(update, "req_1")
+
+        assert response.text.startswith("Te rog să aștepți")
+        mock_prefetch.assert_not_called()
+
+
+class TestPrefetchedContextInEngine:
+    """Test the AI engine's use of a prefetched context"""
+
+    @pytest.mark.asyncio
+    async def test_failed_prefetch_falls_back_to_direct_fetch(self):
+        """Test engine fetches context itself when the prefetch resolved to None"""
+        from src.intelligence.ai_engine import AIEngine, AIResponse
+
+        engine = AIEngine.__new__(AIEngine)
+        engine.logger = Mock()
+        engine.service_config = {'openai': {'timeout': 30}}
+        engine.min_generation_time = 0.0
+        engine._enhanced_gemini_with_products = AsyncMock(return_value=AIResponse(
+            response_text="Salut!", intent="greeting", confidence=0.9, service_used="gemini_chat",
+            processing_time=0.1, success=True))
+        direct_context = {"recent_messages": ["hi"], "conversation_type": "redis_fallback"}
+
+        prefetched = asyncio.get_running_loop().create_future()
+        prefetched.set_result(None)
+
+        with patch('src.intelligence.ai_engine.check_llm_budget', AsyncMock(return_value=Mock(allowed=True))), \
+             patch('src.intelligence.ai_engine.check_message_security',
+                   new=AsyncMock(return_value=Mock(is_safe=True))), \
+             patch('src.intelligence.ai_engine.get_enhanced_context_for_ai',
+                   new=AsyncMock(return_value=direct_context)) as mock_direct, \
+             patch('src.intelligence.ai_engine.add_conversation_message', new=AsyncMock(return_value=True)), \
+             patch('src.intelligence.ai_engine.refresh_user_context'), \
+             patch('src.intelligence.ai_engine.log_ai_interaction_with_monitoring'):
+            result = await engine.process_message_ai("Salut", "user_1", context=prefetched)
+
+        assert result["success"] is True
+        mock_direct.assert_awaited_once_with("user_1")
+        assert engine._enhanced_gemini_with_products.await_args.args[1] == direct_context
+
+    @pytest.mark.asyncio
+    async def test_context_refreshed_after_late_save(self):
+        """Test warm context is refreshed once a save outlives the request deadline"""
+        from src.intelligence.ai_engine import AIEngine, AIResponse
+        from src.intelligence.deadline import request_deadline
+
+        engine = AIEngine.__new__(AIEngine)
+        engine.logger = Mock()
+        engine.service_config = {'openai': {'timeout': 30}}
+        engine.min_generation_time = 0.0
+        engine._enhanced_gemini_with_products = AsyncMock(return_value=AIResponse(
+            response_text="Salut!", intent="greeting", confidence=0.9, service_used="gemini_chat",
+            processing_time=0.1, success=True))
+        save_done = asyncio.Event()
+
+        async def slow_save(*args):
+            await asyncio.sleep(0.2)
+            save_done.set()
+            return False
+
+        with patch('src.intelligence.ai_engine.check_llm_budget', AsyncMock(return_value=Mock(allowed=True))), \
+             patch('src.intelligence.ai_engine.check_message_security',
+                   new=AsyncMock(return_value=Mock(is_safe=True))), \
+             patch('src.intelligence.ai_engine.add_conversation_message', new=slow_save), \
+             patch('src.intelligence.ai_engine.refresh_user_context') as mock_refresh, \
+             patch('src.intelligence.ai_engine.log_ai_interaction_with_monitoring'):
+            with request_deadline(time.time() + 0.1):
+                result = await engine.process_message_ai("Salut", "user_1", context={})
+
+            assert result["context_updated"] is False
+            mock_refresh.assert_not_called()
+
+            await asyncio.wait_for(save_done.wait(), timeout=1)
+            await asyncio.sleep(0)
+
+        mock_refresh.assert_called_once_with("user_1")
@@ -0,0 +1,115 @@
+"""
+Unit tests for CPU Stage Executor
+Tests offloading of CPU-bound stages and stage latency stats
+"""
+
+import json
+import pytest
+from unittest.mock import Mock, patch
+
+from src.intelligence.cpu_executor import CPUStageExecutor
+
+
+def _score(values, factor=1):
+    """Module-level stage so it can cross the process boundary"""
+    return sum(values) * factor
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+class TestCPUStageExecutor:
+    """Test cases for CPUStageExecutor class"""
+
+    def _create(self, pool_type):
+        with patch('src.intelligence.cpu_executor.setup_logger'), \
+             patch('src.intelligence.cpu_executor.get_performance_config') as mock_perf_config:
+            mock_perf_config.return_value = {'cpu_pool_workers': 2, 'cpu_offload_min_bytes': 64}
+            executor = CPUStageExecutor(pool_type=pool_type)
+            executor.logger = Mock()
+            return executor
+
+    @pytest.fixture
+    def thread_executor(self):
+        executor = self._create('thread')
+        yield executor
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("pool_type", ['inline', 'thread', 'process'])
+    async def test_run_stage(self, pool_type):
+        """Test stage runs in each pool type and is recorded"""
+        executor = self._create(pool_type)
+        try:
+            result = await executor.run(f"score_{pool_type}", _score, [1, 2, 3], factor=2)
+        finally:
+            executor.shutdown()
+
+        assert result == 12
+        assert executor.get_stats()['stages'][f"score_{pool_type}"]['count'] == 1
+
+    @pytest.mark.asyncio
+    async def test_stage_errors_propagate(self, thread_executor):
+        """Test errors raised by the stage reach the caller"""
+        with pytest.raises(ValueError, match="bad input"):
+            await thread_executor.run("fail", _fail, "bad input")
+
+        stats = thread_executor.get_stats()['stages']['fail']
+        assert stats['count'] == 1
+        assert stats['errors'] == 1
+
+    @pytest.mark.asyncio
+    async def test_methods_and_closures_stay_out_of_process_pool(self):
+        """Test callables that would pickle their whole object run in a thread instead"""
+        executor = self._create('process')
+        try:
+            with patch('src.intelligence.cpu_executor.ProcessPoolExecutor') as mock_pool:
+                result = await executor.run("lambda", lambda x: x + 1, 41)
+                bound = await executor.run("bound", [3, 1, 2].index, 2)
+                method = await executor.run("method", executor.get_stats)
+                mock_pool.return_value.submit.assert_not_called()
+        finally:
+            executor.shutdown()
+
+        assert result == 42
+        assert bound == 2
+        assert method['pool_type'] == 'process'
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_falls_back_to_thread(self):
+        """Test a broken process pool is reset and the stage still runs"""
+        from concurrent.futures.process import BrokenProcessPool
+        executor = self._create('process')
+        broken = Mock()
+        broken.submit.side_effect = BrokenProcessPool("worker died")
+        executor._executor = broken
+
+        result = await executor.run("score", _score, [1, 2], factor=3)
+
+        assert result == 9
+        assert executor._executor is None
+        executor.logger.warning.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_stage_type_errors_are_not_swallowed(self):
+        """Test TypeError from the stage itself propagates instead of being retried"""
+        executor = self._create('process')
+        try:
+            with pytest.raises(TypeError):
+                await executor.run("score", _score, [1, "x"])
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_loads_offloads_only_large_documents(self, thread_executor):
+        """Test small JSON is decoded inline and large JSON in the pool"""
+        small = json.dumps({"a": 1})
+        large = json.dumps({"messages": ["x" * 100]})
+
+        with patch.object(thread_executor, '_get_executor', wraps=thread_executor._get_executor) as mock_get:
+            assert await thread_executor.loads(small) == {"a": 1}
+            mock_get.assert_not_called()
+
+            assert await thread_executor.loads(large) == {"messages": ["x" * 100]}
+            mock_get.assert_called_once()
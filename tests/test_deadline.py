@@ -0,0 +1,139 @@
+"""
+Unit tests for Request Deadlines
+Tests deadline propagation, stage timeouts, cancellation and degraded answers
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock
+
+from src.intelligence.ai_engine import AIEngine
+from src.intelligence.deadline import (
+    DeadlineExceeded, get_deadline, http_timeout_ms, remaining_time, request_deadline, run_within_deadline,
+    stage_timeout
+)
+
+
+class TestRequestDeadline:
+    """Test cases for request_deadline and stage timeouts"""
+
+    def test_no_deadline_uses_stage_default(self):
+        """Test stages keep their own timeout outside a request deadline"""
+        assert get_deadline() is None
+        assert remaining_time() is None
+        assert stage_timeout(30) == 30
+
+    def test_http_timeout_in_milliseconds(self):
+        """Test per-call SDK timeout follows the stage timeout"""
+        assert http_timeout_ms(30) == 30000
+        with request_deadline(time.time() + 2):
+            assert http_timeout_ms(30, reserve=1) <= 1000
+        with request_deadline(time.time() + 0.5):
+            with pytest.raises(DeadlineExceeded):
+                http_timeout_ms(30, reserve=1, stage="security")
+
+    def test_stage_timeout_capped_by_deadline(self):
+        """Test stage timeout never exceeds the time left minus reserve"""
+        with request_deadline(time.time() + 2):
+            assert stage_timeout(30) <= 2
+            assert stage_timeout(30, reserve=1) <= 1
+            with pytest.raises(DeadlineExceeded):
+                stage_timeout(30, reserve=5)
+
+        assert get_deadline() is None
+
+    def test_nested_deadline_only_tightens(self):
+        """Test inner block can't extend the outer deadline"""
+        outer = time.time() + 1
+        with request_deadline(outer):
+            with request_deadline(outer + 10):
+                assert get_deadline() == outer
+            with request_deadline(None):
+                assert get_deadline() == outer
+
+    @pytest.mark.asyncio
+    async def test_deadline_propagates_to_tasks(self):
+        """Test tasks started inside the block see the deadline"""
+        deadline = time.time() + 5
+        with request_deadline(deadline):
+            task = asyncio.ensure_future(asyncio.sleep(0, result=None))
+            seen = await asyncio.create_task(self._read_deadline())
+            await task
+
+        assert seen == deadline
+
+    async def _read_deadline(self):
+        return get_deadline()
+
+
+class TestRunWithinDeadline:
+    """Test cases for run_within_deadline"""
+
+    @pytest.mark.asyncio
+    async def test_returns_result_in_time(self):
+        """Test stage finishing in time returns its result"""
+        with request_deadline(time.time() + 1):
+            assert await run_within_deadline(asyncio.sleep(0, result="ok"), "fast", 5) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancels_stage_at_deadline(self):
+        """Test overrunning stage is cancelled and reported with its name"""
+        cancelled = asyncio.Event()
+
+        async def slow_stage():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with request_deadline(time.time() + 0.05):
+            with pytest.raises(DeadlineExceeded) as error:
+                await run_within_deadline(slow_stage(), "generation", 30)
+
+        assert error.value.stage == "generation"
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_skips_stage_without_time_left(self):
+        """Test stage isn't started once its share of time is gone"""
+        started = Mock()
+
+        async def stage():
+            started()
+
+        with request_deadline(time.time() + 0.5):
+            with pytest.raises(DeadlineExceeded):
+                await run_within_deadline(stage(), "analysis", 30, reserve=1)
+
+        started.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_deadline_exceeded_is_timeout_error(self):
+        """Test existing asyncio.TimeoutError handlers still catch deadline errors"""
+        with pytest.raises(asyncio.TimeoutError):
+            with request_deadline(time.time() - 1):
+                await run_within_deadline(asyncio.sleep(0), "security", 30)
+
+
+class TestDeadlineDegradedResponse:
+    """Test cases for the partial answer when generation would overrun"""
+
+    def test_lists_products_found(self):
+        """Test partial answer lists the products already found"""
+        products = [{'name': 'Buchet trandafiri', 'price': 750}, None]
+
+        response = AIEngine._deadline_degraded_response(Mock(), {'intent': 'product_search'}, products)
+
+        assert response.success is True
+        assert response.service_used == "deadline_degraded"
+        assert "Buchet trandafiri - 750 MDL" in response.response_text
+        assert response.products_found == 1
+
+    def test_without_products(self):
+        """Test degraded answer without products asks the user to retry"""
+        response = AIEngine._deadline_degraded_response(Mock(), {}, [])
+
+        assert response.products == []
+        assert "din nou" in response.response_text
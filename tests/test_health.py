@@ -0,0 +1,158 @@
+"""
+Unit tests for Dependency Health
+Tests passive outcome tracking, breaker state, bounded active checks and the health endpoints
+"""
+
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.helpers.health import HealthRegistry, DEGRADED, DOWN, HEALTHY, UNKNOWN
+
+
+def _create(clock, **config):
+    performance_config = {
+        'health_check_interval_seconds': 30,
+        'health_check_timeout_seconds': 0.2,
+        'health_failure_threshold': 3,
+        'health_open_seconds': 10
+    }
+    performance_config.update(config)
+    with patch('src.helpers.health.setup_logger'), \
+         patch('src.helpers.health.get_performance_config', return_value=performance_config):
+        registry = HealthRegistry(clock=clock)
+        registry.logger = Mock()
+        return registry
+
+
+class TestHealthRegistry:
+    """Test cases for HealthRegistry class"""
+
+    def test_unknown_until_seen(self, fake_clock):
+        """Test dependencies without outcomes report unknown"""
+        registry = _create(fake_clock)
+
+        assert registry.status('openai') == UNKNOWN
+        assert registry.statuses() == {}
+
+    def test_failures_open_breaker_until_success(self, fake_clock):
+        """Test consecutive failures mark a dependency down and a success closes it"""
+        registry = _create(fake_clock)
+
+        registry.record('openai', True, 0.5)
+        registry.record('openai', False, error="timeout")
+        assert registry.status('openai') == DEGRADED
+
+        registry.record('openai', False, error="timeout")
+        registry.record('openai', False, error="timeout")
+        assert registry.is_down('openai') is True
+        assert registry.snapshot()['openai']['last_error'] == "timeout"
+
+        registry.record('openai', True, 0.4)
+        assert registry.status('openai') == HEALTHY
+
+    def test_breaker_expires_after_open_seconds(self, fake_clock):
+        """Test a down dependency is retried once the open period has passed"""
+        registry = _create(fake_clock)
+        for _ in range(3):
+            registry.record('redis', False)
+
+        fake_clock.now += 11
+
+        assert registry.status('redis') == DEGRADED
+
+    def test_operations_map_to_dependencies(self, fake_clock):
+        """Test performance metric operations are attributed to their dependency"""
+        registry = _create(fake_clock)
+
+        registry.record_operation('gemini_security_check', False, 1.0, {"error": "quota"})
+        registry.record_operation('telegram_send_message', True, 0.1)
+        registry.record_operation('telegram_queued_update', False, 5.0)
+        registry.record_operation('message_processing', False, 5.0)
+
+        assert registry.statuses() == {'gemini': DEGRADED, 'telegram': HEALTHY}
+        assert registry.snapshot()['gemini']['last_error'] == "quota"
+
+    @pytest.mark.asyncio
+    async def test_active_checks_are_bounded(self, fake_clock):
+        """Test a hanging check is recorded as a failure after the check timeout"""
+        registry = _create(fake_clock)
+        registry.register_check('chromadb', lambda: True)
+        registry.register_check('redis', lambda: time.sleep(1) or True)
+
+        start_time = time.perf_counter()
+        await registry.run_checks()
+
+        assert time.perf_counter() - start_time < 0.9
+        assert registry.status('chromadb') == HEALTHY
+        assert registry.status('redis') == DEGRADED
+        assert 'timed out' in registry.snapshot()['redis']['last_error']
+
+    @pytest.mark.asyncio
+    async def test_failing_check_is_recorded(self, fake_clock):
+        """Test a check raising an error counts as a failure"""
+        registry = _create(fake_clock)
+        registry.register_check('redis', Mock(side_effect=ConnectionError("refused")))
+
+        await registry.run_checks()
+
+        assert registry.snapshot()['redis']['last_error'] == "refused"
+        assert registry.snapshot()['redis']['last_check_age'] == 0.0
+
+
+class TestHealthEndpoints:
+    """Test cases for /health and /health/ready reading the registry"""
+
+    @pytest.fixture
+    def registry(self):
+        registry = _create(clock=time.time)
+        with patch('src.api.main.get_health_registry', return_value=registry):
+            yield registry
+
+    @pytest.fixture
+    def client(self, registry):
+        engine = Mock(openai_available=True, gemini_available=True)
+        engine.get_cache_stats.return_value = {}
+        with patch('src.intelligence.ai_engine.get_ai_engine', return_value=engine), \
+             patch('src.data.chromadb_client.is_chromadb_available', return_value=True), \
+             patch('src.data.chromadb_client.health_check_chromadb') as chromadb_check, \
+             patch('src.data.redis_client.health_check_redis') as redis_check:
+            yield TestClient(app)
+        chromadb_check.assert_not_called()
+        redis_check.assert_not_called()
+
+    def test_health_reports_status_strings(self, client, registry):
+        """Test /health returns per-service status strings with details, without calling dependencies"""
+        registry.record('redis', True, 0.001)
+
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body['status'] == 'healthy'
+        assert body['services']['redis'] == HEALTHY
+        assert body['services']['ai_engine'] == 'healthy'
+        assert body['details']['redis']['successes'] == 1
+
+    def test_health_degraded_when_dependency_down(self, client, registry):
+        """Test an open breaker degrades overall health"""
+        for _ in range(3):
+            registry.record('openai', False, error="timeout")
+
+        body = client.get("/health").json()
+
+        assert body['status'] == 'degraded'
+        assert body['services']['openai'] == DOWN
+
+    def test_ready_stays_up_during_dependency_outage(self, client, registry):
+        """Test readiness reports dependency status without failing the probe"""
+        for _ in range(3):
+            registry.record('gemini', False)
+
+        response = client.get("/health/ready")
+
+        assert response.status_code == 200
+        assert response.json()['dependencies'] == {'gemini': DOWN}
@@ -288,11 +288,11 @@ class TestFallbackSystemIntegration:
     @pytest.mark.asyncio
     async def test_redis_unavailable_fallback(self):
         """Test system behavior when Redis is unavailable"""
-        with patch('src.intelligence.context_manager.redis.Redis') as mock_redis_class:
+        with patch('src.intelligence.context_manager.create_redis_client') as mock_create_client:
             # Mock Redis connection failure
             mock_redis_instance = Mock()
             mock_redis_instance.ping.side_effect = Exception("Redis connection failed")
-            mock_redis_class.return_value = mock_redis_instance
+            mock_create_client.return_value = mock_redis_instance
             
             # Import after mocking to ensure the mock takes effect
             from src.intelligence.context_manager import ContextManager
@@ -0,0 +1,204 @@
+"""
+Unit tests for LLM Usage Accounting
+Tests usage extraction, cost estimates, per-request and per-user totals, metrics and daily budgets
+"""
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import fakeredis.aioredis
+
+from src.helpers import llm_usage
+from src.helpers.llm_usage import TokenUsage, UsageAccountant, extract_usage, usage_scope
+from src.helpers.monitoring import MetricsRegistry
+
+PRICES = {
+    'gpt-4o': {'input': 2.5, 'cached': 1.25, 'output': 10.0},
+    'gpt-4o-mini': {'input': 0.15, 'cached': 0.075, 'output': 0.6},
+    'gemini-2.5-flash': {'input': 0.3, 'cached': 0.075, 'output': 2.5}
+}
+
+
+def openai_response(prompt, completion, cached=0):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                                                 prompt_tokens_details=SimpleNamespace(cached_tokens=cached)))
+
+
+def gemini_response(prompt, candidates, thoughts=None, cached=None):
+    return SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=prompt, candidates_token_count=candidates,
+        thoughts_token_count=thoughts, cached_content_token_count=cached))
+
+
+@pytest.fixture
+def accountant():
+    """Global accountant with test prices and a private metrics registry"""
+    accountant = UsageAccountant({'prices': PRICES, 'user_daily_token_budget': 1000})
+    registry = MetricsRegistry()
+    with patch.object(llm_usage, '_usage_accountant', accountant), \
+         patch('src.helpers.llm_usage.get_metrics_registry', return_value=registry):
+        accountant.registry = registry
+        yield accountant
+
+
+class TestExtraction:
+    """Test cases for reading usage from provider responses"""
+
+    def test_openai_and_gemini(self):
+        """Test both response shapes, with thinking tokens counted as output"""
+        assert extract_usage(openai_response(1200, 80, cached=1024)) == TokenUsage(1200, 80, 1024)
+        assert extract_usage(gemini_response(900, 40, thoughts=10)) == TokenUsage(900, 50, 0)
+
+    def test_missing_usage(self):
+        """Test responses without usage (or mocks) are ignored"""
+        assert extract_usage(Mock()) is None
+        assert extract_usage(SimpleNamespace(text="hi")) is None
+
+
+class TestCost:
+    """Test cases for cost estimates"""
+
+    def test_longest_prefix_and_cached_discount(self):
+        """Test dated model names find their price and cached tokens are cheaper"""
+        accountant = UsageAccountant({'prices': PRICES})
+
+        cost = accountant.estimate_cost('gpt-4o-mini-2024-07-18', TokenUsage(1_000_000, 1_000_000, 500_000))
+
+        assert cost == pytest.approx(0.5 * 0.15 + 0.5 * 0.075 + 0.6)
+        assert accountant.estimate_cost('models/gemini-2.5-flash', TokenUsage(1_000_000, 0)) == pytest.approx(0.3)
+
+    def test_unknown_model_costs_nothing(self):
+        """Test models without a price are still counted in tokens"""
+        accountant = UsageAccountant({'prices': PRICES})
+
+        assert accountant.estimate_cost('claude-x', TokenUsage(100, 100)) == 0.0
+
+
+class TestRecording:
+    """Test cases for aggregation and export"""
+
+    @pytest.mark.asyncio
+    async def test_request_scope_spans_tasks(self, accountant):
+        """Test calls from concurrent stages add up to the request and the user"""
+        async def stage(name, response):
+            await asyncio.sleep(0)
+            llm_usage.record_llm_usage(name, 'gemini', 'gemini-2.5-flash', response)
+
+        with usage_scope('user_1', 'user_1_1') as usage:
+            await asyncio.gather(
+                asyncio.ensure_future(stage('security', gemini_response(300, 20))),
+                stage('generation', gemini_response(500, 100))
+            )
+
+        assert usage.calls == 2 and usage.total_tokens == 920
+        assert usage.stages == {'security': 320, 'generation': 600}
+        assert accountant.user_usage_local('user_1')['tokens'] == 920
+        assert accountant.user_usage_local('user_2')['tokens'] == 0
+        assert llm_usage.current_request_usage() is None
+
+    def test_totals_and_metrics(self, accountant):
+        """Test totals per stage/provider/model and exported counters"""
+        llm_usage.record_llm_usage('intent', 'openai', 'gpt-4o-mini', openai_response(1000, 200, cached=500))
+        llm_usage.record_llm_usage('intent', 'openai', 'gpt-4o-mini', openai_response(1000, 200))
+        llm_usage.record_llm_usage('intent', 'openai', 'gpt-4o-mini', Mock())
+
+        stats = accountant.get_stats()
+        text = accountant.registry.render()
+
+        assert stats['by_stage'][0]['calls'] == 2
+        assert stats['by_stage'][0]['prompt_tokens'] == 2000
+        assert stats['users_today'] == 0
+        labels = 'stage="intent",provider="openai",model="gpt-4o-mini"'
+        assert f'xoflowers_llm_calls_total{{{labels}}} 2\n' in text
+        assert f'xoflowers_llm_tokens_total{{{labels},type="cached"}} 500\n' in text
+        assert 'xoflowers_llm_prompt_tokens_count{stage="intent"} 2\n' in text
+
+    def test_accounting_errors_never_raise(self, accountant):
+        """Test a failing accountant doesn't break the LLM call path"""
+        with patch.object(accountant, 'estimate_cost', side_effect=RuntimeError("boom")):
+            assert llm_usage.record_llm_usage('intent', 'openai', 'gpt-4o', openai_response(1, 1)) is None
+
+
+class TestDailyBudget:
+    """Test cases for per-user daily budgets"""
+
+    @pytest.mark.asyncio
+    async def test_budget_denies_until_midnight(self, accountant):
+        """Test a user over the token budget is denied and others are not"""
+        with usage_scope('user_1'):
+            llm_usage.record_llm_usage('generation', 'openai', 'gpt-4o', openai_response(900, 150))
+
+        denied = await llm_usage.check_user_llm_budget('user_1')
+        allowed = await llm_usage.check_user_llm_budget('user_2')
+
+        assert denied.allowed is False and denied.limit_name == 'daily-token-budget'
+        assert 0 < denied.retry_after <= 86400
+        assert allowed.allowed is True and allowed.remaining == 1000
+
+    @pytest.mark.asyncio
+    async def test_cost_budget(self):
+        """Test the cost budget applies without a token budget"""
+        accountant = UsageAccountant({'prices': PRICES, 'user_daily_cost_budget': 0.01})
+        with usage_scope('user_1'):
+            accountant.record('generation', 'openai', 'gpt-4o', openai_response(4000, 100))
+
+        result = await accountant.check_user_budget('user_1')
+
+        assert result.allowed is False and result.limit_name == 'daily-cost-budget'
+
+    @pytest.mark.asyncio
+    async def test_shared_between_workers(self):
+        """Test usage recorded by one worker counts against the budget in another"""
+        server = fakeredis.FakeServer()
+        config = {'prices': PRICES, 'user_daily_token_budget': 1000}
+        first = UsageAccountant(config, client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        second = UsageAccountant(config, client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+
+        with usage_scope('user_1'):
+            first.record('generation', 'gemini', 'gemini-2.5-flash', gemini_response(1100, 50))
+        await asyncio.gather(*first._pending)
+
+        usage = await second.user_usage('user_1')
+
+        assert usage['tokens'] == 1150 and usage['calls'] == 1
+        assert (await second.check_user_budget('user_1')).allowed is False
+
+    @pytest.mark.asyncio
+    async def test_redis_error_falls_back_to_local(self):
+        """Test Redis errors fall back to per-process totals"""
+        client = Mock()
+        client.hgetall = AsyncMock(side_effect=ConnectionError("down"))
+        accountant = UsageAccountant({'user_daily_token_budget': 100, 'redis_cooldown_seconds': 60}, client=client)
+        with usage_scope('user_1'):
+            accountant.record('intent', 'openai', 'gpt-4o', TokenUsage(80, 30))
+
+        assert (await accountant.check_user_budget('user_1')).allowed is False
+        assert (await accountant.check_user_budget('user_2')).allowed is True
+        client.hgetall.assert_awaited_once()
+
+
+class TestEngineBudget:
+    """Test the AI engine answers busy once a user's daily budget is spent"""
+
+    @pytest.mark.asyncio
+    async def test_user_budget_short_circuits(self):
+        """Test no security check or LLM call runs for a user over budget"""
+        from src.helpers.rate_limiter import RateLimitResult
+        from src.intelligence.ai_engine import AIEngine
+
+        engine = AIEngine.__new__(AIEngine)
+        engine.logger = Mock()
+        engine._get_busy_response = Mock(return_value="busy")
+        global_budget = AsyncMock()
+
+        with patch('src.intelligence.ai_engine.check_user_llm_budget',
+                   AsyncMock(return_value=RateLimitResult(False, 3600, 'daily-token-budget'))), \
+             patch('src.intelligence.ai_engine.check_llm_budget', global_budget), \
+             patch('src.intelligence.ai_engine.check_message_security', new=AsyncMock()) as mock_security:
+            result = await engine.process_message_ai("Salut", "user_1", context={})
+
+        assert result["rate_limited"] is True and result["retry_after"] == 3600
+        global_budget.assert_not_awaited()
+        mock_security.assert_not_awaited()
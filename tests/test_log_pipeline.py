@@ -0,0 +1,185 @@
+"""
+Unit tests for the Logging Pipeline
+Tests queued writing, JSON output, DEBUG sampling, trace ids and fork handling
+"""
+
+import json
+import logging
+from unittest.mock import patch
+
+from src.helpers import tracing
+from src.helpers.log_pipeline import JsonFormatter, LogPipeline
+from src.helpers.tracing import BatchSpanProcessor, Tracer, start_span
+
+
+class ListHandler(logging.Handler):
+    """Collects formatted records in memory"""
+
+    def __init__(self, formatter=None):
+        super().__init__()
+        self.setFormatter(formatter or JsonFormatter())
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+    @property
+    def entries(self):
+        return [json.loads(line) for line in self.lines]
+
+
+class NullExporter:
+    """Exporter discarding spans"""
+
+    def export(self, payload):
+        pass
+
+
+def pipeline_logger(pipeline, name="test.log_pipeline"):
+    logger = logging.Logger(name, logging.DEBUG)
+    for handler in pipeline.logger_handlers:
+        logger.addHandler(handler)
+    sampler = pipeline.debug_sampler(name)
+    if sampler is not None:
+        logger.addFilter(sampler)
+    return logger
+
+
+class TestQueuedWriting:
+    """Test cases for the queue and writer thread"""
+
+    def test_writer_starts_with_first_record(self):
+        """Test no thread runs until something is logged and stop writes everything"""
+        output = ListHandler()
+        pipeline = LogPipeline(handlers=[output])
+        logger = pipeline_logger(pipeline)
+
+        assert pipeline._listener is None
+        for i in range(100):
+            logger.info("line %d", i)
+        assert pipeline._listener is not None
+        pipeline.stop()
+
+        assert [entry['message'] for entry in output.entries] == [f"line {i}" for i in range(100)]
+        assert pipeline._listener is None
+
+    def test_message_rendered_when_logged(self):
+        """Test arguments changed after the call don't change the message"""
+        output = ListHandler()
+        pipeline = LogPipeline(handlers=[output])
+        logger = pipeline_logger(pipeline)
+        data = {'products': 3}
+
+        logger.info("PERFORMANCE: %s", data, extra={'data': data})
+        data['products'] = 0
+        pipeline.stop()
+
+        assert output.entries[0]['message'] == "PERFORMANCE: {'products': 3}"
+
+    def test_full_queue_drops_records(self):
+        """Test a full queue drops records instead of blocking"""
+        output = ListHandler()
+        pipeline = LogPipeline({'queue_size': 2}, handlers=[output])
+        logger = pipeline_logger(pipeline)
+
+        with patch.object(pipeline, 'start'):
+            for i in range(5):
+                logger.info("line %d", i)
+        pipeline.stop()
+
+        assert pipeline.stats['dropped'] == 3
+        assert pipeline.queue.qsize() == 2
+
+    def test_sync_mode(self):
+        """Test async off writes in the calling thread"""
+        output = ListHandler(logging.Formatter('%(levelname)s %(message)s'))
+        pipeline = LogPipeline({'async': False}, handlers=[output])
+
+        pipeline_logger(pipeline).warning("Redis down")
+
+        assert output.lines == ["WARNING Redis down"]
+        assert pipeline._listener is None
+
+    def test_fork_reset(self):
+        """Test a forked worker gets a fresh queue and starts its own writer"""
+        output = ListHandler()
+        pipeline = LogPipeline(handlers=[output])
+        logger = pipeline_logger(pipeline)
+        logger.info("before fork")
+        pipeline.stop()
+        parent_queue = pipeline.queue
+
+        pipeline._reset_after_fork()
+        logger.info("in worker")
+        pipeline.stop()
+
+        assert pipeline.queue is not parent_queue
+        assert pipeline.queue_handler.queue is pipeline.queue
+        assert [entry['message'] for entry in output.entries] == ["before fork", "in worker"]
+
+
+class TestJsonOutput:
+    """Test cases for structured output"""
+
+    def test_extra_fields_and_exceptions(self):
+        """Test extra= fields and tracebacks become JSON fields"""
+        output = ListHandler()
+        pipeline = LogPipeline(handlers=[output])
+        logger = pipeline_logger(pipeline)
+
+        logger.info("AI_INTERACTION", extra={'data': {'intent': 'greeting', 'processing_time': 0.4}})
+        try:
+            raise ValueError("bad price")
+        except ValueError:
+            logger.exception("Product search failed")
+        pipeline.stop()
+
+        interaction, error = output.entries
+        assert interaction['data'] == {'intent': 'greeting', 'processing_time': 0.4}
+        assert interaction['level'] == 'INFO' and interaction['logger'] == "test.log_pipeline"
+        assert interaction['time'].endswith('Z')
+        assert 'ValueError: bad price' in error['exception']
+
+    def test_trace_ids_of_sampled_requests(self):
+        """Test records logged inside a sampled span carry its ids"""
+        output = ListHandler()
+        pipeline = LogPipeline(handlers=[output])
+        logger = pipeline_logger(pipeline)
+        tracer = Tracer({'sample_rate': 1.0}, processor=BatchSpanProcessor(NullExporter()))
+
+        with patch.object(tracing, '_tracer', tracer):
+            with start_span("ai.process_message") as span:
+                logger.info("inside")
+        logger.info("outside")
+        pipeline.stop()
+
+        inside, outside = output.entries
+        assert inside['trace_id'] == span.trace_id and inside['span_id'] == span.span_id
+        assert 'trace_id' not in outside
+
+
+class TestDebugSampling:
+    """Test cases for per-logger DEBUG sampling"""
+
+    def test_rates_by_logger_prefix(self):
+        """Test the longest matching logger prefix sets the rate"""
+        pipeline = LogPipeline({'debug_sample_rate': 1.0,
+                                'debug_sample_rates': {'src.data': 0.5, 'src.data.chromadb_client': 0.1}},
+                               handlers=[])
+
+        assert pipeline.debug_sampler('src.data.chromadb_client').rate == 0.1
+        assert pipeline.debug_sampler('src.data.redis_connection').rate == 0.5
+        assert pipeline.debug_sampler('src.database') is None
+
+    def test_only_debug_is_sampled(self):
+        """Test sampled loggers drop DEBUG records but keep INFO and above"""
+        output = ListHandler()
+        pipeline = LogPipeline({'debug_sample_rates': {'noisy': 0.0}}, handlers=[output])
+        logger = pipeline_logger(pipeline, "noisy")
+
+        for _ in range(10):
+            logger.debug("product details")
+        logger.info("found products")
+        pipeline.stop()
+
+        assert [entry['message'] for entry in output.entries] == ["found products"]
@@ -0,0 +1,173 @@
+"""
+Unit tests for Prometheus Metrics
+Tests per-thread counters, histogram quantiles, exposition format and merging prefork workers
+"""
+
+import os
+import threading
+import pytest
+
+from src.helpers.monitoring import (
+    LATENCY_BUCKETS, MetricsRegistry, histogram_quantile, merge_snapshots, observe_operation,
+    operation_provider, render_families, get_metrics_registry
+)
+
+
+class TestMetricTypes:
+    """Test cases for counters, gauges and histograms"""
+
+    def test_counter_sums_threads(self):
+        """Test increments from many threads are all counted"""
+        counter = MetricsRegistry().counter('requests_total', "Requests").labels()
+
+        def work():
+            for _ in range(10000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value() == 80000
+
+    def test_gauge_function(self):
+        """Test gauges track inc/dec or report a function at scrape time"""
+        registry = MetricsRegistry()
+        in_flight = registry.gauge('in_flight', "In flight").labels()
+        in_flight.inc()
+        in_flight.inc()
+        in_flight.dec()
+        size = registry.gauge('size', "Size", ('cache',)).labels(cache='response')
+        size.set_function(lambda: 42)
+
+        assert in_flight.value() == 1
+        assert size.value() == 42
+
+    def test_histogram_quantiles(self):
+        """Test quantiles interpolate inside the bucket holding them"""
+        histogram = MetricsRegistry().histogram('latency_seconds', "Latency").labels()
+        for _ in range(90):
+            histogram.observe(0.004)
+        for _ in range(10):
+            histogram.observe(1.2)
+
+        assert 0.003 < histogram.quantile(0.5) <= 0.005
+        assert 1.0 < histogram.quantile(0.99) <= 1.5
+        assert histogram.value()[-1] == pytest.approx(90 * 0.004 + 10 * 1.2)
+
+    def test_quantile_of_empty_and_overflow(self):
+        """Test empty histograms report zero and overflow reports the top bound"""
+        assert histogram_quantile(0.5, (1.0, 2.0), [0, 0, 0]) == 0.0
+        assert histogram_quantile(0.99, (1.0, 2.0), [0, 0, 5]) == 2.0
+
+    def test_kind_mismatch(self):
+        """Test a name can't be reused for another metric type"""
+        registry = MetricsRegistry()
+        registry.counter('things', "Things")
+
+        with pytest.raises(ValueError):
+            registry.gauge('things', "Things")
+
+    def test_buckets_cover_llm_latencies(self):
+        """Test buckets span 1ms to 60s without wide gaps"""
+        assert LATENCY_BUCKETS[0] == 0.001 and LATENCY_BUCKETS[-1] == 60.0
+        assert all(a < b for a, b in zip(LATENCY_BUCKETS, LATENCY_BUCKETS[1:]))
+        assert max(b / a for a, b in zip(LATENCY_BUCKETS, LATENCY_BUCKETS[1:])) < 1.7
+
+    def test_overflow_only_in_inf_bucket(self):
+        """Test observations above the last bound count only in +Inf"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram('stage_seconds', "Stage latency").labels()
+        histogram.observe(62.0)
+        histogram.observe(1.0)
+
+        text = registry.render()
+
+        assert 'stage_seconds_bucket{le="60.0"} 1\n' in text
+        assert 'stage_seconds_bucket{le="+Inf"} 2\n' in text
+        assert histogram.quantile(0.99) == 60.0
+
+    def test_unsorted_buckets_rejected(self):
+        """Test histograms refuse bounds that are out of order"""
+        with pytest.raises(ValueError):
+            MetricsRegistry().histogram('bad_seconds', "Bad", buckets=(1.0, 75.0, 60.0))
+
+
+class TestExposition:
+    """Test cases for the text exposition format"""
+
+    def test_render(self):
+        """Test counters, escaped labels and cumulative histogram buckets"""
+        registry = MetricsRegistry()
+        registry.counter('errors_total', "Errors", ('operation',)).labels('say "hi"\n').inc(2)
+        histogram = registry.histogram('stage_seconds', "Stage latency", ('stage',), buckets=(0.1, 1.0))
+        histogram.labels('security').observe(0.05)
+        histogram.labels('security').observe(0.5)
+
+        text = registry.render()
+
+        assert '# TYPE errors_total counter\nerrors_total{operation="say \\"hi\\"\\n"} 2\n' in text
+        assert 'stage_seconds_bucket{stage="security",le="0.1"} 1\n' in text
+        assert 'stage_seconds_bucket{stage="security",le="1.0"} 2\n' in text
+        assert 'stage_seconds_bucket{stage="security",le="+Inf"} 2\n' in text
+        assert 'stage_seconds_sum{stage="security"} 0.55\n' in text
+        assert 'stage_seconds_count{stage="security"} 2\n' in text
+
+    def test_observe_operation_labels_provider(self):
+        """Test performance metrics are labelled with their provider"""
+        observe_operation("openai_security_check", 0.3, False)
+
+        text = get_metrics_registry().render()
+
+        assert operation_provider("chromadb_search") == 'chromadb'
+        assert operation_provider("cpu_stage_json_decode") == 'internal'
+        assert 'xoflowers_operation_errors_total{operation="openai_security_check",provider="openai"}' in text
+
+
+class TestWorkerMerge:
+    """Test cases for merging samples of prefork workers"""
+
+    def test_merge_keeps_exited_counters_drops_gauges(self):
+        """Test counters and histograms of exited workers still count, their gauges don't"""
+        families = []
+        for _ in range(2):
+            registry = MetricsRegistry()
+            registry.counter('requests_total', "Requests").labels().inc(3)
+            registry.gauge('in_flight', "In flight").labels().inc()
+            registry.histogram('latency_seconds', "Latency", buckets=(1.0,)).labels().observe(0.5)
+            families.append(registry.collect())
+
+        merged = merge_snapshots([(families[0], True), (families[1], False)])
+        text = render_families(merged)
+
+        assert 'requests_total 6\n' in text
+        assert 'in_flight 1\n' in text
+        assert 'latency_seconds_count 2\n' in text
+
+    def test_scrape_merges_worker_files(self, tmp_path):
+        """Test the scraped worker merges the samples other workers flushed"""
+        other = tmp_path / "999999999.json"
+        peer = MetricsRegistry()
+        peer.counter('requests_total', "Requests").labels().inc(5)
+        peer.metrics_dir = str(tmp_path)
+        peer.write_snapshot()
+        os.replace(tmp_path / f"{os.getpid()}.json", other)
+
+        registry = MetricsRegistry(metrics_dir=str(tmp_path))
+        registry.counter('requests_total', "Requests").labels().inc(2)
+
+        assert 'requests_total 7\n' in registry.render()
+        assert (tmp_path / f"{os.getpid()}.json").exists()
+
+    def test_fork_reset(self):
+        """Test a forked worker starts its counters from zero but keeps gauge functions"""
+        registry = MetricsRegistry()
+        registry.counter('requests_total', "Requests").labels().inc(4)
+        registry.gauge('size', "Size").labels().set_function(lambda: 3)
+
+        registry._reset_after_fork()
+
+        assert registry.collect()['requests_total']['samples'] == []
+        assert registry.collect()['size']['samples'] == [[[], 3.0]]
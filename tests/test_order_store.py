@@ -0,0 +1,176 @@
+"""
+Unit tests for Cart and Order Store
+Tests atomic cart operations, checkout, JSON migration and concurrent writers
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+
+from src.data.order_store import OrderStore
+from src.data.product_catalog import Product, ProductCatalog
+from src.tools.cart_tools import CartTools
+from src.tools.payment_tools import PaymentTools
+
+
+def _create(db_path):
+    with patch('src.data.order_store.get_service_config', return_value={'order_store': {}}):
+        return OrderStore(db_path=str(db_path))
+
+
+def _catalog(tmp_path):
+    with patch('src.data.product_catalog.get_service_config', return_value={'product_catalog': {}}):
+        catalog = ProductCatalog(csv_path=str(tmp_path / "missing.csv"))
+    catalog.index([Product("product_0001", "Bujori", 200.0), Product("product_0002", "Lalele", 90.0)])
+    return catalog
+
+
+class TestOrderStore:
+    """Test cases for OrderStore class"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Create OrderStore backed by a temporary database"""
+        store = _create(tmp_path / "orders.db")
+        yield store
+        store.close()
+
+    def test_wal_mode_enabled(self, store):
+        """Test database runs in WAL journal mode"""
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal"
+
+    @pytest.mark.asyncio
+    async def test_cart_operations(self, store):
+        """Test adding, incrementing and removing cart items per user"""
+        assert await store.add_item("u1", "Trandafiri roșii", 150.0, "https://xoflowers.md/t") == 1
+        assert await store.add_item("u1", "Bujori", 200.0) == 1
+        assert await store.add_item("u1", "Trandafiri roșii", 150.0) == 2
+        await store.add_item("u2", "Lalele", 90.0)
+
+        assert await store.remove_item("u1", "BUJORI") == "Bujori"
+        assert await store.remove_item("u1", "Orhidee") is None
+
+        cart = await store.get_cart("u1")
+        assert cart == [{'product_id': 'prod_1', 'name': 'Trandafiri roșii', 'price': 150.0,
+                         'quantity': 2, 'url': 'https://xoflowers.md/t'}]
+        assert await store.clear_cart("u2") == 1
+        assert await store.get_cart("u2") == []
+
+    @pytest.mark.asyncio
+    async def test_checkout_appends_order_and_empties_cart(self, store):
+        """Test checkout stores the order and empties the cart in one step"""
+        await store.add_item("u1", "Bujori", 200.0)
+
+        order = await store.checkout("u1", lambda items: {
+            'order_id': 'XOF_1', 'created_at': '2025-07-16T10:00:00', 'items': items,
+            'total_amount': sum(item['price'] * item['quantity'] for item in items)
+        })
+
+        assert order['total_amount'] == 200.0
+        assert await store.get_cart("u1") == []
+        assert await store.get_order("XOF_1") == order
+        assert await store.checkout("u1", lambda items: pytest.fail("empty cart ordered")) is None
+
+    @pytest.mark.asyncio
+    async def test_failed_checkout_keeps_cart(self, store):
+        """Test an error while building the order rolls back and leaves the cart intact"""
+        await store.add_item("u1", "Bujori", 200.0)
+
+        def build_order(items):
+            raise RuntimeError("payment declined")
+
+        with pytest.raises(RuntimeError):
+            await store.checkout("u1", build_order)
+
+        assert len(await store.get_cart("u1")) == 1
+
+    def test_migrate_from_json_is_idempotent(self, store, tmp_path):
+        """Test legacy carts and orders are imported once"""
+        carts_path = tmp_path / "user_carts.json"
+        orders_path = tmp_path / "orders.json"
+        carts_path.write_text(json.dumps({
+            "u1": [{"product_id": "prod_1", "name": "Bujori", "price": 200, "quantity": 2, "url": ""}],
+            "u2": []
+        }), encoding='utf-8')
+        orders_path.write_text(json.dumps({
+            "XOF_1": {"order_id": "XOF_1", "user_id": "u3", "created_at": "2025-07-01T10:00:00",
+                      "total_amount": 90, "items": []}
+        }), encoding='utf-8')
+
+        first = store.migrate_from_json(str(carts_path), str(orders_path))
+        second = store.migrate_from_json(str(carts_path), str(orders_path))
+
+        assert first == {'cart_items': 1, 'orders': 1}
+        assert second == {'cart_items': 0, 'orders': 0}
+        assert store._get_cart_sync("u1")[0]['quantity'] == 2
+        assert store._get_user_orders_sync("u3", 10)[0]['total_amount'] == 90
+
+
+class TestConcurrentWriters:
+    """Stress tests: concurrent requests in one process and across connections"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_adds_are_not_lost(self, tmp_path):
+        """Test concurrent adds from two store instances (as two workers would) all land"""
+        stores = [_create(tmp_path / "orders.db"), _create(tmp_path / "orders.db")]
+        users = [f"user_{i}" for i in range(10)]
+
+        try:
+            await asyncio.gather(*[
+                stores[(user_index + attempt) % 2].add_item(user, "Trandafiri", 150.0)
+                for attempt in range(20)
+                for user_index, user in enumerate(users)
+            ])
+
+            for user in users:
+                cart = await stores[0].get_cart(user)
+                assert [item['quantity'] for item in cart] == [20]
+        finally:
+            for store in stores:
+                store.close()
+
+    @pytest.mark.asyncio
+    async def test_racing_checkouts_order_cart_once(self, tmp_path):
+        """Test concurrent checkouts of one cart produce exactly one order"""
+        stores = [_create(tmp_path / "orders.db"), _create(tmp_path / "orders.db")]
+        await stores[0].add_item("u1", "Bujori", 200.0)
+        await stores[0].add_item("u1", "Lalele", 90.0)
+        payments = [PaymentTools(CartTools(store, _catalog(tmp_path))) for store in stores]
+
+        try:
+            results = await asyncio.gather(*[
+                payments[i % 2].process_payment("u1", "Ion Popescu", "+373 69 123 456") for i in range(8)
+            ])
+
+            assert sum("Plata procesată" in result for result in results) == 1
+            orders = await stores[1].get_user_orders("u1")
+            assert len(orders) == 1 and orders[0]['total_amount'] == 290.0
+        finally:
+            for store in stores:
+                store.close()
+
+
+class TestCartTools:
+    """Test cases for CartTools and PaymentTools on the store"""
+
+    @pytest.mark.asyncio
+    async def test_cart_and_payment_messages(self, tmp_path):
+        """Test tool replies keep their wording on the new store"""
+        store = _create(tmp_path / "orders.db")
+        cart_tools = CartTools(store, _catalog(tmp_path))
+        payment_tools = PaymentTools(cart_tools)
+
+        assert await cart_tools.add_to_cart("u1", "Bujori", 200.0) == "✅ Bujori adăugat în cart - 200.0 MDL"
+        assert "cantitatea actualizată la 2" in await cart_tools.add_to_cart("u1", "Bujori", 200.0)
+        assert "Total: 400.0 MDL" in await cart_tools.view_cart("u1")
+        assert "nu a fost găsit" in await cart_tools.remove_from_cart("u1", "Lalele")
+
+        receipt = await payment_tools.process_payment("u1")
+        order_id = receipt.split("Comanda #")[1].split("**")[0]
+
+        assert "Status:** Confirmed" in await payment_tools.get_order_status(order_id)
+        assert "cartul gol" in await payment_tools.process_payment("u1")
+        assert "gol" in await cart_tools.remove_from_cart("u1", "Bujori")
+        store.close()
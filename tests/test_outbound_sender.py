@@ -0,0 +1,259 @@
+"""
+Unit tests for Outbound Sender
+Tests delivery against a fake Bot API / Graph API, splitting, ordering and retries
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock, patch
+
+import httpx
+
+from src.api.outbound_sender import OutboundSender, TokenBucket, split_message, strip_html
+
+
+class FakePlatformAPI:
+    """In-process fake of the Telegram Bot API and Instagram Graph API"""
+
+    def __init__(self, failures=None, delay=0.0):
+        self.requests = []
+        self.failures = list(failures or [])
+        self.delay = delay
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            return failure
+        self.requests.append((request.url.path, json.loads(request.content), request.headers))
+        return httpx.Response(200, json={'ok': True, 'result': {}})
+
+    @property
+    def transport(self):
+        return httpx.MockTransport(self.handler)
+
+    def texts(self):
+        return [body.get('text') or body['message']['text'] for _path, body, _headers in self.requests]
+
+
+def _create_sender(api, **overrides):
+    config = {
+        'telegram_bot_token': 'TEST_TOKEN',
+        'telegram_api_base': 'http://fake-telegram',
+        'instagram_access_token': 'IG_TOKEN',
+        'instagram_api_base': 'http://fake-graph',
+        'max_retries': 2,
+        'backoff_base_seconds': 0.001,
+        'telegram_global_rate': 1000,
+        'telegram_chat_rate': 1000,
+        'instagram_global_rate': 1000,
+        'instagram_chat_rate': 1000,
+        'telegram_max_length': 50,
+        'instagram_max_length': 50
+    }
+    config.update(overrides)
+    with patch('src.api.outbound_sender.setup_logger'), \
+         patch('src.api.outbound_sender.get_service_config') as mock_config:
+        mock_config.return_value = {'outbound': config}
+        sender = OutboundSender(transport=api.transport)
+        sender.logger = Mock()
+        return sender
+
+
+class TestSplitMessage:
+    """Test cases for split_message"""
+
+    def test_short_message_is_single_chunk(self):
+        """Test text within the limit is returned unchanged"""
+        assert split_message("Buna ziua!", 50) == ["Buna ziua!"]
+
+    def test_splits_at_sentence_boundary(self):
+        """Test long text is split at sentence ends without losing content"""
+        text = "Trandafirii rosii costa 500 MDL. Livrarea este gratuita in Chisinau. Multumim!"
+
+        chunks = split_message(text, 40)
+
+        assert chunks == ["Trandafirii rosii costa 500 MDL.",
+                          "Livrarea este gratuita in Chisinau.",
+                          "Multumim!"]
+        assert all(len(chunk) <= 40 for chunk in chunks)
+
+    def test_hard_cut_without_boundary(self):
+        """Test text without separators is cut at the limit"""
+        assert split_message("x" * 25, 10) == ["x" * 10, "x" * 10, "x" * 5]
+
+    def test_byte_limit_counts_encoded_length(self):
+        """Test multi-byte characters are split by UTF-8 length without breaking a character"""
+        text = "ă" * 30 + "🌹" * 5
+
+        chunks = split_message(text, 50, max_bytes=21)
+
+        assert "".join(chunks) == text
+        assert all(len(chunk.encode('utf-8')) <= 21 for chunk in chunks)
+
+
+class TestStripHtml:
+    """Test cases for strip_html"""
+
+    def test_removes_tags_and_entities(self):
+        """Test markup, a tag cut at the chunk end and entities are removed"""
+        assert strip_html("<b>Trandafiri</b> &amp; bujori <i cla") == "Trandafiri & bujori "
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket"""
+
+    @pytest.mark.asyncio
+    async def test_paces_after_burst(self):
+        """Test acquire waits once the burst capacity is used"""
+        bucket = TokenBucket(rate=50, capacity=2)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        for _ in range(4):
+            await bucket.acquire()
+
+        assert loop.time() - start >= 0.03
+
+
+class TestOutboundSender:
+    """Test cases for OutboundSender class"""
+
+    @pytest.mark.asyncio
+    async def test_send_telegram(self):
+        """Test Telegram message is posted to the Bot API"""
+        api = FakePlatformAPI()
+        sender = _create_sender(api)
+
+        assert (await sender.send_telegram(123, "Salut!", reply_to_message_id=7)).delivered is True
+        await sender.close()
+
+        path, body, _headers = api.requests[0]
+        assert path == "/botTEST_TOKEN/sendMessage"
+        assert body == {'chat_id': 123, 'text': 'Salut!', 'parse_mode': 'HTML', 'reply_to_message_id': 7}
+
+    @pytest.mark.asyncio
+    async def test_long_message_sent_in_order(self):
+        """Test long reply is split and chunks are delivered in order"""
+        api = FakePlatformAPI()
+        sender = _create_sender(api)
+        text = " ".join(f"Propozitia numarul {i}." for i in range(10))
+
+        assert (await sender.send_telegram(123, text, reply_to_message_id=7)).delivered is True
+
+        assert " ".join(api.texts()) == text
+        assert len(api.requests) > 1
+        assert 'reply_to_message_id' not in api.requests[1][1]
+
+    @pytest.mark.asyncio
+    async def test_same_chat_messages_keep_order(self):
+        """Test concurrent sends to one chat are delivered in call order"""
+        api = FakePlatformAPI(delay=0.005)
+        sender = _create_sender(api)
+
+        await asyncio.gather(*(sender.send_instagram("user_1", f"mesaj {i}") for i in range(5)))
+
+        assert api.texts() == [f"mesaj {i}" for i in range(5)]
+        assert api.requests[0][0] == "/me/messages"
+        assert api.requests[0][2]['authorization'] == "Bearer IG_TOKEN"
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limited_request(self):
+        """Test 429 with retry_after and 5xx errors are retried"""
+        api = FakePlatformAPI(failures=[
+            httpx.Response(429, json={'ok': False, 'description': 'Too Many Requests',
+                                      'parameters': {'retry_after': 0.001}}),
+            httpx.Response(502, text="Bad Gateway")
+        ])
+        sender = _create_sender(api)
+
+        assert (await sender.send_telegram(123, "Salut!")).delivered is True
+        assert sender.get_stats()['telegram']['retries'] == 2
+
+    @pytest.mark.asyncio
+    async def test_send_latency_read_from_metrics_registry(self):
+        """Test latency stats come from the send_message operation histogram"""
+        api = FakePlatformAPI()
+        sender = _create_sender(api)
+        before = sender.get_stats()['telegram']['latency']['count']
+
+        assert (await sender.send_telegram(123, "Salut!")).delivered is True
+
+        assert sender.get_stats()['telegram']['latency']['count'] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_retried(self):
+        """Test 4xx errors fail without retrying"""
+        api = FakePlatformAPI(failures=[
+            httpx.Response(400, json={'error': {'message': 'Invalid recipient'}})
+        ])
+        sender = _create_sender(api)
+
+        assert (await sender.send_instagram("user_1", "Salut!")).delivered is False
+
+        stats = sender.get_stats()['instagram']
+        assert stats['failed'] == 1
+        assert stats['retries'] == 0
+
+    @pytest.mark.asyncio
+    async def test_partial_delivery_resumes_after_last_chunk(self):
+        """Test a failed chunk reports the last delivered one and the resend starts after it"""
+        api = FakePlatformAPI(failures=[None, httpx.Response(400, json={'error': {'message': 'Invalid recipient'}})])
+        sender = _create_sender(api, instagram_max_length=20)
+        text = "Trandafiri rosii. Bujori albi. Lalele galbene."
+        chunks = split_message(text, 20, max_bytes=20)
+
+        result = await sender.send_instagram("user_1", text)
+        assert result.delivered is False
+        assert result.last_chunk == 0
+
+        result = await sender.send_instagram("user_1", text, start_chunk=result.last_chunk + 1)
+        assert result.delivered is True
+        assert result.last_chunk == len(chunks) - 1
+        assert api.texts() == chunks
+
+    @pytest.mark.asyncio
+    async def test_html_parse_error_resends_plain_text(self):
+        """Test chunk rejected for broken HTML is resent without parse mode"""
+        api = FakePlatformAPI(failures=[
+            httpx.Response(400, json={'ok': False, 'description': "Bad Request: can't parse entities"})
+        ])
+        sender = _create_sender(api)
+
+        assert (await sender.send_telegram(123, "<b>Salut")).delivered is True
+        assert 'parse_mode' not in api.requests[0][1]
+        assert api.requests[0][1]['text'] == "Salut"
+
+    @pytest.mark.asyncio
+    async def test_instagram_chunks_fit_byte_limit(self):
+        """Test Instagram replies are split by encoded length"""
+        api = FakePlatformAPI()
+        sender = _create_sender(api, instagram_max_length=20)
+
+        assert (await sender.send_instagram("user_1", "Flori ș" * 6)).delivered is True
+        assert all(len(text.encode('utf-8')) <= 20 for text in api.texts())
+
+    @pytest.mark.asyncio
+    async def test_chat_bucket_taken_before_global(self):
+        """Test a paced chat waits on its own bucket before taking a global token"""
+        api = FakePlatformAPI()
+        sender = _create_sender(api)
+        order = []
+        state = sender._chat_state('telegram', '123')
+        state.bucket.acquire = lambda: order.append('chat') or asyncio.sleep(0)
+        sender._global_buckets['telegram'].acquire = lambda: order.append('global') or asyncio.sleep(0)
+
+        assert (await sender.send_telegram(123, "Salut!")).delivered is True
+        assert order == ['chat', 'global']
+
+    @pytest.mark.asyncio
+    async def test_missing_token_fails(self):
+        """Test send fails when the platform isn't configured"""
+        api = FakePlatformAPI()
+        sender = _create_sender(api, telegram_bot_token=None)
+
+        assert sender.is_configured('telegram') is False
+        assert (await sender.send_telegram(123, "Salut!")).delivered is False
+        assert api.requests == []
@@ -0,0 +1,90 @@
+"""
+Unit tests for Performance Monitor
+Tests the health report and the /metrics endpoints that expose it
+"""
+
+import logging
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.helpers.monitoring import MetricsRegistry
+from src.helpers.utils import PerformanceMonitor, PerformanceTimer, log_performance_metrics
+
+
+class TestPerformanceMonitor:
+    """Test cases for PerformanceMonitor class"""
+
+    @pytest.mark.timeout(5)
+    def test_summary_does_not_deadlock(self):
+        """Test summary can call the other locked methods"""
+        monitor = PerformanceMonitor(MetricsRegistry())
+        monitor.record_metric("openai_response_generation", 0.5, True)
+        monitor.record_metric("openai_response_generation", 1.5, False)
+
+        summary = monitor.get_performance_summary()
+
+        assert summary['operations']['openai_response_generation']['count'] == 2
+        assert summary['system_health']['error_rate'] == 0.5
+
+    def test_stats_read_from_registry(self):
+        """Test operation stats and cache hit rate come from the /metrics histograms and counters"""
+        registry = MetricsRegistry()
+        monitor = PerformanceMonitor(registry)
+        for duration in (0.1, 0.2, 0.3, 2.0):
+            monitor.record_metric("chromadb_search", duration, True)
+        monitor.record_cache_hit(True)
+        monitor.record_cache_hit(False, cache='security_verdict')
+
+        stats = monitor.get_operation_stats("chromadb_search")
+        health = monitor.get_system_health()
+
+        assert stats['count'] == 4 and stats['error_count'] == 0
+        assert stats['avg_duration'] == pytest.approx(0.65)
+        assert 0.15 <= stats['p50_duration'] <= 0.3 and stats['p99_duration'] <= 2.0
+        assert health.cache_hit_rate == 0.5
+        assert 'xoflowers_operation_duration_seconds_count{operation="chromadb_search",provider="chromadb"} 4' \
+            in registry.render()
+
+    def test_timer_records_once(self):
+        """Test a timed operation is recorded once, through log_performance_metrics"""
+        monitor = PerformanceMonitor(MetricsRegistry())
+        logger = logging.getLogger("test.performance_monitor")
+
+        with patch('src.helpers.utils.get_performance_monitor', return_value=monitor):
+            with PerformanceTimer("redis_context_get", logger):
+                pass
+            log_performance_metrics(logger, "gemini_response_generation", 1.2, True)
+
+        summary = monitor.get_performance_summary()
+        assert summary['operations']['redis_context_get']['count'] == 1
+        assert summary['operations']['gemini_response_generation']['count'] == 1
+        assert summary['total_metrics'] == 2
+
+
+class TestMetricsEndpoint:
+    """Test cases for /metrics and /metrics/json"""
+
+    @pytest.mark.timeout(10)
+    def test_metrics_exposes_all_sections(self):
+        """Test /metrics/json answers with the pipeline metrics"""
+        response = TestClient(app).get("/metrics/json")
+
+        assert response.status_code == 200
+        data = response.json()
+        for section in ("metrics", "cpu_stages", "webhook_queue", "outbound", "admission"):
+            assert section in data
+
+    @pytest.mark.timeout(10)
+    def test_metrics_prometheus_format(self):
+        """Test /metrics answers in the text exposition format with request metrics"""
+        client = TestClient(app)
+        client.get("/health/live")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE xoflowers_http_request_duration_seconds histogram' in response.text
+        assert 'route="/health/live"' in response.text
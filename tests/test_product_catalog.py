@@ -0,0 +1,121 @@
+"""
+Unit tests for Product Catalog
+Tests CSV loading, id/name/URL indexes, fuzzy name matching and catalog-backed cart operations
+"""
+
+import csv
+import pytest
+from unittest.mock import patch
+
+from src.data.order_store import OrderStore
+from src.data.product_catalog import ProductCatalog, normalize_name, normalize_url
+from src.tools.cart_tools import CartTools
+
+
+CATALOG_ROWS = [
+    ("product_0001", "product", 'Bouquet "Coral" - Buchet cu bujori coral', "650.0",
+     "https://xoflowers.md/bouquet-coral/", "True"),
+    ("product_0002", "product", 'Bouquet "Marshmallow" - Buchet delicat', "1200.0",
+     "https://xoflowers.md/bouquet-marshmallow", "True"),
+    ("product_0003", "product", 'Box with Flowers "Coral Dream" - Cutie cu flori', "2000.0",
+     "https://xoflowers.md/box-coral-dream", "True"),
+    # Same product listed under another category
+    ("product_0004", "product", 'Bouquet "Coral" - Buchet cu bujori coral', "650.0",
+     "https://xoflowers.md/bouquet-coral/n/", "True"),
+    ("product_0005", "product", 'Bouquet "Retired" - Nu mai există', "100.0",
+     "https://xoflowers.md/bouquet-retired", "False"),
+    ("collection_01", "collection", "Peonies", "", "https://xoflowers.md/peonies", "True"),
+]
+
+
+def write_catalog(path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["chunk_id", "chunk_type", "primary_text", "category", "price", "flower_type",
+                         "url", "product_exists"])
+        for chunk_id, chunk_type, text, price, url, exists in CATALOG_ROWS:
+            writer.writerow([chunk_id, chunk_type, text, "Peonies", price, "Peony", url, exists])
+    return str(path)
+
+
+def create_catalog(tmp_path):
+    with patch('src.data.product_catalog.get_service_config', return_value={'product_catalog': {}}):
+        return ProductCatalog(csv_path=write_catalog(tmp_path / "products.csv"))
+
+
+class TestProductCatalog:
+    """Test cases for ProductCatalog class"""
+
+    @pytest.fixture
+    def catalog(self, tmp_path):
+        return create_catalog(tmp_path)
+
+    def test_loads_existing_products_once(self, catalog):
+        """Test collections and removed products are skipped and duplicates collapse"""
+        assert len(catalog) == 3
+        assert catalog.get("product_0005") is None
+        assert catalog.get("product_0004") is catalog.get("product_0001")
+
+    def test_exact_lookups(self, catalog):
+        """Test id, URL and name lookups ignore formatting differences"""
+        assert catalog.find_by_url("http://www.xoflowers.md/bouquet-coral").product_id == "product_0001"
+        assert catalog.find_by_url("https://xoflowers.md/bouquet-coral/n/").product_id == "product_0001"
+        assert catalog.find_by_name("bouquet coral").price == 650.0
+        assert catalog.find_by_name("Bouquet") is None
+
+    def test_fuzzy_name_resolution(self, catalog):
+        """Test distinctive words resolve and ambiguous or unknown names don't"""
+        assert catalog.resolve(name="Marshmallow").product_id == "product_0002"
+        assert catalog.resolve(name="coral dream").product_id == "product_0003"
+        assert catalog.resolve(name="bouquet") is None
+        assert catalog.resolve(name="Orhidee albastră") is None
+        assert catalog.resolve(name="orhidee coral") is None
+
+    def test_resolve_prefers_url(self, catalog):
+        """Test a known URL wins over the name"""
+        product = catalog.resolve(name="Bouquet Marshmallow", url="https://xoflowers.md/bouquet-coral")
+
+        assert product.product_id == "product_0001"
+
+    def test_normalization(self):
+        """Test names lose diacritics and punctuation and URLs lose scheme and suffixes"""
+        assert normalize_name('Buchet „Trandafiri roșii"!') == "buchet trandafiri rosii"
+        assert normalize_url("HTTPS://xoflowers.md/a-b/n/?utm=1") == "xoflowers.md/a-b"
+
+
+class TestCatalogCart:
+    """Test cases for CartTools resolving products through the catalog"""
+
+    @pytest.fixture
+    def cart_tools(self, tmp_path):
+        with patch('src.data.order_store.get_service_config', return_value={'order_store': {}}):
+            store = OrderStore(db_path=str(tmp_path / "orders.db"))
+        yield CartTools(store, create_catalog(tmp_path))
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_cart_stores_canonical_product(self, cart_tools):
+        """Test the catalog id, name and price are stored instead of the given ones"""
+        reply = await cart_tools.add_to_cart("u1", "coral", 1.0, "https://xoflowers.md/bouquet-coral/n/")
+        await cart_tools.add_to_cart("u1", 'Bouquet "Coral"', 650.0)
+
+        assert reply == '✅ Bouquet "Coral" adăugat în cart - 650.0 MDL'
+        assert await cart_tools.store.get_cart("u1") == [{
+            'product_id': 'product_0001', 'name': 'Bouquet "Coral"', 'price': 650.0,
+            'quantity': 2, 'url': 'https://xoflowers.md/bouquet-coral/'
+        }]
+
+    @pytest.mark.asyncio
+    async def test_unknown_product_rejected(self, cart_tools):
+        """Test products missing from the catalog are not added"""
+        reply = await cart_tools.add_to_cart("u1", "Orhidee albastră", 10.0)
+
+        assert "nu a fost găsit în catalog" in reply
+        assert await cart_tools.store.get_cart("u1") == []
+
+    @pytest.mark.asyncio
+    async def test_remove_resolves_name(self, cart_tools):
+        """Test removal accepts the same loose names as adding"""
+        await cart_tools.add_to_cart("u1", "marshmallow", 0.0)
+
+        assert await cart_tools.remove_from_cart("u1", "MARSHMALLOW") == '❌ Bouquet "Marshmallow" eliminat din cart'
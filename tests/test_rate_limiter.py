@@ -0,0 +1,202 @@
+"""
+Unit tests for Rate Limiter
+Tests GCRA limits, retry-after hints, bounded memory and Redis fallback
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.helpers.rate_limiter import (
+    InMemoryRateLimitBackend, RateLimit, RateLimiter, RedisRateLimitBackend
+)
+
+
+class TestInMemoryRateLimitBackend:
+    """Test cases for InMemoryRateLimitBackend class"""
+
+    @pytest.fixture
+    def backend(self, fake_clock):
+        return InMemoryRateLimitBackend(max_keys=100, clock=fake_clock)
+
+    def test_allows_burst_then_limits(self, backend):
+        """Test limit requests pass at once and the next one gets a retry-after hint"""
+        limit = RateLimit('per-minute', 3, 60)
+
+        results = [backend.acquire([("user:1", limit)]) for _ in range(4)]
+
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[0].remaining == 2
+        assert results[3].limit_name == 'per-minute'
+        assert results[3].retry_after == pytest.approx(20)
+
+    def test_replenishes_over_time(self, backend, fake_clock):
+        """Test one request is allowed again after one emission interval"""
+        limit = RateLimit('per-minute', 3, 60)
+        for _ in range(3):
+            backend.acquire([("user:1", limit)])
+
+        fake_clock.now += 20
+
+        assert backend.acquire([("user:1", limit)]).allowed is True
+        assert backend.acquire([("user:1", limit)]).allowed is False
+
+    def test_denied_request_consumes_nothing(self, backend):
+        """Test a request denied by one limit does not count against the others"""
+        minute = RateLimit('per-minute', 10, 60)
+        hour = RateLimit('per-hour', 1, 3600)
+        backend.acquire([("user:1:hour", hour)])
+
+        result = backend.acquire([("user:1:minute", minute), ("user:1:hour", hour)])
+
+        assert result.allowed is False
+        assert result.limit_name == 'per-hour'
+        assert backend.acquire([("user:1:minute", minute)]).remaining == 9
+
+    def test_memory_is_bounded(self, backend):
+        """Test least recently used keys are evicted past max_keys"""
+        limit = RateLimit('per-minute', 5, 60)
+
+        for user in range(250):
+            backend.acquire([(f"user:{user}", limit)])
+
+        assert backend.size() == 100
+
+
+class TestRedisRateLimitBackend:
+    """Test cases for RedisRateLimitBackend class"""
+
+    @pytest.mark.asyncio
+    async def test_script_result_is_decoded(self):
+        """Test Lua script arguments and results"""
+        script = AsyncMock(side_effect=[[1, 0, '0', 4], [0, 2, '12.5', 0]])
+        client = Mock()
+        client.register_script.return_value = script
+        backend = RedisRateLimitBackend(client)
+        limits = [("rl:{1}:per-minute", RateLimit('per-minute', 5, 60)),
+                  ("rl:{1}:per-hour", RateLimit('per-hour', 100, 3600))]
+
+        allowed = await backend.acquire(limits)
+        denied = await backend.acquire(limits)
+
+        assert allowed.allowed is True and allowed.remaining == 4
+        assert denied.allowed is False
+        assert denied.limit_name == 'per-hour'
+        assert denied.retry_after == 12.5
+        script.assert_called_with(keys=["rl:{1}:per-minute", "rl:{1}:per-hour"], args=[12.0, 60, 36.0, 3600])
+
+    @pytest.mark.asyncio
+    async def test_lua_script_denies_without_consuming(self):
+        """Test the script on an in-process Redis: a denied request leaves every key unchanged"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        backend = RedisRateLimitBackend(fakeredis.FakeAsyncRedis(decode_responses=True))
+        user = ("rl:user:1", RateLimit('per-minute', 5, 60))
+        platform = ("rl:platform:telegram", RateLimit('platform', 1, 60))
+
+        assert (await backend.acquire([user, platform])).allowed is True
+        denied = await backend.acquire([user, platform])
+
+        assert denied.allowed is False
+        assert denied.limit_name == 'platform'
+        assert (await backend.acquire([user])).remaining == 3
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter class"""
+
+    def _create(self, backend=None, redis_mode='cluster', **config):
+        security_config = {
+            'rate_limit_per_minute': 2,
+            'rate_limit_per_hour': 100,
+            'rate_limit_platform_per_minute': 3,
+            'llm_requests_per_minute': 1,
+            'rate_limit_backend': 'memory',
+            'rate_limit_redis_cooldown_seconds': 30
+        }
+        security_config.update(config)
+        with patch('src.helpers.rate_limiter.setup_logger'), \
+             patch('src.helpers.rate_limiter.get_security_config', return_value=security_config), \
+             patch('src.helpers.rate_limiter.get_service_config', return_value={'redis': {'mode': redis_mode}}):
+            limiter = RateLimiter(backend=backend)
+            limiter.logger = Mock()
+            return limiter
+
+    @pytest.mark.asyncio
+    async def test_user_limit(self):
+        """Test per-user limit with retry-after"""
+        limiter = self._create()
+
+        assert (await limiter.check_user("user_1")).allowed is True
+        assert (await limiter.check_user("user_1")).allowed is True
+        result = await limiter.check_user("user_1")
+
+        assert result.allowed is False
+        assert result.retry_after > 0
+        assert "per-minute" in result.reason
+        assert (await limiter.check_user("user_2")).allowed is True
+
+    @pytest.mark.asyncio
+    async def test_platform_limit_spans_users(self):
+        """Test platform-wide limit is shared by all users"""
+        limiter = self._create()
+
+        results = [await limiter.check_user(f"user_{i}", platform="telegram") for i in range(4)]
+
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[3].limit_name == 'platform'
+        assert (await limiter.check_user("user_9", platform="instagram")).allowed is True
+
+    @pytest.mark.asyncio
+    async def test_user_and_platform_checked_in_one_call(self):
+        """Test user and platform keys go to the backend together outside cluster mode"""
+        backend = Mock()
+        backend.acquire = AsyncMock(return_value=Mock(allowed=True))
+        limiter = self._create(backend=backend, redis_mode='standalone')
+
+        await limiter.check_user("user_1", platform="telegram")
+
+        backend.acquire.assert_awaited_once()
+        keys = [key for key, _limit in backend.acquire.await_args.args[0]]
+        assert keys == ["xoflowers:ratelimit:user:user_1:per-minute",
+                        "xoflowers:ratelimit:user:user_1:per-hour",
+                        "xoflowers:ratelimit:platform:telegram"]
+
+    @pytest.mark.asyncio
+    async def test_llm_budget(self):
+        """Test global LLM budget"""
+        limiter = self._create()
+
+        assert (await limiter.check_llm_budget()).allowed is True
+        assert (await limiter.check_llm_budget()).allowed is False
+
+    def test_user_keys_share_hash_tag(self):
+        """Test a user's keys land in one cluster slot"""
+        limiter = self._create()
+
+        assert limiter._user_keys("42") == ["xoflowers:ratelimit:user:{42}:per-minute",
+                                            "xoflowers:ratelimit:user:{42}:per-hour"]
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_to_memory_for_cooldown(self):
+        """Test Redis failures don't block users and Redis isn't retried during the cooldown"""
+        redis_backend = Mock()
+        redis_backend.acquire = AsyncMock(side_effect=ConnectionError("Redis down"))
+        limiter = self._create(backend=redis_backend)
+
+        assert (await limiter.check_user("user_1")).allowed is True
+        assert (await limiter.check_user("user_2")).allowed is True
+
+        assert redis_backend.acquire.await_count == 1
+        assert limiter.memory_backend.size() == 4
+
+        limiter._shared_retry_at = 0.0
+        await limiter.check_user("user_3")
+        assert redis_backend.acquire.await_count == 2
+
+    def test_local_check_for_sync_callers(self):
+        """Test synchronous check counts against the in-memory backend"""
+        limiter = self._create()
+
+        assert limiter.check_user_local("user_1").allowed is True
+        assert limiter.check_user_local("user_1").allowed is True
+        assert limiter.check_user_local("user_1").allowed is False
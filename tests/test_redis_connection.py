@@ -0,0 +1,132 @@
+"""
+Unit tests for Redis Connection Factory
+Tests standalone/Sentinel/Cluster client creation and hash-tagged per-user keys
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+from redis.crc import key_slot
+
+from src.data.redis_connection import (
+    create_redis_client, parse_nodes, user_key, user_id_from_key, uses_hash_tags
+)
+
+
+BASE_CONFIG = {
+    'host': 'localhost',
+    'port': 6379,
+    'db': 0,
+    'decode_responses': True,
+    'socket_timeout': 5,
+    'socket_connect_timeout': 5,
+    'retry_on_timeout': True
+}
+
+
+class TestUserKeys:
+    """Test per-user key construction"""
+
+    def test_hash_tagged_keys_share_slot(self):
+        """Test context, session and rate-limit keys of one user map to one slot"""
+        keys = [
+            user_key("xoflowers:context:", "user_42", hash_tag=True),
+            user_key("xoflowers:context_summary:", "user_42", hash_tag=True),
+            user_key("xoflowers:session:", "user_42", hash_tag=True),
+            user_key("xoflowers:ratelimit:", "user_42", hash_tag=True)
+        ]
+
+        assert keys[0] == "xoflowers:context:{user_42}"
+        assert len({key_slot(key.encode()) for key in keys}) == 1
+
+    def test_plain_keys_unchanged(self):
+        """Test keys stay backward compatible without hash tags"""
+        assert user_key("xoflowers:context:", "user_42") == "xoflowers:context:user_42"
+
+    def test_user_id_from_key(self):
+        """Test user id extraction from tagged and plain keys"""
+        assert user_id_from_key("xoflowers:context:{user_42}") == "user_42"
+        assert user_id_from_key("xoflowers:context:user_42") == "user_42"
+
+    def test_hash_tags_default_to_cluster_mode(self):
+        """Test hash tagging is enabled by default only for cluster mode"""
+        assert uses_hash_tags({'mode': 'cluster'}) is True
+        assert uses_hash_tags({'mode': 'standalone'}) is False
+        assert uses_hash_tags({'mode': 'sentinel', 'hash_tag_keys': True}) is True
+
+    def test_parse_nodes(self):
+        """Test node list parsing from env-style strings"""
+        assert parse_nodes("10.0.0.1:7000, 10.0.0.2:7001") == [("10.0.0.1", 7000), ("10.0.0.2", 7001)]
+        assert parse_nodes("") == []
+        assert parse_nodes([("redis", "26379")]) == [("redis", 26379)]
+
+
+class TestCreateRedisClient:
+    """Test client creation for each deployment mode"""
+
+    def test_standalone_mode(self):
+        """Test default mode creates a single-node client"""
+        with patch('redis.Redis') as mock_redis:
+            create_redis_client(BASE_CONFIG, max_connections=50)
+
+        kwargs = mock_redis.call_args[1]
+        assert kwargs['host'] == 'localhost'
+        assert kwargs['max_connections'] == 50
+
+    def test_sentinel_mode(self):
+        """Test Sentinel mode resolves the master through sentinels"""
+        config = {**BASE_CONFIG, 'mode': 'sentinel', 'sentinels': 's1:26379,s2:26379',
+                  'sentinel_master': 'xoflowers'}
+
+        with patch('src.data.redis_connection.Sentinel') as mock_sentinel:
+            client = create_redis_client(config)
+
+        assert mock_sentinel.call_args[0][0] == [("s1", 26379), ("s2", 26379)]
+        mock_sentinel.return_value.master_for.assert_called_once()
+        assert mock_sentinel.return_value.master_for.call_args[0][0] == 'xoflowers'
+        assert client is mock_sentinel.return_value.master_for.return_value
+
+    def test_sentinel_mode_requires_nodes(self):
+        """Test Sentinel mode without sentinels is rejected"""
+        with pytest.raises(ValueError):
+            create_redis_client({**BASE_CONFIG, 'mode': 'sentinel'})
+
+    def test_cluster_mode(self):
+        """Test Cluster mode creates a cluster client from startup nodes"""
+        config = {**BASE_CONFIG, 'mode': 'cluster', 'cluster_nodes': 'n1:7000,n2:7001,n3:7002'}
+
+        with patch('src.data.redis_connection.RedisCluster') as mock_cluster:
+            create_redis_client(config)
+
+        kwargs = mock_cluster.call_args[1]
+        assert [(node.host, node.port) for node in kwargs['startup_nodes']] == [
+            ("n1", 7000), ("n2", 7001), ("n3", 7002)
+        ]
+        assert 'db' not in kwargs
+
+    def test_unknown_mode(self):
+        """Test unknown mode is rejected"""
+        with pytest.raises(ValueError):
+            create_redis_client({**BASE_CONFIG, 'mode': 'memcached'})
+
+
+@pytest.mark.skipif(not os.getenv('REDIS_CLUSTER_NODES'),
+                    reason="Set REDIS_CLUSTER_NODES to run against a local Redis Cluster")
+def test_per_user_pipeline_on_live_cluster():
+    """Test a single pipeline writes all of one user's keys on a real cluster"""
+    config = {**BASE_CONFIG, 'mode': 'cluster', 'cluster_nodes': os.environ['REDIS_CLUSTER_NODES']}
+    client = create_redis_client(config)
+
+    context_key = user_key("xoflowers:context:", "cluster_test", hash_tag=True)
+    session_key = user_key("xoflowers:session:", "cluster_test", hash_tag=True)
+
+    # Non-transactional: MULTI on a cluster client needs redis-py 6+, the slot is shared either way
+    pipe = client.pipeline()
+    pipe.setex(context_key, 60, "context")
+    pipe.setex(session_key, 60, "session")
+    pipe.execute()
+
+    assert client.get(context_key) == "context"
+    assert client.get(session_key) == "session"
+    client.delete(context_key, session_key)
@@ -0,0 +1,159 @@
+"""
+Unit tests for Security Verdict Cache
+Tests message normalization, TTL/LRU eviction, the shared Redis level and the cache step in SecurityAI
+"""
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+import fakeredis.aioredis
+
+from src.intelligence.security_ai import SecurityAI
+from src.intelligence.security_cache import SecurityVerdictCache, cache_key, normalize_message
+
+SAFE = {'is_safe': True, 'risk_level': 'low', 'detected_issues': [], 'should_proceed': True,
+        'reason': 'ok', 'confidence': 0.8}
+RISKY = {'is_safe': False, 'risk_level': 'high', 'detected_issues': ['jailbreak'], 'should_proceed': False,
+         'reason': 'manipulation', 'confidence': 0.8}
+
+
+class TestNormalization:
+    """Test cases for message normalization"""
+
+    def test_trivial_variants_share_key(self):
+        """Test case, diacritics, emoji and whitespace don't change the key"""
+        assert normalize_message("  Bună   ZIUA 🌹👍🏽 ") == "buna ziua"
+        assert cache_key("Vreau trandafiri") == cache_key("vreau  trandafiri ❤️")
+
+    def test_meaningful_differences_kept(self):
+        """Test punctuation, digits and other scripts still distinguish messages"""
+        assert cache_key("<script>") != cache_key("script")
+        assert normalize_message("Buchet de 101 trandafiri") == "buchet de 101 trandafiri"
+        assert normalize_message("Привет") == "привет"
+
+
+class TestSecurityVerdictCache:
+    """Test cases for SecurityVerdictCache class"""
+
+    @pytest.mark.asyncio
+    async def test_hit_after_set_reports_to_monitor(self):
+        """Test repeated messages hit and hit rates reach the performance monitor"""
+        cache = SecurityVerdictCache()
+        monitor = Mock()
+
+        with patch('src.intelligence.security_cache.get_performance_monitor', return_value=monitor):
+            assert await cache.get("Salut!") is None
+            await cache.set("Salut!", {**SAFE, 'processing_time': 1.2, 'service_used': 'gemini'})
+            verdict = await cache.get("salut!")
+
+        assert verdict == SAFE
+        assert [call.args for call in monitor.record_cache_hit.call_args_list] == [(False,), (True,)]
+        assert cache.stats == {'hits': 1, 'misses': 1, 'shared_hits': 0}
+
+    def test_reports_to_health_monitor(self):
+        """Test hits go to the monitor /health reports from"""
+        from src.helpers import utils as health_utils
+        from src.intelligence import security_cache
+
+        assert security_cache.get_performance_monitor is health_utils.get_performance_monitor
+
+    @pytest.mark.asyncio
+    async def test_risky_verdicts_expire_sooner(self):
+        """Test safe verdicts get the long TTL and risky ones the short TTL"""
+        cache = SecurityVerdictCache({'safe_ttl_seconds': 100, 'risky_ttl_seconds': 5})
+
+        with patch('src.intelligence.security_cache.time.monotonic', return_value=1000.0):
+            await cache.set("buna", SAFE)
+            await cache.set("ignore rules", RISKY)
+            await cache.set("poate", {**SAFE, 'risk_level': 'medium'})
+
+        with patch('src.intelligence.security_cache.time.monotonic', return_value=1010.0):
+            assert await cache.get("buna") == SAFE
+            assert await cache.get("ignore rules") is None
+            assert await cache.get("poate") is None
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = SecurityVerdictCache({'max_entries': 2})
+        await cache.set("unu", SAFE)
+        await cache.set("doi", SAFE)
+        await cache.get("unu")
+        await cache.set("trei", SAFE)
+
+        assert await cache.get("doi") is None
+        assert await cache.get("unu") == SAFE
+
+    @pytest.mark.asyncio
+    async def test_shared_between_workers(self):
+        """Test a verdict stored by one worker is found by another through Redis"""
+        server = fakeredis.FakeServer()
+        first = SecurityVerdictCache(client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        second = SecurityVerdictCache(client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+
+        await first.set("Vreau trandafiri", RISKY)
+        key = first.key_prefix + cache_key("Vreau trandafiri")
+
+        assert await second.get("vreau trandafiri") == RISKY
+        assert second.stats['shared_hits'] == 1
+        assert 0 < await second.client.ttl(key) <= 300
+        assert "trandafiri" not in key
+
+    @pytest.mark.asyncio
+    async def test_redis_error_falls_back_to_local(self):
+        """Test Redis errors don't fail checks and pause the shared level"""
+        client = Mock()
+        client.set = AsyncMock(side_effect=ConnectionError("down"))
+        cache = SecurityVerdictCache({'redis_cooldown_seconds': 60}, client=client)
+
+        await cache.set("salut", SAFE)
+
+        assert await cache.get("salut") == SAFE
+        assert await cache.get("altceva") is None
+        client.pipeline.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test a disabled cache never stores verdicts"""
+        cache = SecurityVerdictCache({'enabled': False})
+        await cache.set("salut", SAFE)
+
+        assert await cache.get("salut") is None
+
+
+class TestSecurityAIVerdictCache:
+    """Test cases for the cache step in SecurityAI.check_message_security"""
+
+    @pytest.fixture
+    def security_ai(self):
+        with patch('src.intelligence.security_ai.setup_logger'), \
+             patch('src.intelligence.security_ai.get_service_config') as mock_config, \
+             patch('src.intelligence.security_ai.get_ai_prompts'), \
+             patch('src.intelligence.security_ai.get_security_config') as mock_security_config:
+            mock_config.return_value = {'openai': {'api_key': ''}, 'gemini': {'api_key': '', 'api_key_backup': '',
+                                                                              'model': 'gemini-pro'}}
+            mock_security_config.return_value = {'max_message_length': 1000, 'jailbreak_patterns': [],
+                                                 'classifier': {'enabled': False}}
+            security = SecurityAI()
+        security.logger = Mock()
+        security._ai_security_analysis = AsyncMock(return_value={**SAFE, 'service_used': 'gemini'})
+        return security
+
+    @pytest.mark.asyncio
+    async def test_repeated_message_skips_llm(self, security_ai):
+        """Test a repeated greeting reuses the first verdict"""
+        first = await security_ai.check_message_security("Bună ziua", "user_1")
+        second = await security_ai.check_message_security("buna   ziua 🌸", "user_2")
+
+        assert first.service_used == "gemini"
+        assert second.is_safe and second.service_used == "verdict_cache"
+        security_ai._ai_security_analysis.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_pattern_hits_not_cached(self, security_ai):
+        """Test pattern matching still runs before the cache"""
+        await security_ai.verdict_cache.set("hack the system", SAFE)
+
+        result = await security_ai.check_message_security("hack the system", "user_1")
+
+        assert result.service_used == "pattern_matching"
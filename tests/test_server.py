@@ -0,0 +1,137 @@
+"""
+Unit tests for the Production Server
+Tests graceful drain, the shared listening socket and the cheap readiness probe
+"""
+
+import socket
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.server import DrainingServer, Supervisor, bind_socket
+
+
+class TestDrainingServer:
+    """Test cases for DrainingServer class"""
+
+    def _create(self, drain_seconds):
+        target = SimpleNamespace(state=SimpleNamespace(draining=False))
+        server = DrainingServer(uvicorn.Config(target), drain_seconds=drain_seconds)
+        return server, target
+
+    def test_first_signal_drains_before_exit(self):
+        """Test readiness fails at once while shutdown waits for the drain window"""
+        server, target = self._create(0.05)
+
+        server.handle_exit(15, None)
+
+        assert target.state.draining is True
+        assert server.should_exit is False
+        time.sleep(0.2)
+        assert server.should_exit is True
+
+    def test_second_signal_exits_immediately(self):
+        """Test a repeated signal skips the rest of the drain"""
+        server, target = self._create(10)
+
+        server.handle_exit(15, None)
+        server.handle_exit(15, None)
+
+        assert server.should_exit is True
+
+    def test_no_drain_window(self):
+        """Test drain_seconds=0 keeps uvicorn's default behaviour"""
+        server, target = self._create(0)
+
+        server.handle_exit(15, None)
+
+        assert server.should_exit is True
+        assert target.state.draining is False
+
+
+class TestSupervisor:
+    """Test cases for Supervisor respawn policy"""
+
+    def _create(self, **config):
+        fastapi_config = {'max_restarts': 3, 'restart_window_seconds': 60, 'restart_backoff_max_seconds': 3}
+        fastapi_config.update(config)
+        return Supervisor(Mock(), 2, fastapi_config)
+
+    def test_respawn_backoff_doubles_up_to_max(self):
+        """Test repeated crashes wait longer before each respawn"""
+        supervisor = self._create(max_restarts=10)
+
+        delays = [supervisor.restart_delay(0) for _ in range(4)]
+
+        assert delays == [1.0, 2.0, 3, 3]
+        assert supervisor.restart_delay(1) == 1.0
+
+    def test_crash_loop_stops_server(self):
+        """Test a worker crashing too often shuts everything down instead of respawning"""
+        supervisor = self._create()
+        supervisor._signal_children = Mock()
+
+        for pid in range(100, 104):
+            supervisor.children[pid] = 0
+            supervisor._worker_exited(pid, 256)
+
+        assert supervisor.failed is True
+        assert supervisor.stopping is True
+        assert supervisor._respawn_at == {}
+        supervisor._signal_children.assert_called_with(15)
+
+    def test_old_crashes_leave_the_window(self):
+        """Test crashes older than the window don't count toward the limit"""
+        supervisor = self._create(restart_window_seconds=0)
+
+        assert [supervisor.restart_delay(0) for _ in range(5)] == [1.0] * 5
+
+
+class TestBindSocket:
+    """Test cases for bind_socket"""
+
+    def test_socket_is_listening_and_inheritable(self):
+        """Test workers can inherit and accept on the socket"""
+        sock = bind_socket('127.0.0.1', 0)
+        try:
+            port = sock.getsockname()[1]
+            assert sock.get_inheritable() is True
+            client = socket.create_connection(('127.0.0.1', port), timeout=1)
+            client.close()
+        finally:
+            sock.close()
+
+
+class TestReadinessProbe:
+    """Test cases for /health/ready"""
+
+    @pytest.fixture
+    def client(self):
+        engine = Mock(openai_available=True, gemini_available=False)
+        with patch('src.intelligence.ai_engine.get_ai_engine', return_value=engine), \
+             patch('src.data.chromadb_client.is_chromadb_available', return_value=True):
+            yield TestClient(app)
+        app.state.draining = False
+
+    def test_ready_without_running_pipeline(self, client):
+        """Test probe reports ready from in-process state only"""
+        with patch('src.intelligence.ai_engine.process_message_ai') as pipeline:
+            response = client.get("/health/ready")
+
+        assert response.status_code == 200
+        assert response.json()['status'] == 'ready'
+        pipeline.assert_not_called()
+
+    def test_not_ready_while_draining(self, client):
+        """Test probe fails while the worker drains"""
+        app.state.draining = True
+
+        response = client.get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()['reason'] == 'draining'
@@ -0,0 +1,121 @@
+"""
+Unit tests for the Telegram polling bot
+Tests chat-ordered concurrent update processing and the typing indicator
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.api.telegram_app import ChatOrderedUpdateProcessor, XOFlowersTelegramBot, create_update_processor
+
+
+def _update(chat_id):
+    return Mock(effective_chat=Mock(id=chat_id))
+
+
+async def _handler(log, chat_id, index, delay=0.05):
+    log.append(('start', chat_id, index))
+    await asyncio.sleep(delay)
+    log.append(('end', chat_id, index))
+
+
+class TestChatOrderedUpdateProcessor:
+    """Test cases for ChatOrderedUpdateProcessor class"""
+
+    @pytest.mark.asyncio
+    async def test_chats_run_concurrently_in_order(self):
+        """Test different chats overlap while one chat's updates run one after another in order"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=4)
+        log = []
+        updates = [(1, 0), (2, 0), (1, 1), (2, 1), (1, 2)]
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*[
+            processor.process_update(_update(chat_id), _handler(log, chat_id, index))
+            for chat_id, index in updates
+        ])
+
+        # 3 sequential updates of chat 1 bound the run time, not all 5
+        assert time.perf_counter() - start_time < 0.2
+        for chat_id in (1, 2):
+            events = [(event, index) for event, chat, index in log if chat == chat_id]
+            expected = [(event, index) for index in range(len(events) // 2) for event in ('start', 'end')]
+            assert events == expected
+        assert processor._chat_locks == {}
+
+    @pytest.mark.asyncio
+    async def test_bounds_running_handlers(self):
+        """Test no more than max_concurrent_updates handlers run at once"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2, max_pending_updates=10)
+        running = 0
+        peak = 0
+
+        async def handler():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*[processor.process_update(_update(chat_id), handler()) for chat_id in range(6)])
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_busy_chat_does_not_take_slots(self):
+        """Test a backlog in one chat leaves handler slots for other chats"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2, max_pending_updates=10)
+        log = []
+
+        busy = [asyncio.create_task(processor.process_update(_update(1), _handler(log, 1, index, 0.1)))
+                for index in range(3)]
+        await asyncio.sleep(0.01)
+        start_time = time.perf_counter()
+        await processor.process_update(_update(2), _handler(log, 2, 0, 0.01))
+
+        assert time.perf_counter() - start_time < 0.08
+        await asyncio.gather(*busy)
+
+    def test_processor_follows_config(self):
+        """Test the processor defaults to the pipeline's in-flight capacity and can be disabled"""
+        polling_config = {'concurrent_updates': True, 'max_concurrent_updates': 0, 'max_pending_updates': 100}
+        with patch('src.api.telegram_app.get_service_config', return_value={'telegram_polling': polling_config}), \
+             patch('src.api.telegram_app.get_performance_config', return_value={'max_concurrent_requests': 7}):
+            processor = create_update_processor()
+            polling_config['concurrent_updates'] = False
+            disabled = create_update_processor()
+
+        assert processor.max_active_updates == 7
+        assert processor.max_concurrent_updates == 100
+        assert disabled is None
+
+
+class TestTypingIndicator:
+    """Test cases for the typing indicator while the AI works"""
+
+    @pytest.mark.asyncio
+    async def test_typing_sent_before_reply_and_stopped(self):
+        """Test typing goes out while the AI is still working and stops once the reply is ready"""
+        bot = XOFlowersTelegramBot.__new__(XOFlowersTelegramBot)
+        bot.typing_interval = 0.02
+        chat = Mock(id=1, send_action=AsyncMock())
+        update = Mock(effective_chat=chat, effective_user=Mock(id=5))
+        update.message.text = "trandafiri"
+        update.message.reply_text = AsyncMock()
+
+        async def process_message_with_tools(message, user_id):
+            await asyncio.sleep(0.05)
+            assert chat.send_action.await_count >= 1
+            return "Avem trandafiri roșii"
+
+        bot.ai_engine = Mock(process_message_with_tools=process_message_with_tools)
+
+        await bot.handle_message_tools(update, Mock())
+        sent = chat.send_action.await_count
+        await asyncio.sleep(0.05)
+
+        assert sent >= 2
+        assert chat.send_action.await_count == sent
+        update.message.reply_text.assert_awaited_once()
@@ -0,0 +1,238 @@
+"""
+Unit tests for Tool Calling
+Tests the model/tool loop, tool call ordering and concurrency, read caching and result compaction
+"""
+
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.intelligence.tool_calling import (
+    ModelTurn, ToolCall, ToolCallingEngine, ToolExecutor, compact_tool_result, _parse_arguments
+)
+
+
+class ScriptedModel:
+    """Fake model replaying scripted turns and recording what it was asked"""
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.calls = []
+
+    async def complete(self, messages, tools, allow_tools=True):
+        self.calls.append({'messages': list(messages), 'allow_tools': allow_tools})
+        return self.turns.pop(0)
+
+
+class FakeCartTools:
+    """Cart tools recording calls, with optional delay per call"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.items = []
+
+    async def add_to_cart(self, user_id, product_name, price, product_url=""):
+        self.calls.append(('add_to_cart', user_id, product_name))
+        await asyncio.sleep(self.delay)
+        self.items.append(product_name)
+        return f"✅ **{product_name}** adăugat în cart - {price} MDL"
+
+    async def remove_from_cart(self, user_id, product_name):
+        self.calls.append(('remove_from_cart', user_id, product_name))
+        return f"Produsul '{product_name}' a fost eliminat din cart."
+
+    async def view_cart(self, user_id):
+        self.calls.append(('view_cart', user_id))
+        await asyncio.sleep(self.delay)
+        return f"🛒 Cart: {', '.join(self.items) or 'gol'}"
+
+    async def clear_cart(self, user_id):
+        self.calls.append(('clear_cart', user_id))
+        self.items.clear()
+        return "Cartul a fost golit."
+
+
+class FakePaymentTools:
+    """Payment tools recording calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def process_payment(self, user_id, customer_name="", customer_phone=""):
+        self.calls.append(('process_payment', user_id))
+        return "✅ Plata procesată"
+
+    async def get_order_status(self, order_id):
+        self.calls.append(('get_order_status', order_id))
+        return f"Comanda {order_id}: Confirmed"
+
+
+def _engine(model, cart_tools=None, payment_tools=None, **kwargs):
+    with patch('src.intelligence.tool_calling.setup_logger'), \
+         patch('src.intelligence.tool_calling.get_performance_config', return_value={}):
+        return ToolCallingEngine(model, cart_tools or FakeCartTools(), payment_tools or FakePaymentTools(), **kwargs)
+
+
+class TestToolExecutor:
+    """Test cases for ToolExecutor class"""
+
+    @pytest.mark.asyncio
+    async def test_reads_run_concurrently(self):
+        """Test consecutive read-only calls of one turn overlap instead of running back to back"""
+        cart_tools = FakeCartTools(delay=0.1)
+        executor = ToolExecutor(cart_tools, FakePaymentTools(), "u1")
+
+        start = time.monotonic()
+        results = await executor.execute([
+            ToolCall("1", "view_cart", {}),
+            ToolCall("2", "get_order_status", {"order_id": "XOF_1"}),
+            ToolCall("3", "view_cart", {"detailed": True})
+        ])
+
+        assert time.monotonic() - start < 0.18
+        assert results == ["🛒 Cart: gol", "Comanda XOF_1: Confirmed", "🛒 Cart: gol"]
+
+    @pytest.mark.asyncio
+    async def test_writes_run_in_model_order(self):
+        """Test add and pay in one turn run in order, with reads between them seeing the added item"""
+        cart_tools = FakeCartTools(delay=0.05)
+        payment_tools = FakePaymentTools()
+        payment_tools.calls = cart_tools.calls
+        executor = ToolExecutor(cart_tools, payment_tools, "u1")
+
+        results = await executor.execute([
+            ToolCall("1", "add_to_cart", {"product_name": "Bujori", "price": 200}),
+            ToolCall("2", "view_cart", {}),
+            ToolCall("3", "process_payment", {"customer_name": "Ana"})
+        ])
+
+        assert [call[0] for call in cart_tools.calls] == ['add_to_cart', 'view_cart', 'process_payment']
+        assert results == ["✅ Bujori adăugat în cart - 200.0 MDL", "🛒 Cart: Bujori", "✅ Plata procesată"]
+
+    @pytest.mark.asyncio
+    async def test_user_id_is_injected(self):
+        """Test tools act on the conversation's user whatever the arguments say"""
+        cart_tools = FakeCartTools()
+        executor = ToolExecutor(cart_tools, FakePaymentTools(), "u1")
+
+        await executor.execute([ToolCall("1", "remove_from_cart", {"product_name": "Lalele", "user_id": "u2"})])
+
+        assert cart_tools.calls == [('remove_from_cart', 'u1', 'Lalele')]
+
+    @pytest.mark.asyncio
+    async def test_reads_cached_until_write(self):
+        """Test repeated reads share one execution and a write invalidates them"""
+        cart_tools = FakeCartTools()
+        executor = ToolExecutor(cart_tools, FakePaymentTools(), "u1")
+
+        await executor.execute([ToolCall("1", "view_cart", {}), ToolCall("2", "view_cart", {})])
+        first = await executor.execute([ToolCall("3", "view_cart", {})])
+        await executor.execute([ToolCall("4", "add_to_cart", {"product_name": "Bujori", "price": 200})])
+        second = await executor.execute([ToolCall("5", "view_cart", {})])
+
+        assert [call[0] for call in cart_tools.calls].count('view_cart') == 2
+        assert first == ["🛒 Cart: gol"]
+        assert second == ["🛒 Cart: Bujori"]
+
+    @pytest.mark.asyncio
+    async def test_errors_reported_as_results(self):
+        """Test unknown tools and bad arguments come back as error results instead of raising"""
+        executor = ToolExecutor(FakeCartTools(), FakePaymentTools(), "u1")
+
+        results = await executor.execute([
+            ToolCall("1", "delete_database", {}),
+            ToolCall("2", "add_to_cart", {"price": 10})
+        ])
+
+        assert results[0] == "Error: unknown tool 'delete_database'"
+        assert results[1].startswith("Error: KeyError")
+
+
+class TestToolCallingEngine:
+    """Test cases for ToolCallingEngine class"""
+
+    @pytest.mark.asyncio
+    async def test_tool_round_then_answer(self):
+        """Test tool results are appended for the model before it answers"""
+        model = ScriptedModel([
+            ModelTurn(None, [ToolCall("c1", "view_cart", {})]),
+            ModelTurn("Cartul tău este gol.")
+        ])
+        messages = [{"role": "user", "content": "Ce am în cart?"}]
+
+        result = await _engine(model).run("u1", messages)
+
+        assert result.response == "Cartul tău este gol."
+        assert result.iterations == 2 and result.tool_calls == ["view_cart"]
+        assert messages[1]["tool_calls"][0]["function"]["name"] == "view_cart"
+        assert messages[2] == {"role": "tool", "tool_call_id": "c1", "content": "🛒 Cart: gol"}
+
+    @pytest.mark.asyncio
+    async def test_iteration_limit_forces_answer(self):
+        """Test the loop stops calling tools after the limit and asks for a final reply"""
+        model = ScriptedModel([ModelTurn(None, [ToolCall(f"c{i}", "view_cart", {})]) for i in range(2)]
+                              + [ModelTurn("Gata.")])
+
+        result = await _engine(model, max_iterations=2).run("u1", [{"role": "user", "content": "?"}])
+
+        assert result.response == "Gata." and result.hit_iteration_limit
+        assert [call['allow_tools'] for call in model.calls] == [True, True, False]
+
+
+class TestEngineToolCalling:
+    """Test the AI engine's tool-calling entry point"""
+
+    @pytest.mark.asyncio
+    async def test_context_saved_before_reply(self):
+        """Test the exchange is saved within the request instead of in an unreferenced task"""
+        from src.intelligence.ai_engine import AIEngine
+
+        engine = AIEngine.__new__(AIEngine)
+        engine.logger = Mock()
+        engine.openai_available = True
+        engine.openai_client = Mock()
+        engine.service_config = {'openai': {}}
+        engine.ai_prompts = {'main_system_prompt': "", 'tool_calling_prompt': ""}
+        engine._openai_semaphore = asyncio.Semaphore(1)
+        engine._cart_tools, engine._payment_tools = FakeCartTools(), FakePaymentTools()
+        saved = []
+
+        async def save(*args):
+            await asyncio.sleep(0.01)
+            saved.append(args)
+            return True
+
+        tool_engine = Mock(run=AsyncMock(return_value=SimpleNamespace(response="Gata.", iterations=1, tool_calls=[])))
+        with patch('src.intelligence.ai_engine.check_user_llm_budget', AsyncMock(return_value=Mock(allowed=True))), \
+             patch('src.intelligence.ai_engine.check_llm_budget', AsyncMock(return_value=Mock(allowed=True))), \
+             patch('src.intelligence.ai_engine.check_message_security', AsyncMock(return_value=Mock(is_safe=True))), \
+             patch('src.intelligence.ai_engine.get_enhanced_context_for_ai', AsyncMock(return_value={})), \
+             patch('src.intelligence.ai_engine.ToolCallingEngine', return_value=tool_engine), \
+             patch('src.intelligence.ai_engine.OpenAIToolModel'), \
+             patch('src.intelligence.ai_engine.add_conversation_message', new=save), \
+             patch('src.intelligence.ai_engine.refresh_user_context') as mock_refresh:
+            response = await engine.process_message_with_tools("Golește cartul", "u1")
+
+        assert response == "Gata."
+        assert saved == [("u1", "Golește cartul", "Gata.", "tool_calling", 1.0)]
+        mock_refresh.assert_called_once_with("u1")
+
+
+class TestHelpers:
+    """Test cases for result compaction and argument parsing"""
+
+    def test_compact_tool_result(self):
+        """Test markdown and blank lines are dropped and long results truncated"""
+        assert compact_tool_result("🛒 **Cart**\n\n\n• Bujori\n\n**Total: 200 MDL**") == \
+            "🛒 Cart\n• Bujori\nTotal: 200 MDL"
+        assert len(compact_tool_result("x" * 1000, max_chars=100)) == 100
+
+    def test_parse_arguments(self):
+        """Test malformed or non-object arguments decode to an empty dict"""
+        assert _parse_arguments('{"order_id": "XOF_1"}') == {"order_id": "XOF_1"}
+        assert _parse_arguments("{oops") == {}
+        assert _parse_arguments("[1]") == {}
+        assert _parse_arguments(None) == {}
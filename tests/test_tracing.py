@@ -0,0 +1,175 @@
+"""
+Unit tests for Request Tracing
+Tests span nesting across tasks, sampling, traceparent propagation and OTLP/JSON export
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+
+from src.helpers import tracing
+from src.helpers.tracing import (
+    BatchSpanProcessor, FileSpanExporter, Tracer, current_span, parse_traceparent, start_span, traced
+)
+from src.intelligence.deadline import DeadlineExceeded, run_within_deadline
+
+
+class ListExporter:
+    """Collects export requests in memory"""
+
+    def __init__(self):
+        self.requests = []
+
+    def export(self, payload):
+        self.requests.append(payload)
+
+    @property
+    def spans(self):
+        return [span for request in self.requests
+                for resource in request['resourceSpans']
+                for scope in resource['scopeSpans']
+                for span in scope['spans']]
+
+
+@pytest.fixture
+def exporter():
+    """Global tracer sampling every trace into a list"""
+    exporter = ListExporter()
+    processor = BatchSpanProcessor(exporter, flush_interval=60)
+    tracer = Tracer({'sample_rate': 1.0}, processor=processor)
+    with patch.object(tracing, '_tracer', tracer):
+        yield exporter
+        processor.flush()
+
+
+def _by_name(spans):
+    return {span['name']: span for span in spans}
+
+
+class TestSpans:
+    """Test cases for span creation and nesting"""
+
+    @pytest.mark.asyncio
+    async def test_nesting_across_tasks_and_stages(self, exporter):
+        """Test stages run through run_within_deadline and decorated calls nest under the request"""
+        @traced("chromadb.search")
+        async def search():
+            current_span().set_attribute('results', 3)
+            return [1, 2, 3]
+
+        with start_span("ai.process_message") as root:
+            await asyncio.gather(
+                run_within_deadline(search(), "product_search", 5),
+                asyncio.ensure_future(run_within_deadline(asyncio.sleep(0), "security", 5))
+            )
+        tracing.get_tracer().processor.flush()
+
+        spans = _by_name(exporter.spans)
+        assert set(spans) == {"ai.process_message", "product_search", "security", "chromadb.search"}
+        assert {span['traceId'] for span in spans.values()} == {root.trace_id}
+        assert spans["product_search"]['parentSpanId'] == root.span_id
+        assert spans["security"]['parentSpanId'] == root.span_id
+        assert spans["chromadb.search"]['parentSpanId'] == spans["product_search"]['spanId']
+        assert {'key': 'results', 'value': {'intValue': '3'}} in spans["chromadb.search"]['attributes']
+
+    @pytest.mark.asyncio
+    async def test_errors_mark_span(self, exporter):
+        """Test exceptions and deadline overruns are recorded as error status"""
+        with pytest.raises(DeadlineExceeded):
+            await run_within_deadline(asyncio.sleep(1), "generation", 0.01)
+        tracing.get_tracer().processor.flush()
+
+        span = exporter.spans[0]
+        assert span['status']['code'] == tracing.STATUS_ERROR
+        assert 'DeadlineExceeded' in span['status']['message']
+
+    def test_unsampled_traces_record_nothing(self):
+        """Test spans of unsampled traces are not exported, children included"""
+        exporter = ListExporter()
+        tracer = Tracer({'sample_rate': 0.0}, processor=BatchSpanProcessor(exporter))
+
+        with patch.object(tracing, '_tracer', tracer):
+            with start_span("root") as root:
+                with start_span("child") as child:
+                    child.set_attribute('ignored', True)
+        tracer.processor.flush()
+
+        assert not root.sampled and child is root
+        assert exporter.requests == []
+
+    def test_disabled_without_exporter(self):
+        """Test the none exporter turns tracing off"""
+        tracer = Tracer({'exporter': 'none', 'sample_rate': 1.0})
+
+        assert tracer.enabled is False
+        assert tracer.new_span("root").sampled is False
+
+
+class TestPropagation:
+    """Test cases for W3C traceparent handling"""
+
+    def test_continues_remote_trace(self, exporter):
+        """Test a sampled incoming traceparent becomes the parent of the request span"""
+        parent = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+
+        with start_span("HTTP POST", parent=parent) as span:
+            pass
+
+        assert span.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert span.parent_id == "00f067aa0ba902b7"
+        assert span.traceparent.startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+
+    def test_rejects_invalid_headers(self):
+        """Test malformed or all-zero trace ids are ignored"""
+        assert parse_traceparent("garbage") is None
+        assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+        assert parse_traceparent(None) is None
+
+
+class TestExport:
+    """Test cases for the exporters"""
+
+    def test_file_exporter_writes_otlp_json(self, tmp_path):
+        """Test spans are written as one OTLP export request per line"""
+        path = tmp_path / "traces.jsonl"
+        processor = BatchSpanProcessor(FileSpanExporter(str(path)), service_name="xoflowers-test")
+        tracer = Tracer({'sample_rate': 1.0}, processor=processor)
+
+        with patch.object(tracing, '_tracer', tracer):
+            with start_span("security", {'security.service': 'gemini'}):
+                pass
+        processor.flush()
+
+        request = json.loads(path.read_text(encoding='utf-8').splitlines()[0])
+        resource = request['resourceSpans'][0]
+        span = resource['scopeSpans'][0]['spans'][0]
+        assert {'key': 'service.name', 'value': {'stringValue': 'xoflowers-test'}} in resource['resource']['attributes']
+        assert span['name'] == "security" and len(span['traceId']) == 32 and len(span['spanId']) == 16
+        assert int(span['endTimeUnixNano']) >= int(span['startTimeUnixNano'])
+
+    def test_file_exporter_rotates(self, tmp_path):
+        """Test the file is rotated once it reaches max_bytes"""
+        path = tmp_path / "traces.jsonl"
+        exporter = FileSpanExporter(str(path), max_bytes=10)
+
+        exporter.export({'resourceSpans': []})
+        exporter.export({'resourceSpans': []})
+
+        assert (tmp_path / "traces.jsonl.1").exists()
+        assert len(path.read_text(encoding='utf-8').splitlines()) == 1
+
+    def test_queue_drops_oldest_when_full(self):
+        """Test a full queue drops the oldest spans instead of growing"""
+        exporter = ListExporter()
+        processor = BatchSpanProcessor(exporter, max_queue=2, flush_interval=60)
+        tracer = Tracer({'sample_rate': 1.0}, processor=processor)
+
+        with patch.object(tracing, '_tracer', tracer):
+            for name in ("a", "b", "c"):
+                with start_span(name):
+                    pass
+        processor.flush()
+
+        assert [span['name'] for span in exporter.spans] == ["b", "c"]
+        assert processor.stats['dropped'] == 1
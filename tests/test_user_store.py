@@ -0,0 +1,117 @@
+"""
+Unit tests for User Store
+Tests SQLite-backed profiles, conversation history and JSON migration
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from src.data.user_store import UserStore
+
+
+class TestUserStore:
+    """Test cases for UserStore class"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Create UserStore backed by a temporary database"""
+        with patch('src.data.user_store.get_service_config') as mock_config:
+            mock_config.return_value = {'user_store': {'enabled': True}}
+            store = UserStore(db_path=str(tmp_path / "users.db"))
+            yield store
+            store.close()
+
+    def test_wal_mode_enabled(self, store):
+        """Test database runs in WAL journal mode"""
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal"
+
+    @pytest.mark.asyncio
+    async def test_append_and_get_recent_messages(self, store):
+        """Test messages are appended per user and returned in order"""
+        for i in range(5):
+            await store.append_message("user_1", {"user": f"msg {i}", "assistant": "ok",
+                                                  "timestamp": f"2025-01-01T10:0{i}:00"})
+        await store.append_message("user_2", {"user": "other", "assistant": "ok",
+                                              "timestamp": "2025-01-01T10:00:00"})
+
+        messages = await store.get_recent_messages("user_1", limit=3)
+        profile = await store.get_profile("user_1")
+
+        assert [m["user"] for m in messages] == ["msg 2", "msg 3", "msg 4"]
+        assert profile["conversation_count"] == 5
+        assert profile["last_interaction"] == "2025-01-01T10:04:00"
+
+    @pytest.mark.asyncio
+    async def test_history_trimmed_on_write(self, store):
+        """Test only the newest max_messages rows are kept per user"""
+        store.max_messages = 3
+        for i in range(5):
+            await store.append_message("user_1", {"user": f"msg {i}", "assistant": "ok"})
+        await store.append_message("user_2", {"user": "other", "assistant": "ok"})
+
+        stored = store._conn.execute(
+            "SELECT COUNT(*) FROM conversation_messages WHERE user_id = 'user_1'").fetchone()[0]
+        messages = await store.get_recent_messages("user_1", limit=10)
+
+        assert stored == 3
+        assert [m["user"] for m in messages] == ["msg 2", "msg 3", "msg 4"]
+        assert len(await store.get_recent_messages("user_2")) == 1
+        assert (await store.get_profile("user_1"))["conversation_count"] == 5
+
+    @pytest.mark.asyncio
+    async def test_update_preferences_merges(self, store):
+        """Test preference updates merge into the existing profile"""
+        await store.update_preferences("user_1", {"color": "red"})
+        await store.update_preferences("user_1", {"budget": "500"})
+
+        profile = await store.get_profile("user_1")
+
+        assert profile["preferences"] == {"color": "red", "budget": "500"}
+
+    @pytest.mark.asyncio
+    async def test_delete_and_cleanup(self, store):
+        """Test user deletion and cleanup of inactive users"""
+        old = (datetime.now() - timedelta(days=10)).isoformat()
+        await store.append_message("old_user", {"user": "hi", "assistant": "hello", "timestamp": old})
+        await store.append_message("new_user", {"user": "hi", "assistant": "hello",
+                                                "timestamp": datetime.now().isoformat()})
+
+        cleaned = await store.cleanup_inactive(datetime.now() - timedelta(days=1))
+
+        assert cleaned == 1
+        assert await store.get_profile("old_user") is None
+        assert await store.get_recent_messages("old_user") == []
+        assert await store.delete_user("new_user") is True
+        assert await store.count_users() == 0
+
+    @pytest.mark.asyncio
+    async def test_migrate_from_json_is_idempotent(self, store, tmp_path):
+        """Test legacy JSON import maps fields and does not duplicate history"""
+        contexts_path = tmp_path / "contexts.json"
+        profiles_path = tmp_path / "profiles.json"
+        contexts_path.write_text(json.dumps({
+            "user_1": [{"user_message": "Salut", "bot_response": "Bună ziua!",
+                        "intent": "greeting", "timestamp": "2025-01-01T10:00:00", "confidence": 0.9}]
+        }))
+        profiles_path.write_text(json.dumps({
+            "user_1": {"user_id": "user_1", "name": "Ana", "preferences": {"flowers": "roses"},
+                       "conversation_count": 1, "first_interaction": "2025-01-01T10:00:00",
+                       "last_interaction": "2025-01-01T10:00:00"}
+        }))
+
+        first = store.migrate_from_json(str(contexts_path), str(profiles_path))
+        second = store.migrate_from_json(str(contexts_path), str(profiles_path))
+
+        messages = await store.get_recent_messages("user_1")
+        profile = await store.get_profile("user_1")
+
+        assert first == {"profiles": 1, "messages": 1}
+        assert second["messages"] == 0
+        assert len(messages) == 1
+        assert messages[0]["user"] == "Salut"
+        assert messages[0]["assistant"] == "Bună ziua!"
+        assert profile["name"] == "Ana"
+        assert profile["preferences"] == {"flowers": "roses"}
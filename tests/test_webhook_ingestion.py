@@ -0,0 +1,369 @@
+"""
+Unit tests for Webhook Ingestion
+Tests queue deduplication, worker processing, retries and backlog metrics
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+import src.data.work_queue as work_queue_module
+from src.api.webhook_ingestion import WebhookIngestion, DeliveryError, REPLY_CHECKPOINT_KEY
+from src.data.work_queue import InMemoryWorkQueue, RedisStreamWorkQueue, ensure_work_queue
+
+
+class TestInMemoryWorkQueue:
+    """Test cases for InMemoryWorkQueue class"""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_updates_are_ignored(self):
+        """Test redelivered update id is enqueued only once"""
+        queue = InMemoryWorkQueue()
+
+        assert await queue.enqueue("telegram", "100", {"update_id": 100}) is True
+        assert await queue.enqueue("telegram", "100", {"update_id": 100}) is False
+        assert await queue.enqueue("instagram", "100", {"mid": "100"}) is True
+
+        backlog = await queue.get_backlog()
+        assert backlog['length'] == 2
+
+    @pytest.mark.asyncio
+    async def test_consume_and_ack(self):
+        """Test consumed update stays pending until acknowledged"""
+        queue = InMemoryWorkQueue()
+        await queue.enqueue("telegram", "1", {"update_id": 1})
+
+        updates = await queue.consume("worker-0", block_ms=10)
+        assert len(updates) == 1
+        assert (await queue.get_backlog())['pending'] == 1
+
+        await queue.ack(updates[0])
+        assert (await queue.get_backlog())['pending'] == 0
+
+    @pytest.mark.asyncio
+    async def test_consume_times_out_when_empty(self):
+        """Test consume returns nothing after block_ms"""
+        queue = InMemoryWorkQueue()
+
+        assert await queue.consume("worker-0", block_ms=10) == []
+
+
+class PendingEntriesQueue(InMemoryWorkQueue):
+    """In-memory queue that tracks the owner and idle time of pending entries like a Redis consumer group"""
+
+    def __init__(self):
+        super().__init__()
+        self.owners = {}
+        self.failures = 0  # ack/retry calls that fail as during a Redis outage
+
+    def _fail_if_down(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Redis unavailable")
+
+    async def consume(self, consumer, count=1, block_ms=1000):
+        updates = await super().consume(consumer, count, block_ms)
+        for update in updates:
+            self.owners[update.entry_id] = (consumer, time.monotonic())
+        return updates
+
+    async def ack(self, update):
+        self._fail_if_down()
+        self.owners.pop(update.entry_id, None)
+        await super().ack(update)
+
+    async def retry(self, update, max_attempts):
+        self._fail_if_down()
+        self.owners.pop(update.entry_id, None)
+        return await super().retry(update, max_attempts)
+
+    async def claim_stale(self, consumer, min_idle_ms, count=10, exclude_ids=()):
+        claimed = []
+        for entry_id, (owner, delivered_at) in list(self.owners.items()):
+            idle_ms = (time.monotonic() - delivered_at) * 1000
+            if entry_id not in exclude_ids and idle_ms >= min_idle_ms:
+                self.owners[entry_id] = (consumer, time.monotonic())
+                claimed.append(self._in_flight[entry_id])
+        return claimed[:count]
+
+    async def refresh(self, consumer, entry_ids):
+        for entry_id in entry_ids:
+            if self.owners.get(entry_id, (None,))[0] == consumer:
+                self.owners[entry_id] = (consumer, time.monotonic())
+
+
+class TestRedisStreamWorkQueue:
+    """Test cases for RedisStreamWorkQueue reclaiming"""
+
+    @pytest.fixture
+    def queue(self):
+        queue = RedisStreamWorkQueue.__new__(RedisStreamWorkQueue)
+        queue.stream = 'updates'
+        queue.group = 'workers'
+        queue._group_ready = True
+        queue.client = Mock()
+        queue.client.xinfo_consumers = AsyncMock(return_value=[
+            {'name': 'host-1-0', 'pending': 2, 'idle': 100},
+            {'name': 'host-2-0', 'pending': 2, 'idle': 90000},
+            {'name': 'host-3-0', 'pending': 0, 'idle': 90000},
+            {'name': 'host-4-0', 'pending': 0, 'idle': 100}
+        ])
+        queue.client.xpending_range = AsyncMock(side_effect=lambda *args, consumername, **kwargs: {
+            'host-1-0': [{'message_id': '1-0'}, {'message_id': '2-0'}],
+            'host-2-0': [{'message_id': '3-0'}]
+        }[consumername])
+        queue.client.xclaim = AsyncMock(side_effect=lambda stream, group, consumer, idle, entry_ids, **kwargs: [
+            (entry_id, {'platform': 'telegram', 'payload': f'{{"entry": "{entry_id}"}}',
+                        'enqueued_at': '1', 'attempts': '1'})
+            for entry_id in entry_ids
+        ])
+        queue.client.xgroup_delconsumer = AsyncMock()
+        return queue
+
+    @pytest.mark.asyncio
+    async def test_claim_skips_held_entries(self, queue):
+        """Test idle entries are claimed, including this consumer's own, unless held locally"""
+        updates = await queue.claim_stale('host-1-0', 60000, exclude_ids={'1-0'})
+
+        assert [call.kwargs['idle'] for call in queue.client.xpending_range.await_args_list] == [60000, 60000]
+        assert [update.payload for update in updates] == [{'entry': '2-0'}, {'entry': '3-0'}]
+        queue.client.xclaim.assert_any_await('updates', 'workers', 'host-1-0', 60000, ['2-0'])
+
+    @pytest.mark.asyncio
+    async def test_claim_removes_exited_consumers(self, queue):
+        """Test consumers idle past min_idle_ms with nothing pending are deleted from the group"""
+        await queue.claim_stale('host-1-0', 60000)
+
+        queue.client.xgroup_delconsumer.assert_awaited_once_with('updates', 'workers', 'host-3-0')
+
+    @pytest.mark.asyncio
+    async def test_refresh_reclaims_held_entries_to_self(self, queue):
+        """Test refresh resets idle time without fetching entry bodies"""
+        await queue.refresh('host-1-0', ['1-0', '2-0'])
+
+        queue.client.xclaim.assert_awaited_once_with('updates', 'workers', 'host-1-0', 0, ['1-0', '2-0'],
+                                                     justid=True)
+
+
+class TestWebhookIngestion:
+    """Test cases for WebhookIngestion class"""
+
+    @staticmethod
+    def _new_ingestion(queue):
+        with patch('src.api.webhook_ingestion.setup_logger'), \
+             patch('src.api.webhook_ingestion.get_service_config') as mock_config:
+            mock_config.return_value = {
+                'webhook_queue': {'enabled': True, 'workers': 2, 'max_attempts': 2, 'block_ms': 10}
+            }
+            ingestion = WebhookIngestion()
+            ingestion.logger = Mock()
+            ingestion._queue = queue
+            return ingestion
+
+    @pytest.fixture
+    def ingestion(self):
+        return self._new_ingestion(InMemoryWorkQueue())
+
+    async def _drain(self, ingestion, timeout=2.0):
+        """Wait until no update is queued or in flight"""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            backlog = await ingestion.queue.get_backlog()
+            if backlog['length'] == 0 and backlog['pending'] == 0:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("Queue was not drained")
+
+    @pytest.mark.asyncio
+    async def test_enqueue_counts_duplicates(self, ingestion):
+        """Test duplicate deliveries are counted and not queued"""
+        assert await ingestion.enqueue("telegram", 42, {"update_id": 42}) is True
+        assert await ingestion.enqueue("telegram", 42, {"update_id": 42}) is False
+
+        metrics = await ingestion.get_metrics()
+        assert metrics['enqueued'] == 1
+        assert metrics['duplicates'] == 1
+        assert metrics['backlog']['length'] == 1
+
+    @pytest.mark.asyncio
+    async def test_workers_process_updates(self, ingestion):
+        """Test workers hand queued payloads to the platform handler"""
+        handler = AsyncMock()
+        ingestion.register_handler("telegram", handler)
+
+        await ingestion.start()
+        try:
+            await ingestion.enqueue("telegram", 1, {"update_id": 1})
+            await ingestion.enqueue("telegram", 2, {"update_id": 2})
+            await self._drain(ingestion)
+        finally:
+            await ingestion.stop()
+
+        assert handler.await_count == 2
+        assert ingestion._stats['processed'] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_update_is_retried_then_dead_lettered(self, ingestion):
+        """Test failing handler is retried up to max_attempts"""
+        handler = AsyncMock(side_effect=RuntimeError("send failed"))
+        ingestion.register_handler("instagram", handler)
+        queue = ingestion.queue
+
+        await ingestion.start()
+        try:
+            await ingestion.enqueue("instagram", "mid.1", {"sender": {"id": "1"}})
+            await self._drain(ingestion)
+        finally:
+            await ingestion.stop()
+
+        assert handler.await_count == 2
+        assert ingestion._stats['retried'] == 1
+        assert ingestion._stats['dead_lettered'] == 1
+        assert (await queue.get_backlog())['dead_letters'] == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_ingestion_starts_no_workers(self, ingestion):
+        """Test start is a no-op when queue mode is disabled"""
+        ingestion.enabled = False
+
+        await ingestion.start()
+
+        assert ingestion._workers == []
+
+    @pytest.mark.asyncio
+    async def test_delivery_retry_reuses_generated_reply(self, ingestion):
+        """Test a delivery failure is retried with the reply and last delivered chunk instead of regenerating it"""
+        payloads = []
+
+        async def handler(payload):
+            payloads.append(payload)
+            if REPLY_CHECKPOINT_KEY not in payload:
+                raise DeliveryError("send failed", reply={"text": "Salut"}, last_chunk=1)
+
+        ingestion.register_handler("telegram", handler)
+
+        await ingestion.start()
+        try:
+            await ingestion.enqueue("telegram", 1, {"update_id": 1})
+            await self._drain(ingestion)
+        finally:
+            await ingestion.stop()
+
+        assert len(payloads) == 2
+        assert payloads[1] == {"update_id": 1,
+                               REPLY_CHECKPOINT_KEY: {"reply": {"text": "Salut"}, "last_chunk": 1}}
+        assert ingestion._stats['processed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_updates_with_same_key_are_processed_in_order(self, ingestion):
+        """Test one chat's updates are not processed concurrently or out of order"""
+        processed = []
+        active = set()
+
+        async def handler(payload):
+            chat = payload['chat']
+            assert chat not in active
+            active.add(chat)
+            await asyncio.sleep(0.01 if payload['seq'] == 0 else 0)
+            processed.append((chat, payload['seq']))
+            active.discard(chat)
+
+        ingestion.register_handler("telegram", handler, ordering_key=lambda payload: payload['chat'])
+
+        await ingestion.start()
+        try:
+            for seq in range(3):
+                for chat in (1, 2):
+                    await ingestion.enqueue("telegram", f"{chat}-{seq}", {"chat": chat, "seq": seq})
+            await self._drain(ingestion)
+        finally:
+            await ingestion.stop()
+
+        for chat in (1, 2):
+            assert [seq for key, seq in processed if key == chat] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_slow_partition_updates_are_not_reclaimed(self):
+        """Test updates buffered past claim_idle_ms behind a slow chat are processed once"""
+        handled = []
+
+        async def handler(payload):
+            handled.append(payload['seq'])
+            await asyncio.sleep(0.1)
+
+        queue = PendingEntriesQueue()
+        ingestion, other = self._new_ingestion(queue), self._new_ingestion(queue)
+        for worker in (ingestion, other):
+            worker.claim_idle_ms = 60
+            worker.register_handler("telegram", handler, ordering_key=lambda payload: payload['chat'])
+
+        for seq in range(4):
+            await ingestion.enqueue("telegram", seq, {"chat": 1, "seq": seq})
+
+        with patch('src.api.webhook_ingestion.default_consumer_name', return_value='host-1'):
+            await ingestion.start()
+        try:
+            while (await queue.get_backlog())['length']:
+                await asyncio.sleep(0.01)
+            with patch('src.api.webhook_ingestion.default_consumer_name', return_value='host-2'):
+                await other.start()
+            await self._drain(ingestion)
+        finally:
+            await other.stop()
+            await ingestion.stop()
+
+        assert handled == [0, 1, 2, 3]
+        assert ingestion._stats['reclaimed'] == 0
+        assert other._stats['reclaimed'] == 0
+
+    @pytest.mark.asyncio
+    async def test_update_left_pending_by_failed_ack_is_reclaimed(self):
+        """Test an update whose ack and retry failed is reclaimed by the same process"""
+        handler = AsyncMock()
+        queue = PendingEntriesQueue()
+        ingestion = self._new_ingestion(queue)
+        ingestion.claim_idle_ms = 60
+        ingestion.register_handler("telegram", handler)
+        queue.failures = 2
+
+        await ingestion.enqueue("telegram", 1, {"update_id": 1})
+        await ingestion.start()
+        try:
+            await self._drain(ingestion)
+        finally:
+            await ingestion.stop()
+
+        assert handler.await_count == 2
+        assert ingestion._stats['reclaimed'] == 1
+        assert queue.owners == {}
+
+    @pytest.mark.asyncio
+    async def test_stop_resets_global_queue(self, ingestion):
+        """Test the next start creates a fresh queue after stop"""
+        with patch('src.api.webhook_ingestion.reset_work_queue') as mock_reset:
+            await ingestion.start()
+            await ingestion.stop()
+
+        mock_reset.assert_called_once()
+        assert ingestion._queue is None
+
+
+class TestEnsureWorkQueue:
+    """Test cases for the work queue startup check"""
+
+    @pytest.mark.asyncio
+    async def test_unreachable_redis_falls_back_to_memory(self):
+        """Test failed Redis ping switches the global queue to the in-memory backend"""
+        redis_queue = RedisStreamWorkQueue.__new__(RedisStreamWorkQueue)
+        redis_queue.config = {'dedup_ttl_seconds': 60}
+        redis_queue.ping = AsyncMock(side_effect=ConnectionError("refused"))
+        redis_queue.close = AsyncMock()
+
+        with patch('src.data.work_queue._work_queue', redis_queue):
+            queue = await ensure_work_queue()
+            assert work_queue_module._work_queue is queue
+
+        assert isinstance(queue, InMemoryWorkQueue)
+        assert queue.dedup_ttl == 60
+        redis_queue.close.assert_awaited_once()
@@ -0,0 +1,153 @@
+"""
+Unit tests for Webhook Body Parsing
+Tests raw-body decoding, early rejection of non-text updates and the webhook endpoints' fast path
+"""
+
+import hashlib
+import hmac
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.api.instagram_integration import instagram_integration
+from src.api.webhook_parsing import (
+    WebhookPayloadError, decode_webhook_body, prune_instagram_webhook, telegram_text_message
+)
+
+
+TEXT_UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "from": {"id": 5, "is_bot": False, "first_name": "Ana"},
+        "chat": {"id": 5, "type": "private"},
+        "date": 1752661800,
+        "text": "Aveți trandafiri?"
+    }
+}
+
+PHOTO_UPDATE = {
+    "update_id": 2,
+    "message": {
+        "message_id": 11,
+        "chat": {"id": 5, "type": "private"},
+        "date": 1752661800,
+        "photo": [{"file_id": "abc", "width": 90, "height": 90}]
+    }
+}
+
+
+def _instagram_event(sender, text=None):
+    event = {"sender": {"id": sender}, "recipient": {"id": "page"}, "timestamp": 1}
+    if text is None:
+        event["read"] = {"mid": "m0"}
+    else:
+        event["message"] = {"id": f"mid_{sender}", "timestamp": "1", "text": text}
+    return event
+
+
+def _instagram_payload(*events):
+    return {"object": "instagram", "entry": [{"id": "page", "time": 1, "messaging": list(events)}]}
+
+
+class TestWebhookParsing:
+    """Test cases for raw-body decoding and pre-validation filters"""
+
+    def test_decodes_bytes(self):
+        """Test bodies decode directly from bytes, including non-ASCII text"""
+        body = json.dumps(TEXT_UPDATE, ensure_ascii=False).encode('utf-8')
+
+        assert decode_webhook_body(body) == TEXT_UPDATE
+
+    @pytest.mark.parametrize("body", [b"{not json", b"[1, 2]", b"\xff\xfe"])
+    def test_rejects_invalid_bodies(self, body):
+        """Test malformed bodies and non-object JSON raise WebhookPayloadError"""
+        with pytest.raises(WebhookPayloadError):
+            decode_webhook_body(body)
+
+    def test_telegram_text_message(self):
+        """Test only updates with a non-empty text message are kept"""
+        edited = {"update_id": 3, "edited_message": TEXT_UPDATE["message"]}
+
+        assert telegram_text_message(TEXT_UPDATE) is TEXT_UPDATE["message"]
+        assert telegram_text_message(edited) is TEXT_UPDATE["message"]
+        assert telegram_text_message(PHOTO_UPDATE) is None
+        assert telegram_text_message({"update_id": 4, "callback_query": {"id": "q"}}) is None
+
+    def test_prune_instagram_webhook(self):
+        """Test non-text events are dropped and webhooks without text are skipped"""
+        payload = _instagram_payload(_instagram_event("a", "Salut"), _instagram_event("b"))
+
+        pruned = prune_instagram_webhook(payload)
+
+        assert [event["sender"]["id"] for event in pruned["entry"][0]["messaging"]] == ["a"]
+        assert prune_instagram_webhook(_instagram_payload(_instagram_event("b"))) is None
+        assert prune_instagram_webhook({"object": "instagram", "entry": [{"id": "page", "time": 1}]}) is None
+
+
+class TestWebhookEndpoints:
+    """Test cases for the webhook endpoints' raw-body path"""
+
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_telegram_non_text_skips_processing(self, client):
+        """Test a photo update is acknowledged without running the pipeline"""
+        with patch('src.api.telegram_integration.telegram_integration.process_webhook',
+                   new=AsyncMock()) as process_webhook:
+            response = client.post("/telegram/webhook", json=PHOTO_UPDATE)
+
+        assert response.status_code == 200
+        assert response.json()["message"] == "ignored"
+        process_webhook.assert_not_awaited()
+
+    def test_telegram_text_is_validated_and_processed(self, client):
+        """Test a text update is validated into the update model and processed"""
+        with patch('src.api.telegram_integration.is_queue_mode_enabled', return_value=False), \
+             patch('src.api.telegram_integration.telegram_integration.process_webhook',
+                   new=AsyncMock(return_value=None)) as process_webhook:
+            response = client.post("/telegram/webhook", json=TEXT_UPDATE)
+
+        assert response.status_code == 200
+        update = process_webhook.await_args.args[0]
+        assert update.message.text == "Aveți trandafiri?"
+
+    def test_telegram_rejects_invalid_body(self, client):
+        """Test malformed JSON and invalid text updates are rejected"""
+        invalid = {"update_id": "x", "message": {"text": "hi"}}
+
+        assert client.post("/telegram/webhook", content=b"{oops").status_code == 400
+        assert client.post("/telegram/webhook", json=invalid).status_code == 422
+
+    def test_instagram_signature_over_raw_body(self, client):
+        """Test the signature is checked over the received bytes and only text events are processed"""
+        body = json.dumps(_instagram_payload(_instagram_event("a", "Bujori?"), _instagram_event("b")),
+                          ensure_ascii=False).encode('utf-8')
+        signature = "sha256=" + hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+
+        with patch.object(instagram_integration, 'app_secret', "secret"), \
+             patch.object(instagram_integration, '_signing_key', b"secret"), \
+             patch('src.api.instagram_integration.is_queue_mode_enabled', return_value=False), \
+             patch.object(instagram_integration, 'process_webhook', new=AsyncMock(return_value=[])) as process:
+            accepted = client.post("/instagram/webhook", content=body,
+                                   headers={"X-Hub-Signature-256": signature})
+            rejected = client.post("/instagram/webhook", content=body + b" ",
+                                   headers={"X-Hub-Signature-256": signature})
+
+        assert accepted.status_code == 200
+        assert rejected.status_code == 403
+        webhook = process.await_args.args[0]
+        assert [event.sender.id for event in webhook.entry[0].messaging] == ["a"]
+
+    def test_instagram_without_text_skips_processing(self, client):
+        """Test a read receipt is acknowledged without building the webhook model"""
+        with patch.object(instagram_integration, 'process_webhook', new=AsyncMock()) as process:
+            response = client.post("/instagram/webhook", json=_instagram_payload(_instagram_event("b")))
+
+        assert response.status_code == 200
+        assert response.json()["responses"] == []
+        process.assert_not_awaited()